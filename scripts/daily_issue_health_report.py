@@ -9,6 +9,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import re
 import subprocess
 import time
@@ -40,6 +41,19 @@ def _iso_to_dt(value: str) -> datetime:
 
 
 def _gh_api(path: str) -> Any:
+    # 有 token 且可导入 issuelab 时走共享连接池客户端（keep-alive + ETag），否则回退 gh CLI；
+    # 显式传入与 gh 相同优先级的 token（GH_TOKEN > GITHUB_TOKEN），身份与配额不变
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        try:
+            from issuelab.tools.github_client import get_github_client
+        except ImportError:
+            pass
+        else:
+            try:
+                return get_github_client().get_json(path, token=token)
+            except Exception as exc:
+                raise RuntimeError(f"GitHub API request failed: {path}\n{exc}") from exc
     return _run_gh_json(["api", path])
 
 
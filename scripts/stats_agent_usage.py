@@ -6,7 +6,8 @@
 使用方法:
     uv run python scripts/stats_agent_usage.py
 
-注意: 需要安装 gh CLI 并登录
+注意: 需要安装 gh CLI 并登录（run 列表、日志与 artifact 下载仍由 gh 完成；
+设置 GH_TOKEN/GITHUB_TOKEN 时 jobs/artifacts 查询走 issuelab 共享连接池客户端）
 """
 
 import asyncio
@@ -25,6 +26,32 @@ def run_cmd(cmd: list[str], timeout: int = 60) -> tuple[int, str, str]:
     return result.returncode, result.stdout, result.stderr
 
 
+def gh_api_json(path: str) -> Any | None:
+    """GET GitHub REST API 并解析 JSON，失败返回 None
+
+    有 token 且可导入 issuelab 时走共享连接池客户端（与 gh 相同的 token 优先级：GH_TOKEN > GITHUB_TOKEN），
+    否则回退 gh CLI。
+    """
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        try:
+            from issuelab.tools.github_client import get_github_client
+        except ImportError:
+            pass
+        else:
+            try:
+                return get_github_client().get_json(path, token=token)
+            except Exception:
+                return None
+    code, stdout, _ = run_cmd(["gh", "api", path])
+    if code != 0:
+        return None
+    try:
+        return json.loads(stdout)
+    except json.JSONDecodeError:
+        return None
+
+
 def get_workflow_runs(limit: int = 50) -> list[dict]:
     """获取最近的 workflow runs"""
     code, stdout, _ = run_cmd(
@@ -39,15 +66,14 @@ def get_workflow_runs(limit: int = 50) -> list[dict]:
 def get_workflow_jobs(run_id: str) -> list[dict]:
     """获取 workflow run 的所有 jobs"""
     repo = os.getenv("GITHUB_REPOSITORY", "gqy20/IssueLab")
-    code, stdout, _ = run_cmd(
-        ["gh", "api", f"repos/{repo}/actions/runs/{run_id}/jobs", "--jq", "[.jobs[] | {name, id, status, conclusion}]"]
-    )
-    if code != 0:
-        return []
-    try:
-        return json.loads(stdout)
-    except Exception:
+    data = gh_api_json(f"repos/{repo}/actions/runs/{run_id}/jobs")
+    if not isinstance(data, dict):
         return []
+    return [
+        {key: job.get(key) for key in ("name", "id", "status", "conclusion")}
+        for job in data.get("jobs", [])
+        if isinstance(job, dict)
+    ]
 
 
 def get_job_id_by_name(run_id: str, job_name: str) -> str:
@@ -98,15 +124,14 @@ def get_job_logs(run_id: str, job_name: str) -> str:
 def get_run_artifacts(run_id: str) -> list[dict]:
     """获取 run 的 artifacts"""
     repo = os.getenv("GITHUB_REPOSITORY", "gqy20/IssueLab")
-    code, stdout, _ = run_cmd(
-        ["gh", "api", f"repos/{repo}/actions/runs/{run_id}/artifacts", "--jq", "[.artifacts[] | {name, id}]"]
-    )
-    if code != 0:
-        return []
-    try:
-        return json.loads(stdout)
-    except Exception:
+    data = gh_api_json(f"repos/{repo}/actions/runs/{run_id}/artifacts")
+    if not isinstance(data, dict):
         return []
+    return [
+        {"name": artifact.get("name"), "id": artifact.get("id")}
+        for artifact in data.get("artifacts", [])
+        if isinstance(artifact, dict)
+    ]
 
 
 def parse_usage_from_log(log: str) -> dict[str, Any]:
@@ -4,9 +4,10 @@ import argparse
 import json
 import os
 
-from issuelab.commands.core import handle_execute, handle_list_agents, handle_review
+from issuelab.commands.core import REVIEW_AGENTS, handle_execute, handle_list_agents, handle_review
 from issuelab.commands.observer import handle_observe, handle_observe_batch
 from issuelab.commands.personal import handle_personal_reply, handle_personal_scan
+from issuelab.commands.registry import handle_registry_build
 from issuelab.config import Config
 from issuelab.logging_config import get_logger, setup_logging
 from issuelab.tools.github import get_issue_info
@@ -44,8 +45,15 @@ def parse_agents_arg(agents_str: str) -> list[str]:
     return [a.lower() for a in agents_str.split() if a]
 
 
-def _prepare_issue_execution_context(issue_number: int) -> tuple[dict, str, str, str, int]:
+def _prepare_issue_execution_context(
+    issue_number: int, agent_names: list[str] | None = None
+) -> tuple[dict, str, str, str, int]:
     """Load issue info and write context file for agent execution commands."""
+    if agent_names:
+        # 获取 Issue 期间后台预热 MCP server（ISSUELAB_MCP_PREWARM=1）
+        from issuelab.agents.options import prewarm_mcp_servers
+
+        prewarm_mcp_servers(agent_names)
     print(f"[INFO] 正在获取 Issue #{issue_number} 信息...")
     issue_info = get_issue_info(issue_number, format_comments=True)
     from issuelab.tools.github import write_issue_context_file
@@ -58,9 +66,21 @@ def _prepare_issue_execution_context(issue_number: int) -> tuple[dict, str, str,
         comment_count=issue_info.get("comment_count", 0),
     )
     context = f"**Issue 内容文件**: {issue_file}\n请使用 Read 工具读取该文件后再进行分析。"
+    from issuelab.tools.issue_index import build_issue_index_hint, issue_index_enabled, issue_index_stats
+
+    if issue_index_enabled():
+        index_hint = build_issue_index_hint(issue_index_stats(issue_number))
+        if index_hint:
+            context = f"**Issue 内容文件**: {issue_file}\n{index_hint}"
     comments = issue_info.get("comments", "")
     comment_count = issue_info.get("comment_count", 0)
     print(f"[OK] 已获取: 标题={issue_info.get('title', '')[:30]}..., 评论数={comment_count}")
+    compaction = issue_info.get("context_compaction")
+    if compaction:
+        print(
+            f"[OK] 评论上下文压缩: {compaction['original_tokens']} → {compaction['compacted_tokens']} tokens "
+            f"(压缩比 {compaction['ratio']:.1%})"
+        )
     return issue_info, issue_file, context, comments, comment_count
 
 
@@ -118,14 +138,28 @@ def main():
     )
     personal_reply_parser.add_argument("--post", action="store_true", help="自动发布回复到主仓库")
 
+    registry_parser = subparsers.add_parser("registry", help="Agent registry 工具")
+    registry_subparsers = registry_parser.add_subparsers(dest="registry_command", help="registry 子命令")
+    registry_build_parser = registry_subparsers.add_parser(
+        "build", help="编译 agents 配置/prompt/输出模板为单文件快照（加速冷启动）"
+    )
+    registry_build_parser.add_argument("--root", type=str, default=".", help="项目根目录（默认当前目录）")
+    registry_build_parser.add_argument(
+        "--output",
+        type=str,
+        default="",
+        help="输出路径（默认 ISSUELAB_REGISTRY_SNAPSHOT_PATH 或 <root>/.issuelab/registry_snapshot.json；"
+        "加载时只读取该默认路径）",
+    )
+
     args = parser.parse_args()
 
     if args.command == "execute":
-        _, _, context, _, comment_count = _prepare_issue_execution_context(args.issue)
+        _, _, context, _, comment_count = _prepare_issue_execution_context(args.issue, parse_agents_arg(args.agents))
         return handle_execute(args, context, comment_count, parse_agents_arg)
 
     if args.command == "review":
-        _, _, context, _, comment_count = _prepare_issue_execution_context(args.issue)
+        _, _, context, _, comment_count = _prepare_issue_execution_context(args.issue, list(REVIEW_AGENTS))
         handle_review(args, context, comment_count)
         return None
 
@@ -144,6 +178,12 @@ def main():
     if args.command == "personal-reply":
         return handle_personal_reply(args)
 
+    if args.command == "registry":
+        if args.registry_command == "build":
+            return handle_registry_build(args)
+        registry_parser.print_help()
+        return None
+
     if args.command == "list-agents":
         handle_list_agents()
         return None
@@ -0,0 +1,132 @@
+"""Agent 并发准入控制
+
+run_agents_parallel 同时启动大量 agent 时，会一起打到模型 API，触发 429 与重试风暴。
+这里提供按权重计数的全局并发限制：
+- 容量（总权重）由 ISSUELAB_AGENT_MAX_CONCURRENCY 配置，默认 4；
+- agent 权重取 agent.yml 的 concurrency_weight（gqy20 多阶段默认 2，其余默认 1）；
+- 等待队列按 agent.yml 的 priority 从高到低放行，同优先级先到先得；
+- 记录每个 agent 的排队等待时间。
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+import weakref
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from issuelab.logging_config import get_logger
+from issuelab.utils.env import env_int
+
+logger = get_logger(__name__)
+
+DEFAULT_AGENT_MAX_CONCURRENCY = 4
+MULTISTAGE_DEFAULT_WEIGHT = 2
+
+
+@dataclass(order=True)
+class _Waiter:
+    sort_key: tuple[int, int]
+    weight: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class WeightedLimiter:
+    """按权重计数的异步并发限制器（同一事件循环内使用）"""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self.in_use = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+
+    def _clamp(self, weight: int) -> int:
+        # 权重超过容量时按容量计，避免永远无法放行
+        return min(max(1, weight), self.capacity)
+
+    async def acquire(self, weight: int = 1, priority: int = 0) -> None:
+        weight = self._clamp(weight)
+        if not self._waiters and self.in_use + weight <= self.capacity:
+            self.in_use += weight
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter((-priority, next(self._seq)), weight, future)
+        heapq.heappush(self._waiters, waiter)
+        try:
+            await future
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # 已被放行但在恢复前取消：归还容量
+                self.release(weight)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._wake()
+            raise
+
+    def release(self, weight: int = 1) -> None:
+        self.in_use = max(0, self.in_use - self._clamp(weight))
+        self._wake()
+
+    def _wake(self) -> None:
+        # 严格按队首放行，保证高优先级（以及较重的 agent）不会被插队饿死
+        while self._waiters and self.in_use + self._waiters[0].weight <= self.capacity:
+            waiter = heapq.heappop(self._waiters)
+            if waiter.future.done():
+                continue
+            self.in_use += waiter.weight
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, weight: int = 1, priority: int = 0) -> AsyncIterator[float]:
+        """占用一个槽位，产出排队等待秒数"""
+        start = time.perf_counter()
+        await self.acquire(weight, priority)
+        try:
+            yield time.perf_counter() - start
+        finally:
+            self.release(weight)
+
+
+def get_max_concurrency() -> int:
+    """全局并发容量（ISSUELAB_AGENT_MAX_CONCURRENCY，<=0 或非法时使用默认值）"""
+    return env_int("ISSUELAB_AGENT_MAX_CONCURRENCY", DEFAULT_AGENT_MAX_CONCURRENCY, minimum=1)
+
+
+# 每个事件循环一个限制器：同一进程内并发的 run_agents_parallel 共享容量
+_LIMITERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, WeightedLimiter]" = weakref.WeakKeyDictionary()
+
+
+def get_agent_limiter() -> WeightedLimiter:
+    loop = asyncio.get_running_loop()
+    capacity = get_max_concurrency()
+    limiter = _LIMITERS.get(loop)
+    if limiter is None or (limiter.capacity != capacity and not limiter.in_use):
+        limiter = WeightedLimiter(capacity)
+        _LIMITERS[loop] = limiter
+    return limiter
+
+
+def _int_option(value: object, default: int) -> int:
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, int | float | str):
+        try:
+            return int(value)
+        except ValueError:
+            return default
+    return default
+
+
+def get_agent_admission(agent_name: str, multistage: bool = False) -> tuple[int, int]:
+    """返回 agent 的 (权重, 优先级)"""
+    from issuelab.agents.registry import get_agent_config
+
+    config = get_agent_config(agent_name) or {}
+    default_weight = MULTISTAGE_DEFAULT_WEIGHT if multistage else 1
+    weight = max(1, _int_option(config.get("concurrency_weight"), default_weight))
+    priority = _int_option(config.get("priority"), 0)
+    return weight, priority
@@ -0,0 +1,263 @@
+"""常驻 SDK 客户端池
+
+claude_agent_sdk.query 每次调用都会启动并销毁一个 CLI 子进程；gqy20 多阶段流程
+（含 Judge 重试）和 observe-batch 会串行启动大量进程，只有这两处开启池作用域
+（run_agents_parallel 的并发扇出各 agent 只调用一次，复用不到进程）。开启后，同一作用域内
+按 agent 名与选项签名复用长连接的 ClaudeSDKClient，不同 agent 之间从不共用进程：
+- 每个客户端由池内独立 worker 任务持有（SDK 要求 connect/disconnect 在同一任务内）；
+- 任务之间发送 /clear 重置会话：CLI 在流式模式下本地处理该命令并开启新会话，
+  池校验 session_id 确实切换后才复用，未切换、重置失败、任务出错或达到复用上限时丢弃该进程；
+- 池满且无空闲客户端时回退为一次性 query，不排队等待。
+
+环境变量：
+- ISSUELAB_SDK_CLIENT_POOL=1          开启
+- ISSUELAB_SDK_CLIENT_POOL_SIZE       最大常驻客户端数（默认 4）
+- ISSUELAB_SDK_CLIENT_MAX_USES        单个客户端最多承接的任务数（默认 8）
+"""
+
+import contextvars
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any
+
+import anyio
+from anyio.abc import ObjectSendStream, TaskGroup, TaskStatus
+from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient, ResultMessage, SystemMessage, query
+
+from issuelab.agents.options import get_agent_options_cache_key
+from issuelab.logging_config import get_logger
+from issuelab.utils.env import env_flag, env_int
+
+logger = get_logger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_MAX_USES = 8
+RESET_COMMAND = "/clear"
+RESET_TIMEOUT_SECONDS = 10.0
+
+
+def client_pool_enabled() -> bool:
+    return env_flag("ISSUELAB_SDK_CLIENT_POOL")
+
+
+@dataclass
+class _Failure:
+    exc: Exception
+
+
+_UNAVAILABLE = object()
+
+
+@dataclass(eq=False)
+class _Worker:
+    key: str
+    options: ClaudeAgentOptions
+    jobs: ObjectSendStream[tuple[str, ObjectSendStream[Any]]]
+    uses: int = 0
+    closed: bool = field(default=False)
+    session_id: str | None = None
+
+
+def _session_id(message: Any) -> str | None:
+    if isinstance(message, ResultMessage):
+        return message.session_id or None
+    if isinstance(message, SystemMessage) and message.subtype == "init":
+        return message.data.get("session_id") or None
+    return None
+
+
+class ClientPool:
+    """按 agent 名与选项签名复用 ClaudeSDKClient 的有界池（须在 agent_client_pool 作用域内使用）"""
+
+    def __init__(
+        self,
+        task_group: TaskGroup,
+        max_size: int = DEFAULT_POOL_SIZE,
+        max_uses: int = DEFAULT_MAX_USES,
+        client_factory: Callable[[ClaudeAgentOptions], Any] | None = None,
+    ) -> None:
+        self._tg = task_group
+        self.max_size = max(1, max_size)
+        self.max_uses = max(1, max_uses)
+        self._client_factory = client_factory or (lambda options: ClaudeSDKClient(options=options))
+        self._idle: dict[str, list[_Worker]] = {}
+        self._workers: set[_Worker] = set()
+        self._closed = False
+        self.stats = {"spawned": 0, "reused": 0, "fallback": 0, "discarded": 0}
+
+    @staticmethod
+    def _key(options: ClaudeAgentOptions, agent_name: str | None) -> str:
+        # 未登记的选项按对象身份区分；worker 持有引用，存活期间 id 不会被复用
+        return f"{agent_name or ''}|{get_agent_options_cache_key(options) or f'id:{id(options)}'}"
+
+    async def _acquire(self, key: str, options: ClaudeAgentOptions) -> _Worker | None:
+        idle = self._idle.get(key)
+        if idle:
+            self.stats["reused"] += 1
+            return idle.pop()
+        if len(self._workers) >= self.max_size:
+            victim = next((workers.pop() for workers in self._idle.values() if workers), None)
+            if victim is None:
+                return None
+            self._retire(victim)
+        worker = await self._tg.start(self._serve, key, options)
+        self.stats["spawned"] += 1
+        return worker
+
+    def _retire(self, worker: _Worker) -> None:
+        if not worker.closed:
+            worker.closed = True
+            worker.jobs.close()
+        self._workers.discard(worker)
+        idle = self._idle.get(worker.key)
+        if idle and worker in idle:
+            idle.remove(worker)
+
+    async def _serve(self, key: str, options: ClaudeAgentOptions, *, task_status: TaskStatus[_Worker]) -> None:
+        jobs_send, jobs_recv = anyio.create_memory_object_stream[tuple[str, ObjectSendStream[Any]]](1)
+        worker = _Worker(key, options, jobs_send)
+        client = self._client_factory(options)
+        await client.connect()
+        self._workers.add(worker)
+        task_status.started(worker)
+
+        try:
+            async with jobs_recv:
+                async for prompt, out in jobs_recv:
+                    # 上一个任务的会话在下一个任务开始前清空
+                    if worker.uses and not await self._reset(worker, client):
+                        with suppress(anyio.BrokenResourceError, anyio.ClosedResourceError):
+                            await out.send(_UNAVAILABLE)
+                        out.close()
+                        break
+                    worker.uses += 1
+                    if not await self._run_job(worker, client, prompt, out):
+                        break
+        finally:
+            if not worker.closed and not self._closed:
+                self.stats["discarded"] += 1
+            self._retire(worker)
+            with anyio.CancelScope(shield=True):
+                try:
+                    await client.disconnect()
+                except Exception as exc:
+                    logger.debug("关闭池化客户端失败: %s", exc)
+
+    def _release(self, worker: _Worker) -> bool:
+        """任务完成后归还空闲队列；已关闭或达到复用上限时返回 False"""
+        if worker.closed or self._closed or worker.uses >= self.max_uses:
+            return False
+        self._idle.setdefault(worker.key, []).append(worker)
+        return True
+
+    async def _run_job(self, worker: _Worker, client: Any, prompt: str, out: ObjectSendStream[Any]) -> bool:
+        with out:
+            try:
+                await client.query(prompt)
+                async for message in client.receive_response():
+                    worker.session_id = _session_id(message) or worker.session_id
+                    await out.send(message)
+            except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+                # 调用方提前放弃（超时/异常），进程状态未知
+                return False
+            except Exception as exc:
+                with suppress(anyio.BrokenResourceError, anyio.ClosedResourceError):
+                    await out.send(_Failure(exc))
+                return False
+            # 先归还再关闭输出流，调用方读完消息时客户端已可被下一个任务借用
+            return self._release(worker)
+
+    @staticmethod
+    async def _reset(worker: _Worker, client: Any) -> bool:
+        """发送 /clear 并确认 CLI 已切换到新会话；无法确认时返回 False（调用方丢弃进程）"""
+        previous = worker.session_id
+        current = None
+        try:
+            with anyio.fail_after(RESET_TIMEOUT_SECONDS):
+                await client.query(RESET_COMMAND)
+                async for message in client.receive_response():
+                    current = _session_id(message) or current
+        except Exception as exc:
+            logger.debug("池化客户端重置失败，丢弃: %s", exc)
+            return False
+        if previous is None or current is None or current == previous:
+            logger.warning("池化客户端 %s 后会话未切换（session_id=%s），丢弃以免上下文泄漏", RESET_COMMAND, current)
+            return False
+        worker.session_id = current
+        return True
+
+    async def query(
+        self, prompt: str, options: ClaudeAgentOptions, agent_name: str | None = None
+    ) -> AsyncIterator[Any]:
+        """与 claude_agent_sdk.query 等价的消息流；优先借用同一 agent 的池内客户端"""
+        worker = None if self._closed else await self._acquire(self._key(options, agent_name), options)
+        if worker is None:
+            self.stats["fallback"] += 1
+            async for message in query(prompt=prompt, options=options):
+                yield message
+            return
+
+        out_send, out_recv = anyio.create_memory_object_stream[Any](32)
+        await worker.jobs.send((prompt, out_send))
+        async with out_recv:
+            async for item in out_recv:
+                if item is _UNAVAILABLE:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.exc
+                yield item
+            else:
+                return
+
+        self.stats["fallback"] += 1
+        async for message in query(prompt=prompt, options=options):
+            yield message
+
+    def close(self) -> None:
+        self._closed = True
+        for worker in list(self._workers):
+            if not worker.closed:
+                worker.closed = True
+                worker.jobs.close()
+        self._idle.clear()
+
+
+_ACTIVE_POOL: contextvars.ContextVar[ClientPool | None] = contextvars.ContextVar("issuelab_client_pool", default=None)
+
+
+def get_active_client_pool() -> ClientPool | None:
+    return _ACTIVE_POOL.get()
+
+
+@asynccontextmanager
+async def agent_client_pool(
+    client_factory: Callable[[ClaudeAgentOptions], Any] | None = None,
+) -> AsyncIterator[ClientPool | None]:
+    """开启客户端池作用域；未开启或已处于外层作用域时直接复用外层（可能为 None）"""
+    existing = _ACTIVE_POOL.get()
+    if existing is not None or not client_pool_enabled():
+        yield existing
+        return
+
+    host_error: Exception | None = None
+    async with anyio.create_task_group() as tg:
+        pool = ClientPool(
+            tg,
+            max_size=env_int("ISSUELAB_SDK_CLIENT_POOL_SIZE", DEFAULT_POOL_SIZE, minimum=1),
+            max_uses=env_int("ISSUELAB_SDK_CLIENT_MAX_USES", DEFAULT_MAX_USES, minimum=1),
+            client_factory=client_factory,
+        )
+        token = _ACTIVE_POOL.set(pool)
+        try:
+            yield pool
+        except Exception as exc:
+            # 作用域内的异常原样抛出，不被任务组包装为 ExceptionGroup
+            host_error = exc
+            tg.cancel_scope.cancel()
+        finally:
+            _ACTIVE_POOL.reset(token)
+            pool.close()
+            logger.info("SDK 客户端池统计: %s", pool.stats)
+    if host_error is not None:
+        raise host_error
@@ -8,12 +8,15 @@ from typing import Any
 
 # 统一 registry 读取
 from issuelab.agents.registry import load_registry
+from issuelab.agents.snapshot import get_snapshot_for_agents_dir
 
 AGENTS_DIR = Path(__file__).parent.parent.parent.parent / "agents"
 
 # 进程级缓存
 _CACHED_AGENTS: dict[str, dict[str, Any]] | None = None
 _CACHED_SIGNATURE: tuple[tuple[str, float], ...] | None = None
+# Agent 矩阵按 discover_agents 结果对象缓存（签名变化时该对象会被替换）
+_CACHED_MATRIX: tuple[dict[str, dict[str, Any]], str] | None = None
 
 
 def _get_discovery_signature() -> tuple:
@@ -40,6 +43,7 @@ def discover_agents() -> dict[str, dict[str, Any]]:
     """动态发现所有可用的 Agent
 
     通过读取 agents/<name>/agent.yml + prompt.md
+    （存在有效的 .issuelab/registry_snapshot.json 时直接使用快照内容）
 
     Returns:
         {
@@ -59,14 +63,19 @@ def discover_agents() -> dict[str, dict[str, Any]]:
     agents: dict[str, dict[str, Any]] = {}
     if AGENTS_DIR.exists():
         registry = load_registry(AGENTS_DIR, include_disabled=False)
+        snapshot = get_snapshot_for_agents_dir(AGENTS_DIR)
+        snapshot_agents = snapshot.get("agents", {}) if snapshot else {}
 
         for agent_name, agent_config in registry.items():
-            agent_dir = AGENTS_DIR / agent_name
-            prompt_file = agent_dir / "prompt.md"
-            if not prompt_file.exists():
-                continue
-
-            prompt_content = prompt_file.read_text()
+            if snapshot is not None:
+                prompt_content = (snapshot_agents.get(agent_name) or {}).get("prompt")
+                if prompt_content is None:
+                    continue
+            else:
+                prompt_file = AGENTS_DIR / agent_name / "prompt.md"
+                if not prompt_file.exists():
+                    continue
+                prompt_content = prompt_file.read_text()
             clean_content = prompt_content.strip()
 
             description = str(agent_config.get("description", ""))
@@ -87,7 +96,10 @@ def discover_agents() -> dict[str, dict[str, Any]]:
 
 def get_agent_matrix_markdown() -> str:
     """生成 Agent 矩阵的 Markdown 表格（用于 Observer Prompt）"""
+    global _CACHED_MATRIX
     agents = discover_agents()
+    if _CACHED_MATRIX is not None and _CACHED_MATRIX[0] is agents:
+        return _CACHED_MATRIX[1]
 
     lines = [
         "| Agent | 描述 | 何时触发 |",
@@ -102,7 +114,9 @@ def get_agent_matrix_markdown() -> str:
         desc = config.get("description", "")
         lines.append(f"| **{name}** | {desc} | {trigger} |")
 
-    return "\n".join(lines)
+    matrix = "\n".join(lines)
+    _CACHED_MATRIX = (agents, matrix)
+    return matrix
 
 
 def load_prompt(agent_name: str) -> str:
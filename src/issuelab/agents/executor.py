@@ -4,9 +4,11 @@
 """
 
 import asyncio
+import dataclasses
 import os
 import re
 import sys
+import time
 from pathlib import Path
 from typing import Any, cast
 
@@ -19,14 +21,46 @@ from claude_agent_sdk import (
     ThinkingBlock,
     ToolResultBlock,
     ToolUseBlock,
+    UserMessage,
     query,
 )
 
+from issuelab.agents.admission import get_agent_admission, get_agent_limiter
+from issuelab.agents.client_pool import agent_client_pool, get_active_client_pool
 from issuelab.agents.config import AgentConfig
-from issuelab.agents.options import create_agent_options, format_mcp_servers_for_prompt
+from issuelab.agents.mcp_proxy import shared_mcp_proxy
+from issuelab.agents.options import (
+    create_agent_options,
+    format_mcp_servers_for_prompt,
+    get_agent_options_cache_key,
+)
 from issuelab.agents.registry import get_agent_config, is_system_agent
+from issuelab.agents.result_cache import CACHED_FIELDS, build_result_cache_key, context_file_digest, get_result_cache
+from issuelab.agents.snapshot import get_snapshot_path, load_registry_snapshot, snapshot_enabled
+from issuelab.agents.stage_checkpoint import get_stage_checkpoint_store, inputs_digest
+from issuelab.agents.stage_dag import StageSpec, parse_stage_specs, run_stage_dag, summarize_dag_run
+from issuelab.agents.timings import TimingCollector, write_timings_record
+from issuelab.agents.tool_cache import ToolCacheCounter
+from issuelab.agents.trace import (
+    get_replay_path,
+    get_replay_speed,
+    get_trace_recorder,
+    record_messages,
+    replay_trace,
+    trace_issue,
+)
+from issuelab.config import Config
 from issuelab.logging_config import get_logger
-from issuelab.retry import retry_async
+from issuelab.retry import (
+    ERROR_AUTH,
+    ERROR_OVERLOADED,
+    ERROR_RATE_LIMIT,
+    RetryError,
+    RetryPolicy,
+    classify_error,
+    get_shared_retry_bucket,
+)
+from issuelab.utils.env import env_flag
 from issuelab.utils.yaml_text import extract_yaml_block
 
 logger = get_logger(__name__)
@@ -35,8 +69,14 @@ _SYSTEM_EXECUTION_TIMEOUT_SECONDS = 600
 
 _ALLOWED_OUTPUT_FORMATS = {"markdown", "yaml", "hybrid"}
 _ALLOWED_MENTIONS_MODES = {"controlled", "required", "off"}
-_GLOBAL_OUTPUT_TEMPLATES_CACHE: dict[str, Any] | None = None
-_AGENT_OUTPUT_CONFIG_CACHE: dict[str, dict[str, Any]] = {}
+# 输出模板/配置缓存按源文件签名失效：{key: (signature, value)}
+_GLOBAL_OUTPUT_TEMPLATES_CACHE: dict[str, tuple[tuple, dict[str, Any]]] = {}
+_AGENT_OUTPUT_CONFIG_CACHE: dict[str, tuple[tuple, dict[str, Any]]] = {}
+# 渲染后的输出格式片段：(agent, output_format, mentions_mode, template, section_order, 源文件签名) -> 文本
+_OUTPUT_SCHEMA_CACHE: dict[tuple, str] = {}
+_OUTPUT_SCHEMA_CACHE_MAX = 1024
+# agent 输出偏好：{agent_name: (registry 中的配置对象, 偏好)}，配置对象变化（registry 重载）即失效
+_OUTPUT_PREFERENCES_CACHE: dict[str, tuple[Any, tuple[str, str, str | None, list[str] | None]]] = {}
 
 _OUTPUT_SCHEMA_BLOCK_MARKDOWN = (
     "\n\n## Output Format (required)\n"
@@ -73,14 +113,60 @@ _OUTPUT_SCHEMA_BLOCK_HYBRID = (
 _DEFAULT_ATTEMPT_TIMEOUT_SECONDS = 90
 
 
+class AgentAPIError(Exception):
+    """模型 API 在对话中返回的错误（AssistantMessage.error）"""
+
+    _STATUS_BY_KIND = {
+        "rate_limit": 429,
+        "authentication_failed": 401,
+        "billing_error": 402,
+        "invalid_request": 400,
+        "server_error": 500,
+    }
+
+    def __init__(self, kind: str, detail: str = "") -> None:
+        super().__init__(f"API error: {kind}" + (f" - {detail}" if detail else ""))
+        self.kind = kind
+        self.api_error_status = self._STATUS_BY_KIND.get(kind)
+
+
 def _classify_run_exception(exc: Exception) -> str:
     if isinstance(exc, TimeoutError):
         return "timeout"
     if isinstance(exc, asyncio.CancelledError):
         return "timeout"
+    cause = exc.__cause__ if isinstance(exc, RetryError) and exc.__cause__ else exc
+    if isinstance(cause, TimeoutError):
+        return "timeout"
+    error_class = classify_error(cause)
+    if error_class in {ERROR_RATE_LIMIT, ERROR_OVERLOADED, ERROR_AUTH}:
+        return error_class
     return "unknown"
 
 
+def _log_slowest_tool(agent_name: str, summary: dict[str, Any]) -> None:
+    """记录耗时概要，标出最慢的工具调用"""
+    tools = summary.get("tools") or []
+    slowest = max(tools, key=lambda t: t["seconds"], default=None)
+    line = (
+        f"[{agent_name}] [Timing] 总耗时 {summary['total_seconds']:.1f}s, "
+        f"模型 {summary['model_seconds']:.1f}s, 工具 {summary['tool_seconds']:.1f}s"
+    )
+    if slowest is not None:
+        line += f", 最慢工具 {slowest['name']} {slowest['seconds']:.1f}s"
+    logger.info(line)
+
+
+def _agent_retry_policy() -> RetryPolicy:
+    """agent 查询的重试策略：按错误类别重试，限流时与其他并行 agent 共享退避"""
+    return RetryPolicy(
+        max_retries=3,
+        base_delay=2.0,
+        should_retry=_should_retry_run_exception,
+        bucket=get_shared_retry_bucket(),
+    )
+
+
 def _should_retry_run_exception(exc: Exception) -> bool:
     return not isinstance(exc, TimeoutError | asyncio.CancelledError)
 
@@ -105,48 +191,106 @@ def _get_project_root() -> Path:
     return Path.cwd()
 
 
-def _load_global_output_templates(root_dir: Path | None = None) -> dict[str, Any]:
-    global _GLOBAL_OUTPUT_TEMPLATES_CACHE
-    if _GLOBAL_OUTPUT_TEMPLATES_CACHE is not None:
-        return _GLOBAL_OUTPUT_TEMPLATES_CACHE
+def _file_signature(path: Path) -> tuple:
+    try:
+        st = path.stat()
+    except OSError:
+        return (str(path), None)
+    return (str(path), st.st_mtime_ns, st.st_size)
+
 
+def _templates_signature(root: Path) -> tuple:
+    return (
+        snapshot_enabled(),
+        _file_signature(get_snapshot_path(root)),
+        _file_signature(root / "config" / "output_templates.yml"),
+    )
+
+
+def _agent_output_config_signature(root: Path, agent_name: str) -> tuple:
+    return (
+        snapshot_enabled(),
+        _file_signature(get_snapshot_path(root)),
+        _file_signature(root / "agents" / agent_name / "output_config.yml"),
+    )
+
+
+def clear_prompt_caches() -> None:
+    """清除输出模板、输出格式片段与输出偏好缓存"""
+    _GLOBAL_OUTPUT_TEMPLATES_CACHE.clear()
+    _AGENT_OUTPUT_CONFIG_CACHE.clear()
+    _OUTPUT_SCHEMA_CACHE.clear()
+    _OUTPUT_PREFERENCES_CACHE.clear()
+
+
+def _load_global_output_templates(root_dir: Path | None = None) -> dict[str, Any]:
     root = root_dir or _get_project_root()
+    key = str(root)
+    signature = _templates_signature(root)
+    cached = _GLOBAL_OUTPUT_TEMPLATES_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    templates = _read_global_output_templates(root)
+    _GLOBAL_OUTPUT_TEMPLATES_CACHE[key] = (signature, templates)
+    return templates
+
+
+def _read_global_output_templates(root: Path) -> dict[str, Any]:
+    snapshot = load_registry_snapshot(root)
+    if snapshot is not None:
+        templates = snapshot.get("output_templates")
+        return templates if isinstance(templates, dict) else {}
+
     path = root / "config" / "output_templates.yml"
     if not path.exists():
-        _GLOBAL_OUTPUT_TEMPLATES_CACHE = {}
-        return _GLOBAL_OUTPUT_TEMPLATES_CACHE
+        return {}
     try:
         data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
-        _GLOBAL_OUTPUT_TEMPLATES_CACHE = data if isinstance(data, dict) else {}
+        return data if isinstance(data, dict) else {}
     except Exception:
-        _GLOBAL_OUTPUT_TEMPLATES_CACHE = {}
-    return _GLOBAL_OUTPUT_TEMPLATES_CACHE
+        return {}
 
 
 def _load_agent_output_config(agent_name: str, root_dir: Path | None = None) -> dict[str, Any]:
-    key = f"{root_dir or _get_project_root()}::{agent_name}"
-    if key in _AGENT_OUTPUT_CONFIG_CACHE:
-        return _AGENT_OUTPUT_CONFIG_CACHE[key]
-
     root = root_dir or _get_project_root()
+    key = f"{root}::{agent_name}"
+    signature = _agent_output_config_signature(root, agent_name)
+    cached = _AGENT_OUTPUT_CONFIG_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    output_config = _read_agent_output_config(root, agent_name)
+    _AGENT_OUTPUT_CONFIG_CACHE[key] = (signature, output_config)
+    return output_config
+
+
+def _read_agent_output_config(root: Path, agent_name: str) -> dict[str, Any]:
+    snapshot = load_registry_snapshot(root)
+    if snapshot is not None and agent_name in snapshot.get("agents", {}):
+        output_config = snapshot["agents"][agent_name].get("output_config")
+        return output_config if isinstance(output_config, dict) else {}
+
     path = root / "agents" / agent_name / "output_config.yml"
     if not path.exists():
-        _AGENT_OUTPUT_CONFIG_CACHE[key] = {}
-        return _AGENT_OUTPUT_CONFIG_CACHE[key]
+        return {}
     try:
         data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
-        _AGENT_OUTPUT_CONFIG_CACHE[key] = data if isinstance(data, dict) else {}
+        return data if isinstance(data, dict) else {}
     except Exception:
-        _AGENT_OUTPUT_CONFIG_CACHE[key] = {}
-    return _AGENT_OUTPUT_CONFIG_CACHE[key]
+        return {}
 
 
 def _resolve_output_template(
     agent_name: str, template_id: str | None, *, root_dir: Path | None = None, default_template: str = "review_v1"
 ) -> dict[str, Any] | None:
     global_config = _load_global_output_templates(root_dir=root_dir)
-    global_templates = global_config.get("templates", {}) if isinstance(global_config, dict) else {}
     agent_config = _load_agent_output_config(agent_name, root_dir=root_dir)
+    return _select_output_template(global_config, agent_config, template_id, default_template=default_template)
+
+
+def _select_output_template(
+    global_config: dict[str, Any], agent_config: dict[str, Any], template_id: str | None, *, default_template: str
+) -> dict[str, Any] | None:
+    global_templates = global_config.get("templates", {}) if isinstance(global_config, dict) else {}
     local_templates = agent_config.get("templates", {}) if isinstance(agent_config, dict) else {}
 
     template_name = template_id
@@ -222,9 +366,19 @@ def _build_template_instruction(
 
 def _get_output_preferences(agent_name: str) -> tuple[str, str, str | None, list[str] | None]:
     try:
-        config = get_agent_config(agent_name) or {}
+        registry_config = get_agent_config(agent_name)
     except Exception:
-        config = {}
+        registry_config = None
+    cached = _OUTPUT_PREFERENCES_CACHE.get(agent_name)
+    # get_agent_config 每次返回副本，按内容判断配置是否变化
+    if cached is not None and cached[0] == registry_config:
+        return cached[1]
+    preferences = _parse_output_preferences(registry_config or {})
+    _OUTPUT_PREFERENCES_CACHE[agent_name] = (registry_config, preferences)
+    return preferences
+
+
+def _parse_output_preferences(config: dict[str, Any]) -> tuple[str, str, str | None, list[str] | None]:
 
     template_id = config.get("output_template")
     if not isinstance(template_id, str):
@@ -256,37 +410,93 @@ def _append_output_schema(
     """为 prompt 注入统一输出格式（如果尚未注入）。"""
     if "## Output Format (required)" in prompt:
         return prompt
-    if stage_name:
+    if stage_name or output_format == "yaml":
         return f"{prompt}{_OUTPUT_SCHEMA_BLOCK_YAML}"
+    return prompt + _output_schema_block(agent_name, output_format, mentions_mode, output_template, section_order)
+
+
+def _agent_output_schema(agent_name: str) -> str:
+    """agent 常规（非阶段）调用时 _append_output_schema 注入的输出格式片段"""
+    output_format, mentions_mode, output_template, section_order = _get_output_preferences(agent_name)
+    if output_format == "yaml":
+        return _OUTPUT_SCHEMA_BLOCK_YAML
+    return _output_schema_block(agent_name, output_format, mentions_mode, output_template, section_order)
+
+
+def _common_output_schema(agent_names: list[str]) -> str:
+    """各 agent 的输出格式片段逐字节一致时返回该片段（可放入共享前缀），否则返回空串"""
+    blocks = {_agent_output_schema(name) for name in agent_names}
+    return blocks.pop() if len(blocks) == 1 else ""
+
 
+def _output_schema_block(
+    agent_name: str,
+    output_format: str,
+    mentions_mode: str,
+    output_template: str | None,
+    section_order: list[str] | None,
+) -> str:
+    """渲染输出格式片段；按 (agent, 偏好, 模板/配置源文件签名) 缓存"""
+    root = _get_project_root()
+    key = (
+        agent_name,
+        output_format,
+        mentions_mode,
+        output_template,
+        tuple(section_order or ()),
+        _templates_signature(root),
+        _agent_output_config_signature(root, agent_name),
+    )
+    block = _OUTPUT_SCHEMA_CACHE.get(key)
+    if block is None:
+        block = _render_output_schema_block(agent_name, output_format, mentions_mode, output_template, section_order)
+        if len(_OUTPUT_SCHEMA_CACHE) >= _OUTPUT_SCHEMA_CACHE_MAX:
+            _OUTPUT_SCHEMA_CACHE.clear()
+        _OUTPUT_SCHEMA_CACHE[key] = block
+    return block
+
+
+def _render_output_schema_block(
+    agent_name: str,
+    output_format: str,
+    mentions_mode: str,
+    output_template: str | None,
+    section_order: list[str] | None,
+) -> str:
     mention_instruction = {
         "controlled": "- 如需触发协作，仅在文末使用受控区：`---\\n相关人员: @user1 @user2` 或 `协作请求:` 列表\n",
         "required": "- 必须在文末使用受控区输出协作对象：`---\\n相关人员: @user1 @user2` 或 `协作请求:` 列表\n",
         "off": "- 不要输出 `相关人员`/`协作请求` 受控区\n",
     }.get(mentions_mode, "- 如需触发协作，仅在文末使用受控区：`---\\n相关人员: @user1 @user2` 或 `协作请求:` 列表\n")
 
-    if output_format == "yaml":
-        return f"{prompt}{_OUTPUT_SCHEMA_BLOCK_YAML}"
-
     template = _resolve_output_template(agent_name, output_template)
     if template:
         rendered = _build_template_instruction(
             template, mentions_mode=mentions_mode, output_format=output_format, section_order_override=section_order
         )
         if rendered:
-            return f"{prompt}{rendered}"
+            return rendered
 
     if output_format == "hybrid":
-        return f"{prompt}{_OUTPUT_SCHEMA_BLOCK_HYBRID}{mention_instruction}"
-    return f"{prompt}{_OUTPUT_SCHEMA_BLOCK_MARKDOWN}{mention_instruction}"
+        return f"{_OUTPUT_SCHEMA_BLOCK_HYBRID}{mention_instruction}"
+    return f"{_OUTPUT_SCHEMA_BLOCK_MARKDOWN}{mention_instruction}"
 
 
-async def run_single_agent(prompt: str, agent_name: str, *, stage_name: str | None = None) -> dict:
+async def run_single_agent(
+    prompt: str,
+    agent_name: str,
+    *,
+    stage_name: str | None = None,
+    resume_session: str | None = None,
+    trace_label: str | None = None,
+) -> dict:
     """运行单个代理（带完善的中间日志监听）
 
     Args:
         prompt: 用户提示词
         agent_name: 代理名称
+        resume_session: 续接的会话 ID；此时 prompt 仅为追加消息，不再注入输出格式
+        trace_label: 轨迹文件标签（默认取 stage_name）；同一 agent 多次非结构化调用需区分轨迹时传入
 
     Returns:
         {
@@ -316,16 +526,14 @@ async def run_single_agent(prompt: str, agent_name: str, *, stage_name: str | No
         "input_tokens": 0,
         "output_tokens": 0,
         "total_tokens": 0,
+        "cache_read_input_tokens": 0,
+        "cache_creation_input_tokens": 0,
     }
 
-    async def _query_agent():
-        options = create_agent_options(agent_name=agent_name)
-        response_text = []
-        turn_count = 0
-        tool_calls = []
-        first_result = True
-
-        effective_prompt = _append_output_schema(
+    effective_prompt = (
+        prompt
+        if resume_session
+        else _append_output_schema(
             prompt,
             agent_name,
             stage_name=stage_name,
@@ -334,100 +542,191 @@ async def run_single_agent(prompt: str, agent_name: str, *, stage_name: str | No
             output_template=output_template,
             section_order=section_order,
         )
-        async for message in query(prompt=effective_prompt, options=options):
-            # AssistantMessage: AI 响应（文本或工具调用）
-            if isinstance(message, AssistantMessage):
-                turn_count += 1
-                logger.debug(f"[{agent_name}] 收到消息 (第 {turn_count} 轮)")
-
-                for block in message.content:
-                    # 文本块 → 终端流式输出 + INFO 日志
-                    if isinstance(block, TextBlock):
-                        text = block.text
-                        response_text.append(text)
-                        execution_info["text_blocks"].append(text)
-
-                        # 终端流式输出（写入 stderr，避免污染 stdout）
-                        print(text, end="", flush=True, file=sys.stderr)
-                        # 日志记录（INFO 级别）
-                        logger.info(f"[{agent_name}] [Text] {text[:100]}...")
-
-                    # 思考块 → 输出思考过程
-                    elif isinstance(block, ThinkingBlock):
-                        thinking = getattr(block, "thinking", "")
-                        if thinking:
-                            thinking_preview = thinking[:200] + "..." if len(thinking) > 200 else thinking
-                            logger.debug(f"[{agent_name}] [Thinking] {thinking_preview}")
-
-                    # 工具调用块 → 终端显示 + INFO 日志
-                    elif isinstance(block, ToolUseBlock):
-                        tool_name = block.name
-                        tool_use_id = getattr(block, "tool_use_id", "")
-                        tool_input = getattr(block, "input", {})
-                        tool_calls.append(tool_name)
-                        execution_info["tool_calls"].append(tool_name)
-
-                        # 终端输出（写入 stderr，避免污染 stdout）
-                        print(f"\n[{tool_name}] id={tool_use_id}", end="", flush=True, file=sys.stderr)
-                        if tool_name == "Skill" or tool_name.startswith("Skill"):
-                            logger.info(f"[{agent_name}] [Skill] {tool_name}(id={tool_use_id})")
-                        if tool_name == "Task":
-                            logger.info(f"[{agent_name}] [Subagent] Task(id={tool_use_id})")
-                        # 详细日志输出
-                        if isinstance(tool_input, dict):
-                            import json
-
-                            input_str = json.dumps(tool_input, indent=2, ensure_ascii=False)
-                            logger.info(f"[{agent_name}] [Tool] {tool_name}(id={tool_use_id})")
-                            logger.debug(f"[{agent_name}] [ToolInput] {input_str}")
-                        else:
-                            logger.info(f"[{agent_name}] [Tool] {tool_name}(id={tool_use_id})")
-
-                    # 工具结果块 → 只日志，不终端输出
-                    elif isinstance(block, ToolResultBlock):
-                        tool_use_id = getattr(block, "tool_use_id", "")
-                        is_error = getattr(block, "is_error", False)
-                        result = getattr(block, "result", "")
-                        # 限制结果长度，避免日志过多
-                        if isinstance(result, str) and len(result) > 500:
-                            logger.info(f"[{agent_name}] [ToolResult] id={tool_use_id} error={is_error} (truncated)")
-                            logger.debug(f"[{agent_name}] [ToolResult] id={tool_use_id}:\n{result[:500]}...")
-                        else:
-                            logger.info(f"[{agent_name}] [ToolResult] id={tool_use_id} error={is_error}")
-                            if result:
-                                logger.debug(f"[{agent_name}] [ToolResult] id={tool_use_id}: {result}")
-
-            # ResultMessage: 执行结果（成本、统计信息）
-            elif isinstance(message, ResultMessage):
-                # 打印统计信息
-                print("\n")
-                session_id = message.session_id or ""
-                cost_usd = message.total_cost_usd or 0.0
-                result_turns = message.num_turns or turn_count
-                usage = message.usage or {}
-                input_tokens = int(usage.get("input_tokens") or 0)
-                output_tokens = int(usage.get("output_tokens") or 0)
-                total_tokens = int(usage.get("total_tokens") or (input_tokens + output_tokens))
-
-                execution_info["session_id"] = session_id
-                execution_info["cost_usd"] = cost_usd
-                execution_info["num_turns"] = result_turns
-                execution_info["input_tokens"] = input_tokens
-                execution_info["output_tokens"] = output_tokens
-                execution_info["total_tokens"] = total_tokens
-
-                # 只在第一次收到 ResultMessage 时记录
-                if first_result:
-                    logger.info(f"[{agent_name}] [Result] session_id={session_id}")
-                    first_result = False
-
-                # 日志记录成本和统计
-                stats_line = (
-                    f"[{agent_name}] [Stats] 成本: ${cost_usd:.4f}, 轮数: {result_turns}, 工具调用: {len(tool_calls)}"
+    )
+
+    # 结果缓存（ISSUELAB_RESULT_CACHE=1 时启用）：相同 prompt/agent/模型/选项直接复用上次成功结果
+    # 续接会话的结果依赖会话历史，不缓存
+    agent_options = create_agent_options(agent_name=agent_name)
+    result_cache = None if resume_session else get_result_cache()
+    cache_key = ""
+    if result_cache is not None:
+        cache_key = build_result_cache_key(
+            effective_prompt,
+            agent_name,
+            Config.get_anthropic_model(),
+            get_agent_options_cache_key(agent_options),
+            context_file_digest(effective_prompt),
+        )
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            saved_cost = float(cached.get("cost_usd") or 0.0)
+            execution_info.update({k: cached[k] for k in CACHED_FIELDS if k in cached})
+            execution_info["cost_usd"] = 0.0
+            execution_info["cache"] = {"hit": True, **result_cache.stats(), "saved_cost_usd": saved_cost}
+            logger.info(f"[{agent_name}] 命中结果缓存 key={cache_key[:12]}，节省成本 ${saved_cost:.4f}")
+            return execution_info
+
+    async def _query_agent():
+        options = agent_options
+        if resume_session and options is not None:
+            options = dataclasses.replace(options, resume=resume_session)
+        response_text = []
+        turn_count = 0
+        tool_calls = []
+        first_result = True
+        timings = TimingCollector()
+        tool_cache_counter = ToolCacheCounter()
+
+        # 池中客户端各有自己的会话，续接指定会话时走一次性 query
+        pool = None if resume_session else get_active_client_pool()
+        if replay_path is not None:
+            messages = replay_trace(replay_path, get_replay_speed())
+        elif pool is not None:
+            messages = pool.query(effective_prompt, options, agent_name=agent_name)
+        else:
+            messages = query(prompt=effective_prompt, options=options)
+        recorder = get_trace_recorder(agent_name, trace_label or stage_name)
+        if recorder is not None:
+            messages = record_messages(messages, recorder)
+        try:
+            async for message in messages:
+                # AssistantMessage: AI 响应（文本或工具调用）
+                if isinstance(message, AssistantMessage):
+                    turn_count += 1
+                    timings.on_turn()
+                    logger.debug(f"[{agent_name}] 收到消息 (第 {turn_count} 轮)")
+                    api_error = getattr(message, "error", None)
+                    if isinstance(api_error, str) and api_error:
+                        detail = " ".join(b.text for b in message.content if isinstance(b, TextBlock))[:200]
+                        raise AgentAPIError(api_error, detail)
+
+                    for block in message.content:
+                        # 文本块 → 终端流式输出 + INFO 日志
+                        if isinstance(block, TextBlock):
+                            text = block.text
+                            response_text.append(text)
+                            timings.on_text()
+                            execution_info["text_blocks"].append(text)
+
+                            # 终端流式输出（写入 stderr，避免污染 stdout）
+                            print(text, end="", flush=True, file=sys.stderr)
+                            # 日志记录（INFO 级别）
+                            logger.info(f"[{agent_name}] [Text] {text[:100]}...")
+
+                        # 思考块 → 输出思考过程
+                        elif isinstance(block, ThinkingBlock):
+                            thinking = getattr(block, "thinking", "")
+                            if thinking:
+                                thinking_preview = thinking[:200] + "..." if len(thinking) > 200 else thinking
+                                logger.debug(f"[{agent_name}] [Thinking] {thinking_preview}")
+
+                        # 工具调用块 → 终端显示 + INFO 日志
+                        elif isinstance(block, ToolUseBlock):
+                            tool_name = block.name
+                            tool_use_id = getattr(block, "tool_use_id", "")
+                            tool_input = getattr(block, "input", {})
+                            tool_calls.append(tool_name)
+                            execution_info["tool_calls"].append(tool_name)
+                            timings.on_tool_use(getattr(block, "id", "") or tool_use_id, tool_name)
+                            tool_cache_counter.on_tool_use(getattr(block, "id", "") or tool_use_id, tool_name)
+
+                            # 终端输出（写入 stderr，避免污染 stdout）
+                            print(f"\n[{tool_name}] id={tool_use_id}", end="", flush=True, file=sys.stderr)
+                            if tool_name == "Skill" or tool_name.startswith("Skill"):
+                                logger.info(f"[{agent_name}] [Skill] {tool_name}(id={tool_use_id})")
+                            if tool_name == "Task":
+                                logger.info(f"[{agent_name}] [Subagent] Task(id={tool_use_id})")
+                            # 详细日志输出
+                            if isinstance(tool_input, dict):
+                                import json
+
+                                input_str = json.dumps(tool_input, indent=2, ensure_ascii=False)
+                                logger.info(f"[{agent_name}] [Tool] {tool_name}(id={tool_use_id})")
+                                logger.debug(f"[{agent_name}] [ToolInput] {input_str}")
+                            else:
+                                logger.info(f"[{agent_name}] [Tool] {tool_name}(id={tool_use_id})")
+
+                        # 工具结果块 → 只日志，不终端输出
+                        elif isinstance(block, ToolResultBlock):
+                            tool_use_id = getattr(block, "tool_use_id", "")
+                            is_error = getattr(block, "is_error", False)
+                            result = getattr(block, "result", "")
+                            timings.on_tool_result(tool_use_id, bool(is_error))
+                            tool_cache_counter.on_tool_result(tool_use_id, getattr(block, "content", None))
+                            # 限制结果长度，避免日志过多
+                            if isinstance(result, str) and len(result) > 500:
+                                logger.info(
+                                    f"[{agent_name}] [ToolResult] id={tool_use_id} error={is_error} (truncated)"
+                                )
+                                logger.debug(f"[{agent_name}] [ToolResult] id={tool_use_id}:\n{result[:500]}...")
+                            else:
+                                logger.info(f"[{agent_name}] [ToolResult] id={tool_use_id} error={is_error}")
+                                if result:
+                                    logger.debug(f"[{agent_name}] [ToolResult] id={tool_use_id}: {result}")
+
+                # UserMessage: 工具执行结果回传（仅用于工具耗时配对）
+                elif isinstance(message, UserMessage):
+                    content = message.content if isinstance(message.content, list) else []
+                    for block in content:
+                        if isinstance(block, ToolResultBlock):
+                            timings.on_tool_result(block.tool_use_id, bool(block.is_error))
+                            tool_cache_counter.on_tool_result(block.tool_use_id, block.content)
+                    timings.on_message()
+
+                # ResultMessage: 执行结果（成本、统计信息）
+                elif isinstance(message, ResultMessage):
+                    timings.on_message()
+                    # 打印统计信息
+                    print("\n")
+                    session_id = message.session_id or ""
+                    cost_usd = message.total_cost_usd or 0.0
+                    result_turns = message.num_turns or turn_count
+                    usage = message.usage or {}
+                    input_tokens = int(usage.get("input_tokens") or 0)
+                    output_tokens = int(usage.get("output_tokens") or 0)
+                    total_tokens = int(usage.get("total_tokens") or (input_tokens + output_tokens))
+
+                    execution_info["session_id"] = session_id
+                    execution_info["cost_usd"] = cost_usd
+                    execution_info["num_turns"] = result_turns
+                    execution_info["input_tokens"] = input_tokens
+                    execution_info["output_tokens"] = output_tokens
+                    execution_info["total_tokens"] = total_tokens
+                    execution_info["cache_read_input_tokens"] = int(usage.get("cache_read_input_tokens") or 0)
+                    execution_info["cache_creation_input_tokens"] = int(usage.get("cache_creation_input_tokens") or 0)
+
+                    # 只在第一次收到 ResultMessage 时记录
+                    if first_result:
+                        logger.info(f"[{agent_name}] [Result] session_id={session_id}")
+                        first_result = False
+
+                    # 日志记录成本和统计
+                    stats_line = f"[{agent_name}] [Stats] 成本: ${cost_usd:.4f}, 轮数: {result_turns}, 工具调用: {len(tool_calls)}"
+                    if input_tokens or output_tokens or total_tokens:
+                        stats_line += (
+                            f", 输入Token: {input_tokens}, 输出Token: {output_tokens}, 总Token: {total_tokens}"
+                        )
+                    if execution_info["cache_read_input_tokens"] or execution_info["cache_creation_input_tokens"]:
+                        stats_line += (
+                            f", 缓存读取Token: {execution_info['cache_read_input_tokens']}"
+                            f", 缓存写入Token: {execution_info['cache_creation_input_tokens']}"
+                        )
+                    logger.info(stats_line)
+        finally:
+            if pool is not None or recorder is not None:
+                await messages.aclose()
+            timings.finish()
+            summary = timings.summary()
+            execution_info["timings"] = summary
+            write_timings_record({"agent": agent_name, "stage": stage_name, "ts": time.time(), **summary})
+            _log_slowest_tool(agent_name, summary)
+            tool_cache_summary = tool_cache_counter.summary()
+            if tool_cache_summary is not None:
+                execution_info["tool_cache"] = tool_cache_summary
+                logger.info(
+                    f"[{agent_name}] [ToolCache] 命中 {tool_cache_summary['hits']}/"
+                    f"{tool_cache_summary['hits'] + tool_cache_summary['misses']}"
                 )
-                if input_tokens or output_tokens or total_tokens:
-                    stats_line += f", 输入Token: {input_tokens}, 输出Token: {output_tokens}, 总Token: {total_tokens}"
-                logger.info(stats_line)
 
         result = "\n".join(response_text)
         return result
@@ -466,7 +765,10 @@ async def run_single_agent(prompt: str, agent_name: str, *, stage_name: str | No
             return None
         return max(1, min(_DEFAULT_ATTEMPT_TIMEOUT_SECONDS, int(overall_timeout_seconds)))
 
+    replay_path = None
     try:
+        # 回放模式下缺少轨迹直接失败，不进入重试
+        replay_path = get_replay_path(agent_name, trace_label or stage_name)
         timeout_seconds = _get_timeout_seconds()
         attempt_timeout_seconds = _get_attempt_timeout_seconds(timeout_seconds)
 
@@ -476,31 +778,19 @@ async def run_single_agent(prompt: str, agent_name: str, *, stage_name: str | No
                     return await _query_agent()
             return await _query_agent()
 
+        retry_policy = _agent_retry_policy()
         if timeout_seconds:
             with anyio.fail_after(timeout_seconds):
-                response = cast(
-                    str,
-                    await retry_async(
-                        _query_agent_with_attempt_timeout,
-                        max_retries=3,
-                        initial_delay=2.0,
-                        backoff_factor=2.0,
-                        should_retry=_should_retry_run_exception,
-                    ),
-                )
+                response = cast(str, await retry_policy.run_async(_query_agent_with_attempt_timeout))
         else:
-            response = cast(
-                str,
-                await retry_async(
-                    _query_agent_with_attempt_timeout,
-                    max_retries=3,
-                    initial_delay=2.0,
-                    backoff_factor=2.0,
-                    should_retry=_should_retry_run_exception,
-                ),
-            )
+            response = cast(str, await retry_policy.run_async(_query_agent_with_attempt_timeout))
         execution_info["response"] = response
 
+        if result_cache is not None:
+            if response.strip():
+                result_cache.put(cache_key, {k: execution_info[k] for k in CACHED_FIELDS if k in execution_info})
+            execution_info["cache"] = {"hit": False, **result_cache.stats(), "saved_cost_usd": 0.0}
+
         # 最终日志
         logger.info(
             f"[{agent_name}] 完成 - "
@@ -536,6 +826,7 @@ async def run_single_agent(prompt: str, agent_name: str, *, stage_name: str | No
             "tool_calls": [],
             "session_id": "",
             "text_blocks": [],
+            "timings": execution_info.get("timings"),
         }
 
 
@@ -629,11 +920,150 @@ def _collect_source_urls(text: str) -> list[str]:
 def _is_gqy20_multistage_enabled(agent_name: str) -> bool:
     if agent_name != "gqy20":
         return False
-    return os.environ.get("ISSUELAB_GQY20_MULTISTAGE", "1").lower() not in {"0", "false", "no", "off"}
+    return env_flag("ISSUELAB_GQY20_MULTISTAGE", True)
+
+
+_GQY20_STAGE_NAMES = ("Researcher", "Analyst", "Critic", "Verifier", "Judge")
+
+# 默认阶段 DAG：与原串行流程一致（每个阶段读取之前所有阶段的输出）
+_GQY20_DEFAULT_STAGE_SPECS = [StageSpec(name, _GQY20_STAGE_NAMES[:i]) for i, name in enumerate(_GQY20_STAGE_NAMES)]
+
+_GQY20_STAGE_OUTPUT_SCHEMAS = {
+    "Analyst": """输出要求（YAML）：
+```yaml
+summary: ""
+candidates:
+  - id: "A"
+    summary: ""
+    findings:
+      - ""
+    recommendations:
+      - ""
+    sources:
+      - ""
+  - id: "B"
+    summary: ""
+    findings:
+      - ""
+    recommendations:
+      - ""
+    sources:
+      - ""
+confidence: "low|medium|high"
+```""",
+    "Critic": """输出要求（YAML）：
+```yaml
+summary: ""
+criticisms:
+  - candidate_id: "A"
+    issues:
+      - ""
+    missing_evidence:
+      - ""
+confidence: "low|medium|high"
+```""",
+    "Verifier": """输出要求（YAML）：
+```yaml
+summary: ""
+verified_sources:
+  - url: ""
+    status: "verified|partially_verified|unverified"
+    supports:
+      - ""
+verification_gaps:
+  - ""
+confidence: "low|medium|high"
+```""",
+    "Judge": """最终输出必须是 Markdown（禁止 YAML/JSON 代码块）：
+- [Agent: gqy20]
+- ## Summary
+- ## Key Findings
+- ## Evidence Gaps
+- ## Recommended Actions
+- ## Sources""",
+}
+
+
+# Critic 与 Analyst 并行（不依赖 Analyst）时尚无候选结论，只按 Researcher 证据逐条批判
+_GQY20_CRITIC_EVIDENCE_SCHEMA = """输出要求（YAML）：
+```yaml
+summary: ""
+criticisms:
+  - claim: ""
+    issues:
+      - ""
+    missing_evidence:
+      - ""
+confidence: "low|medium|high"
+```"""
+
+
+def _get_gqy20_stage_specs() -> list[StageSpec]:
+    """读取 agents/gqy20/agent.yml 的 multistage_stages；缺省或非法时使用默认串行 DAG"""
+    config = get_agent_config("gqy20") or {}
+    raw = config.get("multistage_stages")
+    if raw is None:
+        return list(_GQY20_DEFAULT_STAGE_SPECS)
+    try:
+        specs = parse_stage_specs(raw)
+        names = {spec.name for spec in specs}
+        unknown = names - set(_GQY20_STAGE_NAMES)
+        if unknown:
+            raise ValueError(f"未知阶段: {sorted(unknown)}")
+        if "Researcher" not in names or "Judge" not in names:
+            raise ValueError("必须包含 Researcher 与 Judge 阶段")
+        if next(s for s in specs if s.name == "Researcher").depends_on:
+            raise ValueError("Researcher 不能依赖其他阶段")
+    except ValueError as exc:
+        logger.warning("[gqy20] multistage_stages 配置无效，使用默认串行流程: %s", exc)
+        return list(_GQY20_DEFAULT_STAGE_SPECS)
+    return specs
+
+
+def _is_valid_stage_checkpoint(stage_name: str, text: str) -> bool:
+    if stage_name == "Researcher":
+        return _validate_researcher_stage_output(text)[0]
+    return bool(text.strip())
+
+
+def _build_gqy20_stage_task(stage_name: str, inputs: dict[str, str]) -> str:
+    """按阶段依赖的上游输出构建阶段任务"""
+    schema = _GQY20_STAGE_OUTPUT_SCHEMAS[stage_name]
+    if stage_name == "Analyst":
+        instruction = "基于 Researcher 证据，产出 2-3 个候选结论版本（不要最终定稿）。"
+    elif stage_name == "Critic":
+        if "Analyst" in inputs:
+            instruction = "逐条批判 Analyst 候选结论，识别逻辑漏洞、证据缺口、过度推断和缺失引用。"
+        else:
+            instruction = (
+                "当前尚无候选结论。逐条批判 Researcher 证据（按 evidence 中的 claim 对应），"
+                "识别逻辑漏洞、证据缺口、过度推断和缺失引用。"
+            )
+            schema = _GQY20_CRITIC_EVIDENCE_SCHEMA
+    elif stage_name == "Verifier":
+        instruction = (
+            "强制核验候选结论的来源链接与证据一致性。\n要求尽可能调用工具验证链接是否可访问、内容是否支持对应结论。"
+        )
+    elif stage_name == "Judge":
+        instruction = (
+            f"请综合 {'/'.join(inputs)} 结果，给出最终结论。\n\n"
+            "要求：\n- 必须优先使用已核验来源\n- 必须输出可追溯链接（sources）\n- 对不确定项明确标注"
+        )
+    else:
+        raise ValueError(f"未知阶段: {stage_name}")
+    upstream = "\n\n".join(f"{name} 输出：\n{text}" for name, text in inputs.items())
+    return f"\n{instruction}\n\n{upstream}\n\n{schema}\n"
 
 
 async def _run_gqy20_multistage(agent_prompt: str, issue_number: int, task_context: str) -> dict[str, Any]:
     """gqy20 专用多阶段流程：Researcher -> Analyst -> Critic -> Verifier -> Judge。"""
+    # 各阶段选项相同，开启客户端池时复用同一 CLI 进程
+    with trace_issue(issue_number):
+        async with agent_client_pool():
+            return await _run_gqy20_stages(agent_prompt, issue_number, task_context)
+
+
+async def _run_gqy20_stages(agent_prompt: str, issue_number: int, task_context: str) -> dict[str, Any]:
     stages: dict[str, str] = {}
     total_cost = 0.0
     total_turns = 0
@@ -675,25 +1105,8 @@ async def _run_gqy20_multistage(agent_prompt: str, issue_number: int, task_conte
                 unique_tools.append(tool)
         return unique_tools
 
-    async def _run_stage(stage_name: str, task: str, *, structured_output: bool = True) -> dict[str, Any]:
+    def _add_usage(result: dict[str, Any]) -> None:
         nonlocal total_cost, total_turns, total_input_tokens, total_output_tokens, total_tokens
-        stage_prompt = f"""{agent_prompt}
-
----
-
-## Multi-Stage Workflow
-你正在执行 gqy20 的多阶段高质量流程。
-当前阶段：{stage_name}
-
-请严格遵守：
-- 优先大量使用可用工具进行检索、核验、对照
-- 不得在证据不足时给出确定性结论
-- 如涉及事实陈述，尽可能给出可追溯 URL
-
-## 当前任务
-{task}
-"""
-        result = await run_single_agent(stage_prompt, "gqy20", stage_name=stage_name if structured_output else None)
         total_cost += float(result.get("cost_usd", 0.0))
         total_turns += int(result.get("num_turns", 0))
         total_input_tokens += int(result.get("input_tokens", 0))
@@ -702,6 +1115,8 @@ async def _run_gqy20_multistage(agent_prompt: str, issue_number: int, task_conte
         stage_tools = result.get("tool_calls", [])
         if isinstance(stage_tools, list):
             tool_calls.extend(str(t) for t in stage_tools)
+
+    def _stage_outcome(stage_name: str, result: dict[str, Any]) -> dict[str, Any]:
         text = str(result.get("response", "")).strip()
         stages[stage_name] = text
         if not bool(result.get("ok", True)):
@@ -725,8 +1140,36 @@ async def _run_gqy20_multistage(agent_prompt: str, issue_number: int, task_conte
             "error_type": None,
             "error_message": None,
             "response": text,
+            "session_id": str(result.get("session_id") or ""),
+            "input_tokens": int(result.get("input_tokens", 0)),
         }
 
+    async def _run_stage(
+        stage_name: str, task: str, *, structured_output: bool = True, trace_label: str | None = None
+    ) -> dict[str, Any]:
+        stage_prompt = f"""{agent_prompt}
+
+---
+
+## Multi-Stage Workflow
+你正在执行 gqy20 的多阶段高质量流程。
+当前阶段：{stage_name}
+
+请严格遵守：
+- 优先大量使用可用工具进行检索、核验、对照
+- 不得在证据不足时给出确定性结论
+- 如涉及事实陈述，尽可能给出可追溯 URL
+
+## 当前任务
+{task}
+"""
+        if structured_output:
+            result = await run_single_agent(stage_prompt, "gqy20", stage_name=stage_name)
+        else:
+            result = await run_single_agent(stage_prompt, "gqy20", trace_label=trace_label)
+        _add_usage(result)
+        return _stage_outcome(stage_name, result)
+
     researcher_task = f"""
 请先只做“证据收集”，不要下最终结论。
 
@@ -746,11 +1189,97 @@ open_questions:
 confidence: "low|medium|high"
 ```
 """
-    research_stage = await _run_stage("Researcher", researcher_task)
-    if not research_stage["ok"]:
+
+    judge_retry: dict[str, Any] = {"attempts": 0, "continued": 0, "first_input_tokens": 0, "continued_input_tokens": 0}
+
+    async def _run_judge(inputs: dict[str, str]) -> dict[str, Any]:
+        judge_base_task = _build_gqy20_stage_task("Judge", inputs)
+        retry_feedback = "上一版缺少可追溯来源链接。请补全 sources 字段，给出具体 URL，并确保关键结论可追溯。"
+        judge_stage = await _run_stage("Judge", judge_base_task, structured_output=False, trace_label="judge")
+        judge_retry["attempts"] = 1
+        judge_retry["first_input_tokens"] = int(judge_stage.get("input_tokens", 0))
+        if not judge_stage["ok"]:
+            return judge_stage
+        for attempt in range(1, 3):
+            source_urls = _collect_source_urls(str(judge_stage.get("response", "")))
+            if source_urls:
+                break
+            judge_retry["attempts"] = attempt + 1
+            session_id = str(judge_stage.get("session_id") or "")
+            if session_id:
+                # 续接上一次 Judge 会话，只发送纠正反馈，不重复支付完整阶段上下文
+                result = await run_single_agent(
+                    f"补充要求（第 {attempt + 1} 次尝试）：\n{retry_feedback}\n请输出完整的修订版最终答复。",
+                    "gqy20",
+                    resume_session=session_id,
+                    trace_label=f"judge-cont-{attempt}",
+                )
+                _add_usage(result)
+                judge_stage = _stage_outcome("Judge", result)
+                judge_retry["continued"] += 1
+                judge_retry["continued_input_tokens"] += int(result.get("input_tokens", 0))
+            else:
+                # 无会话 ID（如回放旧轨迹）时退回完整重建
+                judge_stage = await _run_stage(
+                    "Judge",
+                    f"{judge_base_task}\n\n补充要求（第 {attempt + 1} 次尝试）：\n{retry_feedback}\n",
+                    structured_output=False,
+                    trace_label=f"judge-retry-{attempt}",
+                )
+            if not judge_stage["ok"]:
+                return judge_stage
+        judge_text = str(judge_stage.get("response", ""))
+        source_urls = _collect_source_urls(judge_text)
+        return {"ok": True, "error_type": None, "error_message": None, "response": judge_text, "sources": source_urls}
+
+    checkpoints = get_stage_checkpoint_store(issue_number, f"{agent_prompt}\n{task_context}")
+    resumed_stages: list[str] = []
+
+    async def _run_dag_stage(spec: StageSpec, done: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        inputs = {dep: str(done[dep].get("response", "")) for dep in spec.depends_on}
+        if spec.name == "Judge":
+            return await _run_judge(inputs)
+
+        upstream_digest = inputs_digest(inputs)
+        if checkpoints is not None:
+            cached = checkpoints.load(spec.name, upstream_digest)
+            if cached is not None and _is_valid_stage_checkpoint(spec.name, cached):
+                logger.info("[gqy20] 从检查点恢复 %s 阶段（issue #%s）", spec.name, issue_number)
+                stages[spec.name] = cached
+                resumed_stages.append(spec.name)
+                return {"ok": True, "error_type": None, "error_message": None, "response": cached}
+
+        if spec.name == "Researcher":
+            result = await _run_stage("Researcher", researcher_task)
+        else:
+            result = await _run_stage(spec.name, _build_gqy20_stage_task(spec.name, inputs))
+        if checkpoints is not None and result["ok"]:
+            checkpoints.save(spec.name, upstream_digest, str(result.get("response", "")))
+        return result
+
+    specs = _get_gqy20_stage_specs()
+    dag_run = await run_stage_dag(specs, _run_dag_stage)
+    dag_summary = summarize_dag_run(specs, dag_run)
+    dag_summary["resumed_stages"] = resumed_stages
+    if checkpoints is not None and dag_run.ok:
+        checkpoints.clear()
+    logger.info(
+        "[gqy20] 阶段 DAG 完成: 墙钟 %.1fs, 串行合计 %.1fs, 关键路径 %s (%.1fs)",
+        dag_summary["wall_seconds"],
+        dag_summary["serial_seconds"],
+        " -> ".join(dag_summary["critical_path"]),
+        dag_summary["critical_path_seconds"],
+    )
+
+    if not dag_run.ok:
+        failed_stage = str(dag_run.failed_stage)
+        failed_result = dag_run.results.get(failed_stage, {})
+        error_type = str(failed_result.get("error_type") or "unknown")
         # 放宽门禁：Researcher 结构化输出不合格时，降级为单阶段回答而非直接失败。
-        if str(research_stage.get("error_type") or "") == "invalid_output":
-            logger.warning("[gqy20] Researcher 输出结构不完整，降级为单阶段回复: %s", research_stage["error_message"])
+        if failed_stage == "Researcher" and error_type == "invalid_output":
+            logger.warning(
+                "[gqy20] Researcher 输出结构不完整，降级为单阶段回复: %s", failed_result.get("error_message")
+            )
             fallback_prompt = f"""{agent_prompt}
 
 ---
@@ -774,7 +1303,7 @@ confidence: "low|medium|high"
   - ## Sources
 - 若涉及事实，请尽量给出可追溯链接；无法核验时明确说明不确定性
 """
-            fallback_result = await run_single_agent(fallback_prompt, "gqy20")
+            fallback_result = await run_single_agent(fallback_prompt, "gqy20", trace_label="fallback")
             total_cost += float(fallback_result.get("cost_usd", 0.0))
             total_turns += int(fallback_result.get("num_turns", 0))
             total_input_tokens += int(fallback_result.get("input_tokens", 0))
@@ -789,11 +1318,14 @@ confidence: "low|medium|high"
             stages["FallbackSingleStage"] = fallback_text
 
             if not bool(fallback_result.get("ok", True)):
-                return _build_failure_result(
-                    "FallbackSingleStage",
-                    str(fallback_result.get("error_type") or "unknown"),
-                    str(fallback_result.get("error_message") or "FallbackSingleStage 阶段失败"),
-                )
+                return {
+                    **_build_failure_result(
+                        "FallbackSingleStage",
+                        str(fallback_result.get("error_type") or "unknown"),
+                        str(fallback_result.get("error_message") or "FallbackSingleStage 阶段失败"),
+                    ),
+                    "dag": dag_summary,
+                }
 
             return {
                 "ok": True,
@@ -807,168 +1339,36 @@ confidence: "low|medium|high"
                 "output_tokens": total_output_tokens,
                 "total_tokens": total_tokens,
                 "stages": stages,
+                "dag": dag_summary,
             }
-        return _build_failure_result(
-            "Researcher",
-            str(research_stage.get("error_type") or "unknown"),
-            str(research_stage.get("error_message") or "Researcher 阶段失败"),
-        )
-    research_text = str(research_stage.get("response", ""))
-
-    analyst_task = f"""
-基于 Researcher 证据，产出 2-3 个候选结论版本（不要最终定稿）。
-
-Researcher 输出：
-{research_text}
-
-输出要求（YAML）：
-```yaml
-summary: ""
-candidates:
-  - id: "A"
-    summary: ""
-    findings:
-      - ""
-    recommendations:
-      - ""
-    sources:
-      - ""
-  - id: "B"
-    summary: ""
-    findings:
-      - ""
-    recommendations:
-      - ""
-    sources:
-      - ""
-confidence: "low|medium|high"
-```
-"""
-    analyst_stage = await _run_stage("Analyst", analyst_task)
-    if not analyst_stage["ok"]:
-        return _build_failure_result(
-            "Analyst",
-            str(analyst_stage.get("error_type") or "unknown"),
-            str(analyst_stage.get("error_message") or "Analyst 阶段失败"),
-        )
-    analyst_text = str(analyst_stage.get("response", ""))
-
-    critic_task = f"""
-逐条批判 Analyst 候选结论，识别逻辑漏洞、证据缺口、过度推断和缺失引用。
-
-Researcher 输出：
-{research_text}
-
-Analyst 输出：
-{analyst_text}
-
-输出要求（YAML）：
-```yaml
-summary: ""
-criticisms:
-  - candidate_id: "A"
-    issues:
-      - ""
-    missing_evidence:
-      - ""
-confidence: "low|medium|high"
-```
-"""
-    critic_stage = await _run_stage("Critic", critic_task)
-    if not critic_stage["ok"]:
-        return _build_failure_result(
-            "Critic",
-            str(critic_stage.get("error_type") or "unknown"),
-            str(critic_stage.get("error_message") or "Critic 阶段失败"),
-        )
-    critic_text = str(critic_stage.get("response", ""))
-
-    verifier_task = f"""
-强制核验候选结论的来源链接与证据一致性。
-要求尽可能调用工具验证链接是否可访问、内容是否支持对应结论。
-
-Researcher 输出：
-{research_text}
-
-Analyst 输出：
-{analyst_text}
-
-Critic 输出：
-{critic_text}
+        return {
+            **_build_failure_result(
+                failed_stage,
+                error_type,
+                str(failed_result.get("error_message") or f"{failed_stage} 阶段失败"),
+            ),
+            "dag": dag_summary,
+        }
 
-输出要求（YAML）：
-```yaml
-summary: ""
-verified_sources:
-  - url: ""
-    status: "verified|partially_verified|unverified"
-    supports:
-      - ""
-verification_gaps:
-  - ""
-confidence: "low|medium|high"
-```
-"""
-    verifier_stage = await _run_stage("Verifier", verifier_task)
-    if not verifier_stage["ok"]:
-        return _build_failure_result(
-            "Verifier",
-            str(verifier_stage.get("error_type") or "unknown"),
-            str(verifier_stage.get("error_message") or "Verifier 阶段失败"),
+    judge_text = str(dag_run.results["Judge"].get("response", ""))
+    source_urls = list(dag_run.results["Judge"].get("sources") or [])
+    # 重建同样上下文的代价估算：每次续接都要再付一次首轮 Judge 的输入
+    judge_retry["saved_input_tokens"] = max(
+        0, judge_retry["first_input_tokens"] * judge_retry["continued"] - judge_retry["continued_input_tokens"]
+    )
+    if judge_retry["continued"]:
+        logger.info(
+            "[gqy20] Judge 续接会话重试 %d 次，输入 Token %d（完整重建估算节省 %d）",
+            judge_retry["continued"],
+            judge_retry["continued_input_tokens"],
+            judge_retry["saved_input_tokens"],
         )
-    verifier_text = str(verifier_stage.get("response", ""))
-
-    judge_base_task = f"""
-请综合 Researcher/Analyst/Critic/Verifier 结果，给出最终结论。
-
-要求：
-- 必须优先使用已核验来源
-- 必须输出可追溯链接（sources）
-- 对不确定项明确标注
-
-Researcher 输出：
-{research_text}
-
-Analyst 输出：
-{analyst_text}
-
-Critic 输出：
-{critic_text}
-
-Verifier 输出：
-{verifier_text}
-
-最终输出必须是 Markdown（禁止 YAML/JSON 代码块）：
-- [Agent: gqy20]
-- ## Summary
-- ## Key Findings
-- ## Evidence Gaps
-- ## Recommended Actions
-- ## Sources
-"""
-
-    judge_text = ""
-    source_urls: list[str] = []
-    retry_feedback = ""
-    for attempt in range(3):
-        judge_task = judge_base_task
-        if retry_feedback:
-            judge_task += f"\n\n补充要求（第 {attempt + 1} 次尝试）：\n{retry_feedback}\n"
-        judge_stage = await _run_stage("Judge", judge_task, structured_output=False)
-        if not judge_stage["ok"]:
-            return _build_failure_result(
-                "Judge",
-                str(judge_stage.get("error_type") or "unknown"),
-                str(judge_stage.get("error_message") or "Judge 阶段失败"),
-            )
-        judge_text = str(judge_stage.get("response", ""))
-        source_urls = _collect_source_urls(judge_text)
-        if source_urls:
-            break
-        retry_feedback = "上一版缺少可追溯来源链接。请补全 sources 字段，给出具体 URL，并确保关键结论可追溯。"
 
     if not source_urls:
-        logger.warning("[gqy20] 多阶段结果缺少 sources，触发单阶段回退")
+        logger.warning("[gqy20] 多阶段结果缺少 sources，触发单阶段回退（复用已有阶段输出）")
+        stage_outputs = "\n\n".join(
+            f"### {name} 输出\n{text}" for name, text in stages.items() if name != "Judge" and text
+        )
         fallback_prompt = f"""{agent_prompt}
 
 ---
@@ -980,12 +1380,17 @@ Verifier 输出：
 
 ---
 
+## 已完成阶段的输出（直接复用，无需重新检索已有证据）
+{stage_outputs}
+
+---
+
 输出要求（严格）：
 - 以 [Agent: gqy20] 开头
 - 必须给出可追溯来源链接（sources）
 - 证据不足的内容必须明确标注“不确定/缺证据”
 """
-        fallback_result = await run_single_agent(fallback_prompt, "gqy20")
+        fallback_result = await run_single_agent(fallback_prompt, "gqy20", trace_label="fallback-sources")
         fallback_text = str(fallback_result.get("response", ""))
         fallback_urls = _collect_source_urls(fallback_text)
         if fallback_urls:
@@ -1011,9 +1416,139 @@ Verifier 输出：
         "output_tokens": total_output_tokens,
         "total_tokens": total_tokens,
         "stages": stages,
+        "dag": dag_summary,
+        "judge_retry": judge_retry,
     }
 
 
+def _build_task_context(
+    context: str,
+    comment_count: int = 0,
+    available_agents: list[dict] | None = None,
+    trigger_comment: str | None = None,
+) -> str:
+    """构建任务上下文（Issue 信息 + 触发评论 + 协作指南）"""
+    from issuelab.agents.discovery import discover_agents
+    from issuelab.collaboration import build_collaboration_guidelines
+
+    task_context = context
+    if trigger_comment:
+        task_context = f"## 最新触发评论（最高优先级）\n{trigger_comment}\n\n---\n\n{task_context}"
+    if comment_count > 0:
+        task_context += f"\n\n**重要提示**: 本 Issue 已有 {comment_count} 条历史评论。请仔细阅读并分析这些评论。"
+
+    # 协作指南：统一在执行器注入，覆盖所有入口（CLI/personal-reply/observer_trigger 等）
+    # 为避免重复注入：如果上游 context 已包含协作指南标题，则跳过
+    if "## 协作指南" not in task_context:
+        agents_dict = discover_agents()
+        collaboration_guidelines = build_collaboration_guidelines(agents_dict, available_agents=available_agents)
+        if collaboration_guidelines:
+            task_context += f"\n\n{collaboration_guidelines}"
+    return task_context
+
+
+def _load_agent_prompt(agent_name: str) -> str:
+    """加载 agent 的专属 prompt（定义角色和职责）"""
+    from issuelab.agents.discovery import load_prompt
+
+    agent_prompt = load_prompt(agent_name)
+    if not agent_prompt:
+        logger.warning(f"[{agent_name}] 未找到 prompt 文件，使用默认配置")
+        agent_prompt = f"你是 {agent_name} 代理。"
+
+    if "{mcp_servers}" in agent_prompt:
+        mcp_text = format_mcp_servers_for_prompt(agent_name)
+        agent_prompt = agent_prompt.replace("{mcp_servers}", mcp_text)
+    return agent_prompt
+
+
+def shared_prompt_prefix_enabled() -> bool:
+    """ISSUELAB_SHARED_PROMPT_PREFIX=1：任务上下文在前、角色定义在后，并行 agent 共享字节一致的 prompt 前缀"""
+    return env_flag("ISSUELAB_SHARED_PROMPT_PREFIX")
+
+
+def _build_agent_task_prompt(
+    agent_name: str,
+    agent_prompt: str,
+    issue_number: int,
+    task_context: str,
+    upstream: str = "",
+    shared_prefix: bool | None = None,
+    output_schema: str = "",
+) -> str:
+    """构建最终 prompt：角色定义 + 当前任务（+ 上游阶段输出）
+
+    shared_prefix 时改为 当前任务 → 角色定义：同一次并行分发中各 agent 的前缀（Issue 上下文 +
+    协作指南）逐字节一致，可作为 prompt 缓存前缀复用；agent 专属内容全部放在前缀之后。
+    output_schema 为各 agent 一致的输出格式片段（见 _common_output_schema），仅共享布局下放入前缀，
+    run_single_agent 检测到已注入后不再追加。
+    """
+    if shared_prefix is None:
+        shared_prefix = shared_prompt_prefix_enabled()
+    requirements = f"""**输出要求**：
+- 请以 [Agent: {agent_name}] 为前缀发布你的回复
+- 专注于 Issue 的讨论话题和内容
+- 不要去分析项目代码或架构（除非 Issue 明确要求）
+- 仅输出 Markdown，禁止输出 YAML/JSON 代码块
+"""
+    if shared_prefix:
+        final_prompt = f"""{shared_task_prefix(issue_number, task_context, upstream, output_schema)}## 你的角色
+
+{agent_prompt}
+
+---
+
+{requirements}"""
+    else:
+        final_prompt = f"""{agent_prompt}
+
+---
+
+## 当前任务
+
+你需要分析 GitHub Issue #{issue_number}：
+
+{task_context}
+{upstream}
+---
+
+{requirements}"""
+    if os.environ.get("PROMPT_LOG") == "1":
+        max_len = 2000
+        preview = final_prompt[:max_len]
+        suffix = "..." if len(final_prompt) > max_len else ""
+        logger.debug(f"[{agent_name}] [Prompt] length={len(final_prompt)}\\n{preview}{suffix}")
+    return final_prompt
+
+
+def shared_task_prefix(issue_number: int, task_context: str, upstream: str = "", output_schema: str = "") -> str:
+    """共享前缀布局下各 agent 相同的 prompt 开头部分"""
+    schema = f"{output_schema.strip()}\n\n---\n\n" if output_schema else ""
+    return f"""## 当前任务
+
+你需要分析 GitHub Issue #{issue_number}：
+
+{task_context}
+{upstream}
+---
+
+{schema}"""
+
+
+def _log_prompt_cache_usage(issue_number: int, results: dict[str, dict]) -> dict[str, int]:
+    """汇总本次运行的输入 Token 与 prompt 缓存读写 Token"""
+    counters = {
+        key: sum(int(r.get(key) or 0) for r in results.values())
+        for key in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+    }
+    if counters["cache_read_input_tokens"] or counters["cache_creation_input_tokens"]:
+        logger.info(
+            f"[Issue#{issue_number}] Prompt 缓存 - 读取: {counters['cache_read_input_tokens']}, "
+            f"写入: {counters['cache_creation_input_tokens']}, 未缓存输入: {counters['input_tokens']}"
+        )
+    return counters
+
+
 async def run_agents_parallel(
     issue_number: int,
     agents: list[str],
@@ -1042,7 +1577,6 @@ async def run_agents_parallel(
             }
         }
     """
-    from issuelab.agents.discovery import discover_agents, load_prompt
     from issuelab.agents.observer import run_observer_for_papers, run_pubmed_observer_for_papers
     from issuelab.agents.paper_extractors import (
         extract_issue_body,
@@ -1051,28 +1585,43 @@ async def run_agents_parallel(
         parse_arxiv_papers_from_issue,
         parse_pubmed_papers_from_issue,
     )
-    from issuelab.collaboration import build_collaboration_guidelines
 
-    # 构建任务上下文（Issue 信息）
-    task_context = context
-    if trigger_comment:
-        task_context = "## 最新触发评论（最高优先级）\n" f"{trigger_comment}\n\n" "---\n\n" f"{task_context}"
-    if comment_count > 0:
-        task_context += f"\n\n**重要提示**: 本 Issue 已有 {comment_count} 条历史评论。请仔细阅读并分析这些评论。"
-
-    # 协作指南：统一在执行器注入，覆盖所有入口（CLI/personal-reply/observer_trigger 等）
-    # 为避免重复注入：如果上游 context 已包含协作指南标题，则跳过
-    if "## 协作指南" not in task_context:
-        agents_dict = discover_agents()
-        collaboration_guidelines = build_collaboration_guidelines(agents_dict, available_agents=available_agents)
-        if collaboration_guidelines:
-            task_context += f"\n\n{collaboration_guidelines}"
+    task_context = _build_task_context(context, comment_count, available_agents, trigger_comment)
 
     results: dict[str, dict] = {}
     total_cost = 0.0
 
+    limiter = get_agent_limiter()
+    admissions = {name: get_agent_admission(name, _is_gqy20_multistage_enabled(name)) for name in agents}
+    queue_waits: dict[str, float] = {}
+
+    # 共享前缀布局下，走通用 prompt 的 agent 输出格式一致时一并放入共享前缀
+    shared_schema = ""
+    if shared_prompt_prefix_enabled():
+        prompt_agents = [
+            name
+            for name in agents
+            if name not in {"pubmed_observer", "arxiv_observer"} and not _is_gqy20_multistage_enabled(name)
+        ]
+        if len(prompt_agents) > 1:
+            shared_schema = _common_output_schema(prompt_agents)
+
     async def run_agent_task(agent_name: str, results: dict[str, dict]) -> None:
-        """并行任务：运行单个 agent"""
+        """并行任务：按权重占用全局并发槽位后运行单个 agent"""
+        weight, priority = admissions[agent_name]
+        async with limiter.slot(weight, priority) as waited:
+            queue_waits[agent_name] = waited
+            if waited >= 0.05:
+                logger.info(
+                    f"[Issue#{issue_number}] [并行] {agent_name} 排队 {waited:.2f}s "
+                    f"(weight={weight}, priority={priority}, capacity={limiter.capacity})"
+                )
+            with trace_issue(issue_number):
+                await _run_agent_task(agent_name, results)
+        if agent_name in results:
+            results[agent_name]["queue_wait_seconds"] = round(waited, 3)
+
+    async def _run_agent_task(agent_name: str, results: dict[str, dict]) -> None:
         logger.info(f"[Issue#{issue_number}] [并行] 开始执行 {agent_name}")
 
         # 特殊：pubmed_observer / arxiv_observer 需要从 Issue 正文解析文献列表
@@ -1111,40 +1660,10 @@ async def run_agents_parallel(
             results[agent_name] = raw_result
             return
 
-        # 1. 加载 agent 的专属 prompt（定义角色和职责）
-        agent_prompt = load_prompt(agent_name)
-        if not agent_prompt:
-            logger.warning(f"[{agent_name}] 未找到 prompt 文件，使用默认配置")
-            agent_prompt = f"你是 {agent_name} 代理。"
-
-        if "{mcp_servers}" in agent_prompt:
-            mcp_text = format_mcp_servers_for_prompt(agent_name)
-            agent_prompt = agent_prompt.replace("{mcp_servers}", mcp_text)
-
-        # 2. 构建最终 prompt：角色定义 + 当前任务
-        final_prompt = f"""{agent_prompt}
-
----
-
-## 当前任务
-
-你需要分析 GitHub Issue #{issue_number}：
-
-{task_context}
-
----
-
-**输出要求**：
-- 请以 [Agent: {agent_name}] 为前缀发布你的回复
-- 专注于 Issue 的讨论话题和内容
-- 不要去分析项目代码或架构（除非 Issue 明确要求）
-- 仅输出 Markdown，禁止输出 YAML/JSON 代码块
-"""
-        if os.environ.get("PROMPT_LOG") == "1":
-            max_len = 2000
-            preview = final_prompt[:max_len]
-            suffix = "..." if len(final_prompt) > max_len else ""
-            logger.debug(f"[{agent_name}] [Prompt] length={len(final_prompt)}\\n{preview}{suffix}")
+        agent_prompt = _load_agent_prompt(agent_name)
+        final_prompt = _build_agent_task_prompt(
+            agent_name, agent_prompt, issue_number, task_context, output_schema=shared_schema
+        )
 
         if _is_gqy20_multistage_enabled(agent_name):
             logger.info(f"[Issue#{issue_number}] {agent_name} 启用多阶段流程")
@@ -1160,12 +1679,115 @@ async def run_agents_parallel(
             f"工具: {len(result.get('tool_calls', []))}"
         )
 
-    # 使用 anyio.create_task_group 实现真正的并行执行
-    async with anyio.create_task_group() as tg:
-        for agent in agents:
+    # 使用 anyio.create_task_group 并行执行；按优先级顺序启动，实际并发由 limiter 控制
+    ordered_agents = sorted(agents, key=lambda name: -admissions[name][1])
+    # ISSUELAB_MCP_PROXY=1 时多个 agent 共用的 MCP server 只启动一次
+    async with shared_mcp_proxy(agents), anyio.create_task_group() as tg:
+        for agent in ordered_agents:
             tg.start_soon(run_agent_task, agent, results)
 
     # 汇总总成本
     total_cost = sum(r.get("cost_usd", 0.0) for r in results.values())
-    logger.info(f"[Issue#{issue_number}] 所有 Agent 完成 - 总成本: ${total_cost:.4f}")
+    max_wait = max(queue_waits.values(), default=0.0)
+    _log_prompt_cache_usage(issue_number, results)
+    logger.info(
+        f"[Issue#{issue_number}] 所有 Agent 完成 - 总成本: ${total_cost:.4f}, "
+        f"最长排队: {max_wait:.2f}s (并发容量 {limiter.capacity})"
+    )
     return results
+
+
+# review 流水线：moderator 先定框架 → 两位 reviewer 并行评审 → summarizer 汇总
+REVIEW_PIPELINE_STAGES = [
+    StageSpec("moderator"),
+    StageSpec("reviewer_a", ("moderator",)),
+    StageSpec("reviewer_b", ("moderator",)),
+    StageSpec("summarizer", ("moderator", "reviewer_a", "reviewer_b")),
+]
+
+
+def _format_upstream_outputs(depends_on: tuple[str, ...], results: dict[str, dict]) -> str:
+    """将上游阶段的输出拼为 prompt 片段；失败的上游阶段给出说明"""
+    if not depends_on:
+        return ""
+    sections = []
+    for name in depends_on:
+        result = results.get(name) or {}
+        response = str(result.get("response", "")).strip()
+        if result.get("ok", True) and response:
+            sections.append(f"### {name} 输出\n{response}")
+        else:
+            sections.append(f"### {name} 输出\n（{name} 未能完成，请基于其余信息继续）")
+    return "\n## 上游评审输出（本轮流水线内存传递）\n\n" + "\n\n".join(sections) + "\n"
+
+
+async def run_review_pipeline(
+    issue_number: int,
+    context: str,
+    comment_count: int = 0,
+    available_agents: list[dict] | None = None,
+    trigger_comment: str | None = None,
+) -> dict[str, dict]:
+    """按评审流水线运行 moderator / reviewer_a / reviewer_b / summarizer
+
+    moderator 的框架传给两位 reviewer（二者并行），summarizer 拿到三者的内存结果后汇总，
+    整个流程在同一进程内完成。单个 agent 失败不阻断下游，下游 prompt 中会注明。
+
+    Returns:
+        {agent_name: result}，每个结果附带 pipeline 阶段耗时
+    """
+    specs = REVIEW_PIPELINE_STAGES
+    task_context = _build_task_context(context, comment_count, available_agents, trigger_comment)
+    limiter = get_agent_limiter()
+    results: dict[str, dict] = {}
+
+    # 依赖相同的阶段（如两位 reviewer）共享前缀；输出格式一致时一并放入前缀
+    shared_schemas: dict[tuple[str, ...], str] = {}
+    if shared_prompt_prefix_enabled():
+        groups: dict[tuple[str, ...], list[str]] = {}
+        for spec in specs:
+            groups.setdefault(spec.depends_on, []).append(spec.name)
+        shared_schemas = {deps: _common_output_schema(names) for deps, names in groups.items() if len(names) > 1}
+
+    async def _run_stage(spec: StageSpec, done: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        agent_name = spec.name
+        weight, priority = get_agent_admission(agent_name)
+        upstream = _format_upstream_outputs(spec.depends_on, results)
+        final_prompt = _build_agent_task_prompt(
+            agent_name,
+            _load_agent_prompt(agent_name),
+            issue_number,
+            task_context,
+            upstream,
+            output_schema=shared_schemas.get(spec.depends_on, ""),
+        )
+        async with limiter.slot(weight, priority) as waited:
+            logger.info(f"[Issue#{issue_number}] [review] 开始执行 {agent_name}")
+            with trace_issue(issue_number):
+                result = await run_single_agent(final_prompt, agent_name)
+        result["queue_wait_seconds"] = round(waited, 3)
+        results[agent_name] = result
+        logger.info(
+            f"[Issue#{issue_number}] [review] {agent_name} 完成 - "
+            f"成本: ${result.get('cost_usd', 0.0):.4f}, 轮数: {result.get('num_turns', 0)}"
+        )
+        # 失败也继续流水线：下游在 prompt 中看到失败说明
+        return {"ok": True}
+
+    async with shared_mcp_proxy([spec.name for spec in specs]):
+        dag_run = await run_stage_dag(specs, _run_stage)
+
+    summary = summarize_dag_run(specs, dag_run)
+    for agent_name, result in results.items():
+        result["pipeline"] = {
+            "stage_seconds": summary["stage_seconds"].get(agent_name, 0.0),
+            "span": [round(t, 3) for t in dag_run.spans.get(agent_name, (0.0, 0.0))],
+        }
+    total_cost = sum(r.get("cost_usd", 0.0) for r in results.values())
+    _log_prompt_cache_usage(issue_number, results)
+    stage_text = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in summary["stage_seconds"].items())
+    logger.info(
+        f"[Issue#{issue_number}] review 流水线完成 - 墙钟: {summary['wall_seconds']:.2f}s, "
+        f"串行合计: {summary['serial_seconds']:.2f}s, 阶段: {stage_text}, 总成本: ${total_cost:.4f}"
+    )
+    return {spec.name: results[spec.name] for spec in specs if spec.name in results}
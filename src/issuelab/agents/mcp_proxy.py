@@ -0,0 +1,490 @@
+"""并行 agent 共享的 MCP server 代理（默认关闭）
+
+run_agents_parallel 并行运行多个 agent 时，各 SDK 会话会为同一份 MCP 配置各启动一个 server。
+设置 ISSUELAB_MCP_PROXY=1 后，每次任务启动一个本地代理进程：
+- 被两个及以上 agent 声明的 stdio server（按解析后的配置 + 工作目录去重）只启动一次；
+- 这些 server 在 agent 选项中替换为本模块的桥接命令，经 Unix socket 连到代理；
+- 代理改写 JSON-RPC 请求 ID（及 progressToken），把多个会话复用到同一 server 进程。
+
+initialize 由代理对上游只做一次，结果回放给各会话；server 发起的请求由代理本地应答。
+
+子命令：
+    python -m issuelab.agents.mcp_proxy serve --socket <path> --plan <json>
+    python -m issuelab.agents.mcp_proxy connect --socket <path> --server <id>
+"""
+
+import argparse
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import anyio
+from anyio.abc import Process
+
+from issuelab.logging_config import get_logger
+from issuelab.utils.env import env_flag
+
+logger = get_logger(__name__)
+
+PROTOCOL_VERSION = "2025-06-18"
+_READY = b"ready\n"
+_STREAM_LIMIT = 64 * 1024 * 1024
+_PACKAGE_ROOT = str(Path(__file__).resolve().parents[2])
+
+
+def mcp_proxy_enabled() -> bool:
+    return env_flag("ISSUELAB_MCP_PROXY")
+
+
+def _is_stdio(cfg: Any) -> bool:
+    return isinstance(cfg, dict) and bool(cfg.get("command")) and cfg.get("type", "stdio") == "stdio"
+
+
+def _effective_cwd(cfg: dict[str, Any], agent_cwd: str | Path) -> str:
+    return str(cfg.get("cwd") or agent_cwd)
+
+
+def server_id(cfg: dict[str, Any], cwd: str) -> str:
+    """解析后的 server 配置 + 工作目录的稳定 ID"""
+    payload = json.dumps({"cfg": cfg, "cwd": cwd}, sort_keys=True, ensure_ascii=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _child_env(extra: dict[str, str] | None = None) -> dict[str, str]:
+    """保证子进程能导入 issuelab（源码运行时包不在 site-packages）"""
+    paths = [_PACKAGE_ROOT, *filter(None, [os.environ.get("PYTHONPATH")])]
+    return {**os.environ, **(extra or {}), "PYTHONPATH": os.pathsep.join(paths)}
+
+
+def _reply(request_id: Any, result: Any = None, error: str | None = None) -> dict[str, Any]:
+    if error is not None:
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32000, "message": error}}
+    return {"jsonrpc": "2.0", "id": request_id, "result": result if result is not None else {}}
+
+
+def _local_reply(request: dict[str, Any]) -> dict[str, Any]:
+    """代理本地应答 server 发起的请求（共享 server 无法确定应转发给哪个会话）"""
+    method = request.get("method")
+    if method == "ping":
+        return _reply(request["id"])
+    if method == "roots/list":
+        return _reply(request["id"], {"roots": []})
+    return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": f"{method} 不支持共享代理"}}
+
+
+# ---- 代理进程 ----
+
+
+class _Client:
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self._lock = asyncio.Lock()
+
+    async def send(self, message: dict[str, Any]) -> None:
+        async with self._lock:
+            with suppress(ConnectionError, RuntimeError):
+                self.writer.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+                await self.writer.drain()
+
+
+class _Upstream:
+    """单个共享 server 进程及其请求路由表"""
+
+    def __init__(self, sid: str, spec: dict[str, Any]) -> None:
+        self.sid = sid
+        self.spec = spec
+        self.process: asyncio.subprocess.Process | None = None
+        self.ready = asyncio.Event()
+        self.init_result: dict[str, Any] | None = None
+        self.error = ""
+        self.clients: set[_Client] = set()
+        self.served = 0
+        # 上游请求 ID -> (会话, 原 ID) 或代理自身请求的 Future
+        self._pending: dict[int, tuple[_Client, Any] | asyncio.Future] = {}
+        self._progress: dict[str, tuple[_Client, Any]] = {}
+        self._next_id = 0
+        self._write_lock = asyncio.Lock()
+        self._reader: asyncio.Task | None = None
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    async def _send(self, message: dict[str, Any]) -> None:
+        if self.process is None or self.process.stdin is None:
+            return
+        async with self._write_lock:
+            with suppress(ConnectionError, RuntimeError):
+                self.process.stdin.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+                await self.process.stdin.drain()
+
+    async def start(self, init_timeout: float) -> None:
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                self.spec["command"],
+                *[str(a) for a in self.spec.get("args") or []],
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                env={**os.environ, **(self.spec.get("env") or {})},
+                cwd=self.spec.get("cwd") or None,
+                limit=_STREAM_LIMIT,
+            )
+            self._reader = asyncio.create_task(self._read_loop())
+            future: asyncio.Future = asyncio.get_running_loop().create_future()
+            request_id = self._new_id()
+            self._pending[request_id] = future
+            await self._send(
+                {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "method": "initialize",
+                    "params": {
+                        "protocolVersion": PROTOCOL_VERSION,
+                        "capabilities": {},
+                        "clientInfo": {"name": "issuelab-mcp-proxy", "version": "1"},
+                    },
+                },
+            )
+            response = await asyncio.wait_for(future, init_timeout)
+            if "error" in response:
+                raise RuntimeError(json.dumps(response["error"], ensure_ascii=False))
+            self.init_result = response.get("result") or {}
+            await self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        except Exception as exc:
+            self.error = self.error or f"{type(exc).__name__}: {exc}"
+            logger.warning("MCP proxy: server '%s' 启动失败: %s", self.spec.get("name", self.sid), self.error)
+        finally:
+            self.ready.set()
+
+    async def _read_loop(self) -> None:
+        assert self.process is not None and self.process.stdout is not None
+        while line := await self.process.stdout.readline():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(message, dict):
+                await self._on_upstream_message(message)
+        self.error = self.error or "MCP server 已退出"
+        for target in self._pending.values():
+            if isinstance(target, asyncio.Future):
+                if not target.done():
+                    target.set_exception(RuntimeError(self.error))
+            else:
+                await target[0].send(_reply(target[1], error=self.error))
+        self._pending.clear()
+        self.ready.set()
+
+    async def _on_upstream_message(self, message: dict[str, Any]) -> None:
+        method = message.get("method")
+        if method is not None:
+            if "id" in message:
+                await self._send(_local_reply(message))
+            elif method == "notifications/progress":
+                params = message.get("params") or {}
+                target = self._progress.get(str(params.get("progressToken")))
+                if target is not None:
+                    await target[0].send({**message, "params": {**params, "progressToken": target[1]}})
+            else:
+                for client in list(self.clients):
+                    await client.send(message)
+            return
+        request_id = message.get("id")
+        target = self._pending.pop(request_id, None) if isinstance(request_id, int) else None
+        self._progress.pop(f"p{request_id}", None)
+        if isinstance(target, asyncio.Future):
+            if not target.done():
+                target.set_result(message)
+        elif target is not None:
+            await target[0].send({**message, "id": target[1]})
+
+    async def on_client_message(self, client: _Client, message: dict[str, Any]) -> None:
+        method = message.get("method")
+        if not isinstance(method, str):
+            return  # server 发起的请求均由代理本地应答，会话不会有响应
+        if "id" not in message:
+            if method == "notifications/initialized":
+                return
+            if method == "notifications/cancelled":
+                params = message.get("params") or {}
+                for request_id, target in self._pending.items():
+                    if isinstance(target, tuple) and target == (client, params.get("requestId")):
+                        await self._send({**message, "params": {**params, "requestId": request_id}})
+                        break
+                return
+            await self._send(message)
+            return
+
+        if method == "ping":
+            await client.send(_reply(message["id"]))
+            return
+        await self.ready.wait()
+        if self.error:
+            await client.send(_reply(message["id"], error=self.error))
+            return
+        if method == "initialize":
+            self.served += 1
+            await client.send(_reply(message["id"], self.init_result))
+            return
+
+        request_id = self._new_id()
+        self._pending[request_id] = (client, message["id"])
+        params = message.get("params")
+        meta = params.get("_meta") if isinstance(params, dict) else None
+        if isinstance(meta, dict) and "progressToken" in meta:
+            self._progress[f"p{request_id}"] = (client, meta["progressToken"])
+            params = {**params, "_meta": {**meta, "progressToken": f"p{request_id}"}}
+            message = {**message, "params": params}
+        await self._send({**message, "id": request_id})
+
+    async def drop(self, client: _Client) -> None:
+        self.clients.discard(client)
+        for request_id, target in list(self._pending.items()):
+            if isinstance(target, tuple) and target[0] is client:
+                del self._pending[request_id]
+                self._progress.pop(f"p{request_id}", None)
+                await self._send(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "notifications/cancelled",
+                        "params": {"requestId": request_id, "reason": "client disconnected"},
+                    }
+                )
+
+    async def stop(self) -> None:
+        if self.process is None or self.process.returncode is not None:
+            return
+        with suppress(ProcessLookupError):
+            self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), 5)
+        except TimeoutError:
+            with suppress(ProcessLookupError):
+                self.process.kill()
+
+
+async def _handle_client(
+    upstreams: dict[str, _Upstream], reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    client = _Client(writer)
+    upstream: _Upstream | None = None
+    try:
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+        except ValueError:
+            return
+        upstream = upstreams.get(str(hello.get("server"))) if isinstance(hello, dict) else None
+        if upstream is None:
+            return
+        upstream.clients.add(client)
+        while line := await reader.readline():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(message, dict):
+                await upstream.on_client_message(client, message)
+    except ConnectionError:
+        pass
+    finally:
+        if upstream is not None:
+            await upstream.drop(client)
+        writer.close()
+
+
+async def _serve(socket_path: str, plan: dict[str, dict[str, Any]], init_timeout: float) -> None:
+    upstreams = {sid: _Upstream(sid, spec) for sid, spec in plan.items()}
+
+    async def _on_connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await _handle_client(upstreams, reader, writer)
+
+    server = await asyncio.start_unix_server(_on_connect, path=socket_path, limit=_STREAM_LIMIT)
+    starts = [asyncio.create_task(u.start(init_timeout)) for u in upstreams.values()]
+    sys.stdout.buffer.write(_READY)
+    sys.stdout.buffer.flush()
+
+    # 父进程关闭 stdin（任务结束或异常退出）即停止
+    await asyncio.get_running_loop().run_in_executor(None, sys.stdin.buffer.read)
+    server.close()
+    for task in starts:
+        task.cancel()
+    for upstream in upstreams.values():
+        await upstream.stop()
+    served = ", ".join(f"{u.spec.get('name', u.sid)}={u.served}" for u in upstreams.values())
+    logger.info("MCP proxy 退出: %d 个共享 server，会话数 %s", len(upstreams), served or "-")
+
+
+# ---- 桥接命令（作为 agent 的 stdio MCP server 运行）----
+
+
+def _connect(socket_path: str, sid: str) -> int:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+    sock.sendall(json.dumps({"server": sid}).encode("utf-8") + b"\n")
+
+    def _pump_stdin() -> None:
+        try:
+            while chunk := os.read(sys.stdin.fileno(), 65536):
+                sock.sendall(chunk)
+        except OSError:
+            pass
+        finally:
+            with suppress(OSError):
+                sock.shutdown(socket.SHUT_WR)
+
+    threading.Thread(target=_pump_stdin, daemon=True).start()
+    out = sys.stdout.buffer
+    with suppress(OSError):
+        while chunk := sock.recv(65536):
+            out.write(chunk)
+            out.flush()
+    return 0
+
+
+# ---- 任务进程侧 ----
+
+
+@dataclass
+class McpProxy:
+    socket_path: str
+    servers: dict[str, dict[str, Any]]
+
+    def route(self, servers: dict[str, Any], agent_cwd: str | Path) -> dict[str, Any]:
+        """把由代理托管的 server 替换为桥接命令，其余配置原样返回"""
+        routed: dict[str, Any] = {}
+        for name, cfg in servers.items():
+            sid = server_id(cfg, _effective_cwd(cfg, agent_cwd)) if _is_stdio(cfg) else ""
+            if sid in self.servers:
+                routed[name] = {
+                    "type": "stdio",
+                    "command": sys.executable,
+                    "args": ["-m", __name__, "connect", "--socket", self.socket_path, "--server", sid],
+                    "env": {"PYTHONPATH": _PACKAGE_ROOT},
+                }
+            else:
+                routed[name] = cfg
+        return routed
+
+
+def plan_shared_mcp_servers(agent_names: list[str]) -> dict[str, dict[str, Any]]:
+    """返回被两个及以上 agent 声明的 stdio server：{server_id: 启动参数}"""
+    from issuelab.agents import options
+
+    specs: dict[str, dict[str, Any]] = {}
+    users: dict[str, set[str]] = {}
+    for agent_name in dict.fromkeys(agent_names):
+        if not options._get_agent_feature_flags(agent_name)["enable_mcp"]:
+            continue
+        include_system = options._get_enable_system_mcp(agent_name)
+        agent_cwd = options._get_agent_cwd(agent_name)
+        for name, cfg in options.load_mcp_servers_for_agent(agent_name, include_system=include_system).items():
+            if not _is_stdio(cfg):
+                continue
+            cwd = _effective_cwd(cfg, agent_cwd)
+            sid = server_id(cfg, cwd)
+            specs.setdefault(
+                sid,
+                {
+                    "name": name,
+                    "command": cfg["command"],
+                    "args": cfg.get("args") or [],
+                    "env": cfg.get("env") or {},
+                    "cwd": cwd,
+                },
+            )
+            users.setdefault(sid, set()).add(agent_name)
+    return {sid: spec for sid, spec in specs.items() if len(users[sid]) > 1}
+
+
+_ACTIVE_PROXY: contextvars.ContextVar[McpProxy | None] = contextvars.ContextVar("issuelab_mcp_proxy", default=None)
+
+
+def get_active_mcp_proxy() -> McpProxy | None:
+    return _ACTIVE_PROXY.get()
+
+
+async def _wait_ready(process: Process) -> bool:
+    assert process.stdout is not None
+    buffer = b""
+    with anyio.move_on_after(15):
+        async for chunk in process.stdout:
+            buffer += chunk
+            if _READY in buffer:
+                return True
+    return False
+
+
+@asynccontextmanager
+async def shared_mcp_proxy(agent_names: list[str]) -> AsyncIterator[McpProxy | None]:
+    """为一次并行任务启动共享代理；未开启、无共享 server 或已处于外层作用域时复用外层"""
+    existing = _ACTIVE_PROXY.get()
+    if existing is not None or not mcp_proxy_enabled():
+        yield existing
+        return
+    plan = plan_shared_mcp_servers(agent_names)
+    if not plan:
+        yield None
+        return
+
+    init_timeout = os.environ.get("ISSUELAB_MCP_PROXY_INIT_TIMEOUT", "60")
+    with tempfile.TemporaryDirectory(prefix="issuelab-mcp-") as tmp:
+        socket_path = os.path.join(tmp, "proxy.sock")
+        plan_path = Path(tmp) / "plan.json"
+        plan_path.write_text(json.dumps(plan, ensure_ascii=False), encoding="utf-8")
+        command = [sys.executable, "-m", __name__, "serve", "--socket", socket_path, "--plan", str(plan_path)]
+        process = await anyio.open_process([*command, "--init-timeout", init_timeout], env=_child_env(), stderr=None)
+        try:
+            if not await _wait_ready(process):
+                logger.warning("MCP proxy 启动超时，agent 将各自启动 MCP server")
+                yield None
+                return
+            names = ", ".join(sorted(spec["name"] for spec in plan.values()))
+            logger.info("MCP proxy 已启动: %d 个共享 server (%s)", len(plan), names)
+            token = _ACTIVE_PROXY.set(McpProxy(socket_path, plan))
+            try:
+                yield _ACTIVE_PROXY.get()
+            finally:
+                _ACTIVE_PROXY.reset(token)
+        finally:
+            with anyio.CancelScope(shield=True):
+                if process.stdin is not None:
+                    await process.stdin.aclose()
+                with anyio.move_on_after(10):
+                    await process.wait()
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m issuelab.agents.mcp_proxy")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("--socket", required=True)
+    serve_parser.add_argument("--plan", required=True)
+    serve_parser.add_argument("--init-timeout", type=float, default=60.0)
+    connect_parser = subparsers.add_parser("connect")
+    connect_parser.add_argument("--socket", required=True)
+    connect_parser.add_argument("--server", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "connect":
+        return _connect(args.socket, args.server)
+    plan = json.loads(Path(args.plan).read_text(encoding="utf-8"))
+    asyncio.run(_serve(args.socket, plan, args.init_timeout))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,9 +7,11 @@ from typing import Any, Literal, overload
 
 import anyio
 
+from issuelab.agents.client_pool import agent_client_pool
 from issuelab.agents.discovery import discover_agents, get_agent_matrix_markdown
 from issuelab.agents.executor import run_single_agent
 from issuelab.agents.parsers import parse_observer_response, parse_papers_recommendation
+from issuelab.agents.trace import trace_issue
 from issuelab.collaboration import build_collaboration_guidelines
 from issuelab.logging_config import get_logger
 
@@ -84,7 +86,8 @@ __COMMENTS__"""
     logger.info(f"[Observer] 开始分析 Issue #{issue_number}")
     logger.debug(f"[Observer] Title: {issue_title[:50]}...")
 
-    result = await run_single_agent(prompt, "observer")
+    with trace_issue(issue_number):
+        result = await run_single_agent(prompt, "observer")
 
     # 解析响应（从 dict 中提取 response 字段）
     response_text = result.get("response", "")
@@ -119,7 +122,7 @@ async def run_observer_batch(issue_data_list: list[dict], max_parallel: int = 5)
     results = []
     limiter = anyio.Semaphore(max_parallel)
 
-    async with anyio.create_task_group() as tg:
+    async with agent_client_pool(), anyio.create_task_group() as tg:
 
         async def analyze_one(issue_data: dict):
             issue_number = issue_data["issue_number"]
@@ -3,9 +3,13 @@
 处理 SDK 选项的创建和缓存管理。
 """
 
+import hashlib
 import json
 import os
 import re
+import shutil
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures import TimeoutError as FutureTimeoutError
 from contextlib import suppress
@@ -17,14 +21,20 @@ from claude_agent_sdk import AgentDefinition, ClaudeAgentOptions
 
 from issuelab.agents.config import AgentConfig
 from issuelab.agents.discovery import AGENTS_DIR, discover_agents
+from issuelab.agents.mcp_proxy import get_active_mcp_proxy
 from issuelab.agents.registry import get_agent_config, is_system_agent
+from issuelab.agents.tool_cache import TOOL_CACHE_SERVER, build_tool_cache_hint, get_tool_cache_server
 from issuelab.config import Config
 from issuelab.logging_config import get_logger
+from issuelab.tools.issue_index import ISSUE_INDEX_SERVER, get_issue_index_server
+from issuelab.utils.env import env_flag
 
 logger = get_logger(__name__)
 
 # 全局缓存：存储 Agent 选项
 _cached_agent_options: dict[tuple, ClaudeAgentOptions] = {}
+# 选项对象 id -> 缓存键（供结果缓存等按配置区分）
+_agent_options_keys: dict[int, tuple] = {}
 
 
 _TOOL_AND_CITATION_RULES = (
@@ -42,14 +52,6 @@ _SYSTEM_DEFAULT_OVERRIDES: dict[str, float | int] = {
 }
 
 
-def _env_flag(name: str, default: bool) -> bool:
-    """Parse boolean environment flag."""
-    value = os.environ.get(name)
-    if value is None:
-        return default
-    return value.strip().lower() in {"1", "true", "yes", "on"}
-
-
 def _default_feature_flags(agent_name: str | None) -> dict[str, bool]:
     """Resolve default feature flags from environment.
 
@@ -64,11 +66,11 @@ def _default_feature_flags(agent_name: str | None) -> dict[str, bool]:
     - ISSUELAB_DEFAULT_ENABLE_MCP
     """
     is_system = bool(agent_name and is_system_agent(agent_name, agents_dir=AGENTS_DIR)[0])
-    global_default = _env_flag("ISSUELAB_ENABLE_DEFAULT_FEATURES", not is_system)
+    global_default = env_flag("ISSUELAB_ENABLE_DEFAULT_FEATURES", not is_system)
     return {
-        "enable_skills": _env_flag("ISSUELAB_DEFAULT_ENABLE_SKILLS", global_default),
-        "enable_subagents": _env_flag("ISSUELAB_DEFAULT_ENABLE_SUBAGENTS", global_default),
-        "enable_mcp": _env_flag("ISSUELAB_DEFAULT_ENABLE_MCP", global_default),
+        "enable_skills": env_flag("ISSUELAB_DEFAULT_ENABLE_SKILLS", global_default),
+        "enable_subagents": env_flag("ISSUELAB_DEFAULT_ENABLE_SUBAGENTS", global_default),
+        "enable_mcp": env_flag("ISSUELAB_DEFAULT_ENABLE_MCP", global_default),
     }
 
 
@@ -77,11 +79,20 @@ def clear_agent_options_cache() -> None:
 
     在测试或配置更改后调用此函数以确保使用最新的配置。
     """
-    global _cached_agent_options
+    global _cached_agent_options, _agent_options_keys
     _cached_agent_options = {}
+    _agent_options_keys = {}
     logger.info("Agent 选项缓存已清除")
 
 
+def get_agent_options_cache_key(options: ClaudeAgentOptions) -> str:
+    """返回选项对应缓存键的稳定摘要；非 create_agent_options 创建的对象返回空串"""
+    key = _agent_options_keys.get(id(options))
+    if key is None:
+        return ""
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+
 def _get_agent_run_overrides(agent_name: str | None) -> dict[str, float | int]:
     """读取 agent.yml 中的运行覆盖参数"""
     if not agent_name:
@@ -125,7 +136,7 @@ def _get_agent_feature_flags(agent_name: str | None) -> dict[str, bool]:
 
 def _get_enable_system_mcp(agent_name: str | None) -> bool:
     """Whether to load project-level system MCP config for this agent."""
-    default = _env_flag("ISSUELAB_ENABLE_SYSTEM_MCP", False)
+    default = env_flag("ISSUELAB_ENABLE_SYSTEM_MCP", False)
     if not agent_name:
         return default
 
@@ -238,7 +249,7 @@ def load_mcp_servers_for_agent(
     servers: dict[str, Any] = {}
 
     if include_system is None:
-        include_system = _env_flag("ISSUELAB_ENABLE_SYSTEM_MCP", False)
+        include_system = env_flag("ISSUELAB_ENABLE_SYSTEM_MCP", False)
 
     # 全局配置：项目根目录 .mcp.json（系统级，可按开关关闭）
     if include_system:
@@ -423,16 +434,68 @@ async def _list_tools_stdio(server_name: str, cfg: dict[str, Any]) -> list[str]:
         cwd=cfg.get("cwd"),
     )
 
-    async with stdio_client(params) as (read_stream, write_stream):
-        session = ClientSession(read_stream, write_stream)
+    async with stdio_client(params) as (read_stream, write_stream), ClientSession(read_stream, write_stream) as session:
         await session.initialize()
         result = await session.list_tools()
         tools = result.tools or []
         return [t.name for t in tools if getattr(t, "name", None)]
 
 
-def _list_tools_for_mcp_server(server_name: str, cfg: dict[str, Any], timeout_ms: int) -> list[str]:
-    """列出单个 MCP server 的工具（目前仅支持 stdio）"""
+def _mcp_command_mtime(cfg: dict[str, Any]) -> float:
+    """MCP server 命令可执行文件的 mtime（命令升级后工具列表缓存随之失效）"""
+    command = str(cfg.get("command") or "")
+    resolved = shutil.which(command) if command else None
+    if not resolved:
+        return 0.0
+    try:
+        return os.stat(resolved).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _mcp_tools_cache_path(server_name: str, cfg: dict[str, Any]) -> Path | None:
+    """工具列表磁盘缓存路径；ISSUELAB_MCP_TOOLS_CACHE=0 时关闭"""
+    if not env_flag("ISSUELAB_MCP_TOOLS_CACHE", True):
+        return None
+    root = Path(os.environ.get("ISSUELAB_MCP_TOOLS_CACHE_DIR") or Path.cwd() / ".issuelab" / "mcp_tools")
+    key = f"{_mcp_cache_key({server_name: cfg})}\0{_mcp_command_mtime(cfg)}"
+    return root / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+
+
+def _load_cached_mcp_tools(path: Path | None) -> list[str] | None:
+    if path is None:
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    tools = data.get("tools") if isinstance(data, dict) else None
+    if not isinstance(tools, list) or not all(isinstance(t, str) for t in tools):
+        return None
+    return tools
+
+
+def _store_cached_mcp_tools(path: Path | None, server_name: str, tools: list[str]) -> None:
+    if path is None or not tools:
+        return
+    payload = {"server": server_name, "tools": tools, "listed_at": time.time()}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        logger.debug("Write MCP tools cache failed for '%s': %s", server_name, exc)
+
+
+def _list_tools_for_mcp_server(
+    server_name: str, cfg: dict[str, Any], timeout_ms: int, *, use_cache: bool = True
+) -> list[str]:
+    """列出单个 MCP server 的工具（目前仅支持 stdio）
+
+    结果按 server 配置 + 命令 mtime 缓存到磁盘，后续进程无需再启动 server；
+    use_cache=False 时强制启动 server（用于预热）并刷新缓存。
+    """
     if not isinstance(cfg, dict):
         return []
 
@@ -440,14 +503,81 @@ def _list_tools_for_mcp_server(server_name: str, cfg: dict[str, Any], timeout_ms
         logger.debug("Skip MCP tool listing for '%s': non-stdio server", server_name)
         return []
 
+    cache_path = _mcp_tools_cache_path(server_name, cfg)
+    if use_cache:
+        cached = _load_cached_mcp_tools(cache_path)
+        if cached is not None:
+            logger.debug("MCP tools cache hit for '%s'", server_name)
+            return cached
+
     try:
-        return _run_async_in_thread(_list_tools_stdio(server_name, cfg), timeout_ms=timeout_ms)
+        tools = _run_async_in_thread(_list_tools_stdio(server_name, cfg), timeout_ms=timeout_ms)
     except TimeoutError as exc:
         logger.warning("List tools timeout for MCP server '%s': %s", server_name, exc)
         return []
     except Exception as exc:  # pragma: no cover - best effort
         logger.warning("List tools failed for MCP server '%s': %s", server_name, exc)
         return []
+    _store_cached_mcp_tools(cache_path, server_name, tools)
+    return tools
+
+
+def _mcp_servers_for_agents(agent_names: list[str]) -> dict[str, dict[str, Any]]:
+    """收集多个 agent 会用到的 stdio MCP server（按配置去重）"""
+    servers: dict[str, dict[str, Any]] = {}
+    seen: set[str] = set()
+    for agent_name in agent_names:
+        if not _get_agent_feature_flags(agent_name)["enable_mcp"]:
+            continue
+        include_system = _get_enable_system_mcp(agent_name)
+        for name, cfg in load_mcp_servers_for_agent(agent_name, include_system=include_system).items():
+            if not isinstance(cfg, dict) or "command" not in cfg:
+                continue
+            key = _mcp_cache_key({name: cfg})
+            if key not in seen:
+                seen.add(key)
+                servers[name if name not in servers else f"{name}@{agent_name}"] = cfg
+    return servers
+
+
+def prewarm_mcp_servers(agent_names: list[str], timeout_ms: int | None = None) -> threading.Thread | None:
+    """后台预热 agent 将用到的 MCP server（ISSUELAB_MCP_PREWARM=1 时启用）
+
+    在获取 Issue 上下文的同时并行启动各 stdio server 完成一次握手与工具列举：
+    npx/uvx 包下载、解释器与依赖加载等冷启动开销提前发生，并刷新工具列表缓存。
+    返回后台线程（daemon），调用方无需等待。
+    """
+    if not env_flag("ISSUELAB_MCP_PREWARM", False) or not agent_names:
+        return None
+    if timeout_ms is None:
+        timeout_ms = int(os.environ.get("ISSUELAB_MCP_PREWARM_TIMEOUT_MS", "30000"))
+
+    def _prewarm() -> None:
+        try:
+            servers = _mcp_servers_for_agents(agent_names)
+        except Exception as exc:  # pragma: no cover - best effort
+            logger.warning("MCP prewarm skipped: %s", exc)
+            return
+        if not servers:
+            return
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(8, len(servers))) as pool:
+            futures = {
+                name: pool.submit(_list_tools_for_mcp_server, name, cfg, timeout_ms, use_cache=False)
+                for name, cfg in servers.items()
+            }
+            warmed = [name for name, future in futures.items() if future.result()]
+        logger.info(
+            "MCP prewarm: %d/%d servers ready in %.1fs (%s)",
+            len(warmed),
+            len(servers),
+            time.monotonic() - start,
+            ", ".join(sorted(warmed)) or "none",
+        )
+
+    thread = threading.Thread(target=_prewarm, name="issuelab-mcp-prewarm", daemon=True)
+    thread.start()
+    return thread
 
 
 def _mcp_cache_key(servers: dict[str, Any]) -> str:
@@ -537,6 +667,8 @@ def _create_agent_options_impl(
     else:
         output_format_rules = "Follow response format rules in config/response_format.yml."
     system_prompt_append = f"{output_format_rules} {_TOOL_AND_CITATION_RULES}"
+    if TOOL_CACHE_SERVER in mcp_servers:
+        system_prompt_append = f"{system_prompt_append} {build_tool_cache_hint()}"
 
     return ClaudeAgentOptions(
         agents=agent_definitions,
@@ -603,6 +735,22 @@ def create_agent_options(
         logger.debug("MCP servers detail for agent '%s': %s", agent_name or "default", mcp_servers)
 
     cwd = _get_agent_cwd(agent_name)
+    # 共享 MCP 代理作用域内：多 agent 共用的 server 改走代理（结果缓存键仍按原始配置）
+    result_mcp_key = _mcp_cache_key(mcp_servers)
+    mcp_proxy = get_active_mcp_proxy()
+    if mcp_proxy is not None and mcp_servers:
+        mcp_servers = mcp_proxy.route(mcp_servers, cwd)
+
+    # 进程内 MCP server，与 enable_mcp 无关（系统 agent 也可用）：
+    # 跨 agent 工具结果缓存（ISSUELAB_TOOL_CACHE=1）、Issue 上下文检索（ISSUELAB_ISSUE_INDEX=1）
+    builtin_servers: dict[str, Any] = {}
+    tool_cache_server = get_tool_cache_server()
+    if tool_cache_server is not None:
+        builtin_servers[TOOL_CACHE_SERVER] = tool_cache_server
+    issue_index_server = get_issue_index_server()
+    if issue_index_server is not None:
+        builtin_servers[ISSUE_INDEX_SERVER] = issue_index_server
+
     if feature_flags["enable_skills"]:
         project_skills = _discover_skills_in_path(cwd)
         user_skills = _discover_skills_in_path(Path(os.path.expanduser("~")))
@@ -635,6 +783,7 @@ def create_agent_options(
         _mcp_cache_key(mcp_servers),
         _skills_signature(cwd),
         subagents_sig,
+        tuple(builtin_servers),
     )
 
     # 检查缓存
@@ -655,7 +804,7 @@ def create_agent_options(
         effective_max_turns,
         effective_max_budget,
         agent_name=agent_name,
-        mcp_servers=mcp_servers,
+        mcp_servers={**mcp_servers, **builtin_servers},
         cwd=cwd,
         subagents_sig=subagents_sig,
         enable_skills=feature_flags["enable_skills"],
@@ -664,6 +813,7 @@ def create_agent_options(
 
     # 存入缓存
     _cached_agent_options[cache_key] = options
+    _agent_options_keys[id(options)] = (*cache_key[:3], result_mcp_key, *cache_key[4:])
     logger.debug(f"创建新的 Agent 选项并缓存 (key={cache_key})")
 
     return options
@@ -2,20 +2,53 @@
 
 This module centralizes agent registry loading from `agents/<name>/agent.yml`
 and derives behavior from configuration instead of hardcoded name lists.
+
+Parsed configs are cached per directory and invalidated by a directory-wide
+mtime/inode signature, compared on every lookup (stat only, no YAML parsing).
+`ISSUELAB_REGISTRY_RECHECK_SECONDS` (opt-in, default 0) skips the comparison
+for that many seconds after a successful check. Lookups return deep copies, so
+callers may mutate the result without affecting the cache.
 """
 
 from __future__ import annotations
 
+import copy
 import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
 import yaml
 
+from issuelab.utils.env import env_float
+
 logger = logging.getLogger(__name__)
 
 AGENT_TYPE_SYSTEM = "system"
 AGENT_TYPE_USER = "user"
+DEFAULT_RECHECK_SECONDS = 0.0
+
+
+@dataclass
+class _RegistryIndex:
+    """Parsed registry for one agents directory plus a lowercase-name index."""
+
+    signature: tuple
+    checked_at: float = 0.0
+    agents: dict[str, dict[str, Any]] = field(default_factory=dict)
+    enabled: dict[str, dict[str, Any]] = field(default_factory=dict)
+    by_lower: dict[str, dict[str, Any]] = field(default_factory=dict)
+    enabled_by_lower: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+
+# 进程级缓存：resolved agents_dir -> _RegistryIndex
+_REGISTRY_CACHE: dict[str, _RegistryIndex] = {}
+# 绝对路径 -> resolved 路径，热路径上免去 resolve() 的逐级 stat
+_RESOLVED_KEYS: dict[str, str] = {}
+_REGISTRY_LOCK = threading.Lock()
 
 
 def normalize_agent_name(name: str) -> str:
@@ -39,24 +72,60 @@ def _normalize_agent_type(value: Any) -> str | None:
     return None
 
 
-def load_registry(agents_dir: Path, include_disabled: bool = False) -> dict[str, dict[str, Any]]:
-    """
-    Load agent registry from agents/<user>/agent.yml.
+def _get_registry_signature(agents_dir: Path) -> tuple:
+    """生成 agents 目录签名（目录自身 + 各 agent.yml 的 mtime/inode/size）"""
+    try:
+        dir_stat = agents_dir.stat()
+    except OSError:
+        return ()
 
-    Args:
-        agents_dir: agents directory path
-        include_disabled: whether to include disabled agents
+    signature: list[tuple] = [("", dir_stat.st_mtime_ns, dir_stat.st_ino)]
+    try:
+        entries = sorted(os.scandir(agents_dir), key=lambda e: e.name)
+    except OSError:
+        return tuple(signature)
 
-    Returns:
-        username -> config dict
-    """
-    registry: dict[str, dict[str, Any]] = {}
+    for entry in entries:
+        if entry.name.startswith("_"):
+            continue
+        try:
+            if not entry.is_dir():
+                continue
+            st = os.stat(os.path.join(entry.path, "agent.yml"))
+        except OSError:
+            continue
+        signature.append((entry.name, st.st_mtime_ns, st.st_ino, st.st_size))
+    return tuple(signature)
 
-    if not agents_dir.exists():
-        logger.warning("Agents directory not found: %s", agents_dir)
-        return registry
 
-    for user_dir in agents_dir.iterdir():
+def _parse_agent_yml(agent_yml: Path) -> dict[str, Any] | None:
+    try:
+        with open(agent_yml, encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+    except yaml.YAMLError as e:
+        logger.error("Error parsing %s: %s", agent_yml.name, e)
+        return None
+    except Exception as e:
+        logger.error("Error loading %s: %s", agent_yml.name, e)
+        return None
+
+    if not config:
+        logger.warning("Empty config in %s", agent_yml)
+        return None
+    if not isinstance(config, dict):
+        logger.error("Error loading %s: root must be a mapping", agent_yml.name)
+        return None
+    return config
+
+
+def _build_registry_index(agents_dir: Path, signature: tuple) -> _RegistryIndex:
+    from issuelab.agents.snapshot import get_snapshot_for_agents_dir
+
+    index = _RegistryIndex(signature=signature)
+    snapshot = get_snapshot_for_agents_dir(agents_dir)
+    snapshot_agents = snapshot.get("agents", {}) if snapshot else {}
+
+    for user_dir in sorted(agents_dir.iterdir()):
         if not user_dir.is_dir():
             continue
         if user_dir.name.startswith("_"):
@@ -66,33 +135,94 @@ def load_registry(agents_dir: Path, include_disabled: bool = False) -> dict[str,
         if not agent_yml.exists():
             continue
 
-        try:
-            with open(agent_yml, encoding="utf-8") as f:
-                config = yaml.safe_load(f)
+        if snapshot is not None and user_dir.name in snapshot_agents:
+            config = snapshot_agents[user_dir.name].get("config")
+        else:
+            config = _parse_agent_yml(agent_yml)
+        if config is None:
+            continue
 
-            if not config:
-                logger.warning("Empty config in %s", agent_yml)
-                continue
+        # Use owner or username as key
+        username = config.get("owner") or config.get("username")
+        if not username:
+            logger.warning("%s missing 'owner' or 'username'", agent_yml)
+            continue
 
-            # Use owner or username as key
-            username = config.get("owner") or config.get("username")
-            if not username:
-                logger.warning("%s missing 'owner' or 'username'", agent_yml)
-                continue
+        index.agents[username] = config
+        if config.get("enabled", True):
+            index.enabled[username] = config
+
+    # 大小写不敏感索引：同名冲突时保留先出现的条目（与线性查找一致）
+    for name, config in reversed(list(index.agents.items())):
+        index.by_lower[str(name).lower()] = config
+    for name, config in reversed(list(index.enabled.items())):
+        index.enabled_by_lower[str(name).lower()] = config
+    return index
+
+
+def _get_registry_index(agents_dir: Path) -> _RegistryIndex | None:
+    """返回（必要时重建）agents_dir 对应的缓存索引；目录不存在时返回 None。
+
+    默认每次比较目录签名；设置 ISSUELAB_REGISTRY_RECHECK_SECONDS 后，间隔内直接返回缓存。
+    """
+    now = time.monotonic()
+    abs_key = os.path.abspath(agents_dir)
+    key = _RESOLVED_KEYS.get(abs_key)
+    if key is not None:
+        cached = _REGISTRY_CACHE.get(key)
+        if cached is not None and now - cached.checked_at < env_float(
+            "ISSUELAB_REGISTRY_RECHECK_SECONDS", DEFAULT_RECHECK_SECONDS, minimum=0.0
+        ):
+            return cached
+
+    if not agents_dir.exists():
+        return None
+
+    if key is None:
+        key = str(agents_dir.resolve())
+    signature = _get_registry_signature(agents_dir)
+    with _REGISTRY_LOCK:
+        _RESOLVED_KEYS[abs_key] = key
+        cached = _REGISTRY_CACHE.get(key)
+        if cached is not None and cached.signature == signature:
+            cached.checked_at = now
+            return cached
+
+        index = _build_registry_index(agents_dir, signature)
+        index.checked_at = now
+        _REGISTRY_CACHE[key] = index
+        logger.debug("Agent registry (re)loaded: %s (%d agents)", key, len(index.agents))
+        return index
 
-            # Skip disabled unless requested
-            if not include_disabled and not config.get("enabled", True):
-                logger.info("%s is disabled, skipping", username)
-                continue
 
-            registry[username] = config
+def clear_registry_cache() -> None:
+    """清除进程级 registry 缓存（测试或批量修改配置后调用）。"""
+    with _REGISTRY_LOCK:
+        _REGISTRY_CACHE.clear()
+        _RESOLVED_KEYS.clear()
 
-        except yaml.YAMLError as e:
-            logger.error("Error parsing %s: %s", agent_yml.name, e)
-        except Exception as e:
-            logger.error("Error loading %s: %s", agent_yml.name, e)
 
-    return registry
+def load_registry(agents_dir: Path, include_disabled: bool = False) -> dict[str, dict[str, Any]]:
+    """
+    Load agent registry from agents/<user>/agent.yml.
+
+    Parsed configs are cached per directory and reused until the directory
+    signature (agent.yml mtime/inode/size) changes. Returns a deep copy.
+
+    Args:
+        agents_dir: agents directory path
+        include_disabled: whether to include disabled agents
+
+    Returns:
+        username -> config dict
+    """
+    index = _get_registry_index(agents_dir)
+    if index is None:
+        logger.warning("Agents directory not found: %s", agents_dir)
+        return {}
+
+    source = index.agents if include_disabled else index.enabled
+    return copy.deepcopy(source)
 
 
 def get_agent_config(
@@ -101,13 +231,13 @@ def get_agent_config(
     """Get a single agent config by name."""
     if not agent_name:
         return None
-    root = agents_dir or Path("agents")
-    registry = load_registry(root, include_disabled=include_disabled)
-    normalized = agent_name.lower()
-    for name, config in registry.items():
-        if str(name).lower() == normalized:
-            return config
-    return None
+    index = _get_registry_index(agents_dir or Path("agents"))
+    if index is None:
+        return None
+    lookup = index.by_lower if include_disabled else index.enabled_by_lower
+    config = lookup.get(agent_name.lower())
+    # 返回副本：调用方修改配置不影响进程级缓存
+    return copy.deepcopy(config) if config is not None else None
 
 
 def is_system_agent(
@@ -0,0 +1,223 @@
+"""Agent 结果缓存（内容寻址，默认关闭）
+
+同一 issue 上重复触发 /review、或编排 job 在发帖失败后重试时，直接复用上次成功的
+agent 结果，跳过模型调用。
+
+缓存键 = sha256(版本盐 + agent 名 + 模型 + 选项缓存键 + 上下文文件摘要 + 最终 prompt)。
+prompt 只引用 Issue 内容文件的路径（路径按 issue 号固定），因此键中带上该文件内容的摘要，
+Issue 标题/正文/评论变化后不会命中旧结果。
+- 内存层：进程内 LRU；
+- 磁盘层：.issuelab/cache/results/<key[:2]>/<key>.json，按 TTL 过期、按总大小做 LRU 淘汰
+  （命中时刷新 mtime）。
+
+环境变量：
+- ISSUELAB_RESULT_CACHE=1           开启
+- ISSUELAB_RESULT_CACHE_DIR         缓存目录（默认 .issuelab/cache）
+- ISSUELAB_RESULT_CACHE_TTL         过期秒数（默认 86400）
+- ISSUELAB_RESULT_CACHE_MAX_MB      磁盘上限（默认 64）
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from issuelab.logging_config import get_logger
+from issuelab.utils.env import env_flag, env_float
+
+logger = get_logger(__name__)
+
+RESULT_CACHE_VERSION = "2"
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_MEMORY_MAX_ENTRIES = 128
+
+# 缓存的执行信息字段（不含 ok / error_* 等运行态字段）
+CACHED_FIELDS = (
+    "response",
+    "cost_usd",
+    "num_turns",
+    "tool_calls",
+    "session_id",
+    "text_blocks",
+    "input_tokens",
+    "output_tokens",
+    "total_tokens",
+)
+
+
+def result_cache_enabled() -> bool:
+    return env_flag("ISSUELAB_RESULT_CACHE")
+
+
+def context_file_digest(prompt: str) -> str:
+    """prompt 引用的 Issue 内容文件的内容摘要；未引用或无法读取时返回空串"""
+    from issuelab.agents.paper_extractors import _extract_issue_file_path
+
+    file_path = _extract_issue_file_path(prompt)
+    if not file_path:
+        return ""
+    try:
+        return hashlib.sha256(Path(file_path).read_bytes()).hexdigest()
+    except OSError:
+        return ""
+
+
+def build_result_cache_key(prompt: str, agent_name: str, model: str, options_key: str, context_digest: str = "") -> str:
+    digest = hashlib.sha256()
+    for part in (RESULT_CACHE_VERSION, agent_name, model, options_key, context_digest):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """内存 + 磁盘两级结果缓存（线程安全）；cache_dir 为 None 时只用内存层"""
+
+    def __init__(
+        self,
+        cache_dir: str | Path | None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        memory_entries: int = _MEMORY_MAX_ENTRIES,
+        namespace: str = "results",
+    ) -> None:
+        self.root = Path(cache_dir) / namespace if cache_dir is not None else None
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        assert self.root is not None
+        return self.root / key[:2] / f"{key}.json"
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            self._memory.pop(key, None)
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, value)
+        return dict(value[1])
+
+    def _read_disk(self, key: str) -> tuple[float, dict[str, Any]] | None:
+        if self.root is None:
+            return None
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            created_at = float(data["created_at"])
+            value = data["value"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if not isinstance(value, dict) or self._expired(created_at):
+            path.unlink(missing_ok=True)
+            return None
+        # 刷新 mtime 作为 LRU 访问时间
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return created_at, value
+
+    def _remember(self, key: str, entry: tuple[float, dict[str, Any]]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, value: dict[str, Any]) -> None:
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, (created_at, dict(value)))
+        if self.root is None:
+            return
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(
+                json.dumps({"created_at": created_at, "value": value}, ensure_ascii=False), encoding="utf-8"
+            )
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("写入结果缓存失败: %s (%s)", path, exc)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        """删除过期条目；总大小超过上限时按 mtime 从旧到新删除"""
+        entries: list[tuple[float, int, Path]] = []
+        total = 0
+        now = time.time()
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if self.ttl_seconds > 0 and now - st.st_mtime > self.ttl_seconds * 2:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _mtime, size, path in sorted(entries):
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self._memory.pop(path.stem, None)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+_DEFAULT_CACHE: ResultCache | None = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def get_result_cache() -> ResultCache | None:
+    """进程级结果缓存；未开启时返回 None"""
+    global _DEFAULT_CACHE
+    if not result_cache_enabled():
+        return None
+    cache_dir = Path(os.environ.get("ISSUELAB_RESULT_CACHE_DIR") or Path.cwd() / ".issuelab" / "cache")
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None or _DEFAULT_CACHE.root != cache_dir / "results":
+            _DEFAULT_CACHE = ResultCache(
+                cache_dir,
+                ttl_seconds=env_float("ISSUELAB_RESULT_CACHE_TTL", DEFAULT_TTL_SECONDS),
+                max_bytes=int(env_float("ISSUELAB_RESULT_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024) * 1024 * 1024),
+            )
+        return _DEFAULT_CACHE
+
+
+def reset_result_cache() -> None:
+    """重置进程级结果缓存（测试用）"""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        _DEFAULT_CACHE = None
@@ -0,0 +1,305 @@
+"""Agent registry 快照
+
+把 agents/*/agent.yml、prompt.md、output_config.yml 与 config/output_templates.yml
+编译为单个 JSON 文件（默认 .issuelab/registry_snapshot.json），冷启动时一次读取
+即可替代逐个解析小文件。
+
+快照只在与当前目录树一致时生效：
+1. 先比对 stat 指纹（路径 + mtime_ns + size），命中则直接使用；
+2. 指纹不一致时（例如 CI 重新 checkout，所有 mtime 都会变化），比对快照记录的
+   各文件 git blob 哈希：
+   - 在 git 工作区内且这些文件相对索引无改动时，直接取索引中的 blob 哈希
+     （git 只比对 stat，不读文件内容）；
+   - 否则（非 git 目录/有未提交改动）逐个读取文件字节计算 blob 哈希，
+     冷启动代价为一次读取全部源文件（不解析 YAML）。
+   一致则刷新快照中的指纹，后续只需 stat。
+
+快照路径默认 <root>/.issuelab/registry_snapshot.json，可用 ISSUELAB_REGISTRY_SNAPSHOT_PATH
+覆盖（相对路径相对 root，也可为绝对路径）；编译与加载使用同一路径。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from issuelab.logging_config import get_logger
+from issuelab.utils.env import env_flag
+
+logger = get_logger(__name__)
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_RELATIVE_PATH = Path(".issuelab") / "registry_snapshot.json"
+
+_AGENT_FILES = ("agent.yml", "prompt.md", "output_config.yml")
+_GLOBAL_TEMPLATES_FILE = Path("config") / "output_templates.yml"
+
+# 进程级缓存：snapshot 路径 -> (snapshot 文件 mtime_ns, 已验证的快照)
+_SNAPSHOT_CACHE: dict[str, tuple[int, dict[str, Any]]] = {}
+_SNAPSHOT_LOCK = threading.Lock()
+
+
+def snapshot_enabled() -> bool:
+    """是否允许读取快照（ISSUELAB_REGISTRY_SNAPSHOT=0 可关闭）"""
+    return env_flag("ISSUELAB_REGISTRY_SNAPSHOT", True)
+
+
+def get_snapshot_path(root_dir: Path) -> Path:
+    override = os.environ.get("ISSUELAB_REGISTRY_SNAPSHOT_PATH", "").strip()
+    if not override:
+        return root_dir / SNAPSHOT_RELATIVE_PATH
+    path = Path(override).expanduser()
+    return path if path.is_absolute() else root_dir / path
+
+
+def _collect_source_files(root_dir: Path) -> list[Path]:
+    """列出快照覆盖的所有源文件（相对 root_dir，按路径排序）"""
+    files: list[Path] = []
+    agents_dir = root_dir / "agents"
+    if agents_dir.is_dir():
+        for user_dir in sorted(agents_dir.iterdir()):
+            if not user_dir.is_dir() or user_dir.name.startswith("_"):
+                continue
+            for name in _AGENT_FILES:
+                path = user_dir / name
+                if path.is_file():
+                    files.append(path.relative_to(root_dir))
+    if (root_dir / _GLOBAL_TEMPLATES_FILE).is_file():
+        files.append(_GLOBAL_TEMPLATES_FILE)
+    return files
+
+
+def _stat_fingerprint(root_dir: Path, files: list[Path]) -> str:
+    digest = hashlib.sha256()
+    for rel in files:
+        try:
+            st = (root_dir / rel).stat()
+        except OSError:
+            continue
+        digest.update(f"{rel.as_posix()}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+    return digest.hexdigest()
+
+
+def _git_blob_hash(data: bytes) -> str:
+    """与 `git hash-object` 相同的 blob 哈希"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _read_blob_hashes(root_dir: Path, files: list[Path]) -> dict[str, str]:
+    blobs: dict[str, str] = {}
+    for rel in files:
+        try:
+            blobs[rel.as_posix()] = _git_blob_hash((root_dir / rel).read_bytes())
+        except OSError:
+            continue
+    return blobs
+
+
+def _git_index_blob_hashes(root_dir: Path, files: list[Path]) -> dict[str, str] | None:
+    """文件均已纳入 git 且相对索引无改动时返回索引中的 blob 哈希，否则返回 None"""
+    paths = [rel.as_posix() for rel in files]
+    if not paths:
+        return {}
+    git = ["git", "-c", "core.quotePath=false"]
+    try:
+        status = subprocess.run(
+            [*git, "status", "--porcelain", "-z", "--untracked-files=no", "--", *paths],
+            cwd=root_dir,
+            capture_output=True,
+            timeout=10,
+        )
+        if status.returncode != 0 or status.stdout:
+            return None
+        listed = subprocess.run(
+            [*git, "ls-files", "-s", "-z", "--", *paths], cwd=root_dir, capture_output=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if listed.returncode != 0:
+        return None
+
+    blobs: dict[str, str] = {}
+    for record in listed.stdout.decode("utf-8", "replace").split("\0"):
+        meta, _, path = record.partition("\t")
+        fields = meta.split()
+        if path and len(fields) >= 2:
+            blobs[path] = fields[1]
+    return blobs if set(blobs) == set(paths) else None
+
+
+def _load_yaml_mapping(path: Path) -> dict[str, Any] | None:
+    if not path.is_file():
+        return None
+    try:
+        data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    except Exception as exc:
+        logger.warning("快照编译时解析失败: %s (%s)", path, exc)
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def build_registry_snapshot(root_dir: Path | None = None, output_path: Path | None = None) -> dict[str, Any]:
+    """编译 agent registry 快照并写入磁盘
+
+    Args:
+        root_dir: 项目根目录（包含 agents/ 与 config/），默认当前目录
+        output_path: 输出路径，默认 <root>/.issuelab/registry_snapshot.json
+
+    Returns:
+        写入的快照字典
+    """
+    from issuelab.agents.executor import _select_output_template
+    from issuelab.agents.registry import _parse_agent_yml
+
+    root = (root_dir or Path.cwd()).resolve()
+    files = _collect_source_files(root)
+
+    global_templates = _load_yaml_mapping(root / _GLOBAL_TEMPLATES_FILE) or {}
+    agents: dict[str, dict[str, Any]] = {}
+    unresolved: list[str] = []
+
+    agents_dir = root / "agents"
+    if agents_dir.is_dir():
+        for user_dir in sorted(agents_dir.iterdir()):
+            if not user_dir.is_dir() or user_dir.name.startswith("_"):
+                continue
+            agent_yml = user_dir / "agent.yml"
+            if not agent_yml.is_file():
+                continue
+
+            config = _parse_agent_yml(agent_yml)
+            prompt_path = user_dir / "prompt.md"
+            prompt = prompt_path.read_text(encoding="utf-8") if prompt_path.is_file() else None
+            output_config = _load_yaml_mapping(user_dir / "output_config.yml")
+
+            resolved_template = None
+            if config:
+                template_id = config.get("output_template")
+                template_id = template_id if isinstance(template_id, str) and template_id.strip() else None
+                selected = _select_output_template(
+                    global_templates, output_config or {}, template_id, default_template="review_v1"
+                )
+                if selected is not None:
+                    resolved_template = template_id or "default"
+                elif template_id:
+                    unresolved.append(f"{user_dir.name}:{template_id}")
+
+            agents[user_dir.name] = {
+                "config": config,
+                "prompt": prompt,
+                "output_config": output_config,
+                "resolved_template": resolved_template,
+            }
+
+    if unresolved:
+        logger.warning("以下 agent 的 output_template 无法解析: %s", ", ".join(unresolved))
+
+    snapshot: dict[str, Any] = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": _stat_fingerprint(root, files),
+        "blobs": _read_blob_hashes(root, files),
+        "files": [rel.as_posix() for rel in files],
+        "output_templates": global_templates,
+        "agents": agents,
+    }
+
+    path = output_path or get_snapshot_path(root)
+    _write_snapshot(path, snapshot)
+    with _SNAPSHOT_LOCK:
+        _SNAPSHOT_CACHE.pop(str(path.resolve()), None)
+    logger.info("Registry 快照已写入: %s (%d agents, %d files)", path, len(agents), len(files))
+    return snapshot
+
+
+def _write_snapshot(path: Path, snapshot: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _validate_snapshot(root: Path, path: Path, snapshot: dict[str, Any]) -> bool:
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return False
+
+    files = _collect_source_files(root)
+    if [rel.as_posix() for rel in files] != snapshot.get("files"):
+        return False
+
+    fingerprint = _stat_fingerprint(root, files)
+    if fingerprint == snapshot.get("fingerprint"):
+        return True
+
+    blobs = _git_index_blob_hashes(root, files)
+    if blobs is None:
+        blobs = _read_blob_hashes(root, files)
+    if blobs != snapshot.get("blobs"):
+        return False
+
+    # 内容一致但 mtime 变化（例如重新 checkout）：刷新指纹，后续只需 stat
+    snapshot["fingerprint"] = fingerprint
+    try:
+        _write_snapshot(path, snapshot)
+    except OSError as exc:
+        logger.debug("刷新快照指纹失败: %s (%s)", path, exc)
+    return True
+
+
+def load_registry_snapshot(root_dir: Path) -> dict[str, Any] | None:
+    """读取并验证快照；不存在、已关闭或与目录树不一致时返回 None。"""
+    if not snapshot_enabled():
+        return None
+
+    root = root_dir.resolve()
+    path = get_snapshot_path(root)
+    try:
+        snapshot_mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    key = str(path)
+    with _SNAPSHOT_LOCK:
+        cached = _SNAPSHOT_CACHE.get(key)
+    if cached is not None and cached[0] == snapshot_mtime:
+        snapshot = cached[1]
+    else:
+        try:
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("读取 registry 快照失败: %s (%s)", path, exc)
+            return None
+        if not isinstance(snapshot, dict):
+            return None
+
+    if not _validate_snapshot(root, path, snapshot):
+        logger.debug("Registry 快照已过期，回退到逐文件读取: %s", path)
+        with _SNAPSHOT_LOCK:
+            _SNAPSHOT_CACHE.pop(key, None)
+        return None
+
+    # 内容哈希命中时快照文件会被重写，按最新 mtime 缓存
+    with suppress(OSError):
+        snapshot_mtime = path.stat().st_mtime_ns
+    with _SNAPSHOT_LOCK:
+        _SNAPSHOT_CACHE[key] = (snapshot_mtime, snapshot)
+    return snapshot
+
+
+def get_snapshot_for_agents_dir(agents_dir: Path) -> dict[str, Any] | None:
+    """仅当 agents_dir 是 <root>/agents 时返回 root 下的有效快照"""
+    if agents_dir.name != "agents":
+        return None
+    return load_registry_snapshot(agents_dir.parent)
+
+
+def clear_snapshot_cache() -> None:
+    with _SNAPSHOT_LOCK:
+        _SNAPSHOT_CACHE.clear()
@@ -0,0 +1,84 @@
+"""多阶段流程的阶段检查点（默认关闭）
+
+gqy20 多阶段流程在 Verifier/Judge 失败后重新触发时，从第一个缺失或无效的阶段继续，
+不再为已完成的 Researcher 等阶段重复付费。
+
+检查点路径：<dir>/issue-<n>/<context_hash>/<stage>.json
+- context_hash：agent prompt + 任务上下文的摘要，上下文变化即不复用；
+- 每个检查点记录其上游输入摘要，上游阶段重跑后下游检查点自动失效；
+- 整个流程成功后清除该运行的检查点。
+
+环境变量：
+- ISSUELAB_STAGE_CHECKPOINTS=1        开启
+- ISSUELAB_STAGE_CHECKPOINT_DIR       目录（默认 .issuelab/checkpoints）
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from issuelab.logging_config import get_logger
+from issuelab.utils.env import env_flag
+
+logger = get_logger(__name__)
+
+
+def stage_checkpoints_enabled() -> bool:
+    return env_flag("ISSUELAB_STAGE_CHECKPOINTS")
+
+
+def _digest(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def inputs_digest(inputs: dict[str, str]) -> str:
+    return _digest(*(f"{name}\n{text}" for name, text in sorted(inputs.items())))
+
+
+class StageCheckpointStore:
+    """单次多阶段运行（issue + 上下文）的检查点目录"""
+
+    def __init__(self, root: str | Path, issue_number: int, context: str) -> None:
+        self.context_hash = _digest(context)[:16]
+        self.path = Path(root) / f"issue-{issue_number}" / self.context_hash
+
+    def _file(self, stage_name: str) -> Path:
+        return self.path / f"{stage_name}.json"
+
+    def load(self, stage_name: str, upstream_digest: str) -> str | None:
+        """返回检查点中的阶段输出；不存在、损坏或上游已变化时返回 None"""
+        try:
+            data = json.loads(self._file(stage_name).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("inputs_digest") != upstream_digest:
+            return None
+        response = data.get("response")
+        return response if isinstance(response, str) and response.strip() else None
+
+    def save(self, stage_name: str, upstream_digest: str, response: str) -> None:
+        payload = {"stage": stage_name, "inputs_digest": upstream_digest, "response": response, "saved_at": time.time()}
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._file(stage_name).with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self._file(stage_name))
+        except OSError as exc:
+            logger.warning("写入阶段检查点失败: %s (%s)", stage_name, exc)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def get_stage_checkpoint_store(issue_number: int, context: str) -> StageCheckpointStore | None:
+    if not stage_checkpoints_enabled():
+        return None
+    root = os.environ.get("ISSUELAB_STAGE_CHECKPOINT_DIR") or Path.cwd() / ".issuelab" / "checkpoints"
+    return StageCheckpointStore(root, issue_number, context)
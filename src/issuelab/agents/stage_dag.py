@@ -0,0 +1,177 @@
+"""多阶段流程的阶段 DAG 调度
+
+阶段以 (name, depends_on) 声明；依赖全部成功的阶段立即启动，互不依赖的阶段并行执行。
+失败语义与串行流程一致：任一阶段失败后不再启动新阶段（已在运行的并行阶段跑完），
+按声明顺序报告第一个失败阶段。
+
+每次运行返回各阶段起止时间、总墙钟时间与关键路径（决定墙钟时间的依赖链）。
+"""
+
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+import anyio
+
+from issuelab.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class StageSpec:
+    name: str
+    depends_on: tuple[str, ...] = ()
+
+
+@dataclass
+class DagRun:
+    """一次 DAG 运行的结果"""
+
+    results: dict[str, dict[str, Any]] = field(default_factory=dict)
+    spans: dict[str, tuple[float, float]] = field(default_factory=dict)
+    failed_stage: str | None = None
+    wall_seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.failed_stage is None
+
+
+def parse_stage_specs(raw: Any) -> list[StageSpec]:
+    """解析 agent.yml 中的阶段列表；格式错误时抛 ValueError"""
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("stages 必须是非空列表")
+    specs: list[StageSpec] = []
+    for item in raw:
+        if isinstance(item, str):
+            specs.append(StageSpec(item))
+            continue
+        if not isinstance(item, dict) or not isinstance(item.get("name"), str):
+            raise ValueError(f"无效阶段定义: {item!r}")
+        deps = item.get("depends_on") or []
+        if isinstance(deps, str):
+            deps = [deps]
+        if not isinstance(deps, list) or not all(isinstance(d, str) for d in deps):
+            raise ValueError(f"阶段 {item['name']} 的 depends_on 必须是字符串列表")
+        specs.append(StageSpec(item["name"], tuple(deps)))
+    validate_stage_specs(specs)
+    return specs
+
+
+def validate_stage_specs(specs: Iterable[StageSpec]) -> None:
+    specs = list(specs)
+    names = [s.name for s in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("阶段名称重复")
+    known = set(names)
+    for spec in specs:
+        missing = [d for d in spec.depends_on if d not in known]
+        if missing:
+            raise ValueError(f"阶段 {spec.name} 依赖未定义的阶段: {missing}")
+    # Kahn 拓扑排序检测环
+    indegree = {s.name: len(set(s.depends_on)) for s in specs}
+    ready = [n for n, d in indegree.items() if d == 0]
+    visited = 0
+    while ready:
+        node = ready.pop()
+        visited += 1
+        for spec in specs:
+            if node in spec.depends_on:
+                indegree[spec.name] -= 1
+                if indegree[spec.name] == 0:
+                    ready.append(spec.name)
+    if visited != len(specs):
+        raise ValueError("阶段依赖存在环")
+
+
+async def run_stage_dag(
+    specs: list[StageSpec],
+    run_stage: Callable[[StageSpec, dict[str, dict[str, Any]]], Awaitable[dict[str, Any]]],
+    clock: Callable[[], float] = time.monotonic,
+) -> DagRun:
+    """按依赖调度执行阶段
+
+    run_stage(spec, results) 返回至少含 ok 字段的结果字典；results 为已完成阶段的结果。
+    """
+    validate_stage_specs(specs)
+    run = DagRun()
+    start = clock()
+    started: set[str] = set()
+    failed: list[str] = []
+    errors: list[Exception] = []
+    order = {spec.name: i for i, spec in enumerate(specs)}
+
+    async with anyio.create_task_group() as tg:
+
+        def _launch_ready() -> None:
+            if failed:
+                return
+            for spec in specs:
+                if spec.name in started:
+                    continue
+                if all(dep in run.results and run.results[dep].get("ok", True) for dep in spec.depends_on):
+                    started.add(spec.name)
+                    tg.start_soon(_run_one, spec)
+
+        async def _run_one(spec: StageSpec) -> None:
+            stage_start = clock()
+            try:
+                result = await run_stage(spec, dict(run.results))
+            except Exception as exc:
+                # 异常在任务组外原样抛出，避免被包装为 ExceptionGroup
+                errors.append(exc)
+                failed.append(spec.name)
+                return
+            run.spans[spec.name] = (stage_start - start, clock() - start)
+            run.results[spec.name] = result
+            if not result.get("ok", True):
+                failed.append(spec.name)
+            _launch_ready()
+
+        _launch_ready()
+
+    run.wall_seconds = clock() - start
+    if errors:
+        raise errors[0]
+    if failed:
+        run.failed_stage = min(failed, key=order.__getitem__)
+    return run
+
+
+def critical_path(specs: list[StageSpec], spans: dict[str, tuple[float, float]]) -> tuple[list[str], float]:
+    """返回完成阶段中耗时最长的依赖链及其总耗时（各阶段时长之和）"""
+    by_name = {s.name: s for s in specs}
+    best: dict[str, tuple[float, list[str]]] = {}
+
+    def _longest(name: str) -> tuple[float, list[str]]:
+        if name in best:
+            return best[name]
+        begin, end = spans[name]
+        duration = end - begin
+        prev = max(
+            (_longest(dep) for dep in by_name[name].depends_on if dep in spans),
+            key=lambda item: item[0],
+            default=(0.0, []),
+        )
+        best[name] = (prev[0] + duration, [*prev[1], name])
+        return best[name]
+
+    paths = [_longest(name) for name in spans if name in by_name]
+    if not paths:
+        return [], 0.0
+    total, path = max(paths, key=lambda item: item[0])
+    return path, total
+
+
+def summarize_dag_run(specs: list[StageSpec], run: DagRun) -> dict[str, Any]:
+    path, path_seconds = critical_path(specs, run.spans)
+    stage_seconds = {name: round(end - begin, 3) for name, (begin, end) in run.spans.items()}
+    return {
+        "wall_seconds": round(run.wall_seconds, 3),
+        "serial_seconds": round(sum(stage_seconds.values()), 3),
+        "critical_path": path,
+        "critical_path_seconds": round(path_seconds, 3),
+        "stage_seconds": stage_seconds,
+    }
@@ -0,0 +1,118 @@
+"""Agent 运行耗时采集
+
+按单调时钟记录一次 query 内的各类时间片：
+- 首段文本到达时间（time-to-first-text）；
+- 每轮模型延迟：上一条消息（或请求开始）到本轮 AssistantMessage 到达；
+- 每个工具调用：ToolUseBlock 到达至对应 ToolResultBlock 到达（按 tool_use_id 配对）。
+
+结果写入 execution_info["timings"]；设置 ISSUELAB_TIMINGS_FILE 时另追加一行 JSONL。
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from issuelab.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_FILE_LOCK = threading.Lock()
+
+
+def _round(value: float) -> float:
+    return round(value, 4)
+
+
+class TimingCollector:
+    """单次 agent 调用的耗时采集器"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._start = clock()
+        self._last_event = self._start
+        self._first_text: float | None = None
+        self._end: float | None = None
+        self.turns: list[dict[str, Any]] = []
+        self._tools: dict[str, dict[str, Any]] = {}
+
+    def _offset(self, now: float) -> float:
+        return _round(now - self._start)
+
+    def on_turn(self) -> None:
+        now = self._clock()
+        self.turns.append(
+            {
+                "turn": len(self.turns) + 1,
+                "start": self._offset(self._last_event),
+                "seconds": _round(now - self._last_event),
+            }
+        )
+        self._last_event = now
+
+    def on_text(self) -> None:
+        if self._first_text is None:
+            self._first_text = self._clock()
+
+    def on_tool_use(self, tool_use_id: str, name: str) -> None:
+        now = self._clock()
+        key = tool_use_id or f"anonymous-{len(self._tools)}"
+        self._tools[key] = {"id": tool_use_id, "name": name, "start": now, "end": None, "is_error": False}
+
+    def on_tool_result(self, tool_use_id: str, is_error: bool = False) -> None:
+        now = self._clock()
+        span = self._tools.get(tool_use_id)
+        if span is not None and span["end"] is None:
+            span["end"] = now
+            span["is_error"] = bool(is_error)
+        self._last_event = now
+
+    def on_message(self) -> None:
+        """其余消息（如 ResultMessage）只推进事件时间"""
+        self._last_event = self._clock()
+
+    def finish(self) -> None:
+        if self._end is None:
+            self._end = self._clock()
+
+    def summary(self) -> dict[str, Any]:
+        end = self._end if self._end is not None else self._clock()
+        tools = []
+        for span in self._tools.values():
+            stop = span["end"] if span["end"] is not None else end
+            tools.append(
+                {
+                    "id": span["id"],
+                    "name": span["name"],
+                    "start": self._offset(span["start"]),
+                    "seconds": _round(stop - span["start"]),
+                    "is_error": span["is_error"],
+                    "pending": span["end"] is None,
+                }
+            )
+        total = end - self._start
+        return {
+            "total_seconds": _round(total),
+            "time_to_first_text_seconds": None if self._first_text is None else self._offset(self._first_text),
+            "model_seconds": _round(sum(t["seconds"] for t in self.turns)),
+            "tool_seconds": _round(sum(t["seconds"] for t in tools)),
+            "turns": list(self.turns),
+            "tools": tools,
+        }
+
+
+def write_timings_record(record: dict[str, Any], path: str | None = None) -> None:
+    """追加一行耗时记录到 ISSUELAB_TIMINGS_FILE（未设置则跳过）"""
+    path = path or os.environ.get("ISSUELAB_TIMINGS_FILE")
+    if not path:
+        return
+    line = json.dumps(record, ensure_ascii=False)
+    try:
+        with _FILE_LOCK:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+    except OSError as exc:
+        logger.warning("写入耗时记录失败: %s (%s)", path, exc)
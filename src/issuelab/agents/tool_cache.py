@@ -0,0 +1,420 @@
+"""跨 agent 共享的网页抓取 / 检索结果缓存（默认关闭）
+
+/review 中 reviewer_a、reviewer_b、summarizer 常会抓取相同的 arXiv 页面、DOI 与 GitHub 链接。
+开启后每个 agent 的选项都会挂载进程内 MCP server `issuelab_cache`，提供：
+- cached_fetch(url)：按规范化 URL 缓存页面正文；
+- cached_search(query, source)：按规范化查询缓存 arXiv / Crossref 检索结果。
+
+同一进程（一次 run_agents_parallel）内所有 agent 共享内存层；设置目录后磁盘层可跨 job 复用。
+挂载时系统提示追加 build_tool_cache_hint()，引导 agent 用这两个工具代替 WebFetch。
+工具结果首行标注 `[cache hit]` / `[cache miss]`，执行器据此统计每次运行的命中率。
+
+环境变量：
+- ISSUELAB_TOOL_CACHE=1            开启
+- ISSUELAB_TOOL_CACHE_DIR          磁盘层目录（不设置则仅内存）
+- ISSUELAB_TOOL_CACHE_TTL          过期秒数（默认 86400）
+- ISSUELAB_TOOL_CACHE_MAX_MB       磁盘上限（默认 64）
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections.abc import Callable
+from html.parser import HTMLParser
+from typing import Any
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlsplit, urlunsplit
+
+import anyio
+import requests
+from claude_agent_sdk import SdkMcpTool, create_sdk_mcp_server, tool
+from claude_agent_sdk.types import McpSdkServerConfig
+
+from issuelab.agents.result_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL_SECONDS, ResultCache
+from issuelab.logging_config import get_logger
+from issuelab.utils.env import env_flag, env_float
+from issuelab.utils.mcp import text_result
+
+logger = get_logger(__name__)
+
+TOOL_CACHE_SERVER = "issuelab_cache"
+TOOL_CACHE_VERSION = "1"
+HIT_MARKER = "[cache hit]"
+MISS_MARKER = "[cache miss]"
+SEARCH_SOURCES = ("arxiv", "crossref")
+
+_FETCH_TIMEOUT_SECONDS = 20
+_FETCH_MAX_BYTES = 1024 * 1024
+_MEMORY_ENTRIES = 64
+_DEFAULT_MAX_CHARS = 20000
+_USER_AGENT = "IssueLab/0.1 (+https://github.com/gqy20/IssueLab)"
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref_src)$", re.IGNORECASE)
+_CANONICAL_HTTPS_HOSTS = {"arxiv.org", "github.com", "doi.org"}
+_DOI_RE = re.compile(r"^(?:doi:|https?://(?:dx\.)?doi\.org/)(10\.\d{4,9}/\S+)$", re.IGNORECASE)
+_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+
+def tool_cache_enabled() -> bool:
+    return env_flag("ISSUELAB_TOOL_CACHE")
+
+
+def normalize_url(url: str) -> str:
+    """规范化 URL：DOI 统一为 https://doi.org/<doi>，去掉片段、跟踪参数、默认端口与 www 前缀"""
+    url = url.strip()
+    doi = _DOI_RE.match(url)
+    if doi:
+        return f"https://doi.org/{doi.group(1).lower()}"
+    parts = urlsplit(url if "://" in url else f"https://{url}")
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www.") and host[4:] in _CANONICAL_HTTPS_HOSTS:
+        host = host[4:]
+    if host in _CANONICAL_HTTPS_HOSTS:
+        scheme = "https"
+    port = parts.port
+    if port and (scheme, port) not in {("http", 80), ("https", 443)}:
+        host = f"{host}:{port}"
+    path = parts.path or "/"
+    if host == "github.com":
+        path = path.rstrip("/").removesuffix(".git") or "/"
+    query = urlencode(
+        sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _TRACKING_PARAMS.match(k))
+    )
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+def _cache_key(kind: str, value: str) -> str:
+    return hashlib.sha256(f"{TOOL_CACHE_VERSION}\0{kind}\0{value}".encode()).hexdigest()
+
+
+class _TextExtractor(HTMLParser):
+    _SKIP = {"script", "style", "noscript", "svg", "head"}
+    _BLOCK = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "pre"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in self._SKIP:
+            self._skip_depth += 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._SKIP and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(markup: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(markup)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _decode_body(raw: bytes, content_type: str) -> str:
+    """按声明的 charset 解码；未声明时不用 requests 对 text/* 的 ISO-8859-1 默认值，
+    依次尝试 HTML meta charset、UTF-8 与 apparent_encoding 同款的字符集探测"""
+    match = _CHARSET_RE.search(content_type) or _META_CHARSET_RE.search(raw[:4096])
+    if match:
+        encoding = match.group(1)
+        encoding = encoding.decode("ascii") if isinstance(encoding, bytes) else encoding
+    else:
+        try:
+            return raw.decode("utf-8")
+        except UnicodeDecodeError:
+            # 流式读取后 response.content 已不可用，直接对已读字节做 apparent_encoding 的探测
+            encoding = requests.compat.chardet.detect(raw)["encoding"] or "utf-8"
+    try:
+        return raw.decode(encoding, errors="replace")
+    except LookupError:
+        return raw.decode("utf-8", errors="replace")
+
+
+def _http_fetch(url: str) -> dict[str, Any]:
+    """抓取页面并转为纯文本；非 2xx 抛 requests.HTTPError"""
+    with requests.get(
+        url, timeout=_FETCH_TIMEOUT_SECONDS, headers={"User-Agent": _USER_AGENT}, stream=True, allow_redirects=True
+    ) as response:
+        response.raise_for_status()
+        raw = response.raw.read(_FETCH_MAX_BYTES, decode_content=True)
+        content_type = response.headers.get("Content-Type", "")
+        final_url = response.url
+    text = _decode_body(raw, content_type)
+    if "html" in content_type or text.lstrip()[:15].lower().startswith(("<!doctype html", "<html")):
+        text = html_to_text(text)
+    return {"url": final_url, "content_type": content_type, "text": text}
+
+
+def _http_search(query: str, source: str, max_results: int) -> dict[str, Any]:
+    if source == "arxiv":
+        import feedparser
+
+        url = (
+            f"https://export.arxiv.org/api/query?search_query=all:{quote_plus(query)}&start=0&max_results={max_results}"
+        )
+        response = requests.get(url, timeout=_FETCH_TIMEOUT_SECONDS, headers={"User-Agent": _USER_AGENT})
+        response.raise_for_status()
+        feed = feedparser.parse(response.content)
+        items = [
+            {
+                "title": " ".join(str(e.get("title", "")).split()),
+                "url": str(e.get("id", "")),
+                "published": str(e.get("published", ""))[:10],
+                "summary": " ".join(str(e.get("summary", "")).split())[:500],
+            }
+            for e in feed.entries
+        ]
+    else:
+        response = requests.get(
+            "https://api.crossref.org/works",
+            params={"query": query, "rows": max_results, "select": "DOI,title,issued,container-title"},
+            timeout=_FETCH_TIMEOUT_SECONDS,
+            headers={"User-Agent": _USER_AGENT},
+        )
+        response.raise_for_status()
+        items = [
+            {
+                "title": " ".join((item.get("title") or [""])[0].split()),
+                "url": f"https://doi.org/{str(item.get('DOI', '')).lower()}",
+                "published": "-".join(str(p) for p in ((item.get("issued") or {}).get("date-parts") or [[]])[0]),
+                "venue": (item.get("container-title") or [""])[0],
+            }
+            for item in response.json().get("message", {}).get("items", [])
+        ]
+    return {"source": source, "query": query, "items": items}
+
+
+class ToolCache:
+    """抓取 / 检索结果缓存；fetcher 与 searcher 可替换（测试用）"""
+
+    def __init__(
+        self,
+        store: ResultCache,
+        fetcher: Callable[[str], dict[str, Any]] = _http_fetch,
+        searcher: Callable[[str, str, int], dict[str, Any]] = _http_search,
+    ) -> None:
+        self.store = store
+        self.fetcher = fetcher
+        self.searcher = searcher
+        # 同一 key 的并发未命中只请求一次
+        self._inflight: dict[str, anyio.Lock] = {}
+        self._inflight_guard = threading.Lock()
+
+    def _lock_for(self, key: str) -> anyio.Lock:
+        with self._inflight_guard:
+            return self._inflight.setdefault(key, anyio.Lock())
+
+    async def _get_or_load(self, key: str, load: Callable[[], dict[str, Any]]) -> tuple[bool, dict[str, Any]]:
+        cached = self.store.get(key)
+        if cached is not None:
+            return True, cached
+        lock = self._lock_for(key)
+        try:
+            async with lock:
+                cached = self.store.get(key)
+                if cached is not None:
+                    return True, cached
+                value = await anyio.to_thread.run_sync(load)
+                self.store.put(key, value)
+                return False, value
+        finally:
+            with self._inflight_guard:
+                if not lock.locked() and not lock.statistics().tasks_waiting:
+                    self._inflight.pop(key, None)
+
+    async def fetch(self, url: str) -> tuple[bool, dict[str, Any]]:
+        normalized = normalize_url(url)
+        return await self._get_or_load(_cache_key("fetch", normalized), lambda: self.fetcher(normalized))
+
+    async def search(self, query: str, source: str = "arxiv", max_results: int = 10) -> tuple[bool, dict[str, Any]]:
+        if source not in SEARCH_SOURCES:
+            raise ValueError(f"不支持的检索源: {source}（可选 {', '.join(SEARCH_SOURCES)}）")
+        normalized = normalize_query(query)
+        key = _cache_key("search", f"{source}\0{max_results}\0{normalized}")
+        return await self._get_or_load(key, lambda: self.searcher(normalized, source, max_results))
+
+
+def _format_fetch(hit: bool, value: dict[str, Any], offset: int, max_chars: int) -> str:
+    text = str(value.get("text", ""))
+    chunk = text[offset : offset + max_chars]
+    header = f"{HIT_MARKER if hit else MISS_MARKER} {value.get('url', '')} ({value.get('content_type', '')})"
+    if offset + max_chars < len(text):
+        header += f"\n[truncated: chars {offset}-{offset + len(chunk)} of {len(text)}; 用 offset 继续读取]"
+    return f"{header}\n\n{chunk}"
+
+
+def _format_search(hit: bool, value: dict[str, Any]) -> str:
+    lines = [f"{HIT_MARKER if hit else MISS_MARKER} {value.get('source')}: {value.get('query')}"]
+    for i, item in enumerate(value.get("items") or [], 1):
+        meta = " | ".join(str(item[k]) for k in ("published", "venue") if item.get(k))
+        lines.append(f"{i}. {item.get('title', '')}\n   {item.get('url', '')}" + (f"\n   {meta}" if meta else ""))
+        if item.get("summary"):
+            lines.append(f"   {item['summary']}")
+    if len(lines) == 1:
+        lines.append("（无结果）")
+    return "\n".join(lines)
+
+
+def parse_cache_status(content: Any) -> str | None:
+    """从工具结果内容中识别 hit / miss（内容可为字符串或 content block 列表）"""
+    if isinstance(content, list):
+        content = next((b.get("text") for b in content if isinstance(b, dict) and b.get("type") == "text"), "")
+    if not isinstance(content, str):
+        return None
+    if content.startswith(HIT_MARKER):
+        return "hit"
+    if content.startswith(MISS_MARKER):
+        return "miss"
+    return None
+
+
+def build_tool_cache_tools(cache: ToolCache) -> list[SdkMcpTool[Any]]:
+    @tool(
+        "cached_fetch",
+        "抓取网页（arXiv / DOI / GitHub 等）并返回正文文本；结果在所有 agent 间缓存。长页面用 offset 分段读取。",
+        {
+            "type": "object",
+            "properties": {
+                "url": {"type": "string"},
+                "offset": {"type": "integer", "minimum": 0},
+                "max_chars": {"type": "integer", "minimum": 1000},
+            },
+            "required": ["url"],
+        },
+    )
+    async def cached_fetch(args: dict[str, Any]) -> dict[str, Any]:
+        try:
+            hit, value = await cache.fetch(str(args["url"]))
+        except Exception as exc:
+            return text_result(f"抓取失败: {type(exc).__name__}: {exc}", is_error=True)
+        offset = max(0, int(args.get("offset") or 0))
+        max_chars = int(args.get("max_chars") or _DEFAULT_MAX_CHARS)
+        return text_result(_format_fetch(hit, value, offset, max_chars))
+
+    @tool(
+        "cached_search",
+        "检索学术文献（source: arxiv | crossref），返回标题、链接与摘要；结果在所有 agent 间缓存。",
+        {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string"},
+                "source": {"type": "string", "enum": list(SEARCH_SOURCES)},
+                "max_results": {"type": "integer", "minimum": 1, "maximum": 50},
+            },
+            "required": ["query"],
+        },
+    )
+    async def cached_search(args: dict[str, Any]) -> dict[str, Any]:
+        try:
+            hit, value = await cache.search(
+                str(args["query"]), str(args.get("source") or "arxiv"), int(args.get("max_results") or 10)
+            )
+        except Exception as exc:
+            return text_result(f"检索失败: {type(exc).__name__}: {exc}", is_error=True)
+        return text_result(_format_search(hit, value))
+
+    return [cached_fetch, cached_search]
+
+
+def build_tool_cache_hint() -> str:
+    """挂载缓存 server 时追加到系统提示：引导 agent 使用共享缓存工具而非 WebFetch"""
+    return (
+        f"Shared fetch cache: to read a web page (arXiv, DOI, GitHub, etc.) use "
+        f"`mcp__{TOOL_CACHE_SERVER}__cached_fetch` instead of WebFetch, and for literature lookups on arXiv or "
+        f"Crossref use `mcp__{TOOL_CACHE_SERVER}__cached_search`; results are shared with the other agents "
+        "working on this issue."
+    )
+
+
+def create_tool_cache_server(cache: ToolCache) -> McpSdkServerConfig:
+    return create_sdk_mcp_server(TOOL_CACHE_SERVER, tools=build_tool_cache_tools(cache))
+
+
+_DEFAULT_CACHE: ToolCache | None = None
+_DEFAULT_SERVER: McpSdkServerConfig | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_tool_cache() -> ToolCache | None:
+    """进程级工具缓存；未开启时返回 None"""
+    global _DEFAULT_CACHE, _DEFAULT_SERVER
+    if not tool_cache_enabled():
+        return None
+    cache_dir = os.environ.get("ISSUELAB_TOOL_CACHE_DIR") or None
+    with _DEFAULT_LOCK:
+        root = os.path.join(cache_dir, "tools") if cache_dir else None
+        if _DEFAULT_CACHE is None or str(_DEFAULT_CACHE.store.root or "") != str(root or ""):
+            store = ResultCache(
+                cache_dir,
+                ttl_seconds=env_float("ISSUELAB_TOOL_CACHE_TTL", DEFAULT_TTL_SECONDS),
+                max_bytes=int(env_float("ISSUELAB_TOOL_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024) * 1024 * 1024),
+                memory_entries=_MEMORY_ENTRIES,
+                namespace="tools",
+            )
+            _DEFAULT_CACHE = ToolCache(store)
+            _DEFAULT_SERVER = None
+        return _DEFAULT_CACHE
+
+
+def get_tool_cache_server() -> McpSdkServerConfig | None:
+    """挂载到 agent 选项的进程内 MCP server；未开启时返回 None"""
+    global _DEFAULT_SERVER
+    cache = get_tool_cache()
+    if cache is None:
+        return None
+    with _DEFAULT_LOCK:
+        if _DEFAULT_SERVER is None:
+            _DEFAULT_SERVER = create_tool_cache_server(cache)
+        return _DEFAULT_SERVER
+
+
+def reset_tool_cache() -> None:
+    """重置进程级工具缓存（测试用）"""
+    global _DEFAULT_CACHE, _DEFAULT_SERVER
+    with _DEFAULT_LOCK:
+        _DEFAULT_CACHE = None
+        _DEFAULT_SERVER = None
+
+
+class ToolCacheCounter:
+    """统计单次运行中缓存工具的命中情况（按 tool_use_id 关联调用与结果）"""
+
+    def __init__(self) -> None:
+        self._pending: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def on_tool_use(self, tool_use_id: str, name: str) -> None:
+        if name.startswith(f"mcp__{TOOL_CACHE_SERVER}__"):
+            self._pending.add(tool_use_id)
+
+    def on_tool_result(self, tool_use_id: str, content: Any) -> None:
+        if tool_use_id not in self._pending:
+            return
+        self._pending.discard(tool_use_id)
+        status = parse_cache_status(content)
+        if status == "hit":
+            self.hits += 1
+        elif status == "miss":
+            self.misses += 1
+
+    def summary(self) -> dict[str, Any] | None:
+        total = self.hits + self.misses
+        if not total:
+            return None
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 3)}
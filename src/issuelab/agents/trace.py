@@ -0,0 +1,196 @@
+"""Agent 执行轨迹录制与离线回放
+
+录制：设置 ISSUELAB_TRACE_DIR 后，run_single_agent 的每次 query 把收到的 SDK 消息
+（含相对时间戳）逐条序列化为 gzip 压缩的 JSONL：
+    <dir>/issue-<n>/<agent>[.<label>].jsonl.gz
+label 为阶段名或调用方传入的 trace_label（如 gqy20 的 judge / judge-cont-1 / fallback），
+同一 agent 的多次调用各写一个文件。末行为 __end__ 记录（ok / error / cancelled）。
+
+回放：设置 ISSUELAB_TRACE_REPLAY_DIR 后，run_single_agent 从同名轨迹读取消息代替 query，
+不消耗模型额度。ISSUELAB_TRACE_REPLAY_SPEED 控制节奏：
+- 0（默认）：最快速度；
+- 1：按原始时间间隔；
+- 其他正数：按倍速（2 表示两倍速）。
+"""
+
+import asyncio
+import contextvars
+import dataclasses
+import gzip
+import json
+import os
+import re
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import claude_agent_sdk.types as sdk_types
+
+from issuelab.logging_config import get_logger
+from issuelab.utils.env import env_float
+
+logger = get_logger(__name__)
+
+TRACE_SUFFIX = ".jsonl.gz"
+_END = "__end__"
+
+_TRACE_ISSUE: contextvars.ContextVar[int | None] = contextvars.ContextVar("issuelab_trace_issue", default=None)
+
+
+class TraceReplayError(RuntimeError):
+    """回放的轨迹以错误结束"""
+
+
+@contextmanager
+def trace_issue(issue_number: int | None) -> Iterator[None]:
+    """为作用域内的 agent 调用标注所属 Issue（决定轨迹文件目录）"""
+    token = _TRACE_ISSUE.set(issue_number)
+    try:
+        yield
+    finally:
+        _TRACE_ISSUE.reset(token)
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", value) or "_"
+
+
+def trace_path(
+    root: str | Path, agent_name: str, stage_name: str | None = None, issue_number: int | None = None
+) -> Path:
+    issue = _TRACE_ISSUE.get() if issue_number is None else issue_number
+    name = _safe_name(agent_name) + (f".{_safe_name(stage_name)}" if stage_name else "")
+    return Path(root) / f"issue-{issue if issue is not None else 'none'}" / f"{name}{TRACE_SUFFIX}"
+
+
+def encode_message(obj: Any) -> Any:
+    """把 SDK 消息（dataclass 树）转为带类型标记的 JSON 结构"""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        data = {f.name: encode_message(getattr(obj, f.name)) for f in dataclasses.fields(obj)}
+        return {"__type__": type(obj).__name__, **data}
+    if isinstance(obj, dict):
+        return {str(k): encode_message(v) for k, v in obj.items()}
+    if isinstance(obj, list | tuple):
+        return [encode_message(v) for v in obj]
+    if obj is None or isinstance(obj, str | int | float | bool):
+        return obj
+    return repr(obj)
+
+
+def decode_message(data: Any) -> Any:
+    if isinstance(data, list):
+        return [decode_message(v) for v in data]
+    if not isinstance(data, dict):
+        return data
+    type_name = data.get("__type__")
+    fields = {k: decode_message(v) for k, v in data.items() if k != "__type__"}
+    cls = getattr(sdk_types, type_name, None) if isinstance(type_name, str) else None
+    if cls is None or not dataclasses.is_dataclass(cls):
+        return fields
+    init_names = {f.name for f in dataclasses.fields(cls) if f.init}
+    try:
+        return cls(**{k: v for k, v in fields.items() if k in init_names})
+    except TypeError:
+        return fields
+
+
+class TraceRecorder:
+    """单次 query 的轨迹录制器"""
+
+    def __init__(self, path: str | Path, meta: dict[str, Any] | None = None) -> None:
+        self.path = Path(path)
+        self.meta = meta or {}
+        self._start = time.monotonic()
+        self._lines: list[str] = []
+        self._closed = False
+
+    def record(self, message: Any) -> None:
+        entry = {"t": round(time.monotonic() - self._start, 4), "message": encode_message(message)}
+        self._lines.append(json.dumps(entry, ensure_ascii=False))
+
+    def close(self, status: str = "ok", error: str = "") -> None:
+        """写出轨迹（覆盖同一 agent/stage 上一次尝试的轨迹）"""
+        if self._closed:
+            return
+        self._closed = True
+        end = {"t": round(time.monotonic() - self._start, 4), _END: {"status": status, "error": error, **self.meta}}
+        payload = "\n".join([*self._lines, json.dumps(end, ensure_ascii=False)]) + "\n"
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            logger.warning("写入执行轨迹失败: %s (%s)", self.path, exc)
+
+
+def get_trace_recorder(agent_name: str, stage_name: str | None = None) -> TraceRecorder | None:
+    root = os.environ.get("ISSUELAB_TRACE_DIR")
+    if not root:
+        return None
+    meta = {"agent": agent_name, "stage": stage_name, "issue": _TRACE_ISSUE.get(), "recorded_at": time.time()}
+    return TraceRecorder(trace_path(root, agent_name, stage_name), meta)
+
+
+async def record_messages(messages: AsyncIterator[Any], recorder: TraceRecorder) -> AsyncIterator[Any]:
+    """透传消息流并录制"""
+    try:
+        async for message in messages:
+            recorder.record(message)
+            yield message
+    except GeneratorExit:
+        recorder.close("cancelled")
+        raise
+    except BaseException as exc:
+        recorder.close("error", f"{type(exc).__name__}: {exc}")
+        raise
+    else:
+        recorder.close()
+
+
+def load_trace(path: str | Path) -> tuple[list[tuple[float, Any]], dict[str, Any]]:
+    """读取轨迹，返回 ([(相对时间, 消息)], 结束记录)"""
+    entries: list[tuple[float, Any]] = []
+    end: dict[str, Any] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if _END in entry:
+                end = entry[_END]
+                continue
+            entries.append((float(entry["t"]), decode_message(entry["message"])))
+    return entries, end
+
+
+def get_replay_speed() -> float:
+    return env_float("ISSUELAB_TRACE_REPLAY_SPEED", 0.0, minimum=0.0)
+
+
+def get_replay_path(agent_name: str, stage_name: str | None = None) -> Path | None:
+    """回放模式下返回轨迹路径；未开启回放时返回 None，开启但缺少轨迹时报错"""
+    root = os.environ.get("ISSUELAB_TRACE_REPLAY_DIR")
+    if not root:
+        return None
+    path = trace_path(root, agent_name, stage_name)
+    if not path.exists():
+        raise FileNotFoundError(f"回放轨迹不存在: {path}")
+    return path
+
+
+async def replay_trace(path: str | Path, speed: float = 0.0) -> AsyncIterator[Any]:
+    """按录制顺序产出消息；speed>0 时按原始时间间隔（除以倍速）等待"""
+    entries, end = load_trace(path)
+    start = time.monotonic()
+    for offset, message in entries:
+        if speed > 0:
+            delay = offset / speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield message
+    if end.get("status") == "error":
+        raise TraceReplayError(end.get("error") or "trace ended with error")
@@ -5,9 +5,13 @@
 """
 
 import argparse
+import hashlib
 import json
 import os
 import sys
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from typing import Any
@@ -16,7 +20,16 @@ import jwt
 import requests
 
 from issuelab.agents.registry import load_registry
+from issuelab.cli.token_cache import get_token_cache, parse_expires_at
 from issuelab.retry import retry_sync
+from issuelab.tools.github_client import get_github_client
+from issuelab.utils.env import env_int
+
+DEFAULT_DISPATCH_MAX_WORKERS = 4
+
+# (app_id, private_key 摘要) -> (jwt, expires_at)
+_APP_JWT_CACHE: dict[tuple[str, str], tuple[str, datetime]] = {}
+_APP_JWT_LOCK = threading.Lock()
 
 
 def match_triggers(mentions: list[str], registry: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
@@ -42,6 +55,13 @@ def match_triggers(mentions: list[str], registry: dict[str, dict[str, Any]]) ->
     return matched
 
 
+def _resolve_dispatch_workers(max_workers: int | None, job_count: int) -> int:
+    """Resolve dispatch concurrency (explicit value > env > default), capped by job count."""
+    if max_workers is None:
+        max_workers = env_int("ISSUELAB_DISPATCH_MAX_WORKERS", DEFAULT_DISPATCH_MAX_WORKERS)
+    return max(1, min(max_workers, job_count))
+
+
 def _should_retry_dispatch_exception(exc: Exception) -> bool:
     return isinstance(exc, requests.exceptions.Timeout | requests.exceptions.ConnectionError)
 
@@ -79,15 +99,8 @@ def get_installation_id(owner: str, repo: str, app_jwt: str) -> int | None:
     Returns:
         Installation ID，如果未找到则返回 None
     """
-    url = f"https://api.github.com/repos/{owner}/{repo}/installation"
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {app_jwt}",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
-
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = get_github_client().request("GET", f"repos/{owner}/{repo}/installation", token=app_jwt)
         response.raise_for_status()
         data = response.json()
         return data.get("id")
@@ -102,6 +115,31 @@ def get_installation_id(owner: str, repo: str, app_jwt: str) -> int | None:
         return None
 
 
+def _request_installation_token(installation_id: int, app_jwt: str) -> tuple[str, datetime] | None:
+    """
+    请求 Installation Access Token 及其过期时间
+
+    Returns:
+        (token, expires_at)，失败返回 None
+    """
+    try:
+        response = get_github_client().request(
+            "POST", f"app/installations/{installation_id}/access_tokens", token=app_jwt
+        )
+        response.raise_for_status()
+        data = response.json()
+    except Exception as e:
+        print(f"[WARNING] Failed to generate installation token: {e}", file=sys.stderr)
+        return None
+
+    token = data.get("token")
+    if not token:
+        return None
+    # 缺少 expires_at 时按 GitHub 默认有效期（1 小时）保守估计
+    expires_at = parse_expires_at(data.get("expires_at")) or datetime.now(UTC) + timedelta(minutes=55)
+    return token, expires_at
+
+
 def generate_installation_token(installation_id: int, app_jwt: str) -> str | None:
     """
     为指定 Installation 生成 Access Token
@@ -113,27 +151,30 @@ def generate_installation_token(installation_id: int, app_jwt: str) -> str | Non
     Returns:
         Installation Access Token，失败返回 None
     """
-    url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {app_jwt}",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
+    result = _request_installation_token(installation_id, app_jwt)
+    return result[0] if result else None
 
-    try:
-        response = requests.post(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        return data.get("token")
-    except Exception as e:
-        print(f"[WARNING] Failed to generate installation token: {e}", file=sys.stderr)
-        return None
+
+def _get_cached_app_jwt(app_id: str, private_key: str) -> str:
+    """复用未临近过期的 App JWT（有效期 10 分钟，提前 2 分钟刷新）"""
+    key = (app_id, hashlib.sha256(private_key.encode("utf-8")).hexdigest())
+    now = datetime.now(UTC)
+    with _APP_JWT_LOCK:
+        cached = _APP_JWT_CACHE.get(key)
+        if cached and cached[1] - timedelta(minutes=2) > now:
+            return cached[0]
+        app_jwt = generate_github_app_jwt(app_id, private_key)
+        _APP_JWT_CACHE[key] = (app_jwt, now + timedelta(minutes=10))
+        return app_jwt
 
 
 def get_token_for_repository(repository: str, app_id: str, private_key: str) -> str | None:
     """
     为指定仓库获取 GitHub App Installation Token
 
+    repository -> installation_id 映射与 installation token 均经 token 缓存复用，
+    重复分发到同一仓库时不再请求 installation 与 access_tokens 接口。
+
     Args:
         repository: 仓库全名 (owner/repo)
         app_id: GitHub App ID
@@ -143,22 +184,50 @@ def get_token_for_repository(repository: str, app_id: str, private_key: str) ->
         Installation Access Token，失败返回 None
     """
     owner, repo = repository.split("/")
+    cache = get_token_cache()
 
-    # 1. 生成 App JWT
-    app_jwt = generate_github_app_jwt(app_id, private_key)
-
-    # 2. 获取 Installation ID
-    installation_id = get_installation_id(owner, repo, app_jwt)
+    # 1. 获取 Installation ID（App JWT 仅在缓存未命中时生成）
+    installation_id = cache.get_installation_id(
+        repository, lambda: get_installation_id(owner, repo, _get_cached_app_jwt(app_id, private_key))
+    )
     if not installation_id:
         return None
 
-    # 3. 生成 Installation Token
-    return generate_installation_token(installation_id, app_jwt)
+    # 2. 获取（或复用）Installation Token
+    return cache.get_token(
+        installation_id,
+        lambda: _request_installation_token(installation_id, _get_cached_app_jwt(app_id, private_key)),
+    )
+
+
+def refresh_token_for_repository(repository: str, app_id: str, private_key: str) -> str | None:
+    """丢弃仓库缓存的 installation id 与 token 后重新生成（token 被撤销或 App 重装后收到 401 时使用）"""
+    get_token_cache().invalidate(repository=repository)
+    return get_token_for_repository(repository, app_id, private_key)
+
+
+def _retry_with_refreshed_token(
+    repository: str, token: str, refresh_token: Callable[[], str | None] | None
+) -> str | None:
+    """401 时获取新 token；无法刷新或拿到同一个 token 时返回 None"""
+    if refresh_token is None:
+        return None
+    new_token = refresh_token()
+    if not new_token or new_token == token:
+        return None
+    print(f"[WARNING] 401 Unauthorized from {repository}, retrying once with a refreshed token", file=sys.stderr)
+    return new_token
 
 
 @retry_sync(max_retries=2, initial_delay=2.0, backoff_factor=2.0, should_retry=_should_retry_dispatch_exception)
 def dispatch_event(
-    repository: str, event_type: str, client_payload: dict[str, Any], token: str, timeout: int = 10
+    repository: str,
+    event_type: str,
+    client_payload: dict[str, Any],
+    token: str,
+    timeout: int = 10,
+    *,
+    refresh_token: Callable[[], str | None] | None = None,
 ) -> tuple[bool, str]:
     """
     发送 repository_dispatch 事件
@@ -169,22 +238,17 @@ def dispatch_event(
         client_payload: 事件数据
         token: GitHub Token
         timeout: 超时时间（秒）
+        refresh_token: 收到 401 时调用以获取新 token，并重试一次
 
     Returns:
         (是否成功, 错误代码)
     """
-    url = f"https://api.github.com/repos/{repository}/dispatches"
-
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {token}",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
-
     data = {"event_type": event_type, "client_payload": client_payload}
 
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=timeout)
+        response = get_github_client().request(
+            "POST", f"repos/{repository}/dispatches", token=token, json=data, timeout=timeout
+        )
         response.raise_for_status()
         print(f"[OK] Dispatched to {repository} (repository_dispatch)")
         return True, ""
@@ -193,8 +257,16 @@ def dispatch_event(
         status_code = response.status_code
         error_msg = response.text if response.text else str(e)
 
+        # 401：缓存的 installation token 已失效
+        if status_code == 401:
+            new_token = _retry_with_refreshed_token(repository, token, refresh_token)
+            if new_token:
+                return dispatch_event(repository, event_type, client_payload, new_token, timeout)
+            print(f"[ERROR] 401 Unauthorized: Cannot dispatch to {repository}", file=sys.stderr)
+            return False, "UNAUTHORIZED"
+
         # 403 错误特殊处理（fork 仓库限制）
-        if status_code == 403:
+        elif status_code == 403:
             print(f"[ERROR] 403 Forbidden: Cannot dispatch to {repository}", file=sys.stderr)
             if "fork" in repository.lower() or "personal access token" in error_msg.lower():
                 print("  [INFO] Suggestion: This may be a fork repository.", file=sys.stderr)
@@ -222,7 +294,14 @@ def dispatch_event(
 
 @retry_sync(max_retries=2, initial_delay=2.0, backoff_factor=2.0, should_retry=_should_retry_dispatch_exception)
 def dispatch_workflow(
-    repository: str, workflow_file: str, ref: str, inputs: dict[str, Any], token: str, timeout: int = 10
+    repository: str,
+    workflow_file: str,
+    ref: str,
+    inputs: dict[str, Any],
+    token: str,
+    timeout: int = 10,
+    *,
+    refresh_token: Callable[[], str | None] | None = None,
 ) -> tuple[bool, str]:
     """
     发送 workflow_dispatch 事件（推荐用于 fork 仓库）
@@ -234,18 +313,11 @@ def dispatch_workflow(
         inputs: workflow 输入参数
         token: GitHub Token
         timeout: 超时时间（秒）
+        refresh_token: 收到 401 时调用以获取新 token，并重试一次
 
     Returns:
         (是否成功, 错误代码)
     """
-    url = f"https://api.github.com/repos/{repository}/actions/workflows/{workflow_file}/dispatches"
-
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {token}",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
-
     # workflow_dispatch 需要 ref 和 inputs
     # 所有 inputs 必须是字符串类型
     data = {
@@ -263,7 +335,13 @@ def dispatch_workflow(
     }
 
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=timeout)
+        response = get_github_client().request(
+            "POST",
+            f"repos/{repository}/actions/workflows/{workflow_file}/dispatches",
+            token=token,
+            json=data,
+            timeout=timeout,
+        )
         response.raise_for_status()
         print(f"[OK] Dispatched workflow to {repository} (workflow_dispatch)")
         return True, ""
@@ -272,8 +350,16 @@ def dispatch_workflow(
         status_code = response.status_code
         error_msg = response.text if response.text else str(e)
 
+        # 401：缓存的 installation token 已失效
+        if status_code == 401:
+            new_token = _retry_with_refreshed_token(repository, token, refresh_token)
+            if new_token:
+                return dispatch_workflow(repository, workflow_file, ref, inputs, new_token, timeout)
+            print(f"[ERROR] 401 Unauthorized: Cannot trigger workflow in {repository}", file=sys.stderr)
+            return False, "UNAUTHORIZED"
+
         # 404 错误（workflow 文件不存在或未配置 workflow_dispatch）
-        if status_code == 404:
+        elif status_code == 404:
             print(f"[ERROR] 404 Not Found: {repository}/actions/workflows/{workflow_file}", file=sys.stderr)
             print("  Workflow file may not exist or workflow_dispatch not configured", file=sys.stderr)
             return False, "WORKFLOW_NOT_FOUND"
@@ -337,8 +423,14 @@ def dispatch_mentions(
     dry_run: bool = False,
     app_id: str | None = None,
     app_private_key: str | None = None,
+    max_workers: int | None = None,
 ) -> dict[str, Any]:
-    """Core dispatch logic reusable by CLI and internal callers."""
+    """Core dispatch logic reusable by CLI and internal callers.
+
+    Remote targets (token lookup + dispatch request) are fanned out on a bounded
+    thread pool; ``max_workers`` defaults to ISSUELAB_DISPATCH_MAX_WORKERS (4).
+    Use ``max_workers=1`` for strictly serial dispatch.
+    """
     if not mentions:
         return {"success_count": 0, "total_count": 0, "local_agents": [], "failed_agents": []}
 
@@ -394,6 +486,7 @@ def dispatch_mentions(
     success_count = 0
     failed_agents: list[dict[str, str]] = []
     local_agents: list[str] = []
+    remote_jobs: list[dict[str, Any]] = []
 
     for config in matched_configs:
         repository = config.get("repository")
@@ -428,22 +521,57 @@ def dispatch_mentions(
             success_count += 1
             continue
 
-        app_id_value, private_key = github_app_credentials
+        remote_jobs.append(
+            {
+                "username": username,
+                "repository": repository,
+                "branch": branch,
+                "dispatch_mode": dispatch_mode,
+                "workflow_file": workflow_file,
+                "payload": payload,
+            }
+        )
+
+    app_id_value, private_key = github_app_credentials
+
+    def _dispatch_job(job: dict[str, Any]) -> dict[str, str] | None:
+        """Dispatch one remote target; returns a failed_agents entry or None on success."""
+        repository = job["repository"]
         token = get_token_for_repository(repository, app_id_value, private_key)
         if not token:
             print(f"[WARNING] Failed to get token for {repository}", file=sys.stderr)
-            failed_agents.append({"username": username, "repository": repository, "error": "TOKEN_GENERATION_FAILED"})
-            continue
+            return {"username": job["username"], "repository": repository, "error": "TOKEN_GENERATION_FAILED"}
 
-        if dispatch_mode == "workflow_dispatch":
-            success, error_code = dispatch_workflow(repository, workflow_file, branch, payload, token)
+        def refresh_token() -> str | None:
+            return refresh_token_for_repository(repository, app_id_value, private_key)
+
+        if job["dispatch_mode"] == "workflow_dispatch":
+            success, error_code = dispatch_workflow(
+                repository, job["workflow_file"], job["branch"], job["payload"], token, refresh_token=refresh_token
+            )
         else:
-            success, error_code = dispatch_event(repository, event_type, payload, token)
+            success, error_code = dispatch_event(
+                repository, event_type, job["payload"], token, refresh_token=refresh_token
+            )
 
         if success:
+            return None
+        return {"username": job["username"], "repository": repository, "error": error_code}
+
+    workers = _resolve_dispatch_workers(max_workers, len(remote_jobs))
+    if workers <= 1:
+        outcomes = [_dispatch_job(job) for job in remote_jobs]
+    else:
+        print(f"Dispatching to {len(remote_jobs)} repositories with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dispatch") as executor:
+            # map 保持 matched 顺序，汇总结构与串行模式一致
+            outcomes = list(executor.map(_dispatch_job, remote_jobs))
+
+    for outcome in outcomes:
+        if outcome is None:
             success_count += 1
         else:
-            failed_agents.append({"username": username, "repository": repository, "error": error_code})
+            failed_agents.append(outcome)
 
     print(f"\n{'=' * 60}")
     print(f"[OK] Successfully dispatched to {success_count}/{len(matched_configs)} agents")
@@ -500,6 +628,12 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Dry run mode - validate configuration without actually dispatching",
     )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help=f"Concurrent dispatch workers (default: ISSUELAB_DISPATCH_MAX_WORKERS or {DEFAULT_DISPATCH_MAX_WORKERS})",
+    )
     parser.add_argument("--app-id", help="GitHub App ID (required)")
     parser.add_argument("--app-private-key", help="GitHub App Private Key (required)")
 
@@ -582,6 +716,7 @@ def main(argv: list[str] | None = None) -> int:
             dry_run=args.dry_run,
             app_id=app_id,
             app_private_key=app_private_key,
+            max_workers=args.max_workers,
         )
     except ValueError as e:
         print(f"Error: {e}", file=sys.stderr)
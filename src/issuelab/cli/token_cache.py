@@ -0,0 +1,195 @@
+"""
+GitHub App installation token 缓存
+
+- 内存缓存：installation_id -> (token, expires_at)，以及 repository -> installation_id
+- 可选磁盘存储（ISSUELAB_TOKEN_CACHE_FILE），供同一 job 内多次 CLI 调用共享
+- 按 expires_at 提前刷新；同一 key 的并发刷新只会发起一次请求
+"""
+
+import json
+import os
+import sys
+import threading
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+DEFAULT_REFRESH_MARGIN_SECONDS = 300
+
+
+def parse_expires_at(value: Any) -> datetime | None:
+    """解析 GitHub 返回的 ISO8601 时间（如 2024-01-01T00:00:00Z）"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+class InstallationTokenCache:
+    """Installation token / installation id 缓存（线程安全）"""
+
+    def __init__(
+        self,
+        store_path: str | Path | None = None,
+        refresh_margin_seconds: int = DEFAULT_REFRESH_MARGIN_SECONDS,
+        clock: Callable[[], datetime] | None = None,
+    ) -> None:
+        self.store_path = Path(store_path) if store_path else None
+        self.refresh_margin = timedelta(seconds=max(0, refresh_margin_seconds))
+        self._clock = clock or (lambda: datetime.now(UTC))
+        self._tokens: dict[int, tuple[str, datetime]] = {}
+        self._installations: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._store_loaded = False
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def _is_fresh(self, expires_at: datetime) -> bool:
+        return expires_at - self.refresh_margin > self._clock()
+
+    # ---- 磁盘存储 ----
+
+    def _load_store(self) -> None:
+        """首次访问时合并磁盘中的缓存（调用方持有 self._lock）"""
+        if self._store_loaded:
+            return
+        self._store_loaded = True
+        if not self.store_path or not self.store_path.exists():
+            return
+        try:
+            data = json.loads(self.store_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[WARNING] Ignoring unreadable token cache {self.store_path}: {e}", file=sys.stderr)
+            return
+        if not isinstance(data, dict):
+            return
+
+        for repository, installation_id in (data.get("installations") or {}).items():
+            if isinstance(installation_id, int):
+                self._installations.setdefault(str(repository), installation_id)
+        for raw_id, entry in (data.get("tokens") or {}).items():
+            if not isinstance(entry, dict):
+                continue
+            expires_at = parse_expires_at(entry.get("expires_at"))
+            token = entry.get("token")
+            if not expires_at or not isinstance(token, str) or not self._is_fresh(expires_at):
+                continue
+            try:
+                self._tokens.setdefault(int(raw_id), (token, expires_at))
+            except ValueError:
+                continue
+
+    def _save_store(self) -> None:
+        """写回磁盘（调用方持有 self._lock）；仅保存仍有效的 token"""
+        if not self.store_path:
+            return
+        data = {
+            "installations": dict(self._installations),
+            "tokens": {
+                str(installation_id): {"token": token, "expires_at": expires_at.isoformat()}
+                for installation_id, (token, expires_at) in self._tokens.items()
+                if self._is_fresh(expires_at)
+            },
+        }
+        try:
+            self.store_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.store_path.with_name(f"{self.store_path.name}.{os.getpid()}.tmp")
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.store_path)
+        except OSError as e:
+            print(f"[WARNING] Failed to persist token cache {self.store_path}: {e}", file=sys.stderr)
+
+    # ---- 查询接口 ----
+
+    def get_installation_id(self, repository: str, loader: Callable[[], int | None]) -> int | None:
+        """返回仓库的 installation id，未缓存时调用 loader（失败结果不缓存）"""
+        with self._lock:
+            self._load_store()
+            cached = self._installations.get(repository)
+        if cached is not None:
+            return cached
+
+        with self._key_lock(f"installation:{repository}"):
+            with self._lock:
+                cached = self._installations.get(repository)
+            if cached is not None:
+                return cached
+
+            installation_id = loader()
+            if installation_id:
+                with self._lock:
+                    self._installations[repository] = installation_id
+                    self._save_store()
+            return installation_id
+
+    def get_token(self, installation_id: int, loader: Callable[[], tuple[str, datetime] | None]) -> str | None:
+        """返回未临近过期的 installation token，必要时调用 loader 刷新"""
+        with self._lock:
+            self._load_store()
+            cached = self._tokens.get(installation_id)
+        if cached is not None and self._is_fresh(cached[1]):
+            return cached[0]
+
+        # 同一 installation 的并发刷新只发起一次请求，其余线程等待后复用结果
+        with self._key_lock(f"token:{installation_id}"):
+            with self._lock:
+                cached = self._tokens.get(installation_id)
+            if cached is not None and self._is_fresh(cached[1]):
+                return cached[0]
+
+            result = loader()
+            if not result:
+                return None
+            token, expires_at = result
+            with self._lock:
+                self._tokens[installation_id] = (token, expires_at)
+                self._save_store()
+            return token
+
+    def invalidate(self, repository: str | None = None, installation_id: int | None = None) -> None:
+        """移除缓存项（例如 token 被撤销或仓库卸载 App 后）
+
+        只传 repository 时同时移除该仓库当前 installation 的 token。
+        """
+        with self._lock:
+            self._load_store()
+            if repository is not None:
+                cached_id = self._installations.pop(repository, None)
+                if installation_id is None:
+                    installation_id = cached_id
+            if installation_id is not None:
+                self._tokens.pop(installation_id, None)
+            self._save_store()
+
+
+_DEFAULT_CACHE: InstallationTokenCache | None = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def get_token_cache() -> InstallationTokenCache:
+    """进程级默认缓存；设置 ISSUELAB_TOKEN_CACHE_FILE 时启用磁盘共享"""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = InstallationTokenCache(store_path=os.environ.get("ISSUELAB_TOKEN_CACHE_FILE") or None)
+        return _DEFAULT_CACHE
+
+
+def reset_token_cache() -> None:
+    """重置进程级默认缓存（测试用）"""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        _DEFAULT_CACHE = None
@@ -9,6 +9,27 @@ from typing import Any
 
 logger = logging.getLogger(__name__)
 
+# 配置按文件签名缓存；指南按 (agents 对象, 配置对象, 上游列表, 占位符) 缓存
+_CONFIG_CACHE: tuple[tuple, dict[str, Any]] | None = None
+_GUIDELINES_CACHE: dict[tuple, tuple[dict, dict, str]] = {}
+_GUIDELINES_CACHE_MAX = 64
+
+
+def _config_signature(path: Path | None) -> tuple:
+    if path is None:
+        return (None,)
+    try:
+        st = path.stat()
+    except OSError:
+        return (str(path), None)
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def clear_collaboration_cache() -> None:
+    global _CONFIG_CACHE
+    _CONFIG_CACHE = None
+    _GUIDELINES_CACHE.clear()
+
 
 def load_collaboration_config() -> dict[str, Any]:
     """加载协作配置
@@ -27,6 +48,16 @@ def load_collaboration_config() -> dict[str, Any]:
             config_file = path
             break
 
+    global _CONFIG_CACHE
+    signature = _config_signature(config_file)
+    if _CONFIG_CACHE is not None and _CONFIG_CACHE[0] == signature:
+        return _CONFIG_CACHE[1]
+    config = _read_collaboration_config(config_file)
+    _CONFIG_CACHE = (signature, config)
+    return config
+
+
+def _read_collaboration_config(config_file: Path | None) -> dict[str, Any]:
     # 默认配置（禁用）
     default_config = {
         "enabled": False,
@@ -86,6 +117,15 @@ def build_collaboration_guidelines(
         if not template:
             return ""
 
+        available_key = tuple(
+            (str(a.get("name") or ""), str(a.get("description") or "")) if isinstance(a, dict) else None
+            for a in available_agents or ()
+        )
+        cache_key = (id(agents), id(config), available_key, available_agents_placeholder)
+        cached = _GUIDELINES_CACHE.get(cache_key)
+        if cached is not None and cached[0] is agents and cached[1] is config:
+            return cached[2]
+
         # 构建可用 agents 列表（合并本地 discover_agents 与上游传入 available_agents）
         if available_agents_placeholder is not None:
             available_agents_text = available_agents_placeholder
@@ -120,6 +160,9 @@ def build_collaboration_guidelines(
         guidelines = template.format(available_agents=available_agents_text)
 
         logger.debug(f"构建协作指南成功，包含 {len(agents)} 个 agents")
+        if len(_GUIDELINES_CACHE) >= _GUIDELINES_CACHE_MAX:
+            _GUIDELINES_CACHE.clear()
+        _GUIDELINES_CACHE[cache_key] = (agents, config, guidelines)
         return guidelines
 
     except Exception as e:
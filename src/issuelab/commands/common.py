@@ -3,8 +3,9 @@
 import asyncio
 import os
 
-from issuelab.agents.executor import run_agents_parallel
+from issuelab.agents.executor import run_agents_parallel, run_review_pipeline
 from issuelab.tools.github import post_comment
+from issuelab.utils.env import env_flag
 
 
 def is_result_publishable(result: dict) -> tuple[bool, str]:
@@ -35,7 +36,7 @@ def build_failure_comment(agent_name: str, result: dict) -> str:
 
 def should_post_failure_comment() -> bool:
     """Whether to post system failure details to issue."""
-    return os.environ.get("ISSUELAB_POST_FAILURE_COMMENT", "0").lower() in {"1", "true", "yes", "on"}
+    return env_flag("ISSUELAB_POST_FAILURE_COMMENT")
 
 
 def print_agent_result(agent_name: str, result: dict) -> str:
@@ -104,8 +105,20 @@ def run_agents_command(
         )
     )
 
+    _report_results(issue_number, results, post=post, repo=repo)
+    return results
+
+
+def run_review_command(issue_number: int, context: str, comment_count: int, *, post: bool = False) -> dict:
+    """Run the review pipeline (moderator → reviewers → summarizer) in one process."""
+    trigger_comment = os.environ.get("ISSUELAB_TRIGGER_COMMENT", "")
+    results = asyncio.run(run_review_pipeline(issue_number, context, comment_count, trigger_comment=trigger_comment))
+    _report_results(issue_number, results, post=post)
+    return results
+
+
+def _report_results(issue_number: int, results: dict, *, post: bool, repo: str | None = None) -> None:
     for agent_name, result in results.items():
         response = print_agent_result(agent_name, result)
         if post:
             maybe_post_agent_result(issue_number, agent_name, response, result, repo=repo)
-    return results
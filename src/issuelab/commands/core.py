@@ -4,7 +4,9 @@ from argparse import Namespace
 from collections.abc import Callable
 
 from issuelab.agents.discovery import discover_agents, get_agent_matrix_markdown
-from issuelab.commands.common import run_agents_command
+from issuelab.commands.common import run_agents_command, run_review_command
+
+REVIEW_AGENTS = ("moderator", "reviewer_a", "reviewer_b", "summarizer")
 
 
 def handle_execute(
@@ -21,8 +23,7 @@ def handle_execute(
 
 
 def handle_review(args: Namespace, context: str, comment_count: int) -> None:
-    agents = ["moderator", "reviewer_a", "reviewer_b", "summarizer"]
-    results = run_agents_command(args.issue, agents, context, comment_count, post=getattr(args, "post", False))
+    results = run_review_command(args.issue, context, comment_count, post=getattr(args, "post", False))
 
     for agent_name, result in results.items():
         response = str(result.get("response", str(result)))
@@ -4,7 +4,7 @@ from argparse import Namespace
 
 from issuelab.agents.observer import run_observer
 from issuelab.tools import github as github_tools
-from issuelab.tools.github import get_issue_info, post_comment
+from issuelab.tools.github import get_issue_info, get_issues_batch, post_comment
 
 
 def handle_observe(args: Namespace, issue_info: dict, issue_file: str, comments: str) -> None:
@@ -48,10 +48,20 @@ def handle_observe_batch(args: Namespace) -> None:
 
     print(f"\n=== 并行分析 {len(issue_numbers)} 个 Issues ===")
 
+    # 一次 GraphQL 查询批量获取；失败时逐个调用 get_issue_info
+    try:
+        prefetched = get_issues_batch(issue_numbers, format_comments=True)
+    except Exception as e:
+        print(f"[WARNING] 批量获取 Issues 失败，回退到逐个获取: {e}")
+        prefetched = {}
+
     issue_data_list = []
     for issue_num in issue_numbers:
         try:
-            data = get_issue_info(issue_num, format_comments=True)
+            data = prefetched.get(issue_num)
+            # 批量查询只取回最早的 100 条评论；评论不完整时逐个获取，避免看不到最新评论
+            if not data or not data.get("comments_complete", False):
+                data = get_issue_info(issue_num, format_comments=True)
             issue_file = github_tools.write_issue_context_file(
                 issue_number=issue_num,
                 title=data.get("title", ""),
@@ -0,0 +1,28 @@
+"""Registry command handlers."""
+
+from argparse import Namespace
+from pathlib import Path
+
+
+def handle_registry_build(args: Namespace) -> int | None:
+    from issuelab.agents.snapshot import build_registry_snapshot, get_snapshot_path
+
+    root = Path(args.root)
+    if not (root / "agents").is_dir():
+        print(f"[ERROR] 未找到 agents 目录: {root / 'agents'}")
+        return 1
+
+    output = Path(args.output) if args.output else None
+    snapshot = build_registry_snapshot(root, output_path=output)
+    agents = snapshot.get("agents", {})
+    prompts = sum(1 for entry in agents.values() if entry.get("prompt") is not None)
+    print(f"[OK] Registry 快照已生成: agents={len(agents)}, prompts={prompts}, files={len(snapshot.get('files', []))}")
+    if output is not None and output.resolve() != get_snapshot_path(root.resolve()).resolve():
+        # 环境变量中的相对路径相对 root 解析：root 内给出相对路径，否则给出绝对路径
+        resolved = output.resolve()
+        try:
+            hint = resolved.relative_to(root.resolve())
+        except ValueError:
+            hint = resolved
+        print(f"[INFO] 加载时需设置 ISSUELAB_REGISTRY_SNAPSHOT_PATH={hint} 才会读取该快照")
+    return None
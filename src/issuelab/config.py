@@ -59,6 +59,17 @@ class Config:
         """
         return os.environ.get("PAT_TOKEN") or os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN", "")
 
+    @staticmethod
+    def get_github_backend() -> str:
+        """获取 GitHub 操作后端（ISSUELAB_GITHUB_BACKEND）
+
+        - gh（默认）: 始终使用 gh CLI 子进程
+        - rest: 始终使用进程内 REST 客户端（连接池复用）
+        - auto: 有 token 且能确定仓库时走 REST 客户端，否则回退 gh CLI
+        """
+        backend = os.environ.get("ISSUELAB_GITHUB_BACKEND", "gh").strip().lower()
+        return backend if backend in {"auto", "rest", "gh"} else "gh"
+
     @staticmethod
     def prepare_github_env() -> dict:
         """准备带有 GitHub Token 的环境变量字典
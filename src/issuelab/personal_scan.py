@@ -14,7 +14,7 @@ from typing import Any
 import yaml
 
 from issuelab.agents.executor import run_single_agent_text
-from issuelab.tools.github import get_issue_info
+from issuelab.tools.github import get_issue_info, get_issues_batch
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +40,44 @@ def get_issue_content(issue_number: int, repo: str) -> dict[str, Any] | None:
         return None
 
 
+def get_issues_content(issue_numbers: list[int], repo: str) -> dict[int, dict[str, Any]]:
+    """
+    批量获取issue内容（一次GraphQL查询最多50个），失败时回退到逐个获取
+
+    Args:
+        issue_numbers: Issue编号列表
+        repo: 仓库名称 (owner/repo)
+
+    Returns:
+        issue编号 -> Issue数据（获取失败的issue不包含在内）
+    """
+    try:
+        return get_issues_batch(issue_numbers, format_comments=False, repo=repo)
+    except Exception as e:
+        logger.warning(f"[WARNING] 批量获取Issues失败，回退到逐个获取: {e}")
+
+    issues = {}
+    for issue_number in issue_numbers:
+        issue_data = get_issue_content(issue_number, repo)
+        if issue_data:
+            issues[issue_number] = issue_data
+    return issues
+
+
+def has_user_commented(issue_data: dict[str, Any], username: str) -> bool | None:
+    """
+    根据已获取的评论判断用户是否评论过
+
+    Returns:
+        True/False；评论列表不完整（超过单页）或不可用时返回None
+    """
+    comments = issue_data.get("comments")
+    if not isinstance(comments, list) or not issue_data.get("comments_complete", False):
+        return None
+    target = username.lower()
+    return any(((comment.get("author") or {}).get("login") or "").lower() == target for comment in comments)
+
+
 def check_already_commented(issue_number: int, repo: str, username: str) -> bool:
     """
     检查用户是否已经评论过这个issue
@@ -262,17 +300,22 @@ def scan_issues_for_personal_agent(
     """
     logger.info(f"🔍 开始扫描 {len(issue_numbers)} 个issues...")
 
-    # 收集所有候选Issues
+    # 收集所有候选Issues（批量获取，评论随同返回，用于判断是否已评论）
+    issues = get_issues_content(issue_numbers, repo)
     candidates_data = []
     for issue_num in issue_numbers:
-        issue_data = get_issue_content(issue_num, repo)
+        issue_data = issues.get(issue_num)
         if not issue_data:
             continue
 
-        # 检查是否已评论
-        if username and check_already_commented(issue_num, repo, username):
-            logger.info(f"[SKIP] Issue #{issue_num} 已评论过，跳过")
-            continue
+        # 检查是否已评论（评论不完整时单独查询）
+        if username:
+            commented = has_user_commented(issue_data, username)
+            if commented is None:
+                commented = check_already_commented(issue_num, repo, username)
+            if commented:
+                logger.info(f"[SKIP] Issue #{issue_num} 已评论过，跳过")
+                continue
 
         candidates_data.append(
             {
@@ -2,10 +2,17 @@
 
 import asyncio
 import logging
+import random
+import re
+import threading
+import time
 from collections.abc import Callable
+from dataclasses import dataclass, field
 from functools import wraps
 from typing import Any, TypeVar
 
+from issuelab.utils.env import env_float
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
@@ -17,6 +24,14 @@ class RetryError(Exception):
     pass
 
 
+def _next_sleep(exc: Exception, delay: float) -> float:
+    """异常携带 retry_after（如 HTTP Retry-After）时，至少等待该时长"""
+    retry_after = getattr(exc, "retry_after", None)
+    if isinstance(retry_after, int | float) and retry_after > delay:
+        return float(retry_after)
+    return delay
+
+
 async def retry_async(
     func: Callable[..., Any],
     *args: Any,
@@ -54,10 +69,12 @@ async def retry_async(
                 raise
 
             if attempt < max_retries:
+                sleep_for = _next_sleep(e, delay)
                 logger.warning(
-                    f"尝试 {attempt + 1}/{max_retries + 1} 失败: {type(e).__name__}: {e}. 将在 {delay:.1f}秒 后重试..."
+                    f"尝试 {attempt + 1}/{max_retries + 1} 失败: {type(e).__name__}: {e}. "
+                    f"将在 {sleep_for:.1f}秒 后重试..."
                 )
-                await asyncio.sleep(delay)
+                await asyncio.sleep(sleep_for)
                 delay *= backoff_factor
             else:
                 logger.error(f"所有 {max_retries + 1} 次尝试均失败: {type(e).__name__}: {e}")
@@ -100,11 +117,12 @@ def retry_sync(
                         raise
 
                     if attempt < max_retries:
+                        sleep_for = _next_sleep(e, delay)
                         logger.warning(
                             f"尝试 {attempt + 1}/{max_retries + 1} 失败: {type(e).__name__}: {e}. "
-                            f"将在 {delay:.1f}秒 后重试..."
+                            f"将在 {sleep_for:.1f}秒 后重试..."
                         )
-                        time.sleep(delay)
+                        time.sleep(sleep_for)
                         delay *= backoff_factor
                     else:
                         logger.error(f"所有 {max_retries + 1} 次尝试均失败: {type(e).__name__}: {e}")
@@ -114,3 +132,224 @@ def retry_sync(
         return wrapper
 
     return decorator
+
+
+# ---- 自适应重试策略 ----
+
+ERROR_RATE_LIMIT = "rate_limit"
+ERROR_OVERLOADED = "overloaded"
+ERROR_AUTH = "auth"
+ERROR_TRANSIENT = "transient"
+ERROR_FATAL = "fatal"
+
+_STATUS_RE = re.compile(r"\b(429|401|403|500|502|503|504|529)\b")
+_RETRY_AFTER_RE = re.compile(r"retry[- _]after[^0-9]{0,10}(\d+(?:\.\d+)?)", re.IGNORECASE)
+_TEXT_RULES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    (ERROR_RATE_LIMIT, ("rate_limit", "rate limit", "too many requests")),
+    (ERROR_OVERLOADED, ("overloaded", "server_error", "service unavailable")),
+    (ERROR_AUTH, ("authentication", "unauthorized", "invalid api key", "invalid x-api-key", "billing")),
+)
+_FATAL_TYPE_NAMES = {"CLINotFoundError", "MessageParseError", "CLIJSONDecodeError"}
+
+
+def _status_to_class(status: int) -> str | None:
+    if status == 429:
+        return ERROR_RATE_LIMIT
+    if status in (503, 529):
+        return ERROR_OVERLOADED
+    if status in (401, 403):
+        return ERROR_AUTH
+    if 500 <= status < 600:
+        return ERROR_TRANSIENT
+    if 400 <= status < 500:
+        return ERROR_FATAL
+    return None
+
+
+def classify_error(exc: BaseException) -> str:
+    """把异常归类为 rate_limit / overloaded / auth / transient / fatal
+
+    优先使用结构化字段（SDK ResultError.api_error_status、HTTP status_code），
+    其次按异常类型与错误文本匹配；无法识别的异常按 transient 处理（保持原有重试行为）。
+    """
+    if type(exc).__name__ in _FATAL_TYPE_NAMES:
+        return ERROR_FATAL
+
+    for attr in ("api_error_status", "status_code", "status"):
+        status = getattr(exc, attr, None)
+        if isinstance(status, int) and not isinstance(status, bool):
+            error_class = _status_to_class(status)
+            if error_class:
+                return error_class
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if isinstance(status, int):
+        error_class = _status_to_class(status)
+        if error_class:
+            return error_class
+
+    text = " ".join(str(part) for part in (exc, getattr(exc, "stderr", None) or "") if part).lower()
+    for error_class, needles in _TEXT_RULES:
+        if any(needle in text for needle in needles):
+            return error_class
+    match = _STATUS_RE.search(text)
+    if match:
+        return _status_to_class(int(match.group(1))) or ERROR_TRANSIENT
+    return ERROR_TRANSIENT
+
+
+def get_retry_after(exc: BaseException) -> float | None:
+    """提取 retry-after 提示（异常属性、HTTP 响应头或错误文本）"""
+    value = getattr(exc, "retry_after", None)
+    if isinstance(value, int | float) and value >= 0:
+        return float(value)
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            return max(0.0, float(headers.get("Retry-After")))
+        except (TypeError, ValueError):
+            pass
+    match = _RETRY_AFTER_RE.search(f"{exc} {getattr(exc, 'stderr', None) or ''}")
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """进程级重试令牌桶：限制重试速率，并在限流时让所有调用方一起暂停"""
+
+    def __init__(self, rate: float = 1.0, capacity: float = 2.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(capacity, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, consume: bool = True) -> float:
+        """尝试获取令牌，返回需要等待的秒数（0 表示已获取）"""
+        with self._lock:
+            now = self._clock()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if not consume:
+                return 0.0
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """上游限流：在 seconds 内暂停所有调用方，并清空令牌"""
+        with self._lock:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = max(now, self._paused_until)
+
+    async def wait(self, consume: bool = True) -> float:
+        """等待直到可以继续（consume=False 只等待暂停结束），返回等待秒数"""
+        waited = 0.0
+        while True:
+            delay = self.reserve(consume)
+            if delay <= 0:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+_SHARED_BUCKET: TokenBucket | None = None
+_SHARED_BUCKET_LOCK = threading.Lock()
+
+
+def get_shared_retry_bucket() -> TokenBucket:
+    """进程级共享重试令牌桶（ISSUELAB_RETRY_RATE 每秒重试数，ISSUELAB_RETRY_BURST 突发数）"""
+    global _SHARED_BUCKET
+    with _SHARED_BUCKET_LOCK:
+        if _SHARED_BUCKET is None:
+            _SHARED_BUCKET = TokenBucket(
+                rate=env_float("ISSUELAB_RETRY_RATE", 1.0), capacity=env_float("ISSUELAB_RETRY_BURST", 2.0)
+            )
+        return _SHARED_BUCKET
+
+
+def reset_shared_retry_bucket() -> None:
+    """重置共享令牌桶（测试用）"""
+    global _SHARED_BUCKET
+    with _SHARED_BUCKET_LOCK:
+        _SHARED_BUCKET = None
+
+
+@dataclass
+class RetryPolicy:
+    """按错误类别决定是否重试的策略（decorrelated jitter + retry-after + 共享令牌桶）
+
+    Attributes:
+        max_retries: 默认最大重试次数
+        base_delay: transient 错误的基础延迟（秒）
+        throttle_base_delay: rate_limit / overloaded 的基础延迟（秒）
+        max_delay: 单次等待上限（retry-after 提示不受此限制）
+        max_retries_by_class: 按类别覆盖最大重试次数
+        retry_classes: 允许重试的类别（auth / fatal 默认立即失败）
+        should_retry: 额外的否决条件（返回 False 时立即抛出原异常）
+        bucket: 共享令牌桶；None 表示不做跨调用协调
+    """
+
+    max_retries: int = 3
+    base_delay: float = 1.0
+    throttle_base_delay: float = 5.0
+    max_delay: float = 60.0
+    max_retries_by_class: dict[str, int] = field(default_factory=lambda: {ERROR_RATE_LIMIT: 5, ERROR_OVERLOADED: 4})
+    retry_classes: frozenset[str] = frozenset({ERROR_RATE_LIMIT, ERROR_OVERLOADED, ERROR_TRANSIENT})
+    should_retry: Callable[[Exception], bool] | None = None
+    bucket: TokenBucket | None = None
+    classify: Callable[[BaseException], str] = classify_error
+    rng: random.Random = field(default_factory=random.Random)
+
+    def compute_delay(self, error_class: str, previous_delay: float, retry_after: float | None) -> float:
+        """decorrelated jitter: sleep = min(cap, uniform(base, prev * 3))，并至少等待 retry-after"""
+        base = self.throttle_base_delay if error_class in (ERROR_RATE_LIMIT, ERROR_OVERLOADED) else self.base_delay
+        upper = max(base, previous_delay * 3)
+        delay = min(self.max_delay, self.rng.uniform(base, upper))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def run_async(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """按策略执行异步函数；重试耗尽时抛出 RetryError（from 最后一次异常）"""
+        attempt = 0
+        delay = 0.0
+        while True:
+            if self.bucket is not None:
+                # 首次尝试只等待全局暂停结束；重试需要消耗令牌
+                await self.bucket.wait(consume=attempt > 0)
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if self.should_retry is not None and not self.should_retry(e):
+                    logger.warning("遇到不可重试异常，立即失败: %s: %s", type(e).__name__, e)
+                    raise
+                error_class = self.classify(e)
+                if error_class not in self.retry_classes:
+                    logger.warning("错误类别为 %s，不重试: %s: %s", error_class, type(e).__name__, e)
+                    raise
+
+                limit = self.max_retries_by_class.get(error_class, self.max_retries)
+                if attempt >= limit:
+                    logger.error(f"所有 {attempt + 1} 次尝试均失败 ({error_class}): {type(e).__name__}: {e}")
+                    raise RetryError(f"重试 {attempt + 1} 次后仍然失败 ({error_class})") from e
+
+                delay = self.compute_delay(error_class, delay, get_retry_after(e))
+                if self.bucket is not None and error_class in (ERROR_RATE_LIMIT, ERROR_OVERLOADED):
+                    self.bucket.pause(delay)
+                logger.warning(
+                    f"尝试 {attempt + 1}/{limit + 1} 失败 ({error_class}): {type(e).__name__}: {e}. "
+                    f"将在 {delay:.1f}秒 后重试..."
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
@@ -1,11 +1,18 @@
-"""GitHub 操作工具 - 统一的 GitHub API 接口"""
+"""GitHub 操作工具 - 统一的 GitHub API 接口
+
+后端由 ISSUELAB_GITHUB_BACKEND 选择：gh CLI 子进程（默认）或进程内 REST 客户端（连接池复用）。
+重试只在一层进行：REST 路径由 GitHubClient 处理限流/5xx/网络异常重试，gh 路径由本模块的 retry_sync 重试。
+两种后端读取 Issue 时都经本地快照（ISSUELAB_ISSUE_STORE）增量同步评论；gh 后端通过 `gh api` 请求同一组 REST 端点。
+"""
 
 import json
 import os
 import re
+import sqlite3
 import subprocess
 import tempfile
-from typing import Literal
+from typing import Any, Literal
+from urllib.parse import quote, urlencode
 
 from issuelab.config import Config
 from issuelab.logging_config import get_logger
@@ -22,6 +29,137 @@ _CONTROLLED_FOOTER_RE = re.compile(
 )
 
 
+def _resolve_repo(repo: str | None) -> str | None:
+    return repo or os.environ.get("GITHUB_REPOSITORY") or None
+
+
+def _use_rest_backend(repo: str | None) -> bool:
+    """根据 ISSUELAB_GITHUB_BACKEND 选择后端（见 Config.get_github_backend）"""
+    backend = Config.get_github_backend()
+    if backend == "gh":
+        return False
+    if backend == "rest":
+        if not repo:
+            raise RuntimeError("REST backend requires repo or GITHUB_REPOSITORY")
+        return True
+    return bool(repo and Config.get_github_token())
+
+
+def _normalize_rest_issue(issue: dict[str, Any], comments: list[dict[str, Any]]) -> dict[str, Any]:
+    """把 REST 响应转换为与 `gh issue view --json` 相同的字段结构"""
+    return {
+        "number": issue.get("number"),
+        "title": issue.get("title") or "",
+        "body": issue.get("body") or "",
+        "labels": [
+            {
+                "id": label.get("node_id", ""),
+                "name": label.get("name", ""),
+                "description": label.get("description") or "",
+                "color": label.get("color", ""),
+            }
+            for label in issue.get("labels", [])
+            if isinstance(label, dict)
+        ],
+        "comments": [
+            {
+                "id": comment.get("node_id", ""),
+                "author": {"login": (comment.get("user") or {}).get("login", "unknown")},
+                "authorAssociation": comment.get("author_association", ""),
+                "body": comment.get("body") or "",
+                "createdAt": comment.get("created_at", ""),
+                "url": comment.get("html_url", ""),
+            }
+            for comment in comments
+        ],
+    }
+
+
+class _GhApi:
+    """`gh api` 子进程的只读接口（get/paginate 与 GitHubClient 对应方法同义），供 gh 后端同步本地快照"""
+
+    def __init__(self) -> None:
+        self.env = Config.prepare_github_env()
+
+    def _run(self, *args: str) -> str:
+        result = subprocess.run(["gh", "api", *args], capture_output=True, text=True, env=self.env)
+        if result.returncode != 0:
+            raise RuntimeError(f"gh api failed: {result.stderr.strip()}")
+        return result.stdout
+
+    def get(self, path: str) -> Any:
+        return json.loads(self._run(path))
+
+    def paginate(self, path: str, *, params: dict[str, Any] | None = None) -> list[Any]:
+        query = urlencode({"per_page": 100, **(params or {})})
+        output = self._run("--paginate", f"{path}?{query}").strip()
+        # --paginate 逐页输出 JSON 数组，页与页之间直接拼接
+        decoder = json.JSONDecoder()
+        items: list[Any] = []
+        pos = 0
+        while pos < len(output):
+            page, pos = decoder.raw_decode(output, pos)
+            if isinstance(page, list):
+                items.extend(page)
+            while pos < len(output) and output[pos].isspace():
+                pos += 1
+        return items
+
+
+def _issue_with_comments(api: Any, repo: str, issue: dict[str, Any]) -> dict[str, Any]:
+    """补全评论：本地快照可用时增量同步，否则全量获取"""
+    from issuelab.tools.issue_store import get_issue_store
+
+    store = get_issue_store()
+    if store is not None:
+        try:
+            return _normalize_rest_issue(issue, _sync_comments_with_store(api, store, repo, issue))
+        except sqlite3.Error as e:
+            logger.warning(f"Issue 本地快照不可用，回退到全量获取: {e}")
+
+    comments_path = f"repos/{repo}/issues/{issue['number']}/comments"
+    comments = api.paginate(comments_path) if issue.get("comments") else []
+    return _normalize_rest_issue(issue, comments)
+
+
+def _rest_get_issue(issue_number: int, repo: str) -> dict[str, Any]:
+    from issuelab.tools.github_client import get_github_client
+
+    client = get_github_client()
+    response = client.request("GET", f"repos/{repo}/issues/{issue_number}")
+    if response.status_code != 200:
+        logger.error(f"获取 Issue #{issue_number} 失败: HTTP {response.status_code} {response.text[:200]}")
+        raise RuntimeError(f"Failed to get issue info: HTTP {response.status_code}")
+    return _issue_with_comments(client, repo, response.json())
+
+
+def _sync_comments_with_store(client: Any, store: Any, repo: str, issue: dict[str, Any]) -> list[dict[str, Any]]:
+    """按 updated_at 增量同步评论到本地快照，返回完整评论列表"""
+    issue_number = int(issue["number"])
+    comments_path = f"repos/{repo}/issues/{issue_number}/comments"
+    expected = int(issue.get("comments") or 0)
+
+    cached = store.get_issue(repo, issue_number)
+    if cached and cached["updated_at"] == issue.get("updated_at") and len(cached["comment_list"]) == expected:
+        logger.debug(f"Issue #{issue_number} 未变化，评论取自本地快照")
+        return cached["comment_list"]
+
+    if cached and cached["updated_at"]:
+        # 只拉取上次同步后新增或编辑过的评论
+        new_comments = client.paginate(comments_path, params={"since": cached["updated_at"]})
+        store.save_issue(repo, issue, new_comments)
+        if store.count_comments(repo, issue_number) != expected:
+            # 有评论被删除（since 无法感知），整体重新同步
+            store.save_issue(repo, issue, client.paginate(comments_path), replace_comments=True)
+        else:
+            logger.debug(f"Issue #{issue_number} 增量同步 {len(new_comments)} 条评论")
+    else:
+        store.save_issue(repo, issue, client.paginate(comments_path) if expected else [], replace_comments=True)
+
+    refreshed = store.get_issue(repo, issue_number)
+    return refreshed["comment_list"] if refreshed else []
+
+
 def _load_mentions_max_count() -> int:
     """Load mentions cap from centralized response format rules."""
     from issuelab.response_processor import get_mentions_max_count
@@ -30,18 +168,14 @@ def _load_mentions_max_count() -> int:
 
 
 @retry_sync(max_retries=3, initial_delay=1.0, backoff_factor=2.0)
-def get_issue_info(issue_number: int, format_comments: bool = False, repo: str | None = None) -> dict:
-    """获取 Issue 信息（带重试机制）
+def _gh_get_issue(issue_number: int, repo: str | None) -> dict[str, Any]:
+    from issuelab.tools.issue_store import issue_store_enabled
 
-    Args:
-        issue_number: Issue 编号
-        format_comments: 是否格式化评论为字符串（用于 LLM 输入）
+    store_repo = _resolve_repo(repo)
+    if store_repo and issue_store_enabled():
+        api = _GhApi()
+        return _issue_with_comments(api, store_repo, api.get(f"repos/{store_repo}/issues/{issue_number}"))
 
-    Returns:
-        包含 title, body, comments, comment_count 等字段的字典
-        如果 format_comments=True，comments 为格式化字符串，否则为原始列表
-    """
-    logger.debug(f"获取 Issue #{issue_number} 信息")
     env = Config.prepare_github_env()
 
     cmd = ["gh", "issue", "view", str(issue_number), "--json", "number,title,body,labels,comments"]
@@ -58,7 +192,26 @@ def get_issue_info(issue_number: int, format_comments: bool = False, repo: str |
         logger.error(f"获取 Issue #{issue_number} 失败: {result.stderr}")
         raise RuntimeError(f"Failed to get issue info: {result.stderr}")
 
-    data = json.loads(result.stdout)
+    return json.loads(result.stdout)
+
+
+def get_issue_info(issue_number: int, format_comments: bool = False, repo: str | None = None) -> dict:
+    """获取 Issue 信息（带重试机制）
+
+    Args:
+        issue_number: Issue 编号
+        format_comments: 是否格式化评论为字符串（用于 LLM 输入）
+
+    Returns:
+        包含 title, body, comments, comment_count 等字段的字典
+        如果 format_comments=True，comments 为格式化字符串，否则为原始列表
+    """
+    logger.debug(f"获取 Issue #{issue_number} 信息")
+    rest_repo = _resolve_repo(repo)
+    if _use_rest_backend(rest_repo):
+        data = _rest_get_issue(issue_number, rest_repo)
+    else:
+        data = _gh_get_issue(issue_number, repo)
 
     # 先计算评论数（使用原始列表）
     comment_count = len(data.get("comments", []))
@@ -66,18 +219,190 @@ def get_issue_info(issue_number: int, format_comments: bool = False, repo: str |
 
     # 格式化评论（如果需要）
     if format_comments:
-        comments_list = []
-        for comment in data.get("comments", []):
-            author = comment.get("author", {}).get("login", "unknown")
-            created_at = comment.get("createdAt", "")[:10]  # 只取日期部分
-            body = comment.get("body", "")
-            comments_list.append(f"- **[{author}]** ({created_at}):\n{body}")
-
-        data["comments"] = "\n\n".join(comments_list)
+        data["comments"] = _format_comments_for_llm(issue_number, data)
 
     return data
 
 
+def _format_comments_for_llm(issue_number: int, data: dict[str, Any]) -> str:
+    """格式化评论；ISSUELAB_CONTEXT_COMPACTION=1 时按 token 预算压缩（统计写入 context_compaction）"""
+    from issuelab.tools.issue_context import compact_issue_comments, context_compaction_enabled
+
+    comments = data.get("comments", [])
+    if not context_compaction_enabled():
+        return _format_comments(comments)
+    compacted = compact_issue_comments(issue_number, comments)
+    data["context_compaction"] = compacted.stats()
+    return compacted.text
+
+
+def _format_comments(comments: list[dict[str, Any]]) -> str:
+    comments_list = []
+    for comment in comments:
+        author = (comment.get("author") or {}).get("login", "unknown")
+        created_at = comment.get("createdAt", "")[:10]  # 只取日期部分
+        body = comment.get("body", "")
+        comments_list.append(f"- **[{author}]** ({created_at}):\n{body}")
+    return "\n\n".join(comments_list)
+
+
+# 单次 GraphQL 查询最多包含的 issue 数（别名数量过多会触发 GitHub 节点/复杂度限制）
+ISSUE_BATCH_SIZE = 50
+
+_ISSUE_BATCH_FIELDS = """
+      number
+      title
+      body
+      updatedAt
+      labels(first: 50) { nodes { id name description color } }
+      comments(first: 100) {
+        totalCount
+        nodes { id databaseId author { login } authorAssociation body createdAt url }
+      }
+"""
+
+
+def _build_issue_batch_query(issue_numbers: list[int]) -> str:
+    aliases = "\n".join(
+        f"    i{number}: issue(number: {number}) {{{_ISSUE_BATCH_FIELDS}    }}" for number in issue_numbers
+    )
+    return (
+        f"query($owner: String!, $name: String!) {{\n  repository(owner: $owner, name: $name) {{\n{aliases}\n  }}\n}}"
+    )
+
+
+def _run_graphql(query: str, variables: dict[str, str], repo: str | None) -> dict[str, Any]:
+    if _use_rest_backend(repo):
+        from issuelab.tools.github_client import get_github_client
+
+        return get_github_client().graphql(query, variables)
+
+    cmd = ["gh", "api", "graphql", "-f", f"query={query}"]
+    for key, value in variables.items():
+        cmd.extend(["-f", f"{key}={value}"])
+    result = subprocess.run(cmd, capture_output=True, text=True, env=Config.prepare_github_env())
+    # 部分 issue 不存在时 gh 返回非 0，但 stdout 仍包含其余 issue 的 data
+    try:
+        payload = json.loads(result.stdout) if result.stdout.strip() else {}
+    except json.JSONDecodeError:
+        payload = {}
+    if not payload.get("data"):
+        raise RuntimeError(f"GraphQL query failed: {result.stderr.strip() or payload.get('errors')}")
+    return payload
+
+
+def _normalize_graphql_issue(node: dict[str, Any]) -> dict[str, Any]:
+    comments = node.get("comments") or {}
+    comment_nodes = comments.get("nodes") or []
+    return {
+        "number": node.get("number"),
+        "title": node.get("title") or "",
+        "body": node.get("body") or "",
+        "labels": (node.get("labels") or {}).get("nodes") or [],
+        "comments": comment_nodes,
+        "comment_count": comments.get("totalCount", len(comment_nodes)),
+        # 评论超过单页上限时为 False，调用方需要完整评论时应单独查询
+        "comments_complete": comments.get("totalCount", 0) <= len(comment_nodes),
+    }
+
+
+def _graphql_issue_to_rest(node: dict[str, Any]) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """GraphQL 节点转为本地快照使用的 REST 字段（issue, comments）"""
+    comments = node.get("comments") or {}
+    issue = {
+        "number": node.get("number"),
+        "title": node.get("title") or "",
+        "body": node.get("body") or "",
+        "labels": [
+            {
+                "node_id": label.get("id", ""),
+                "name": label.get("name", ""),
+                "description": label.get("description") or "",
+                "color": label.get("color", ""),
+            }
+            for label in (node.get("labels") or {}).get("nodes") or []
+        ],
+        "updated_at": node.get("updatedAt") or "",
+        "comments": comments.get("totalCount", 0),
+    }
+    rest_comments = [
+        {
+            "id": comment.get("databaseId"),
+            "node_id": comment.get("id", ""),
+            "user": {"login": (comment.get("author") or {}).get("login", "unknown")},
+            "author_association": comment.get("authorAssociation", ""),
+            "body": comment.get("body") or "",
+            "created_at": comment.get("createdAt", ""),
+            "html_url": comment.get("url", ""),
+        }
+        for comment in comments.get("nodes") or []
+    ]
+    return issue, rest_comments
+
+
+def _merge_batch_issue_with_store(store: Any, repo: str, node: dict[str, Any], data: dict[str, Any]) -> None:
+    """issue 未更新时评论取自本地快照（不受单页 100 条限制）；评论已全部取回时写入快照"""
+    issue, comments = _graphql_issue_to_rest(node)
+    if not issue["updated_at"]:
+        return
+    cached = store.get_issue(repo, int(issue["number"]))
+    if cached and cached["updated_at"] == issue["updated_at"] and len(cached["comment_list"]) == issue["comments"]:
+        data["comments"] = _normalize_rest_issue(issue, cached["comment_list"])["comments"]
+        data["comments_complete"] = True
+    elif data["comments_complete"]:
+        store.save_issue(repo, issue, comments, replace_comments=True)
+
+
+def get_issues_batch(
+    issue_numbers: list[int], format_comments: bool = False, repo: str | None = None
+) -> dict[int, dict[str, Any]]:
+    """批量获取 Issue 信息（每 ISSUE_BATCH_SIZE 个 issue 一次 GraphQL 别名查询）
+
+    Args:
+        issue_numbers: Issue 编号列表
+        format_comments: 是否格式化评论为字符串（同 get_issue_info）
+        repo: 仓库名称（owner/repo），默认取 GITHUB_REPOSITORY
+
+    Returns:
+        issue 编号 -> 与 get_issue_info 相同结构的字典；不存在的 issue 不出现在结果中
+        （另含 comments_complete 字段，标记评论是否已全部取回）
+
+    Raises:
+        RuntimeError: 无法确定仓库或查询整体失败
+    """
+    from issuelab.tools.issue_store import get_issue_store
+
+    target_repo = _resolve_repo(repo)
+    if not target_repo or "/" not in target_repo:
+        raise RuntimeError("Batch issue fetch requires repo or GITHUB_REPOSITORY")
+    owner, name = target_repo.split("/", 1)
+    store = get_issue_store()
+
+    unique_numbers = list(dict.fromkeys(issue_numbers))
+    issues: dict[int, dict[str, Any]] = {}
+    for start in range(0, len(unique_numbers), ISSUE_BATCH_SIZE):
+        chunk = unique_numbers[start : start + ISSUE_BATCH_SIZE]
+        logger.debug(f"批量获取 {len(chunk)} 个 Issue 信息")
+        payload = _run_graphql(_build_issue_batch_query(chunk), {"owner": owner, "name": name}, target_repo)
+        repository = (payload.get("data") or {}).get("repository") or {}
+        for number in chunk:
+            node = repository.get(f"i{number}")
+            if not node:
+                logger.warning(f"批量获取时未找到 Issue #{number}")
+                continue
+            data = _normalize_graphql_issue(node)
+            if store is not None:
+                try:
+                    _merge_batch_issue_with_store(store, target_repo, node, data)
+                except sqlite3.Error as e:
+                    logger.warning(f"Issue 本地快照不可用: {e}")
+                    store = None
+            if format_comments:
+                data["comments"] = _format_comments_for_llm(number, data)
+            issues[number] = data
+    return issues
+
+
 def write_issue_context_file(
     issue_number: int,
     title: str,
@@ -106,6 +431,19 @@ def write_issue_context_file(
         lines.append("无评论")
 
     content = "\n".join(lines)
+    # 检索索引（ISSUELAB_ISSUE_INDEX=1）：与上下文文件同目录，按块增量更新
+    from issuelab.tools.issue_index import issue_index_enabled, update_issue_index
+
+    if issue_index_enabled():
+        update_issue_index(issue_number, title, body or "", comments or "", base_dir=base_dir)
+
+    # 内容未变化（如同一 issue 在快照命中时重复触发）则不重写
+    try:
+        with open(path, encoding="utf-8") as f:
+            if f.read() == content:
+                return path
+    except OSError:
+        pass
     with open(path, "w", encoding="utf-8") as f:
         f.write(content)
 
@@ -171,7 +509,6 @@ def post_comment(
     Returns:
         是否成功发布
     """
-    env = Config.prepare_github_env()
 
     # 保持正文原样，不做结构重写；仅做一次 mentions 解析与过滤。
     if auto_clean:
@@ -205,27 +542,41 @@ def post_comment(
     if auto_truncate:
         final_body = truncate_text(final_body, MAX_COMMENT_LENGTH)
 
-    # 使用临时文件避免命令行长度限制
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".md", delete=False) as f:
-        f.write(final_body)
-        f.flush()
-
-        # 构建命令
-        cmd = ["gh", "issue", "comment", str(issue_number), "--body-file", f.name]
-        if repo:
-            cmd.extend(["--repo", repo])
+    rest_repo = _resolve_repo(repo)
+    if _use_rest_backend(rest_repo):
+        from issuelab.tools.github_client import get_github_client
 
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            env=env,
+        # 正文直接作为 JSON 请求体发送，无需临时文件
+        response = get_github_client().request(
+            "POST", f"repos/{rest_repo}/issues/{issue_number}/comments", json={"body": final_body}
         )
-        os.unlink(f.name)
-
-    if result.returncode != 0:
-        logger.error(f"发布评论到 Issue #{issue_number} 失败: {result.stderr}")
-        return False
+        if response.status_code != 201:
+            logger.error(f"发布评论到 Issue #{issue_number} 失败: HTTP {response.status_code} {response.text[:200]}")
+            return False
+    else:
+        env = Config.prepare_github_env()
+
+        # 使用临时文件避免命令行长度限制
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".md", delete=False) as f:
+            f.write(final_body)
+            f.flush()
+
+            # 构建命令
+            cmd = ["gh", "issue", "comment", str(issue_number), "--body-file", f.name]
+            if repo:
+                cmd.extend(["--repo", repo])
+
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                env=env,
+            )
+            os.unlink(f.name)
+
+        if result.returncode != 0:
+            logger.error(f"发布评论到 Issue #{issue_number} 失败: {result.stderr}")
+            return False
 
     if agent_name:
         logger.info(f"[{agent_name}] 评论已发布到 Issue #{issue_number}")
@@ -245,19 +596,39 @@ def update_label(issue_number: int, label: str, action: Literal["add", "remove"]
     Returns:
         是否成功更新
     """
-    action_flag = "--add-label" if action == "add" else "--remove-label"
-    env = Config.prepare_github_env()
+    rest_repo = _resolve_repo(None)
+    if _use_rest_backend(rest_repo):
+        from issuelab.tools.github_client import get_github_client
+
+        client = get_github_client()
+        if action == "add":
+            response = client.request(
+                "POST", f"repos/{rest_repo}/issues/{issue_number}/labels", json={"labels": [label]}
+            )
+            ok = response.status_code == 200
+        else:
+            response = client.request(
+                "DELETE", f"repos/{rest_repo}/issues/{issue_number}/labels/{quote(label, safe='')}"
+            )
+            # 与 gh 一致：移除不存在的标签视为成功
+            ok = response.status_code in (200, 404)
+        if not ok:
+            logger.error(f"更新标签 '{label}' 失败: HTTP {response.status_code} {response.text[:200]}")
+            return False
+    else:
+        action_flag = "--add-label" if action == "add" else "--remove-label"
+        env = Config.prepare_github_env()
 
-    result = subprocess.run(
-        ["gh", "issue", "edit", str(issue_number), action_flag, label],
-        capture_output=True,
-        text=True,
-        env=env,
-    )
+        result = subprocess.run(
+            ["gh", "issue", "edit", str(issue_number), action_flag, label],
+            capture_output=True,
+            text=True,
+            env=env,
+        )
 
-    if result.returncode != 0:
-        logger.error(f"更新标签 '{label}' 失败: {result.stderr}")
-        return False
+        if result.returncode != 0:
+            logger.error(f"更新标签 '{label}' 失败: {result.stderr}")
+            return False
 
     logger.info(f"标签 '{label}' 已{action}到 Issue #{issue_number}")
     return True
@@ -0,0 +1,371 @@
+"""GitHub REST 客户端 - 共享连接池的 HTTP 会话层
+
+- requests.Session + HTTPAdapter 连接池（keep-alive，避免每次 TCP+TLS 握手）
+- GET 请求自动携带 If-None-Match，304 时复用缓存内容（不消耗 rate limit 配额）
+- 按 (token, X-RateLimit-Resource) 分桶跟踪 X-RateLimit-* 头，只在本次请求所属的桶耗尽时等待 reset；
+  限流/5xx 响应按 Retry-After 通过 issuelab.retry 退避重试
+- 幂等请求的网络异常（超时/连接失败）同样退避重试
+- Link 头分页辅助
+
+API 根地址取自 GITHUB_API_URL（GitHub Actions 默认提供），便于指向本地测试服务。
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from issuelab.config import Config
+from issuelab.logging_config import get_logger
+from issuelab.retry import RetryError, retry_sync
+
+logger = get_logger(__name__)
+
+DEFAULT_API_URL = "https://api.github.com"
+DEFAULT_TIMEOUT_SECONDS = 10
+_ETAG_CACHE_MAX_ENTRIES = 256
+# 5xx 只对幂等方法重试，避免重复触发 dispatch 等写操作
+_RETRYABLE_STATUS = {500, 502, 503, 504}
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+_NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout)
+# 限流时最长等待秒数（主动等待 reset 或 Retry-After）；超过则直接把响应交给调用方
+_MAX_RESET_WAIT_SECONDS = 60.0
+
+
+class GitHubRetryableError(Exception):
+    """可重试的 HTTP 响应（限流或 5xx），携带原始响应与 Retry-After 提示"""
+
+    def __init__(self, response: requests.Response, retry_after: float | None) -> None:
+        super().__init__(f"HTTP {response.status_code} from {response.url}")
+        self.response = response
+        self.retry_after = retry_after
+
+
+@dataclass
+class RateLimitState:
+    """单个限流桶（token + resource）最近一次响应中的限流信息"""
+
+    limit: int | None = None
+    remaining: int | None = None
+    reset_at: float | None = None
+    resource: str | None = None
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16] if token else ""
+
+
+def _resource_for(url: str) -> str:
+    """按请求路径推断 X-RateLimit-Resource（响应头缺失时也用于分桶）"""
+    path = urlparse(url).path
+    if path.endswith("/graphql"):
+        return "graphql"
+    if "/search/" in path:
+        return "search"
+    return "core"
+
+
+def _parse_retry_after(response: requests.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        reset = response.headers.get("X-RateLimit-Reset")
+        if reset and reset.isdigit():
+            return max(0.0, int(reset) - time.time())
+    return None
+
+
+def _is_rate_limited(response: requests.Response) -> bool:
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    if response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers:
+        return True
+    # secondary rate limit 仅在正文中说明
+    return "rate limit" in (response.text or "").lower()
+
+
+def _should_retry_response(exc: Exception) -> bool:
+    return isinstance(exc, GitHubRetryableError)
+
+
+def _should_retry_idempotent(exc: Exception) -> bool:
+    return isinstance(exc, (GitHubRetryableError, *_NETWORK_ERRORS))
+
+
+class GitHubClient:
+    """共享连接池的 GitHub REST 客户端（线程安全，可跨线程复用）"""
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        token: str | None = None,
+        *,
+        pool_maxsize: int = 16,
+        max_retries: int = 3,
+        initial_delay: float = 1.0,
+    ) -> None:
+        self.base_url = (base_url or os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL).rstrip("/")
+        self.default_token = token
+        self.max_retries = max_retries
+        self.initial_delay = initial_delay
+        # 最近一次响应所属桶的状态（兼容只关心单一 token 的调用方）
+        self.rate_limit = RateLimitState()
+        self.rate_limits: dict[tuple[str, str], RateLimitState] = {}
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+                "User-Agent": "issuelab",
+            }
+        )
+
+        self._etag_cache: OrderedDict[str, tuple[str, requests.Response]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def url_for(self, path_or_url: str) -> str:
+        if path_or_url.startswith(("http://", "https://")):
+            return path_or_url
+        return f"{self.base_url}/{path_or_url.lstrip('/')}"
+
+    def _resolve_token(self, token: str | None) -> str:
+        return token or self.default_token or Config.get_github_token()
+
+    def _etag_key(self, url: str, params: dict[str, Any] | None, token: str) -> str:
+        query = urlencode(sorted((params or {}).items()))
+        return f"{url}?{query}#{_token_digest(token)}"
+
+    def _record_rate_limit(self, response: requests.Response, token: str, resource: str) -> None:
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        try:
+            state = RateLimitState(
+                remaining=int(headers["X-RateLimit-Remaining"]),
+                limit=int(headers.get("X-RateLimit-Limit", "0")) or None,
+                reset_at=float(headers["X-RateLimit-Reset"]) if headers.get("X-RateLimit-Reset") else None,
+                resource=headers.get("X-RateLimit-Resource") or resource,
+            )
+        except ValueError:
+            return
+        with self._lock:
+            self.rate_limits[(_token_digest(token), state.resource)] = state
+            self.rate_limit = state
+        if state.remaining is not None and state.remaining < 50:
+            logger.warning("GitHub API 配额偏低: remaining=%s resource=%s", state.remaining, state.resource)
+
+    def _wait_for_quota(self, token: str, resource: str) -> None:
+        """本次请求所属桶剩余配额为 0 且 reset 时间较近时，主动等待而不是撞上 403"""
+        with self._lock:
+            state = self.rate_limits.get((_token_digest(token), resource))
+        if state is None or state.remaining != 0 or state.reset_at is None:
+            return
+        reset_at = state.reset_at
+        wait = reset_at - time.time()
+        if 0 < wait <= _MAX_RESET_WAIT_SECONDS:
+            logger.warning("GitHub API 配额耗尽，等待 %.1f 秒至 reset", wait)
+            time.sleep(wait)
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        *,
+        token: str,
+        params: dict[str, Any] | None,
+        json: Any,
+        headers: dict[str, str] | None,
+        timeout: float,
+        use_etag: bool,
+    ) -> requests.Response:
+        resource = _resource_for(url)
+        self._wait_for_quota(token, resource)
+
+        request_headers = dict(headers or {})
+        if token:
+            request_headers["Authorization"] = f"Bearer {token}"
+
+        etag_key = self._etag_key(url, params, token) if use_etag else ""
+        cached: tuple[str, requests.Response] | None = None
+        if use_etag:
+            with self._lock:
+                cached = self._etag_cache.get(etag_key)
+            if cached:
+                request_headers["If-None-Match"] = cached[0]
+
+        with self._lock:
+            self.stats["requests"] += 1
+        try:
+            response = self.session.request(
+                method, url, params=params, json=json, headers=request_headers, timeout=timeout
+            )
+        except _NETWORK_ERRORS:
+            if method in _IDEMPOTENT_METHODS:
+                with self._lock:
+                    self.stats["retries"] += 1
+            raise
+        self._record_rate_limit(response, token, resource)
+
+        if response.status_code == 304 and cached:
+            with self._lock:
+                self.stats["not_modified"] += 1
+                self._etag_cache.move_to_end(etag_key)
+            return cached[1]
+
+        retryable_5xx = response.status_code in _RETRYABLE_STATUS and method in _IDEMPOTENT_METHODS
+        if _is_rate_limited(response) or retryable_5xx:
+            retry_after = _parse_retry_after(response)
+            if retry_after is not None and retry_after > _MAX_RESET_WAIT_SECONDS:
+                logger.warning("GitHub API 限流需等待 %.0f 秒，放弃重试: %s", retry_after, url)
+                return response
+            with self._lock:
+                self.stats["retries"] += 1
+            raise GitHubRetryableError(response, retry_after)
+
+        etag = response.headers.get("ETag")
+        if use_etag and etag and response.status_code == 200:
+            with self._lock:
+                self._etag_cache[etag_key] = (etag, response)
+                self._etag_cache.move_to_end(etag_key)
+                while len(self._etag_cache) > _ETAG_CACHE_MAX_ENTRIES:
+                    self._etag_cache.popitem(last=False)
+        return response
+
+    def request(
+        self,
+        method: str,
+        path_or_url: str,
+        *,
+        token: str | None = None,
+        params: dict[str, Any] | None = None,
+        json: Any = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        use_etag: bool | None = None,
+    ) -> requests.Response:
+        """发送请求并返回响应（不对 4xx 抛异常，由调用方决定如何处理）
+
+        限流（429 / 403 + rate limit）与幂等请求的 5xx 会按 Retry-After 退避重试；
+        重试耗尽后返回最后一次响应。网络异常（超时/连接失败）仅对幂等请求重试，
+        耗尽后抛出最后一次异常；非幂等请求直接抛出。
+        """
+        method = method.upper()
+        send = retry_sync(
+            max_retries=self.max_retries,
+            initial_delay=self.initial_delay,
+            backoff_factor=2.0,
+            should_retry=_should_retry_idempotent if method in _IDEMPOTENT_METHODS else _should_retry_response,
+        )(self._send)
+        try:
+            return send(
+                method,
+                self.url_for(path_or_url),
+                token=self._resolve_token(token),
+                params=params,
+                json=json,
+                headers=headers,
+                timeout=timeout,
+                use_etag=(method == "GET") if use_etag is None else use_etag,
+            )
+        except RetryError as exc:
+            cause = exc.__cause__
+            if isinstance(cause, GitHubRetryableError):
+                return cause.response
+            if isinstance(cause, _NETWORK_ERRORS):
+                raise cause from None
+            raise
+
+    def get_json(self, path_or_url: str, **kwargs: Any) -> Any:
+        """GET 并解析 JSON；非 2xx 抛出 requests.HTTPError"""
+        response = self.request("GET", path_or_url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def graphql(self, query: str, variables: dict[str, Any] | None = None, **kwargs: Any) -> dict[str, Any]:
+        """执行 GraphQL 查询，返回完整响应（含 data / errors，部分失败由调用方处理）"""
+        url = os.environ.get("GITHUB_GRAPHQL_URL") or f"{self.base_url}/graphql"
+        response = self.request("POST", url, json={"query": query, "variables": variables or {}}, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def iter_pages(
+        self, path_or_url: str, *, params: dict[str, Any] | None = None, max_pages: int | None = None, **kwargs: Any
+    ) -> Iterator[Any]:
+        """按 Link: rel="next" 逐页产出解析后的 JSON"""
+        url: str | None = self.url_for(path_or_url)
+        page_params = dict(params or {})
+        page_params.setdefault("per_page", 100)
+        pages = 0
+        while url and (max_pages is None or pages < max_pages):
+            response = self.request("GET", url, params=page_params, **kwargs)
+            response.raise_for_status()
+            yield response.json()
+            pages += 1
+            url = response.links.get("next", {}).get("url")
+            # next 链接已包含全部查询参数
+            page_params = {}
+
+    def paginate(
+        self,
+        path_or_url: str,
+        *,
+        params: dict[str, Any] | None = None,
+        max_pages: int | None = None,
+        items_key: str | None = None,
+        **kwargs: Any,
+    ) -> list[Any]:
+        """收集所有分页结果；items_key 用于 {"workflow_runs": [...]} 这类包装响应"""
+        items: list[Any] = []
+        for page in self.iter_pages(path_or_url, params=params, max_pages=max_pages, **kwargs):
+            data = page.get(items_key, []) if items_key and isinstance(page, dict) else page
+            if isinstance(data, list):
+                items.extend(data)
+        return items
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_DEFAULT_CLIENT: GitHubClient | None = None
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+
+def get_github_client() -> GitHubClient:
+    """进程级共享客户端（复用连接池与 ETag 缓存）"""
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = GitHubClient()
+        return _DEFAULT_CLIENT
+
+
+def reset_github_client() -> None:
+    """关闭并重置共享客户端（测试或切换 GITHUB_API_URL 后调用）"""
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is not None:
+            _DEFAULT_CLIENT.close()
+        _DEFAULT_CLIENT = None
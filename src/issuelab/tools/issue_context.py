@@ -0,0 +1,266 @@
+"""Issue 评论上下文压缩（默认关闭）
+
+长讨论的 Issue 上下文文件原样包含全部评论，每个 agent 每次触发都要读入数万 token。
+开启后按以下规则压缩评论区：
+- 去掉引用回复（`>` 开头的行）与之前 agent 输出末尾的受控区（相关人员/协作请求）；
+- 机器人与系统护栏评论折叠为一行；
+- 总量超出 token 预算时，最近 N 条评论保留原文，更早的评论压缩为逐条一行的摘要；
+  摘要按评论 ID 缓存（评论被编辑时失效），新评论到来时旧评论摘要直接复用；
+  摘要只占用原文之外的剩余预算，放不下的最早评论只列出参与者。
+
+token 数为估算值：CJK 字符按 1 token，其余字符按 4 字符 1 token。
+
+环境变量：
+- ISSUELAB_CONTEXT_COMPACTION=1       开启
+- ISSUELAB_CONTEXT_TOKEN_BUDGET       评论区 token 预算（默认 12000）
+- ISSUELAB_CONTEXT_KEEP_RECENT        保留原文的最近评论数（默认 10）
+- ISSUELAB_CONTEXT_DIGEST_DIR         摘要缓存目录（默认 .issuelab/context_digest）
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from issuelab.logging_config import get_logger
+from issuelab.tools.github import _CONTROLLED_FOOTER_RE, _format_comments
+from issuelab.utils.env import env_flag, env_int
+
+logger = get_logger(__name__)
+
+DIGEST_VERSION = "1"
+DEFAULT_TOKEN_BUDGET = 12000
+DEFAULT_KEEP_RECENT = 10
+_DIGEST_LINE_CHARS = 80
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+_AGENT_HEADER_RE = re.compile(r"^\[Agent:\s*(.+?)\]")
+_BOT_LOGINS = {"github-actions", "app/github-actions"}
+
+
+def context_compaction_enabled() -> bool:
+    return env_flag("ISSUELAB_CONTEXT_COMPACTION")
+
+
+def estimate_tokens(text: str) -> int:
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def strip_quoted_replies(body: str) -> str:
+    lines = [line for line in body.splitlines() if not line.lstrip().startswith(">")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def strip_controlled_footer(body: str) -> str:
+    return _CONTROLLED_FOOTER_RE.sub("", body.rstrip()).rstrip()
+
+
+def _author(comment: dict[str, Any]) -> str:
+    return (comment.get("author") or {}).get("login", "unknown")
+
+
+def _agent_name(body: str) -> str | None:
+    match = _AGENT_HEADER_RE.match(body.lstrip())
+    return match.group(1).strip() if match else None
+
+
+def _collapsed_kind(comment: dict[str, Any], body: str) -> str | None:
+    """机器人/护栏评论返回折叠说明；agent 输出虽由机器人账号发布，但保留正文"""
+    if "[系统护栏]" in body[:200]:
+        return "护栏评论已折叠"
+    login = _author(comment)
+    if (login.endswith("[bot]") or login in _BOT_LOGINS) and _agent_name(body) is None:
+        return "机器人评论已折叠"
+    return None
+
+
+def _first_line(body: str, limit: int = _DIGEST_LINE_CHARS) -> str:
+    for raw in body.splitlines():
+        line = raw.strip().lstrip("#").strip()
+        if not line or line == "---" or _AGENT_HEADER_RE.match(line):
+            continue
+        return line if len(line) <= limit else line[: limit - 1] + "…"
+    return ""
+
+
+def _comment_line(comment: dict[str, Any], text: str) -> str:
+    created_at = comment.get("createdAt", "")[:10]
+    return f"- **[{_author(comment)}]** ({created_at}):{text}"
+
+
+@dataclass
+class _Prepared:
+    comment: dict[str, Any]
+    body: str
+    collapsed: str | None
+
+    def render(self) -> str:
+        if self.collapsed:
+            return _comment_line(self.comment, f" _（{self.collapsed}）_ {_first_line(self.body, 80)}")
+        return _comment_line(self.comment, f"\n{self.body}")
+
+    def digest_line(self) -> str:
+        name = _agent_name(self.body)
+        author = name or _author(self.comment)
+        created_at = self.comment.get("createdAt", "")[:10]
+        return f"- [{author}] ({created_at}) {_first_line(self.body)}".rstrip()
+
+    def cache_key(self) -> tuple[str, str]:
+        body_hash = hashlib.sha256(self.body.encode("utf-8")).hexdigest()[:16]
+        return str(self.comment.get("id") or f"h:{body_hash}"), body_hash
+
+
+class DigestCache:
+    """单个 Issue 的旧评论摘要缓存：{评论 ID: {hash, line}}"""
+
+    def __init__(self, root: str | Path, issue_number: int) -> None:
+        self.path = Path(root) / f"issue-{issue_number}.json"
+        self.entries: dict[str, dict[str, str]] = {}
+        self.hits = 0
+        self._dirty = False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == DIGEST_VERSION and isinstance(data.get("entries"), dict):
+            self.entries = data["entries"]
+
+    def line(self, prepared: _Prepared) -> str:
+        comment_id, body_hash = prepared.cache_key()
+        entry = self.entries.get(comment_id)
+        if isinstance(entry, dict) and entry.get("hash") == body_hash and isinstance(entry.get("line"), str):
+            self.hits += 1
+            return entry["line"]
+        line = prepared.digest_line()
+        self.entries[comment_id] = {"hash": body_hash, "line": line}
+        self._dirty = True
+        return line
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            payload = {"version": DIGEST_VERSION, "entries": self.entries}
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            logger.warning("写入评论摘要缓存失败: %s (%s)", self.path, exc)
+
+
+@dataclass
+class CompactedComments:
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    verbatim: int
+    digested: int
+    collapsed: int
+    digest_cache_hits: int = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.compacted_tokens / self.original_tokens if self.original_tokens else 1.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "original_tokens": self.original_tokens,
+            "compacted_tokens": self.compacted_tokens,
+            "ratio": round(self.ratio, 3),
+            "verbatim": self.verbatim,
+            "digested": self.digested,
+            "collapsed": self.collapsed,
+            "digest_cache_hits": self.digest_cache_hits,
+        }
+
+
+def _render(
+    prepared: list[_Prepared], keep: int, digest_line: Callable[[int], str], token_budget: int
+) -> tuple[str, int]:
+    """最近 keep 条保留原文，其余写入摘要段（摘要占用剩余预算，超出部分只列参与者）；返回 (文本, 摘要条数)"""
+    split = len(prepared) - keep
+    older, recent = prepared[:split], prepared[split:]
+    recent_parts = [p.render() for p in recent]
+    if not older:
+        return "\n\n".join(recent_parts), 0
+
+    remaining = token_budget - estimate_tokens("\n\n".join(recent_parts)) - 100
+    lines: list[str] = []
+    for index in range(split - 1, -1, -1):
+        line = digest_line(index)
+        remaining -= estimate_tokens(line) + 1
+        if remaining < 0:
+            break
+        lines.append(line)
+    omitted = older[: split - len(lines)]
+    if omitted:
+        names = list(dict.fromkeys(_agent_name(p.body) or _author(p.comment) for p in omitted))
+        participants = ", ".join(names[:8]) + (" 等" if len(names) > 8 else "")
+        lines.append(f"- 更早的 {len(omitted)} 条评论已省略（参与者：{participants}）")
+    digest = "\n".join(reversed(lines))
+    parts = [f"### 早期评论摘要（{split} 条，每条仅保留首句）\n{digest}", f"### 最近 {keep} 条评论（原文）"]
+    return "\n\n".join(parts + recent_parts), split
+
+
+def compact_issue_comments(
+    issue_number: int,
+    comments: list[dict[str, Any]],
+    *,
+    token_budget: int | None = None,
+    keep_recent: int | None = None,
+    digest_dir: str | Path | None = None,
+) -> CompactedComments:
+    """压缩评论列表为 LLM 输入文本（格式与 _format_comments 一致）"""
+    if token_budget is None:
+        token_budget = env_int("ISSUELAB_CONTEXT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)
+    if keep_recent is None:
+        keep_recent = env_int("ISSUELAB_CONTEXT_KEEP_RECENT", DEFAULT_KEEP_RECENT)
+    if digest_dir is None:
+        digest_dir = os.environ.get("ISSUELAB_CONTEXT_DIGEST_DIR") or Path.cwd() / ".issuelab" / "context_digest"
+
+    original_tokens = estimate_tokens(_format_comments(comments))
+    prepared = []
+    for comment in comments:
+        body = strip_controlled_footer(strip_quoted_replies(comment.get("body", "") or ""))
+        prepared.append(_Prepared(comment, body, _collapsed_kind(comment, body)))
+    collapsed = sum(1 for p in prepared if p.collapsed)
+
+    text, digested = _render(prepared, len(prepared), lambda _i: "", token_budget)
+    cache = None
+    if estimate_tokens(text) > token_budget:
+        cache = DigestCache(digest_dir, issue_number)
+        lines: dict[int, str] = {}
+
+        def digest_line(index: int) -> str:
+            if index not in lines:
+                lines[index] = cache.line(prepared[index])
+            return lines[index]
+
+        keep = max(1, min(keep_recent, len(prepared)))
+        text, digested = _render(prepared, keep, digest_line, token_budget)
+        # 最近评论本身就很长时继续减少原文条数
+        while estimate_tokens(text) > token_budget and keep > 1:
+            keep //= 2
+            text, digested = _render(prepared, keep, digest_line, token_budget)
+        cache.save()
+
+    result = CompactedComments(
+        text=text,
+        original_tokens=original_tokens,
+        compacted_tokens=estimate_tokens(text),
+        verbatim=len(prepared) - digested,
+        digested=digested,
+        collapsed=collapsed,
+        digest_cache_hits=cache.hits if cache is not None else 0,
+    )
+    logger.info(
+        f"Issue #{issue_number} 评论上下文压缩: {result.original_tokens} → {result.compacted_tokens} tokens "
+        f"({result.ratio:.1%}), 原文 {result.verbatim} 条, 摘要 {result.digested} 条, 折叠 {result.collapsed} 条"
+    )
+    return result
@@ -0,0 +1,365 @@
+"""Issue 上下文本地检索索引（默认关闭）
+
+长 Issue 的上下文文件整份 Read 会占满每个 agent 会话的上下文。开启后
+write_issue_context_file 同时在上下文文件旁写入分块 BM25 索引（.issuelab/issue_<n>.index.json），
+并为 agent 挂载进程内 MCP server `issuelab_issue`：
+- search_issue(issue_number, query)：BM25 检索，直接返回命中片段全文；
+- read_issue_chunks(issue_number, chunk_ids)：按 ID 读取片段（如相邻片段）。
+
+分块：正文按段落合并，评论逐条成块（过长再按段落切分）。块 ID 为内容哈希，新评论到来时
+只对新增块分词并增量更新文档频率，已有块直接复用。
+分词：英文/数字按词，中文按二元组（单字片段保留单字）。
+
+环境变量：
+- ISSUELAB_ISSUE_INDEX=1                开启
+- ISSUELAB_ISSUE_INDEX_MIN_TOKENS       上下文超过该 token 数时提示 agent 先检索（默认 4000）
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from claude_agent_sdk import SdkMcpTool, create_sdk_mcp_server, tool
+from claude_agent_sdk.types import McpSdkServerConfig
+
+from issuelab.logging_config import get_logger
+from issuelab.tools.issue_context import estimate_tokens
+from issuelab.utils.env import env_flag, env_int
+from issuelab.utils.mcp import text_result
+
+logger = get_logger(__name__)
+
+ISSUE_INDEX_SERVER = "issuelab_issue"
+INDEX_VERSION = "1"
+DEFAULT_MIN_TOKENS = 4000
+_CHUNK_CHARS = 1200
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+_DEFAULT_TOP_K = 5
+_SEARCH_MAX_CHARS = 8000
+
+_COMMENT_HEADER_RE = re.compile(r"^- \*\*\[(.+?)\]\*\* \((.*?)\):", re.MULTILINE)
+_TOKEN_RE = re.compile(r"[a-z0-9_]+|[\u3400-\u4dbf\u4e00-\u9fff]+")
+
+
+def issue_index_enabled() -> bool:
+    return env_flag("ISSUELAB_ISSUE_INDEX")
+
+
+def tokenize(text: str) -> list[str]:
+    terms: list[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token.isascii():
+            if len(token) > 1:
+                terms.append(token)
+        elif len(token) == 1:
+            terms.append(token)
+        else:
+            terms.extend(token[i : i + 2] for i in range(len(token) - 1))
+    return terms
+
+
+def _split_paragraphs(text: str, limit: int = _CHUNK_CHARS) -> list[str]:
+    """按空行切段，相邻短段合并到 limit 以内；单段超长时按字符切分"""
+    pieces: list[str] = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(paragraph[:limit])
+            paragraph = paragraph[limit:]
+        if current and len(current) + len(paragraph) + 2 > limit:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_issue(title: str, body: str, comments: str) -> list[dict[str, str]]:
+    """切分为 [{id, label, text}]，顺序与上下文文件一致"""
+    chunks: list[tuple[str, str]] = []
+    for piece in _split_paragraphs(f"{title}\n\n{body}" if title else body or ""):
+        chunks.append(("正文", piece))
+
+    headers = list(_COMMENT_HEADER_RE.finditer(comments or ""))
+    preamble = (comments or "")[: headers[0].start()] if headers else comments or ""
+    for piece in _split_paragraphs(preamble):
+        chunks.append(("评论区", piece))
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(comments)
+        label = f"评论 {match.group(1)} ({match.group(2)})"
+        for piece in _split_paragraphs(comments[match.start() : end]):
+            chunks.append((label, piece))
+
+    result = []
+    seen: Counter[str] = Counter()
+    for label, text in chunks:
+        digest = hashlib.sha256(f"{label}\n{text}".encode()).hexdigest()[:12]
+        seen[digest] += 1
+        chunk_id = digest if seen[digest] == 1 else f"{digest}-{seen[digest]}"
+        result.append({"id": chunk_id, "label": label, "text": text})
+    return result
+
+
+def index_path(issue_number: int, base_dir: str | Path | None = None) -> Path:
+    base = Path(base_dir) if base_dir is not None else Path.cwd() / ".issuelab"
+    return base / f"issue_{issue_number}.index.json"
+
+
+class IssueIndex:
+    """单个 Issue 的 BM25 分块索引"""
+
+    def __init__(self, data: dict[str, Any] | None = None) -> None:
+        data = data or {}
+        self.chunks: dict[str, dict[str, Any]] = data.get("chunks", {})
+        self.order: list[str] = data.get("order", [])
+        self.df: dict[str, int] = data.get("df", {})
+        self.total_len: int = int(data.get("total_len", 0))
+        self.tokens: int = int(data.get("tokens", 0))
+
+    @classmethod
+    def load(cls, path: Path) -> "IssueIndex":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return cls()
+        return cls(data)
+
+    def save(self, path: Path) -> None:
+        payload = {
+            "version": INDEX_VERSION,
+            "chunks": self.chunks,
+            "order": self.order,
+            "df": self.df,
+            "total_len": self.total_len,
+            "tokens": self.tokens,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def update(self, chunks: list[dict[str, str]]) -> dict[str, int]:
+        """增量更新：只对新增块分词，移除已消失的块；返回 {added, removed, reused}"""
+        new_ids = {chunk["id"] for chunk in chunks}
+        removed = [chunk_id for chunk_id in self.chunks if chunk_id not in new_ids]
+        for chunk_id in removed:
+            old = self.chunks.pop(chunk_id)
+            self.total_len -= int(old["len"])
+            for term in old["tf"]:
+                self.df[term] -= 1
+                if self.df[term] <= 0:
+                    del self.df[term]
+
+        added = 0
+        for chunk in chunks:
+            if chunk["id"] in self.chunks:
+                continue
+            tf = Counter(tokenize(chunk["text"]))
+            length = sum(tf.values())
+            self.chunks[chunk["id"]] = {"label": chunk["label"], "text": chunk["text"], "tf": dict(tf), "len": length}
+            self.total_len += length
+            for term in tf:
+                self.df[term] = self.df.get(term, 0) + 1
+            added += 1
+
+        self.order = [chunk["id"] for chunk in chunks]
+        return {"added": added, "removed": len(removed), "reused": len(chunks) - added}
+
+    def search(self, query: str, top_k: int = _DEFAULT_TOP_K) -> list[tuple[str, float]]:
+        terms = set(tokenize(query))
+        n = len(self.chunks)
+        if not terms or not n:
+            return []
+        avg_len = self.total_len / n or 1.0
+        scores: list[tuple[str, float]] = []
+        for chunk_id in self.order:
+            chunk = self.chunks[chunk_id]
+            tf, length = chunk["tf"], chunk["len"]
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if not freq:
+                    continue
+                df = self.df.get(term, 0)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * freq * (_BM25_K1 + 1) / (freq + _BM25_K1 * (1 - _BM25_B + _BM25_B * length / avg_len))
+            if score > 0:
+                scores.append((chunk_id, score))
+        scores.sort(key=lambda item: -item[1])
+        return scores[:top_k]
+
+
+_LOADED: dict[str, tuple[int, IssueIndex]] = {}
+_LOADED_LOCK = threading.Lock()
+
+
+def update_issue_index(
+    issue_number: int, title: str, body: str, comments: str, base_dir: str | Path | None = None
+) -> dict[str, Any]:
+    """构建/增量更新索引文件；返回统计（含估算 token 数）"""
+    path = index_path(issue_number, base_dir)
+    index = IssueIndex.load(path)
+    chunks = chunk_issue(title, body, comments)
+    stats: dict[str, Any] = index.update(chunks)
+    if stats["added"] or stats["removed"]:
+        index.tokens = sum(estimate_tokens(chunk["text"]) for chunk in chunks)
+    if stats["added"] or stats["removed"] or not path.exists():
+        try:
+            index.save(path)
+        except OSError as exc:
+            logger.warning("写入 Issue 索引失败: %s (%s)", path, exc)
+    stats["chunks"] = len(chunks)
+    stats["tokens"] = index.tokens
+    logger.info(
+        f"Issue #{issue_number} 检索索引: {stats['chunks']} 个片段 "
+        f"(新增 {stats['added']}, 复用 {stats['reused']}, 移除 {stats['removed']})"
+    )
+    return stats
+
+
+def issue_index_stats(issue_number: int, base_dir: str | Path | None = None) -> dict[str, Any] | None:
+    index = _load_cached(index_path(issue_number, base_dir))
+    if index is None or not index.order:
+        return None
+    return {"chunks": len(index.order), "tokens": index.tokens}
+
+
+def build_issue_index_hint(stats: dict[str, Any] | None) -> str:
+    """上下文较长时提示 agent 先检索片段，而不是整份 Read"""
+    if not stats:
+        return ""
+    if stats.get("tokens", 0) < env_int("ISSUELAB_ISSUE_INDEX_MIN_TOKENS", DEFAULT_MIN_TOKENS):
+        return ""
+    return (
+        f"该文件较长（约 {stats['tokens']} tokens，{stats['chunks']} 个片段）。"
+        f"请优先使用 `mcp__{ISSUE_INDEX_SERVER}__search_issue` 按关键词检索相关片段（结果含片段全文），"
+        f"需要上下文时用 `mcp__{ISSUE_INDEX_SERVER}__read_issue_chunks` 读取指定片段；"
+        "仅在确需全貌时再用 Read 读取整个文件。"
+    )
+
+
+def _load_cached(path: Path) -> IssueIndex | None:
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    key = str(path)
+    with _LOADED_LOCK:
+        cached = _LOADED.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    index = IssueIndex.load(path)
+    with _LOADED_LOCK:
+        _LOADED[key] = (mtime, index)
+    return index
+
+
+def _format_chunks(index: IssueIndex, items: list[tuple[str, float | None]], max_chars: int) -> str:
+    parts: list[str] = []
+    used = 0
+    for chunk_id, score in items:
+        chunk = index.chunks[chunk_id]
+        position = index.order.index(chunk_id) + 1
+        header = f"### [{chunk_id}] {chunk['label']} · 片段 {position}/{len(index.order)}"
+        if score is not None:
+            header += f" · score={score:.2f}"
+        text = chunk["text"]
+        if used + len(text) > max_chars and parts:
+            parts.append(f"（其余 {len(items) - len(parts)} 个片段已省略，可用 read_issue_chunks 读取）")
+            break
+        parts.append(f"{header}\n{text}")
+        used += len(text)
+    return "\n\n".join(parts)
+
+
+def build_issue_index_tools(base_dir: str | Path | None = None) -> list[SdkMcpTool[Any]]:
+    def _index(issue_number: Any) -> IssueIndex | None:
+        return _load_cached(index_path(int(issue_number), base_dir))
+
+    @tool(
+        "search_issue",
+        "在 Issue 正文与评论中按关键词检索（BM25），返回最相关片段的全文及片段 ID。",
+        {
+            "type": "object",
+            "properties": {
+                "issue_number": {"type": "integer"},
+                "query": {"type": "string"},
+                "top_k": {"type": "integer", "minimum": 1, "maximum": 20},
+            },
+            "required": ["issue_number", "query"],
+        },
+    )
+    async def search_issue(args: dict[str, Any]) -> dict[str, Any]:
+        index = _index(args["issue_number"])
+        if index is None:
+            return text_result(f"Issue #{args['issue_number']} 没有检索索引，请直接 Read 上下文文件。", is_error=True)
+        hits = index.search(str(args["query"]), int(args.get("top_k") or _DEFAULT_TOP_K))
+        if not hits:
+            return text_result("未检索到相关片段，可换用其他关键词。")
+        return text_result(_format_chunks(index, list(hits), _SEARCH_MAX_CHARS))
+
+    @tool(
+        "read_issue_chunks",
+        "按片段 ID 读取 Issue 片段全文（ID 来自 search_issue 结果）。",
+        {
+            "type": "object",
+            "properties": {
+                "issue_number": {"type": "integer"},
+                "chunk_ids": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["issue_number", "chunk_ids"],
+        },
+    )
+    async def read_issue_chunks(args: dict[str, Any]) -> dict[str, Any]:
+        index = _index(args["issue_number"])
+        if index is None:
+            return text_result(f"Issue #{args['issue_number']} 没有检索索引，请直接 Read 上下文文件。", is_error=True)
+        wanted = [str(chunk_id) for chunk_id in args.get("chunk_ids") or []]
+        missing = [chunk_id for chunk_id in wanted if chunk_id not in index.chunks]
+        found = [(chunk_id, None) for chunk_id in wanted if chunk_id in index.chunks]
+        text = _format_chunks(index, found, _SEARCH_MAX_CHARS * 2) if found else ""
+        if missing:
+            text += f"\n\n未找到片段: {', '.join(missing)}"
+        return text_result(text.strip(), is_error=not found)
+
+    return [search_issue, read_issue_chunks]
+
+
+_DEFAULT_SERVER: McpSdkServerConfig | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_issue_index_server() -> McpSdkServerConfig | None:
+    """挂载到 agent 选项的进程内 MCP server；未开启时返回 None"""
+    global _DEFAULT_SERVER
+    if not issue_index_enabled():
+        return None
+    with _DEFAULT_LOCK:
+        if _DEFAULT_SERVER is None:
+            _DEFAULT_SERVER = create_sdk_mcp_server(ISSUE_INDEX_SERVER, tools=build_issue_index_tools())
+        return _DEFAULT_SERVER
+
+
+def reset_issue_index() -> None:
+    """重置进程级 server 与已加载索引（测试用）"""
+    global _DEFAULT_SERVER
+    with _DEFAULT_LOCK:
+        _DEFAULT_SERVER = None
+    with _LOADED_LOCK:
+        _LOADED.clear()
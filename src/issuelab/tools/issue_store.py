@@ -0,0 +1,164 @@
+"""Issue 本地快照存储（SQLite）
+
+按 (repo, number) 保存 issue 元数据与评论，供 get_issue_info（REST 与 gh 后端）增量刷新：
+- issue 的 updated_at 未变化时，评论直接取自本地；
+- 否则只用 `since=<上次同步时的 updated_at>` 拉取新增/编辑过的评论并合并；
+- 合并后评论数与 issue 的 comments 计数不一致（有评论被删除）时，整体重新拉取。
+get_issues_batch 在评论全部取回时写入快照，issue 未更新时直接使用快照中的完整评论。
+
+默认位置 .issuelab/issues.db；ISSUELAB_ISSUE_STORE=0 关闭，ISSUELAB_ISSUE_STORE_PATH 指定路径。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from issuelab.logging_config import get_logger
+from issuelab.utils.env import env_flag
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    repo TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    comment_count INTEGER NOT NULL,
+    PRIMARY KEY (repo, number)
+);
+CREATE TABLE IF NOT EXISTS comments (
+    repo TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    comment_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (repo, comment_id)
+);
+CREATE INDEX IF NOT EXISTS comments_by_issue ON comments (repo, number, created_at, comment_id);
+"""
+
+
+def issue_store_enabled() -> bool:
+    return env_flag("ISSUELAB_ISSUE_STORE", True)
+
+
+class IssueStore:
+    """Issue 元数据与评论的 SQLite 存储（每次操作独立连接，可跨线程/进程使用）"""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with self._init_lock:
+            if not self._initialized:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_issue(self, repo: str, number: int) -> dict[str, Any] | None:
+        """返回缓存的 issue（REST 原始字段 + comments 列表），未缓存返回 None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT title, body, labels, updated_at, comment_count FROM issues WHERE repo = ? AND number = ?",
+                (repo, number),
+            ).fetchone()
+            if row is None:
+                return None
+            comment_rows = conn.execute(
+                "SELECT data FROM comments WHERE repo = ? AND number = ? ORDER BY created_at, comment_id",
+                (repo, number),
+            ).fetchall()
+        title, body, labels, updated_at, comment_count = row
+        return {
+            "number": number,
+            "title": title,
+            "body": body,
+            "labels": json.loads(labels),
+            "updated_at": updated_at,
+            "comments": comment_count,
+            "comment_list": [json.loads(data) for (data,) in comment_rows],
+        }
+
+    def save_issue(
+        self,
+        repo: str,
+        issue: dict[str, Any],
+        comments: list[dict[str, Any]],
+        *,
+        replace_comments: bool = False,
+    ) -> None:
+        """写入 issue 元数据并合并评论（replace_comments=True 时先清空该 issue 的评论）"""
+        number = int(issue["number"])
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO issues (repo, number, title, body, labels, updated_at, comment_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    repo,
+                    number,
+                    issue.get("title") or "",
+                    issue.get("body") or "",
+                    json.dumps(issue.get("labels") or [], ensure_ascii=False),
+                    issue.get("updated_at") or "",
+                    int(issue.get("comments") or 0),
+                ),
+            )
+            if replace_comments:
+                conn.execute("DELETE FROM comments WHERE repo = ? AND number = ?", (repo, number))
+            conn.executemany(
+                "INSERT OR REPLACE INTO comments (repo, number, comment_id, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (repo, number, int(c["id"]), json.dumps(c, ensure_ascii=False), c.get("created_at") or "")
+                    for c in comments
+                    if c.get("id") is not None
+                ],
+            )
+
+    def count_comments(self, repo: str, number: int) -> int:
+        with self._connect() as conn:
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM comments WHERE repo = ? AND number = ?", (repo, number)
+            ).fetchone()
+        return int(count)
+
+
+_DEFAULT_STORE: IssueStore | None = None
+_DEFAULT_STORE_LOCK = threading.Lock()
+
+
+def get_issue_store() -> IssueStore | None:
+    """进程级默认存储；关闭时返回 None"""
+    global _DEFAULT_STORE
+    if not issue_store_enabled():
+        return None
+    path = Path(os.environ.get("ISSUELAB_ISSUE_STORE_PATH") or Path.cwd() / ".issuelab" / "issues.db")
+    with _DEFAULT_STORE_LOCK:
+        if _DEFAULT_STORE is None or _DEFAULT_STORE.path != path:
+            _DEFAULT_STORE = IssueStore(path)
+        return _DEFAULT_STORE
+
+
+def reset_issue_store() -> None:
+    """重置进程级默认存储（测试用）"""
+    global _DEFAULT_STORE
+    with _DEFAULT_STORE_LOCK:
+        _DEFAULT_STORE = None
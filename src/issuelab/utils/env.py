@@ -0,0 +1,34 @@
+"""Helpers for reading ISSUELAB_* environment settings."""
+
+import os
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+_FALSE_VALUES = {"0", "false", "no", "off"}
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Parse a boolean flag (1/true/yes/on, 0/false/no/off); unset or other values give default."""
+    value = os.environ.get(name, "").strip().lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    return default
+
+
+def env_int(name: str, default: int, *, minimum: int | None = None) -> int:
+    """Parse an integer setting; invalid values or values below minimum give default."""
+    try:
+        value = int(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return default if minimum is not None and value < minimum else value
+
+
+def env_float(name: str, default: float, *, minimum: float | None = None) -> float:
+    """Parse a float setting; invalid values or values below minimum give default."""
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return default if minimum is not None and value < minimum else value
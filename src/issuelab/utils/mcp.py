@@ -0,0 +1,11 @@
+"""Helpers shared by in-process SDK MCP tools."""
+
+from typing import Any
+
+
+def text_result(text: str, is_error: bool = False) -> dict[str, Any]:
+    """Build an MCP tool result with a single text block."""
+    result: dict[str, Any] = {"content": [{"type": "text", "text": text}]}
+    if is_error:
+        result["is_error"] = True
+    return result
@@ -0,0 +1,22 @@
+"""pytest 配置：墙钟计时对比类基准默认跳过
+
+带 @pytest.mark.perf 的测试比较实际耗时，结果受机器负载影响，只在 ISSUELAB_RUN_PERF=1 时运行：
+    ISSUELAB_RUN_PERF=1 python -m pytest -m perf -s
+"""
+
+import os
+
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: 墙钟计时对比基准（ISSUELAB_RUN_PERF=1 时运行）")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("ISSUELAB_RUN_PERF", "0").strip().lower() in {"1", "true", "yes", "on"}:
+        return
+    skip_perf = pytest.mark.skip(reason="计时基准默认跳过（设置 ISSUELAB_RUN_PERF=1 运行）")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip_perf)
@@ -0,0 +1,130 @@
+"""测试 agent 并发准入控制"""
+
+import asyncio
+import time
+
+import pytest
+
+from issuelab.agents import executor
+from issuelab.agents.admission import WeightedLimiter, get_agent_admission, get_max_concurrency
+from issuelab.retry import retry_async
+
+
+async def test_limiter_respects_capacity_and_weights():
+    limiter = WeightedLimiter(3)
+    active = {"now": 0, "peak": 0}
+
+    async def worker(weight: int) -> None:
+        async with limiter.slot(weight):
+            active["now"] += weight
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= weight
+
+    await asyncio.gather(*(worker(w) for w in (2, 1, 2, 1, 1)))
+
+    assert active["peak"] <= 3
+    assert limiter.in_use == 0
+
+
+async def test_limiter_admits_waiters_by_priority():
+    limiter = WeightedLimiter(1)
+    order: list[str] = []
+    await limiter.acquire()
+
+    async def worker(name: str, priority: int) -> None:
+        async with limiter.slot(1, priority):
+            order.append(name)
+
+    tasks = [asyncio.create_task(worker(name, prio)) for name, prio in (("low", 0), ("high", 5), ("mid", 2))]
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["high", "mid", "low"]
+
+
+async def test_cancelled_waiter_does_not_leak_capacity():
+    limiter = WeightedLimiter(1)
+    await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    limiter.release()
+    assert limiter.in_use == 0
+    await asyncio.wait_for(limiter.acquire(), timeout=1)
+
+
+def test_admission_config(monkeypatch):
+    monkeypatch.setattr(
+        "issuelab.agents.registry.get_agent_config",
+        lambda name: {"heavy": {"concurrency_weight": 3, "priority": 7}}.get(name),
+    )
+    assert get_agent_admission("heavy") == (3, 7)
+    assert get_agent_admission("gqy20", multistage=True) == (2, 0)
+    assert get_agent_admission("plain") == (1, 0)
+
+    monkeypatch.setenv("ISSUELAB_AGENT_MAX_CONCURRENCY", "bogus")
+    assert get_max_concurrency() == 4
+
+
+async def _run_fanout(monkeypatch, capacity: int, agents: list[str]) -> tuple[dict, float, dict]:
+    """以模拟限流 API 运行 run_agents_parallel：同时超过 4 个请求即返回 429"""
+    monkeypatch.setenv("ISSUELAB_AGENT_MAX_CONCURRENCY", str(capacity))
+    monkeypatch.setattr("issuelab.agents.discovery.load_prompt", lambda name: f"你是 {name}")
+    api = {"active": 0, "rate_limited": 0}
+
+    class RateLimitedError(Exception):
+        pass
+
+    async def fake_api_call(name: str) -> dict:
+        api["active"] += 1
+        try:
+            if api["active"] > 4:
+                api["rate_limited"] += 1
+                raise RateLimitedError("429")
+            await asyncio.sleep(0.05)
+            return {"response": name, "cost_usd": 0.0, "num_turns": 1, "tool_calls": []}
+        finally:
+            api["active"] -= 1
+
+    async def fake_run_single_agent(prompt: str, agent_name: str) -> dict:
+        return await retry_async(fake_api_call, agent_name, max_retries=5, initial_delay=0.1)
+
+    monkeypatch.setattr(executor, "run_single_agent", fake_run_single_agent)
+
+    start = time.perf_counter()
+    results = await executor.run_agents_parallel(1, agents, context="## 协作指南\n已注入")
+    return results, time.perf_counter() - start, api
+
+
+async def test_fanout_bounded_avoids_retry_storm(monkeypatch):
+    """8 个 agent 同时触发时，限流器避免 429 重试级联"""
+    agents = [f"bench_agent_{i}" for i in range(8)]
+
+    unbounded, unbounded_seconds, unbounded_api = await _run_fanout(monkeypatch, 100, agents)
+    bounded, bounded_seconds, bounded_api = await _run_fanout(monkeypatch, 4, agents)
+
+    assert set(unbounded) == set(bounded) == set(agents)
+    assert unbounded_api["rate_limited"] > 0
+    assert bounded_api["rate_limited"] == 0
+    assert max(r["queue_wait_seconds"] for r in bounded.values()) > 0
+
+
+@pytest.mark.perf
+async def test_fanout_bounded_is_faster_than_retry_storm(monkeypatch):
+    agents = [f"bench_agent_{i}" for i in range(8)]
+
+    _, unbounded_seconds, unbounded_api = await _run_fanout(monkeypatch, 100, agents)
+    _, bounded_seconds, bounded_api = await _run_fanout(monkeypatch, 4, agents)
+
+    print(
+        f"\n[bench] 8-agent fan-out: unbounded {unbounded_seconds * 1000:.0f} ms "
+        f"({unbounded_api['rate_limited']} x 429), bounded {bounded_seconds * 1000:.0f} ms "
+        f"({bounded_api['rate_limited']} x 429)"
+    )
+    assert bounded_seconds < unbounded_seconds
@@ -285,6 +285,102 @@ enabled: false
         assert summary["success_count"] == 1
         assert summary["local_agents"] == ["alice"]
 
+    @staticmethod
+    def _fork_registry(count: int) -> dict:
+        registry = {}
+        for i in range(count):
+            name = f"user{i}"
+            registry[name] = {"owner": name, "repository": f"{name}/IssueLab", "agent_type": "user"}
+        return registry
+
+    def test_dispatch_mentions_fans_out_concurrently(self, monkeypatch):
+        """Remote dispatches run on a bounded pool and keep the summary shape."""
+        import threading
+        import time
+
+        from issuelab.cli import dispatch as dispatch_mod
+
+        registry = self._fork_registry(5)
+        monkeypatch.setattr(dispatch_mod, "load_registry", lambda _agents_dir: registry)
+
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def fake_token(repository, app_id, private_key):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.05)
+            with lock:
+                state["active"] -= 1
+            return None if repository == "user3/IssueLab" else "tok"
+
+        monkeypatch.setattr(dispatch_mod, "get_token_for_repository", fake_token)
+        monkeypatch.setattr(
+            dispatch_mod,
+            "dispatch_event",
+            lambda repository, event_type, payload, token, **_kw: (repository != "user1/IssueLab", "HTTP_500"),
+        )
+
+        summary = dispatch_mod.dispatch_mentions(
+            mentions=list(registry),
+            agents_dir="agents",
+            source_repo="gqy20/IssueLab",
+            issue_number=1,
+            app_id="fake_app_id",
+            app_private_key="fake_private_key",
+            max_workers=5,
+        )
+
+        assert summary["total_count"] == 5
+        assert summary["success_count"] == 3
+        assert summary["failed_agents"] == [
+            {"username": "user1", "repository": "user1/IssueLab", "error": "HTTP_500"},
+            {"username": "user3", "repository": "user3/IssueLab", "error": "TOKEN_GENERATION_FAILED"},
+        ]
+        assert state["peak"] > 1
+
+    def test_dispatch_mentions_serial_when_single_worker(self, monkeypatch):
+        """max_workers=1 keeps strictly serial dispatch."""
+        import threading
+
+        from issuelab.cli import dispatch as dispatch_mod
+
+        registry = self._fork_registry(3)
+        monkeypatch.setattr(dispatch_mod, "load_registry", lambda _agents_dir: registry)
+        threads = set()
+
+        def fake_token(repository, app_id, private_key):
+            threads.add(threading.current_thread().name)
+            return "tok"
+
+        monkeypatch.setattr(dispatch_mod, "get_token_for_repository", fake_token)
+        monkeypatch.setattr(dispatch_mod, "dispatch_event", lambda *a, **_kw: (True, ""))
+
+        summary = dispatch_mod.dispatch_mentions(
+            mentions=list(registry),
+            agents_dir="agents",
+            source_repo="gqy20/IssueLab",
+            issue_number=1,
+            app_id="fake_app_id",
+            app_private_key="fake_private_key",
+            max_workers=1,
+        )
+
+        assert summary["success_count"] == 3
+        assert threads == {threading.current_thread().name}
+
+    def test_resolve_dispatch_workers(self, monkeypatch):
+        from issuelab.cli.dispatch import _resolve_dispatch_workers
+
+        monkeypatch.setenv("ISSUELAB_DISPATCH_MAX_WORKERS", "8")
+        assert _resolve_dispatch_workers(None, 3) == 3
+        assert _resolve_dispatch_workers(None, 20) == 8
+        assert _resolve_dispatch_workers(2, 20) == 2
+        assert _resolve_dispatch_workers(None, 0) == 1
+        monkeypatch.setenv("ISSUELAB_DISPATCH_MAX_WORKERS", "bad")
+        assert _resolve_dispatch_workers(None, 20) == 4
+
 
 class TestDispatchCLI:
     """Tests for dispatch CLI mention parsing."""
@@ -0,0 +1,276 @@
+"""测试常驻 SDK 客户端池"""
+
+import sys
+import textwrap
+import time
+
+import anyio
+import pytest
+from claude_agent_sdk import AssistantMessage, ClaudeAgentOptions, ResultMessage, SystemMessage
+from claude_agent_sdk.types import TextBlock
+
+from issuelab.agents import executor
+from issuelab.agents.client_pool import agent_client_pool, get_active_client_pool
+
+
+class _FakeClient:
+    """进程内假客户端：记录连接/查询；/clear 与真实 CLI 一样本地处理，清空历史并开启新会话
+
+    clears_session=False 模拟 /clear 未生效（会话 ID 不变）的 CLI。
+    """
+
+    instances: list["_FakeClient"] = []
+
+    def __init__(self, options, fail_on: str | None = None, clears_session: bool = True) -> None:
+        self.options = options
+        self.fail_on = fail_on
+        self.clears_session = clears_session
+        self.history: list[str] = []
+        self.prompts: list[str] = []
+        self.connected = False
+        self.session = 0
+        self.cleared = False
+        _FakeClient.instances.append(self)
+
+    async def connect(self) -> None:
+        self.connected = True
+
+    async def disconnect(self) -> None:
+        self.connected = False
+
+    async def query(self, prompt: str) -> None:
+        self.prompts.append(prompt)
+        self.cleared = prompt == "/clear"
+        if prompt == "/clear":
+            if self.clears_session:
+                self.history.clear()
+                self.session += 1
+        else:
+            if prompt == self.fail_on:
+                raise RuntimeError("CLI 进程退出")
+            self.history.append(prompt)
+
+    async def receive_response(self):
+        session_id = f"s{self.session}"
+        yield SystemMessage(subtype="init", data={"session_id": session_id})
+        if not self.cleared:
+            yield AssistantMessage(content=[TextBlock(text=f"history={len(self.history)}")], model="fake")
+        yield ResultMessage(
+            subtype="success", duration_ms=1, duration_api_ms=1, is_error=False, num_turns=1, session_id=session_id
+        )
+
+
+@pytest.fixture
+def pool_env(monkeypatch):
+    monkeypatch.setenv("ISSUELAB_SDK_CLIENT_POOL", "1")
+    _FakeClient.instances = []
+
+
+async def _texts(pool, prompt: str, options) -> list[str]:
+    texts = []
+    async for message in pool.query(prompt, options):
+        if isinstance(message, AssistantMessage):
+            texts.extend(b.text for b in message.content if isinstance(b, TextBlock))
+    return texts
+
+
+async def test_pool_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("ISSUELAB_SDK_CLIENT_POOL", raising=False)
+    async with agent_client_pool() as pool:
+        assert pool is None
+        assert get_active_client_pool() is None
+
+
+async def test_sequential_tasks_reuse_one_client_and_reset_between(pool_env):
+    options = ClaudeAgentOptions()
+    async with agent_client_pool(_FakeClient) as pool:
+        async with agent_client_pool() as nested:
+            assert nested is pool
+        results = [await _texts(pool, f"stage {i}", options) for i in range(3)]
+
+    assert results == [["history=1"]] * 3
+    assert len(_FakeClient.instances) == 1
+    assert _FakeClient.instances[0].prompts.count("/clear") == 2
+    assert not _FakeClient.instances[0].connected
+    assert pool.stats["spawned"] == 1 and pool.stats["reused"] == 2
+
+
+async def test_client_not_reused_when_clear_keeps_session(pool_env, monkeypatch):
+    """/clear 后 session_id 未切换（上下文可能仍在）时丢弃进程：当前任务走一次性 query，下一任务用新客户端"""
+
+    async def fake_sdk_query(*, prompt, options):
+        yield AssistantMessage(content=[TextBlock(text="one-shot")], model="fake")
+
+    monkeypatch.setattr("issuelab.agents.client_pool.query", fake_sdk_query)
+    options = ClaudeAgentOptions()
+    async with agent_client_pool(lambda opts: _FakeClient(opts, clears_session=False)) as pool:
+        results = [await _texts(pool, f"stage {i}", options) for i in range(3)]
+
+    assert results == [["history=1"], ["one-shot"], ["history=1"]]
+    assert len(_FakeClient.instances) == 2
+    assert all(len(c.history) == 1 for c in _FakeClient.instances)
+    assert pool.stats["discarded"] == 1
+
+
+async def test_clients_are_not_shared_across_agents(pool_env):
+    options = ClaudeAgentOptions()
+    async with agent_client_pool(_FakeClient) as pool:
+        for agent in ("alice", "bob", "alice"):
+            async for _message in pool.query(f"task for {agent}", options, agent_name=agent):
+                pass
+
+    assert [c.prompts for c in _FakeClient.instances] == [
+        ["task for alice", "/clear", "task for alice"],
+        ["task for bob"],
+    ]
+
+
+async def test_failed_task_discards_client(pool_env):
+    options = ClaudeAgentOptions()
+    async with agent_client_pool(lambda opts: _FakeClient(opts, fail_on="boom")) as pool:
+        with pytest.raises(RuntimeError, match="CLI 进程退出"):
+            await _texts(pool, "boom", options)
+        assert await _texts(pool, "ok", options) == ["history=1"]
+
+    assert len(_FakeClient.instances) == 2
+    assert pool.stats["discarded"] == 1
+
+
+async def test_full_pool_evicts_idle_or_falls_back(pool_env, monkeypatch):
+    monkeypatch.setenv("ISSUELAB_SDK_CLIENT_POOL_SIZE", "1")
+    opts_a, opts_b = ClaudeAgentOptions(), ClaudeAgentOptions()
+    fallback_calls = []
+
+    async def fake_sdk_query(*, prompt, options):
+        fallback_calls.append(prompt)
+        yield AssistantMessage(content=[TextBlock(text="one-shot")], model="fake")
+
+    monkeypatch.setattr("issuelab.agents.client_pool.query", fake_sdk_query)
+
+    async with agent_client_pool(_FakeClient) as pool:
+        await _texts(pool, "a", opts_a)
+        await _texts(pool, "b", opts_b)
+        assert pool.stats["spawned"] == 2
+
+        # 池满且唯一客户端正忙：回退为一次性 query
+        busy = pool.query("held", opts_b)
+        await busy.__anext__()
+        assert await _texts(pool, "c", opts_a) == ["one-shot"]
+        await busy.aclose()
+
+    assert fallback_calls == ["c"]
+
+
+_FAKE_CLI = textwrap.dedent(
+    """
+    import json
+    import os
+    import sys
+    import time
+
+    if "-v" in sys.argv[1:]:
+        print("9.9.9 (Claude Code)")
+        sys.exit(0)
+
+    with open(os.environ["FAKE_CLI_SPAWN_LOG"], "a") as fh:
+        fh.write("spawn\\n")
+    # 模拟 Node CLI 启动开销
+    time.sleep(float(os.environ.get("FAKE_CLI_STARTUP", "0.2")))
+
+    def emit(obj):
+        sys.stdout.write(json.dumps(obj) + "\\n")
+        sys.stdout.flush()
+
+    history = 0
+    session = 0
+    for line in sys.stdin:
+        msg = json.loads(line)
+        if msg.get("type") == "control_request":
+            emit({"type": "control_response", "response": {
+                "subtype": "success", "request_id": msg["request_id"], "response": {}}})
+            continue
+        if msg.get("type") != "user":
+            continue
+        content = msg["message"]["content"]
+        if content == "/clear":
+            # 与真实 CLI 一致：本地处理，开启新会话并发出新的 init
+            history = 0
+            session += 1
+            emit({"type": "system", "subtype": "init", "session_id": f"fake-{session}"})
+        else:
+            history += 1
+            emit({"type": "assistant", "session_id": f"fake-{session}", "message": {
+                "model": "fake", "content": [{"type": "text", "text": f"history={history}"}]}})
+        emit({"type": "result", "subtype": "success", "duration_ms": 1, "duration_api_ms": 1, "is_error": False,
+              "num_turns": 1, "session_id": f"fake-{session}", "total_cost_usd": 0.0, "usage": {}})
+    """
+)
+
+
+async def _run_pool_stages(monkeypatch, tmp_path) -> dict[str, tuple[float, int, list[str]]]:
+    """5 个串行阶段（同 gqy20 多阶段）分别用一次性 query 与客户端池运行"""
+    cli = tmp_path / "claude"
+    cli.write_text(f"#!{sys.executable}\n{_FAKE_CLI}", encoding="utf-8")
+    cli.chmod(0o755)
+    spawn_log = tmp_path / "spawns.log"
+    monkeypatch.setenv("FAKE_CLI_SPAWN_LOG", str(spawn_log))
+    monkeypatch.setenv("CLAUDE_AGENT_SDK_SKIP_VERSION_CHECK", "1")
+    options = ClaudeAgentOptions(cli_path=str(cli))
+    monkeypatch.setattr(executor, "create_agent_options", lambda **kwargs: options)
+    monkeypatch.setattr(executor, "print", lambda *a, **k: None, raising=False)
+
+    async def run_stages() -> tuple[float, int, list[str]]:
+        spawn_log.write_text("", encoding="utf-8")
+        start = time.perf_counter()
+        responses = [(await executor.run_single_agent(f"stage {i}", "bench_pool_agent"))["response"] for i in range(5)]
+        return time.perf_counter() - start, len(spawn_log.read_text().splitlines()), responses
+
+    monkeypatch.setenv("ISSUELAB_SDK_CLIENT_POOL", "0")
+    cold = await run_stages()
+
+    monkeypatch.setenv("ISSUELAB_SDK_CLIENT_POOL", "1")
+    async with agent_client_pool():
+        warm = await run_stages()
+    return {"cold": cold, "warm": warm}
+
+
+async def test_pool_saves_cli_spawns(pool_env, monkeypatch, tmp_path):
+    runs = await _run_pool_stages(monkeypatch, tmp_path)
+    _, cold_spawns, cold = runs["cold"]
+    _, warm_spawns, warm = runs["warm"]
+
+    assert cold == warm == ["history=1"] * 5
+    assert cold_spawns == 5
+    assert warm_spawns == 1
+
+
+@pytest.mark.perf
+async def test_pool_saves_cli_spawns_benchmark(pool_env, monkeypatch, tmp_path):
+    runs = await _run_pool_stages(monkeypatch, tmp_path)
+    cold_seconds, cold_spawns, _ = runs["cold"]
+    warm_seconds, warm_spawns, _ = runs["warm"]
+
+    saved_ms = (cold_seconds - warm_seconds) * 1000
+    print(
+        f"\n[bench] 5 stages: one-shot {cold_seconds * 1000:.0f} ms ({cold_spawns} spawns), "
+        f"pooled {warm_seconds * 1000:.0f} ms ({warm_spawns} spawn), "
+        f"saved {saved_ms / max(1, cold_spawns - warm_spawns):.0f} ms per avoided spawn"
+    )
+    assert warm_seconds < cold_seconds
+
+
+async def test_host_error_propagates_unwrapped(pool_env):
+    with pytest.raises(ValueError):
+        async with agent_client_pool(_FakeClient) as pool:
+            await _texts(pool, "x", ClaudeAgentOptions())
+            raise ValueError("stage failed")
+
+
+async def test_concurrent_borrowers_get_distinct_clients(pool_env):
+    options = ClaudeAgentOptions()
+    async with agent_client_pool(_FakeClient) as pool, anyio.create_task_group() as tg:
+        for i in range(3):
+            tg.start_soon(_texts, pool, f"p{i}", options)
+
+    assert len(_FakeClient.instances) == 3
+    assert all(c.history == [] or len(c.history) == 1 for c in _FakeClient.instances)
@@ -0,0 +1,33 @@
+"""Tests for environment and MCP result helpers."""
+
+from issuelab.utils.env import env_flag, env_float, env_int
+from issuelab.utils.mcp import text_result
+
+
+def test_env_flag_values(monkeypatch):
+    monkeypatch.setenv("ISSUELAB_TEST_FLAG", "Yes")
+    assert env_flag("ISSUELAB_TEST_FLAG") is True
+    monkeypatch.setenv("ISSUELAB_TEST_FLAG", "off")
+    assert env_flag("ISSUELAB_TEST_FLAG", default=True) is False
+
+
+def test_env_flag_unset_or_unknown_uses_default(monkeypatch):
+    monkeypatch.delenv("ISSUELAB_TEST_FLAG", raising=False)
+    assert env_flag("ISSUELAB_TEST_FLAG", default=True) is True
+    monkeypatch.setenv("ISSUELAB_TEST_FLAG", "maybe")
+    assert env_flag("ISSUELAB_TEST_FLAG") is False
+
+
+def test_env_numbers_fall_back_on_invalid_or_below_minimum(monkeypatch):
+    monkeypatch.setenv("ISSUELAB_TEST_NUM", "abc")
+    assert env_int("ISSUELAB_TEST_NUM", 4) == 4
+    assert env_float("ISSUELAB_TEST_NUM", 1.5) == 1.5
+    monkeypatch.setenv("ISSUELAB_TEST_NUM", "0")
+    assert env_int("ISSUELAB_TEST_NUM", 4, minimum=1) == 4
+    monkeypatch.setenv("ISSUELAB_TEST_NUM", "2.5")
+    assert env_float("ISSUELAB_TEST_NUM", 1.0, minimum=0.0) == 2.5
+
+
+def test_text_result_marks_errors():
+    assert text_result("ok") == {"content": [{"type": "text", "text": "ok"}]}
+    assert text_result("bad", is_error=True)["is_error"] is True
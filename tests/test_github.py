@@ -1,11 +1,42 @@
 """测试 GitHub 工具"""
 
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from issuelab.tools.github import MAX_COMMENT_LENGTH, get_issue_info, post_comment, truncate_text, update_label
+from issuelab.tools.github import (
+    MAX_COMMENT_LENGTH,
+    get_issue_info,
+    get_issues_batch,
+    post_comment,
+    truncate_text,
+    update_label,
+)
+
+
+@pytest.fixture(autouse=True)
+def _gh_backend(monkeypatch, tmp_path):
+    """默认使用 gh 后端（以下 subprocess mock 测试针对 gh CLI 路径）
+
+    未指定仓库时 gh 后端直接 `gh issue view`；本地快照写入临时目录。
+    """
+    from issuelab.tools.issue_store import reset_issue_store
+
+    monkeypatch.setenv("ISSUELAB_GITHUB_BACKEND", "gh")
+    monkeypatch.delenv("GITHUB_REPOSITORY", raising=False)
+    monkeypatch.setenv("ISSUELAB_ISSUE_STORE_PATH", str(tmp_path / "issues.db"))
+    reset_issue_store()
+    yield
+    reset_issue_store()
 
 
 def test_get_issue_info():
@@ -234,3 +265,387 @@ def test_truncate_text_preserves_encoding():
     result = truncate_text(text, max_length=1000)
     assert len(result) <= 1000
     assert isinstance(result, str)
+
+
+class _FakeGitHubState:
+    def __init__(self) -> None:
+        self.requests: list[tuple[str, str, dict | None]] = []
+
+
+class _FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 头与正文合并写出并关闭 Nagle，避免 keep-alive 下的 delayed-ACK 停顿干扰计时
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    state: _FakeGitHubState
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _reply(self, status: int, body=None) -> None:
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def do_GET(self) -> None:
+        self.state.requests.append(("GET", self.path, None))
+        if self.path.startswith("/repos/o/r/issues/1/comments"):
+            self._reply(
+                200,
+                [
+                    {
+                        "id": 11,
+                        "user": {"login": "alice"},
+                        "body": "第一条评论",
+                        "created_at": "2026-01-02T03:04:05Z",
+                        "updated_at": "2026-01-02T03:04:05Z",
+                    }
+                ],
+            )
+        elif self.path.startswith("/repos/o/r/issues/1"):
+            self._reply(
+                200,
+                {
+                    "number": 1,
+                    "title": "测试 Issue",
+                    "body": "内容",
+                    "labels": [{"name": "bug"}],
+                    "comments": 1,
+                    "updated_at": "2026-01-02T03:04:05Z",
+                },
+            )
+        else:
+            self._reply(404, {"message": "Not Found"})
+
+    def do_POST(self) -> None:
+        body = self._read_body()
+        self.state.requests.append(("POST", self.path, body))
+        if self.path == "/graphql":
+            self._reply(200, self._graphql(body))
+            return
+        self._reply(201 if self.path.endswith("/comments") else 200, {"id": 1})
+
+    def _graphql(self, body: dict) -> dict:
+        aliases = re.findall(r"(i\d+): issue\(number: (\d+)\)", body["query"])
+        repository = {}
+        for alias, number in aliases:
+            if number == "404":
+                repository[alias] = None
+                continue
+            repository[alias] = {
+                "number": int(number),
+                "title": f"Issue {number}",
+                "body": "内容",
+                "labels": {"nodes": [{"name": "bug"}]},
+                "comments": {
+                    "totalCount": 1,
+                    "nodes": [{"author": {"login": "alice"}, "body": "hi", "createdAt": "2026-01-02T00:00:00Z"}],
+                },
+            }
+        return {"data": {"repository": repository}}
+
+    def do_DELETE(self) -> None:
+        self.state.requests.append(("DELETE", self.path, None))
+        self._reply(404, {"message": "Label does not exist"})
+
+
+@pytest.fixture
+def fake_github(monkeypatch, tmp_path):
+    """本地 mock GitHub API，并把共享客户端指向它"""
+    from issuelab.tools.github_client import reset_github_client
+    from issuelab.tools.issue_store import reset_issue_store
+
+    state = _FakeGitHubState()
+    handler = type("Handler", (_FakeGitHubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setenv("GITHUB_API_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setenv("GH_TOKEN", "test-token")
+    monkeypatch.setenv("GITHUB_REPOSITORY", "o/r")
+    monkeypatch.setenv("ISSUELAB_GITHUB_BACKEND", "rest")
+    monkeypatch.setenv("ISSUELAB_ISSUE_STORE_PATH", str(tmp_path / "issues.db"))
+    reset_github_client()
+    reset_issue_store()
+    try:
+        yield state
+    finally:
+        reset_github_client()
+        reset_issue_store()
+        server.shutdown()
+        server.server_close()
+
+
+def test_rest_get_issue_info_matches_gh_shape(fake_github):
+    """REST 后端返回与 gh --json 相同的字段结构"""
+    with patch("issuelab.tools.github.subprocess.run") as mock_run:
+        result = get_issue_info(1, format_comments=True)
+        mock_run.assert_not_called()
+
+    assert result["title"] == "测试 Issue"
+    assert result["labels"][0]["name"] == "bug"
+    assert result["comment_count"] == 1
+    assert result["comments"] == "- **[alice]** (2026-01-02):\n第一条评论"
+
+
+def test_rest_get_issue_info_reuses_local_snapshot(fake_github):
+    """issue 未更新时再次获取不再请求评论接口"""
+    first = get_issue_info(1, format_comments=True)
+    second = get_issue_info(1, format_comments=True)
+
+    comment_requests = [r for r in fake_github.requests if r[1].startswith("/repos/o/r/issues/1/comments")]
+    assert len(comment_requests) == 1
+    assert second == first
+
+
+def test_rest_post_comment_sends_body_without_temp_file(fake_github, monkeypatch):
+    monkeypatch.setattr("issuelab.tools.github._load_mentions_max_count", lambda: 5)
+
+    def fail_tempfile(*_args, **_kwargs):
+        raise AssertionError("REST backend must not create temp files")
+
+    monkeypatch.setattr("issuelab.tools.github.tempfile.NamedTemporaryFile", fail_tempfile)
+
+    assert post_comment(1, "测试评论", auto_clean=False, repo="o/r") is True
+    assert fake_github.requests[-1] == ("POST", "/repos/o/r/issues/1/comments", {"body": "测试评论"})
+
+
+def test_rest_update_label(fake_github):
+    assert update_label(1, "bot:needs triage", "add") is True
+    assert fake_github.requests[-1] == ("POST", "/repos/o/r/issues/1/labels", {"labels": ["bot:needs triage"]})
+
+    # 移除不存在的标签与 gh 行为一致，视为成功
+    assert update_label(1, "bot:needs triage", "remove") is True
+    assert fake_github.requests[-1][1] == "/repos/o/r/issues/1/labels/bot%3Aneeds%20triage"
+
+
+def test_rest_get_issue_info_does_not_retry_404(fake_github):
+    """404 不可重试：REST 路径只在 GitHubClient 内重试限流/5xx/网络异常，外层不再叠加重试"""
+    with pytest.raises(RuntimeError, match="HTTP 404"):
+        get_issue_info(2)
+
+    assert [r[1] for r in fake_github.requests] == ["/repos/o/r/issues/2"]
+
+
+def test_rest_get_issue_info_retries_network_errors(fake_github, monkeypatch):
+    """超时/连接失败时 REST 后端仍重试（与原先 get_issue_info 的 3 次尝试一致）"""
+    import requests
+
+    from issuelab.tools.github_client import get_github_client
+
+    monkeypatch.setattr("issuelab.retry.time.sleep", lambda _s: None)
+    session = get_github_client().session
+    real_request = session.request
+    failures = {"left": 2}
+
+    def flaky_request(*args, **kwargs):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise requests.Timeout("read timed out")
+        return real_request(*args, **kwargs)
+
+    monkeypatch.setattr(session, "request", flaky_request)
+    assert get_issue_info(1)["title"] == "测试 Issue"
+    assert failures["left"] == 0
+
+
+def test_get_issues_batch_uses_one_query_per_50_issues(fake_github):
+    numbers = list(range(1, 61)) + [404]
+
+    issues = get_issues_batch(numbers, repo="o/r")
+
+    graphql_calls = [r for r in fake_github.requests if r[1] == "/graphql"]
+    assert len(graphql_calls) == 2
+    assert graphql_calls[0][2]["variables"] == {"owner": "o", "name": "r"}
+    assert set(issues) == set(range(1, 61))
+    assert issues[7]["title"] == "Issue 7"
+    assert issues[7]["comments"][0]["author"]["login"] == "alice"
+    assert issues[7]["comment_count"] == 1
+    assert issues[7]["comments_complete"] is True
+
+
+def test_get_issues_batch_formats_comments(fake_github):
+    issues = get_issues_batch([3], format_comments=True)
+    assert issues[3]["comments"] == "- **[alice]** (2026-01-02):\nhi"
+
+
+def test_get_issues_batch_via_gh_cli(monkeypatch):
+    """gh 后端通过 `gh api graphql` 执行同一查询"""
+    payload = {"data": {"repository": {"i1": {"number": 1, "title": "t", "body": "b", "comments": {"nodes": []}}}}}
+
+    with patch("issuelab.tools.github.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0, stdout=json.dumps(payload), stderr="")
+        issues = get_issues_batch([1], repo="o/r")
+
+    cmd = mock_run.call_args[0][0]
+    assert cmd[:3] == ["gh", "api", "graphql"]
+    assert "owner=o" in cmd and "name=r" in cmd
+    assert issues[1]["title"] == "t"
+
+
+def test_default_backend_is_gh_cli(monkeypatch):
+    """未设置 ISSUELAB_GITHUB_BACKEND 时即使有 token 和仓库也使用 gh CLI"""
+    monkeypatch.delenv("ISSUELAB_GITHUB_BACKEND", raising=False)
+    monkeypatch.setenv("GH_TOKEN", "test-token")
+    monkeypatch.setenv("GITHUB_REPOSITORY", "o/r")
+
+    with patch("issuelab.tools.github.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0)
+        assert update_label(1, "bug") is True
+        mock_run.assert_called_once()
+
+
+def test_gh_get_issue_info_retries_failed_subprocess(monkeypatch):
+    monkeypatch.setattr("issuelab.retry.time.sleep", lambda _s: None)
+    with patch("issuelab.tools.github.subprocess.run") as mock_run:
+        mock_run.side_effect = [
+            MagicMock(returncode=1, stdout="", stderr="HTTP 502"),
+            MagicMock(returncode=0, stdout='{"number":1,"title":"t","body":"","labels":[]}'),
+        ]
+        assert get_issue_info(1)["title"] == "t"
+        assert mock_run.call_count == 2
+
+
+class _FakeGhApi:
+    """模拟 `gh api` 子进程：issue 详情 + 支持 since 过滤的评论分页"""
+
+    def __init__(self) -> None:
+        self.issue = {"number": 5, "title": "长讨论", "body": "正文", "labels": [], "comments": 0, "updated_at": ""}
+        self.comments: list[dict] = []
+        self.cmds: list[list[str]] = []
+
+    def add_comment(self, comment_id: int, when: str) -> None:
+        self.comments.append(
+            {
+                "id": comment_id,
+                "node_id": f"IC_{comment_id}",
+                "user": {"login": "alice"},
+                "body": f"评论 {comment_id}",
+                "created_at": when,
+                "updated_at": when,
+            }
+        )
+        self.issue.update(comments=len(self.comments), updated_at=when)
+
+    def __call__(self, cmd, capture_output, text, env):
+        self.cmds.append(cmd)
+        assert cmd[:2] == ["gh", "api"]
+        path = cmd[-1]
+        if "/comments?" in path:
+            since = re.search(r"since=([^&]+)", path)
+            since_value = since.group(1).replace("%3A", ":") if since else ""
+            page = [c for c in self.comments if c["updated_at"] >= since_value]
+            # 模拟 --paginate 逐页拼接输出
+            stdout = json.dumps(page[:1]) + json.dumps(page[1:])
+        else:
+            stdout = json.dumps(self.issue)
+        return MagicMock(returncode=0, stdout=stdout, stderr="")
+
+
+def test_default_backend_fetches_only_new_comments(monkeypatch):
+    """默认 gh 后端经本地快照增量同步：再次触发只拉取新增评论"""
+    monkeypatch.delenv("ISSUELAB_GITHUB_BACKEND", raising=False)
+    monkeypatch.setenv("GITHUB_REPOSITORY", "o/r")
+    fake = _FakeGhApi()
+    for i in range(1, 4):
+        fake.add_comment(i, f"2026-01-0{i}T00:00:00Z")
+    monkeypatch.setattr("issuelab.tools.github.subprocess.run", fake)
+
+    first = get_issue_info(5)
+    assert [c["id"] for c in first["comments"]] == ["IC_1", "IC_2", "IC_3"]
+    assert first["comments"][0]["author"]["login"] == "alice"
+
+    fake.add_comment(4, "2026-01-04T00:00:00Z")
+    fake.cmds.clear()
+    second = get_issue_info(5, format_comments=True)
+
+    comment_cmds = [cmd for cmd in fake.cmds if "/comments?" in cmd[-1]]
+    assert len(comment_cmds) == 1
+    assert "since=2026-01-03T00%3A00%3A00Z" in comment_cmds[0][-1]
+    assert second["comment_count"] == 4
+    assert second["comments"].endswith("评论 4")
+
+    fake.cmds.clear()
+    assert get_issue_info(5)["comment_count"] == 4
+    assert [cmd for cmd in fake.cmds if "/comments?" in cmd[-1]] == []
+
+
+def test_get_issues_batch_uses_snapshot_for_truncated_comments(monkeypatch):
+    """批量查询评论超过单页时，issue 未更新则取本地快照中的完整评论"""
+    monkeypatch.setenv("GITHUB_REPOSITORY", "o/r")
+    fake = _FakeGhApi()
+    for i in range(1, 4):
+        fake.add_comment(i, f"2026-01-0{i}T00:00:00Z")
+    monkeypatch.setattr("issuelab.tools.github.subprocess.run", fake)
+    get_issue_info(5)
+
+    node = {
+        "number": 5,
+        "title": "长讨论",
+        "body": "正文",
+        "updatedAt": "2026-01-03T00:00:00Z",
+        "comments": {"totalCount": 3, "nodes": [{"id": "IC_1", "databaseId": 1, "author": {"login": "alice"}}]},
+    }
+    payload = {"data": {"repository": {"i5": node}}}
+    with patch("issuelab.tools.github.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0, stdout=json.dumps(payload), stderr="")
+        issue = get_issues_batch([5])[5]
+
+    assert issue["comments_complete"] is True
+    assert [c["id"] for c in issue["comments"]] == ["IC_1", "IC_2", "IC_3"]
+
+
+def test_auto_backend_falls_back_to_gh_without_token(monkeypatch):
+    monkeypatch.setenv("ISSUELAB_GITHUB_BACKEND", "auto")
+    for name in ("PAT_TOKEN", "GH_TOKEN", "GITHUB_TOKEN"):
+        monkeypatch.delenv(name, raising=False)
+
+    with patch("issuelab.tools.github.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0)
+        assert update_label(1, "bug") is True
+        mock_run.assert_called_once()
+
+
+@pytest.mark.perf
+def test_backend_latency_benchmark(fake_github, tmp_path, monkeypatch):
+    """基准：同一 mock 服务下 REST 后端 vs gh 子进程后端的单次调用延迟
+
+    gh 由一个 Python stub 可执行文件代替：每次调用都新建进程并对 mock 服务发起请求，
+    计入进程启动与新连接开销（真实 gh 还要加上 Go 运行时初始化与 TLS 握手）。
+    关闭本地快照，两种后端都全量获取评论。
+    """
+    monkeypatch.setenv("ISSUELAB_ISSUE_STORE", "0")
+    fake_gh = tmp_path / "gh"
+    fake_gh.write_text(
+        f"#!{sys.executable}\n"
+        "import json, os, urllib.request\n"
+        "base = os.environ['GITHUB_API_URL']\n"
+        "issue = json.load(urllib.request.urlopen(base + '/repos/o/r/issues/1'))\n"
+        "comments = json.load(urllib.request.urlopen(base + '/repos/o/r/issues/1/comments'))\n"
+        "print(json.dumps({**issue, 'comments': comments}))\n",
+        encoding="utf-8",
+    )
+    fake_gh.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ.get('PATH', '')}")
+
+    def median_latency(backend: str, calls: int = 15) -> float:
+        monkeypatch.setenv("ISSUELAB_GITHUB_BACKEND", backend)
+        get_issue_info(1)  # 预热（建立连接 / 页缓存）
+        samples = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            get_issue_info(1)
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples)
+
+    rest_latency = median_latency("rest")
+    gh_latency = median_latency("gh")
+    print(f"\n[bench] get_issue_info: rest {rest_latency * 1000:.2f} ms/call, gh {gh_latency * 1000:.2f} ms/call")
+    assert rest_latency < gh_latency
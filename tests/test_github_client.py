@@ -0,0 +1,256 @@
+"""测试共享连接池的 GitHub REST 客户端（本地 stub HTTP 服务）"""
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from issuelab.retry import retry_sync
+from issuelab.tools.github_client import GitHubClient, RateLimitState, _token_digest
+
+
+class _Headers:
+    """只带响应头的最小响应对象"""
+
+    def __init__(self, headers: dict) -> None:
+        self.headers = headers
+
+
+class _StubState:
+    def __init__(self) -> None:
+        self.requests: list[dict] = []
+        self.client_ports: set[int] = set()
+        self.rate_limit_failures = 0
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: _StubState
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send_json(self, status: int, body, headers: dict | None = None) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_empty(self, status: int, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        state = self.state
+        state.client_ports.add(self.client_address[1])
+        state.requests.append(
+            {
+                "path": self.path,
+                "if_none_match": self.headers.get("If-None-Match"),
+                "authorization": self.headers.get("Authorization"),
+            }
+        )
+        base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        if self.path.startswith("/etag"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._send_empty(304, {"ETag": '"v1"'})
+            else:
+                self._send_json(200, {"value": 1}, {"ETag": '"v1"', "X-RateLimit-Remaining": "4999"})
+        elif self.path.startswith("/limited"):
+            if state.rate_limit_failures > 0:
+                state.rate_limit_failures -= 1
+                self._send_json(429, {"message": "rate limit"}, {"Retry-After": "0"})
+            else:
+                self._send_json(200, {"ok": True})
+        elif self.path.startswith("/items"):
+            page = 2 if "?page=2" in self.path else 1
+            headers = {}
+            if page == 1:
+                headers["Link"] = f'<{base}/items?page=2&per_page=2>; rel="next"'
+            self._send_json(200, [{"id": page * 10 + i} for i in range(2)], headers)
+        elif self.path.startswith("/runs"):
+            self._send_json(200, {"workflow_runs": [{"id": 1}, {"id": 2}]})
+        else:
+            self._send_json(404, {"message": "Not Found"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", "0"))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.state.requests.append({"path": self.path, "method": "POST", "body": body})
+        if self.path.startswith("/flaky"):
+            self._send_json(502, {"message": "bad gateway"})
+        else:
+            self._send_empty(204)
+
+
+@pytest.fixture
+def stub_server():
+    state = _StubState()
+    handler = type("Handler", (_StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", state
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def client(stub_server):
+    base_url, _state = stub_server
+    client = GitHubClient(base_url=base_url, token="test-token", initial_delay=0.01)
+    yield client
+    client.close()
+
+
+def test_etag_revalidation_reuses_cached_body(client, stub_server):
+    _base, state = stub_server
+
+    assert client.get_json("etag") == {"value": 1}
+    assert client.get_json("etag") == {"value": 1}
+
+    assert [r["if_none_match"] for r in state.requests] == [None, '"v1"']
+    assert client.stats["not_modified"] == 1
+    assert client.rate_limit.remaining == 4999
+    assert state.requests[0]["authorization"] == "Bearer test-token"
+
+
+def test_rate_limited_response_is_retried(client, stub_server):
+    _base, state = stub_server
+    state.rate_limit_failures = 2
+
+    response = client.request("GET", "limited")
+
+    assert response.status_code == 200
+    assert len(state.requests) == 3
+    assert client.stats["retries"] == 2
+
+
+def test_retries_exhausted_returns_last_response(stub_server):
+    base_url, state = stub_server
+    state.rate_limit_failures = 10
+    client = GitHubClient(base_url=base_url, token="t", max_retries=1, initial_delay=0.01)
+
+    response = client.request("GET", "limited")
+
+    assert response.status_code == 429
+    assert len(state.requests) == 2
+
+
+def test_post_5xx_is_not_retried(client, stub_server):
+    """非幂等请求遇到 5xx 不重试，避免重复触发写操作"""
+    _base, state = stub_server
+
+    response = client.request("POST", "flaky", json={"a": 1})
+
+    assert response.status_code == 502
+    assert len(state.requests) == 1
+    assert state.requests[0]["body"] == {"a": 1}
+
+
+def _unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_get_connection_error_is_retried(stub_server, monkeypatch):
+    """GET 遇到连接失败时重试，恢复后返回正常响应"""
+    base_url, state = stub_server
+    client = GitHubClient(base_url=base_url, token="t", initial_delay=0.01)
+    real_request = client.session.request
+    failures = {"left": 2}
+
+    def flaky_request(*args, **kwargs):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise requests.ConnectionError("connection reset")
+        return real_request(*args, **kwargs)
+
+    monkeypatch.setattr(client.session, "request", flaky_request)
+    assert client.get_json("runs") == {"workflow_runs": [{"id": 1}, {"id": 2}]}
+    assert client.stats["retries"] == 2
+    assert len(state.requests) == 1
+    client.close()
+
+
+def test_network_error_raised_after_retries_and_post_not_retried():
+    client = GitHubClient(base_url=f"http://127.0.0.1:{_unused_port()}", token="t", max_retries=1, initial_delay=0.01)
+
+    with pytest.raises(requests.ConnectionError):
+        client.request("GET", "runs")
+    assert client.stats["requests"] == 2
+
+    with pytest.raises(requests.ConnectionError):
+        client.request("POST", "dispatches", json={})
+    assert client.stats["requests"] == 3
+    client.close()
+
+
+def test_quota_wait_only_for_exhausted_bucket(client, stub_server, monkeypatch):
+    """配额按 (token, resource) 分桶：只有耗尽的桶会等待 reset，其他 token/resource 不受影响"""
+    sleeps: list[float] = []
+    monkeypatch.setattr("issuelab.tools.github_client.time.sleep", sleeps.append)
+    reset_at = time.time() + 30
+    client._record_rate_limit(
+        _Headers({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset_at), "X-RateLimit-Resource": "core"}),
+        "installation-a",
+        "core",
+    )
+    assert client.rate_limits[(_token_digest("installation-a"), "core")] == RateLimitState(
+        limit=None, remaining=0, reset_at=reset_at, resource="core"
+    )
+
+    client.request("GET", "runs", token="installation-b")
+    client.request("POST", "graphql", token="installation-a", json={})
+    assert sleeps == []
+
+    client.request("GET", "runs", token="installation-a")
+    assert len(sleeps) == 1 and 0 < sleeps[0] <= 30
+
+
+def test_paginate_follows_link_header(client):
+    assert [item["id"] for item in client.paginate("items", params={"per_page": 2})] == [10, 11, 20, 21]
+    assert client.paginate("runs", items_key="workflow_runs") == [{"id": 1}, {"id": 2}]
+
+
+def test_connections_are_reused(client, stub_server):
+    _base, state = stub_server
+
+    for _ in range(5):
+        client.get_json("runs")
+
+    assert len(state.client_ports) == 1
+
+
+def test_retry_sync_honors_retry_after(monkeypatch):
+    class ThrottledError(Exception):
+        retry_after = 0.2
+
+    calls = {"count": 0}
+
+    @retry_sync(max_retries=1, initial_delay=0.0)
+    def flaky():
+        calls["count"] += 1
+        if calls["count"] == 1:
+            raise ThrottledError()
+        return "ok"
+
+    sleeps: list[float] = []
+    monkeypatch.setattr("issuelab.retry.time.sleep", sleeps.append)
+    assert flaky() == "ok"
+    assert sleeps == [pytest.approx(0.2)]
@@ -36,7 +36,9 @@ async def test_gqy20_multistage_judge_retry_then_success(monkeypatch):
 
     calls = {"count": 0}
 
-    async def fake_run_single_agent(prompt: str, agent_name: str, *, stage_name: str | None = None):
+    async def fake_run_single_agent(
+        prompt: str, agent_name: str, *, stage_name: str | None = None, trace_label: str | None = None
+    ):
         calls["count"] += 1
         stage = calls["count"]
         if stage == 1:
@@ -104,7 +106,9 @@ async def test_gqy20_multistage_stops_when_researcher_fails(monkeypatch):
 
     calls = {"count": 0}
 
-    async def fake_run_single_agent(prompt: str, agent_name: str, *, stage_name: str | None = None):
+    async def fake_run_single_agent(
+        prompt: str, agent_name: str, *, stage_name: str | None = None, trace_label: str | None = None
+    ):
         calls["count"] += 1
         return {
             "ok": False,
@@ -134,7 +138,9 @@ async def test_gqy20_multistage_researcher_invalid_output_fallbacks_to_single_st
 
     calls = {"count": 0}
 
-    async def fake_run_single_agent(prompt: str, agent_name: str, *, stage_name: str | None = None):
+    async def fake_run_single_agent(
+        prompt: str, agent_name: str, *, stage_name: str | None = None, trace_label: str | None = None
+    ):
         calls["count"] += 1
         # First call: Researcher invalid output (missing evidence)
         if calls["count"] == 1:
@@ -187,7 +193,9 @@ async def test_gqy20_multistage_judge_uses_markdown_contract(monkeypatch):
 
     calls: list[dict[str, object]] = []
 
-    async def fake_run_single_agent(prompt: str, agent_name: str, *, stage_name: str | None = None):
+    async def fake_run_single_agent(
+        prompt: str, agent_name: str, *, stage_name: str | None = None, trace_label: str | None = None
+    ):
         calls.append({"prompt": prompt, "stage_name": stage_name})
         if "当前阶段：Researcher" in prompt:
             return {
@@ -251,3 +259,92 @@ confidence: "medium"
     judge_call = next(item for item in calls if "当前阶段：Judge" in str(item["prompt"]))
     assert judge_call["stage_name"] is None
     assert "最终输出必须是 Markdown" in str(judge_call["prompt"])
+
+
+def _judge_session_fake(calls: list[dict], judge_sources: bool):
+    researcher = """```yaml
+summary: "r"
+evidence:
+  - claim: "c"
+    source: "s"
+    url: "https://example.com/r"
+    confidence: "high"
+open_questions: []
+confidence: "high"
+```"""
+
+    async def fake_run_single_agent(prompt, agent_name, *, stage_name=None, resume_session=None, trace_label=None):
+        calls.append({"prompt": prompt, "resume_session": resume_session, "label": trace_label or stage_name})
+        usage = {"cost_usd": 0.01, "num_turns": 1, "tool_calls": [], "output_tokens": 10}
+        if resume_session:
+            text = "## Sources\n- https://example.com/final" if judge_sources else "仍无来源"
+            return {"ok": True, "response": text, "session_id": resume_session, "input_tokens": 40, **usage}
+        if "当前阶段：Judge" in prompt:
+            return {"ok": True, "response": "无来源结论", "session_id": "judge-1", "input_tokens": 1000, **usage}
+        if "当前阶段：Researcher" in prompt:
+            return {"ok": True, "response": researcher, "input_tokens": 500, **usage}
+        if "已完成阶段的输出" in prompt:
+            return {"ok": True, "response": "## Sources\n- https://example.com/fb", "input_tokens": 900, **usage}
+        return {"ok": True, "response": 'summary: "ok"', "input_tokens": 500, **usage}
+
+    return fake_run_single_agent
+
+
+@pytest.mark.asyncio
+async def test_gqy20_judge_retry_continues_session(monkeypatch):
+    from issuelab.agents import executor as ex
+
+    calls: list[dict] = []
+    monkeypatch.setattr(ex, "run_single_agent", _judge_session_fake(calls, judge_sources=True))
+    result = await ex._run_gqy20_multistage("agent prompt", 1, "ctx")
+
+    assert result["ok"] is True
+    assert result["response"].endswith("https://example.com/final")
+    retry = calls[-1]
+    assert retry["resume_session"] == "judge-1"
+    # 续接只发送纠正反馈，不重复阶段输出
+    assert "Researcher 输出" not in retry["prompt"] and "sources" in retry["prompt"]
+    assert len(calls) == 6
+    assert result["judge_retry"]["continued"] == 1
+    assert result["judge_retry"]["saved_input_tokens"] == 960
+
+
+@pytest.mark.asyncio
+async def test_gqy20_sources_fallback_reuses_stage_outputs(monkeypatch):
+    from issuelab.agents import executor as ex
+
+    calls: list[dict] = []
+    monkeypatch.setattr(ex, "run_single_agent", _judge_session_fake(calls, judge_sources=False))
+    result = await ex._run_gqy20_multistage("agent prompt", 1, "ctx")
+
+    assert [c["resume_session"] for c in calls].count("judge-1") == 2
+    fallback = calls[-1]["prompt"]
+    assert "### Researcher 输出" in fallback and "https://example.com/r" in fallback
+    assert result["response"].endswith("https://example.com/fb")
+    # Judge / 续接 / 回退各自写入独立轨迹文件，互不覆盖
+    labels = [c["label"] for c in calls]
+    assert labels[-4:] == ["judge", "judge-cont-1", "judge-cont-2", "fallback-sources"]
+    assert len(set(labels)) == len(labels)
+
+
+@pytest.mark.asyncio
+async def test_run_single_agent_resume_session_sets_option(monkeypatch):
+    from claude_agent_sdk import ClaudeAgentOptions
+
+    from issuelab.agents import executor as ex
+
+    seen: dict = {}
+
+    async def fake_query(*, prompt, options):
+        seen.update(prompt=prompt, options=options)
+        return
+        yield
+
+    monkeypatch.setattr(ex, "create_agent_options", lambda **kwargs: ClaudeAgentOptions())
+    monkeypatch.setattr(ex, "query", fake_query)
+    monkeypatch.setattr(ex, "print", lambda *a, **k: None, raising=False)
+
+    await ex.run_single_agent("补充来源", "gqy20", resume_session="sess-1")
+
+    assert seen["prompt"] == "补充来源"
+    assert seen["options"].resume == "sess-1"
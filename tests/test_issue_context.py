@@ -0,0 +1,91 @@
+"""测试 Issue 评论上下文压缩"""
+
+from issuelab.tools import github
+from issuelab.tools.issue_context import (
+    compact_issue_comments,
+    estimate_tokens,
+    strip_controlled_footer,
+    strip_quoted_replies,
+)
+
+_DISCUSSION = "我们讨论了实验设计中的对照组选择，以及样本量是否足够支撑结论。" * 12
+
+
+def _comment(i: int, body: str, login: str = "alice") -> dict:
+    return {
+        "id": f"IC_{i}",
+        "author": {"login": login},
+        "createdAt": f"2026-01-{i % 28 + 1:02d}T00:00:00Z",
+        "body": body,
+    }
+
+
+def _long_thread(n: int = 200) -> list[dict]:
+    comments = []
+    for i in range(n):
+        if i % 10 == 3:
+            comments.append(_comment(i, "已触发 workflow dispatch，稍后开始评审。" * 5, login="github-actions[bot]"))
+        elif i % 10 == 6:
+            body = f"[Agent: reviewer_a]\n\n## 评审 {i}\n{_DISCUSSION}\n\n---\n相关人员: @moderator @reviewer_b"
+            comments.append(_comment(i, body, login="github-actions[bot]"))
+        else:
+            comments.append(_comment(i, f"> 引用上一条：{_DISCUSSION}\n\n第 {i} 条回复：{_DISCUSSION}"))
+    return comments
+
+
+def test_estimate_tokens_counts_cjk_per_char():
+    assert estimate_tokens("中文") == 2
+    assert estimate_tokens("abcdefgh") == 2
+
+
+def test_strip_quotes_and_controlled_footer():
+    assert strip_quoted_replies("> quoted\n> more\n\nreply") == "reply"
+    assert strip_controlled_footer("结论\n\n---\n相关人员: @a @b") == "结论"
+
+
+def test_200_comment_thread_compacts_and_reuses_digest(tmp_path):
+    comments = _long_thread()
+
+    result = compact_issue_comments(7, comments, token_budget=8000, keep_recent=10, digest_dir=tmp_path)
+
+    assert result.compacted_tokens <= 8000
+    assert result.ratio < 0.2
+    assert result.verbatim == 10 and result.digested == 190
+    assert result.collapsed == 20
+    assert "第 199 条回复" in result.text
+    assert "引用上一条" not in result.text
+    assert "相关人员:" not in result.text
+    assert "- [reviewer_a] (" in result.text
+    assert (tmp_path / "issue-7.json").exists()
+
+    # 新评论到来：旧评论摘要直接命中缓存
+    comments.append(_comment(200, f"新的回复：{_DISCUSSION}"))
+    again = compact_issue_comments(7, comments, token_budget=8000, keep_recent=10, digest_dir=tmp_path)
+    assert again.digest_cache_hits >= 50
+    assert "更早的" in again.text
+    assert "新的回复" in again.text
+
+
+def test_short_thread_keeps_every_comment(tmp_path):
+    comments = [
+        _comment(1, "你好"),
+        _comment(2, "[系统护栏] 本次自动评审未产出可发布结论。", login="github-actions[bot]"),
+    ]
+
+    result = compact_issue_comments(1, comments, token_budget=6000, digest_dir=tmp_path)
+
+    assert result.digested == 0
+    assert "你好" in result.text
+    assert "护栏评论已折叠" in result.text
+    assert not (tmp_path / "issue-1.json").exists()
+
+
+def test_get_issue_info_reports_compaction(monkeypatch, tmp_path):
+    monkeypatch.setenv("ISSUELAB_CONTEXT_COMPACTION", "1")
+    monkeypatch.setenv("ISSUELAB_CONTEXT_DIGEST_DIR", str(tmp_path))
+    data = {"title": "t", "body": "b", "comments": _long_thread()}
+
+    text = github._format_comments_for_llm(3, data)
+
+    assert data["context_compaction"]["ratio"] < 1
+    assert "早期评论摘要" in text
@@ -0,0 +1,90 @@
+"""测试 Issue 上下文的本地 BM25 检索索引"""
+
+from issuelab.agents import options
+from issuelab.tools import github
+from issuelab.tools.issue_context import estimate_tokens
+from issuelab.tools.issue_index import (
+    ISSUE_INDEX_SERVER,
+    IssueIndex,
+    build_issue_index_hint,
+    build_issue_index_tools,
+    chunk_issue,
+    index_path,
+    issue_index_stats,
+    reset_issue_index,
+    tokenize,
+    update_issue_index,
+)
+
+_FILLER = "我们讨论了实验设计中的对照组选择，以及样本量是否足够支撑结论。"
+
+
+def _comments(start: int, end: int) -> list[dict]:
+    comments = []
+    for i in range(start, end):
+        body = f"第 {i} 条回复：{_FILLER * 6}"
+        if i == 42:
+            body = "关于 dropout 消融实验：去掉 dropout 后验证集准确率下降 3.2%，建议补充随机种子。"
+        comments.append({"author": {"login": f"user{i % 7}"}, "createdAt": "2026-02-01T00:00:00Z", "body": body})
+    return comments
+
+
+def test_tokenize_uses_words_and_cjk_bigrams():
+    assert tokenize("Dropout 消融实验 a") == ["dropout", "消融", "融实", "实验"]
+
+
+def test_chunks_follow_comment_boundaries():
+    chunks = chunk_issue("标题", "正文第一段\n\n正文第二段", github._format_comments(_comments(0, 3)))
+    labels = [c["label"] for c in chunks]
+    assert labels[0] == "正文"
+    assert labels[1:] == ["评论 user0 (2026-02-01)", "评论 user1 (2026-02-01)", "评论 user2 (2026-02-01)"]
+
+
+def test_incremental_update_only_tokenizes_new_comments(tmp_path):
+    first = update_issue_index(5, "T", "body", github._format_comments(_comments(0, 200)), base_dir=tmp_path)
+    assert first["added"] == first["chunks"] == 201
+
+    second = update_issue_index(5, "T", "body", github._format_comments(_comments(0, 203)), base_dir=tmp_path)
+    assert (second["added"], second["removed"], second["reused"]) == (3, 0, 201)
+
+    index = IssueIndex.load(index_path(5, tmp_path))
+    fresh = IssueIndex()
+    fresh.update(chunk_issue("T", "body", github._format_comments(_comments(0, 203))))
+    assert index.df == fresh.df and index.total_len == fresh.total_len
+
+
+async def test_search_tool_returns_relevant_chunks_with_fewer_tokens(tmp_path):
+    comments = github._format_comments(_comments(0, 200))
+    stats = update_issue_index(9, "T", "body", comments, base_dir=tmp_path)
+    tools = {t.name: t.handler for t in build_issue_index_tools(tmp_path)}
+
+    result = await tools["search_issue"]({"issue_number": 9, "query": "dropout 消融", "top_k": 3})
+    text = result["content"][0]["text"]
+
+    whole_file_tokens = estimate_tokens(comments)
+    assert "准确率下降 3.2%" in text.split("\n\n")[0]
+    assert estimate_tokens(text) < whole_file_tokens / 10
+    assert build_issue_index_hint({"tokens": 10, "chunks": 1}) == ""
+    assert ISSUE_INDEX_SERVER in build_issue_index_hint(stats)
+
+    chunk_id = text.split("]", 1)[0].split("[", 1)[1]
+    read = await tools["read_issue_chunks"]({"issue_number": 9, "chunk_ids": [chunk_id, "missing"]})
+    assert "dropout" in read["content"][0]["text"] and "未找到片段: missing" in read["content"][0]["text"]
+
+
+def test_write_context_file_builds_index_and_mounts_server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ISSUELAB_ISSUE_INDEX", "1")
+    reset_issue_index()
+    options.clear_agent_options_cache()
+    try:
+        github.write_issue_context_file(3, "T", "body", github._format_comments(_comments(0, 5)), 5)
+        assert (tmp_path / ".issuelab" / "issue_3.index.json").exists()
+        assert issue_index_stats(3)["chunks"] == 6
+
+        opts = options.create_agent_options(agent_name="reviewer_a")
+        assert opts.mcp_servers[ISSUE_INDEX_SERVER]["type"] == "sdk"
+        assert f"mcp__{ISSUE_INDEX_SERVER}__*" in opts.allowed_tools
+    finally:
+        reset_issue_index()
+        options.clear_agent_options_cache()
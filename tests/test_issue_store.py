@@ -0,0 +1,94 @@
+"""测试 Issue 本地快照存储与增量评论同步"""
+
+import pytest
+
+from issuelab.tools.github import _sync_comments_with_store
+from issuelab.tools.issue_store import IssueStore, get_issue_store, reset_issue_store
+
+
+class _FakeClient:
+    """模拟评论分页接口，支持 since 过滤"""
+
+    def __init__(self, comments: list[dict]) -> None:
+        self.comments = comments
+        self.calls: list[dict | None] = []
+
+    def paginate(self, path: str, *, params: dict | None = None) -> list[dict]:
+        self.calls.append(params)
+        since = (params or {}).get("since")
+        return [c for c in self.comments if not since or c["updated_at"] >= since]
+
+
+def _comment(comment_id: int, updated_at: str, body: str = "", created_at: str = "") -> dict:
+    return {
+        "id": comment_id,
+        "user": {"login": "alice"},
+        "body": body or f"comment {comment_id}",
+        "created_at": created_at or updated_at,
+        "updated_at": updated_at,
+    }
+
+
+def _issue(updated_at: str, count: int) -> dict:
+    return {"number": 7, "title": "t", "body": "b", "labels": [], "updated_at": updated_at, "comments": count}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IssueStore(tmp_path / "issues.db")
+
+
+def test_first_sync_fetches_all_comments(store):
+    client = _FakeClient([_comment(1, "2026-01-01T00:00:00Z"), _comment(2, "2026-01-02T00:00:00Z")])
+
+    comments = _sync_comments_with_store(client, store, "o/r", _issue("2026-01-02T00:00:00Z", 2))
+
+    assert [c["id"] for c in comments] == [1, 2]
+    assert client.calls == [None]
+
+
+def test_unchanged_issue_served_from_store(store):
+    client = _FakeClient([_comment(1, "2026-01-01T00:00:00Z")])
+    issue = _issue("2026-01-01T00:00:00Z", 1)
+    _sync_comments_with_store(client, store, "o/r", issue)
+
+    comments = _sync_comments_with_store(client, store, "o/r", issue)
+
+    assert [c["id"] for c in comments] == [1]
+    assert len(client.calls) == 1
+
+
+def test_updated_issue_fetches_only_new_comments(store):
+    client = _FakeClient([_comment(i, f"2026-01-01T00:00:{i:02d}Z") for i in range(1, 51)])
+    _sync_comments_with_store(client, store, "o/r", _issue("2026-01-01T00:00:50Z", 50))
+
+    client.comments.append(_comment(51, "2026-01-03T00:00:00Z"))
+    client.comments[0] = _comment(1, "2026-01-03T00:00:00Z", body="edited", created_at="2026-01-01T00:00:01Z")
+    comments = _sync_comments_with_store(client, store, "o/r", _issue("2026-01-03T00:00:00Z", 51))
+
+    assert client.calls[-1] == {"since": "2026-01-01T00:00:50Z"}
+    assert len(comments) == 51
+    assert comments[0]["body"] == "edited"
+    assert comments[-1]["id"] == 51
+
+
+def test_deleted_comment_triggers_full_resync(store):
+    client = _FakeClient([_comment(1, "2026-01-01T00:00:00Z"), _comment(2, "2026-01-01T00:00:01Z")])
+    _sync_comments_with_store(client, store, "o/r", _issue("2026-01-01T00:00:01Z", 2))
+
+    client.comments.pop(0)
+    comments = _sync_comments_with_store(client, store, "o/r", _issue("2026-01-02T00:00:00Z", 1))
+
+    assert [c["id"] for c in comments] == [2]
+    assert client.calls[-1] is None
+
+
+def test_store_disabled_by_env(monkeypatch, tmp_path):
+    reset_issue_store()
+    monkeypatch.setenv("ISSUELAB_ISSUE_STORE", "0")
+    assert get_issue_store() is None
+
+    monkeypatch.setenv("ISSUELAB_ISSUE_STORE", "1")
+    monkeypatch.setenv("ISSUELAB_ISSUE_STORE_PATH", str(tmp_path / "custom.db"))
+    assert get_issue_store().path == tmp_path / "custom.db"
+    reset_issue_store()
@@ -140,6 +140,10 @@ class TestObserveBatchUsesGetIssueInfo:
         async def fake_run_observer_batch(issue_data_list, max_parallel=5):
             return []
 
+        def failing_batch(issue_numbers, format_comments=False):
+            raise RuntimeError("graphql unavailable")
+
+        monkeypatch.setattr("issuelab.commands.observer.get_issues_batch", failing_batch)
         monkeypatch.setattr("issuelab.commands.observer.get_issue_info", fake_get_issue_info)
         from issuelab import tools as tools_pkg
 
@@ -154,3 +158,83 @@ class TestObserveBatchUsesGetIssueInfo:
             main_mod.main()
 
         assert calls["count"] == 2
+
+    def test_observe_batch_prefers_batched_fetch(self, monkeypatch):
+        """批量查询成功时不再逐个调用 get_issue_info"""
+        from issuelab import __main__ as main_mod
+
+        batch_calls = []
+        seen = {}
+
+        def fake_batch(issue_numbers, format_comments=False):
+            batch_calls.append(list(issue_numbers))
+            return {
+                n: {"title": f"title-{n}", "body": "", "comments": "", "comment_count": 0, "comments_complete": True}
+                for n in issue_numbers
+            }
+
+        def fail_get_issue_info(*_args, **_kwargs):
+            raise AssertionError("get_issue_info should not be called")
+
+        async def fake_run_observer_batch(issue_data_list, max_parallel=5):
+            seen["titles"] = [item["issue_title"] for item in issue_data_list]
+            return []
+
+        monkeypatch.setattr("issuelab.commands.observer.get_issues_batch", fake_batch)
+        monkeypatch.setattr("issuelab.commands.observer.get_issue_info", fail_get_issue_info)
+        from issuelab import tools as tools_pkg
+
+        monkeypatch.setattr(
+            tools_pkg.github, "write_issue_context_file", lambda **k: f"/tmp/issue_{k['issue_number']}.md"
+        )
+        monkeypatch.setattr(
+            __import__("issuelab.agents.observer").agents.observer,
+            "run_observer_batch",
+            fake_run_observer_batch,
+        )
+
+        with patch("sys.argv", ["issuelab", "observe-batch", "--issues", "1,2,3"]):
+            main_mod.main()
+
+        assert batch_calls == [[1, 2, 3]]
+        assert seen["titles"] == ["title-1", "title-2", "title-3"]
+
+    def test_observe_batch_refetches_issues_with_truncated_comments(self, monkeypatch):
+        """批量结果评论不完整（超过 100 条）时逐个获取完整评论"""
+        from issuelab import __main__ as main_mod
+
+        refetched = []
+        seen = {}
+
+        def fake_batch(issue_numbers, format_comments=False):
+            return {
+                n: {"title": f"batch-{n}", "body": "", "comments": "", "comment_count": 0, "comments_complete": n != 2}
+                for n in issue_numbers
+            }
+
+        def fake_get_issue_info(issue_number, format_comments=False):
+            refetched.append(issue_number)
+            return {"title": f"full-{issue_number}", "body": "", "comments": "", "comment_count": 150}
+
+        async def fake_run_observer_batch(issue_data_list, max_parallel=5):
+            seen["titles"] = [item["issue_title"] for item in issue_data_list]
+            return []
+
+        monkeypatch.setattr("issuelab.commands.observer.get_issues_batch", fake_batch)
+        monkeypatch.setattr("issuelab.commands.observer.get_issue_info", fake_get_issue_info)
+        from issuelab import tools as tools_pkg
+
+        monkeypatch.setattr(
+            tools_pkg.github, "write_issue_context_file", lambda **k: f"/tmp/issue_{k['issue_number']}.md"
+        )
+        monkeypatch.setattr(
+            __import__("issuelab.agents.observer").agents.observer,
+            "run_observer_batch",
+            fake_run_observer_batch,
+        )
+
+        with patch("sys.argv", ["issuelab", "observe-batch", "--issues", "1,2,3"]):
+            main_mod.main()
+
+        assert refetched == [2]
+        assert seen["titles"] == ["batch-1", "full-2", "batch-3"]
@@ -0,0 +1,137 @@
+"""测试并行 agent 共享的 MCP server 代理"""
+
+import os
+import sys
+import textwrap
+
+import anyio
+import pytest
+from mcp import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+
+from issuelab.agents import mcp_proxy, options
+
+STUB_SERVER = textwrap.dedent(
+    """
+    import json, os, sys
+
+    with open(os.environ["STUB_LOG"], "a") as fh:
+        fh.write(f"{os.getpid()}\\n")
+    for line in sys.stdin:
+        msg = json.loads(line)
+        if "id" not in msg:
+            continue
+        method = msg["method"]
+        if method == "initialize":
+            result = {
+                "protocolVersion": msg["params"]["protocolVersion"],
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "stub", "version": "1"},
+            }
+        elif method == "tools/list":
+            result = {"tools": [{"name": "echo", "inputSchema": {"type": "object"}}]}
+        elif method == "tools/call":
+            text = f"{msg['params']['arguments']['text']}@{os.getpid()}"
+            result = {"content": [{"type": "text", "text": text}], "isError": False}
+        else:
+            result = {}
+        sys.stdout.write(json.dumps({"jsonrpc": "2.0", "id": msg["id"], "result": result}) + "\\n")
+        sys.stdout.flush()
+    """
+)
+
+
+@pytest.fixture
+def shared_stub(tmp_path, monkeypatch):
+    script = tmp_path / "stub.py"
+    script.write_text(STUB_SERVER, encoding="utf-8")
+    log = tmp_path / "starts.log"
+    cfg = {"command": sys.executable, "args": [str(script)], "env": {"STUB_LOG": str(log)}}
+    private = {"command": sys.executable, "args": [str(script), "--private"], "env": {"STUB_LOG": str(log)}}
+    servers = {"alice": {"search": cfg, "solo": private}, "bob": {"web": cfg}}
+
+    monkeypatch.setenv("ISSUELAB_MCP_PROXY", "1")
+    monkeypatch.setattr(
+        options,
+        "_get_agent_feature_flags",
+        lambda name: {"enable_mcp": True, "enable_skills": False, "enable_subagents": False},
+    )
+    monkeypatch.setattr(options, "_get_enable_system_mcp", lambda name: False)
+    monkeypatch.setattr(options, "_get_agent_cwd", lambda name: tmp_path)
+    monkeypatch.setattr(options, "load_mcp_servers_for_agent", lambda name, include_system: dict(servers[name]))
+
+    def starts() -> int:
+        return len(log.read_text().splitlines()) if log.exists() else 0
+
+    return servers, tmp_path, starts
+
+
+async def _call_echo(cfg: dict, texts: list[str]) -> list[str]:
+    params = StdioServerParameters(command=cfg["command"], args=cfg["args"], env={**os.environ, **cfg["env"]})
+    async with stdio_client(params) as (read, write), ClientSession(read, write) as session:
+        await session.initialize()
+        tools = await session.list_tools()
+        assert [t.name for t in tools.tools] == ["echo"]
+        replies = []
+        for text in texts:
+            result = await session.call_tool("echo", {"text": text})
+            replies.append(result.content[0].text)
+        return replies
+
+
+def test_plan_only_includes_servers_shared_by_agents(shared_stub):
+    servers, tmp_path, _ = shared_stub
+    plan = mcp_proxy.plan_shared_mcp_servers(["alice", "bob", "alice"])
+
+    assert list(plan) == [mcp_proxy.server_id(servers["alice"]["search"], str(tmp_path))]
+    assert next(iter(plan.values()))["name"] == "search"
+
+
+async def test_parallel_sessions_share_one_server(shared_stub):
+    servers, tmp_path, starts = shared_stub
+
+    async with mcp_proxy.shared_mcp_proxy(["alice", "bob"]) as proxy:
+        assert proxy is not None and mcp_proxy.get_active_mcp_proxy() is proxy
+        alice = proxy.route(servers["alice"], tmp_path)
+        bob = proxy.route(servers["bob"], tmp_path)
+        # 未共享的 server 保持原配置
+        assert alice["solo"] == servers["alice"]["solo"]
+        assert alice["search"]["args"][-1] == bob["web"]["args"][-1]
+
+        replies: dict[str, list[str]] = {}
+
+        async def _session(name: str, cfg: dict) -> None:
+            replies[name] = await _call_echo(cfg, [f"{name}-{i}" for i in range(5)])
+
+        async with anyio.create_task_group() as tg:
+            for i in range(3):
+                tg.start_soon(_session, f"a{i}", alice["search"])
+                tg.start_soon(_session, f"b{i}", bob["web"])
+
+    assert mcp_proxy.get_active_mcp_proxy() is None
+    pids = {reply.rsplit("@", 1)[1] for values in replies.values() for reply in values}
+    assert len(pids) == 1
+    for name, values in replies.items():
+        assert [v.rsplit("@", 1)[0] for v in values] == [f"{name}-{i}" for i in range(5)]
+    assert starts() == 1
+
+
+async def test_agent_options_route_through_proxy(shared_stub):
+    options.clear_agent_options_cache()
+    direct = options.create_agent_options(agent_name="bob")
+    direct_key = options.get_agent_options_cache_key(direct)
+
+    async with mcp_proxy.shared_mcp_proxy(["alice", "bob"]):
+        proxied = options.create_agent_options(agent_name="bob")
+
+    assert proxied.mcp_servers["web"]["args"][:3] == ["-m", "issuelab.agents.mcp_proxy", "connect"]
+    assert direct.mcp_servers["web"]["args"][0].endswith("stub.py")
+    # 代理只改变传输方式，结果缓存键不变
+    assert options.get_agent_options_cache_key(proxied) == direct_key
+    options.clear_agent_options_cache()
+
+
+async def test_proxy_disabled_by_default(shared_stub, monkeypatch):
+    monkeypatch.delenv("ISSUELAB_MCP_PROXY")
+    async with mcp_proxy.shared_mcp_proxy(["alice", "bob"]) as proxy:
+        assert proxy is None
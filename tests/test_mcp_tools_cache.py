@@ -0,0 +1,105 @@
+"""测试 MCP 工具列表磁盘缓存与预热"""
+
+import os
+import sys
+import textwrap
+
+import pytest
+
+from issuelab.agents import options
+
+STUB_SERVER = textwrap.dedent(
+    """
+    import json, os, sys
+
+    with open(os.environ["STUB_LOG"], "a") as fh:
+        fh.write("start\\n")
+    for line in sys.stdin:
+        msg = json.loads(line)
+        if "id" not in msg:
+            continue
+        if msg["method"] == "initialize":
+            result = {
+                "protocolVersion": msg["params"]["protocolVersion"],
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "stub", "version": "1"},
+            }
+        elif msg["method"] == "tools/list":
+            result = {"tools": [{"name": "echo", "inputSchema": {"type": "object"}}]}
+        else:
+            result = {}
+        sys.stdout.write(json.dumps({"jsonrpc": "2.0", "id": msg["id"], "result": result}) + "\\n")
+        sys.stdout.flush()
+    """
+)
+
+
+@pytest.fixture
+def stub_server(tmp_path, monkeypatch):
+    script = tmp_path / "stub.py"
+    script.write_text(STUB_SERVER, encoding="utf-8")
+    log = tmp_path / "starts.log"
+    monkeypatch.setenv("ISSUELAB_MCP_TOOLS_CACHE_DIR", str(tmp_path / "cache"))
+    cfg = {"command": sys.executable, "args": [str(script)], "env": {**os.environ, "STUB_LOG": str(log)}}
+
+    def starts() -> int:
+        return len(log.read_text().splitlines()) if log.exists() else 0
+
+    return cfg, starts
+
+
+def test_listing_is_cached_across_calls(stub_server):
+    cfg, starts = stub_server
+
+    assert options._list_tools_for_mcp_server("stub", cfg, timeout_ms=10000) == ["echo"]
+    assert options._list_tools_for_mcp_server("stub", cfg, timeout_ms=10000) == ["echo"]
+    assert starts() == 1
+
+    # 强制刷新（预热路径）仍会启动 server
+    assert options._list_tools_for_mcp_server("stub", cfg, timeout_ms=10000, use_cache=False) == ["echo"]
+    assert starts() == 2
+
+
+def test_cache_key_tracks_command_mtime(tmp_path, monkeypatch):
+    monkeypatch.setenv("ISSUELAB_MCP_TOOLS_CACHE_DIR", str(tmp_path / "cache"))
+    binary = tmp_path / "bin" / "fake-mcp"
+    binary.parent.mkdir()
+    binary.write_text("#!/bin/sh\n")
+    binary.chmod(0o755)
+    monkeypatch.setenv("PATH", str(binary.parent))
+    cfg = {"command": "fake-mcp"}
+
+    before = options._mcp_tools_cache_path("s", cfg)
+    os.utime(binary, (1, 1))
+    assert options._mcp_tools_cache_path("s", cfg) != before
+    assert options._mcp_tools_cache_path("s", {"command": "fake-mcp", "args": ["x"]}) != before
+
+    monkeypatch.setenv("ISSUELAB_MCP_TOOLS_CACHE", "0")
+    assert options._mcp_tools_cache_path("s", cfg) is None
+
+
+def test_failed_listing_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("ISSUELAB_MCP_TOOLS_CACHE_DIR", str(tmp_path / "cache"))
+    cfg = {"command": sys.executable, "args": ["-c", "import sys; sys.exit(1)"]}
+
+    assert options._list_tools_for_mcp_server("broken", cfg, timeout_ms=10000) == []
+    assert not (tmp_path / "cache").exists()
+
+
+def test_prewarm_starts_agent_servers_in_background(stub_server, monkeypatch):
+    cfg, starts = stub_server
+    monkeypatch.setattr(options, "_get_agent_feature_flags", lambda name: {"enable_mcp": True})
+    monkeypatch.setattr(options, "_get_enable_system_mcp", lambda name: False)
+    monkeypatch.setattr(options, "load_mcp_servers_for_agent", lambda name, include_system: {"stub": cfg})
+
+    assert options.prewarm_mcp_servers(["a", "b"]) is None
+
+    monkeypatch.setenv("ISSUELAB_MCP_PREWARM", "1")
+    thread = options.prewarm_mcp_servers(["a", "b"])
+    assert thread is not None and thread.daemon
+    thread.join(timeout=30)
+
+    # 两个 agent 共用同一 server 配置，只启动一次；之后列举命中缓存
+    assert starts() == 1
+    assert options._list_tools_for_mcp_server("stub", cfg, timeout_ms=10000) == ["echo"]
+    assert starts() == 1
@@ -185,6 +185,57 @@ class TestCheckAlreadyCommented:
         assert result is False
 
 
+class TestBatchedScan:
+    """测试批量获取与基于批量结果的已评论判断"""
+
+    def test_has_user_commented_from_batch_payload(self):
+        from issuelab.personal_scan import has_user_commented
+
+        issue = {"comments": [{"author": {"login": "TestUser"}}], "comments_complete": True}
+        assert has_user_commented(issue, "testuser") is True
+        assert has_user_commented({**issue, "comments": []}, "testuser") is False
+        # 评论不完整时交由单独查询
+        assert has_user_commented({**issue, "comments_complete": False}, "testuser") is None
+
+    @patch("issuelab.personal_scan.check_already_commented")
+    @patch("issuelab.personal_scan.get_issues_batch")
+    def test_scan_uses_single_batch_fetch(self, mock_batch, mock_check):
+        from issuelab import personal_scan
+
+        mock_batch.return_value = {
+            1: {"title": "A", "body": "x", "labels": [], "comments": [], "comments_complete": True},
+            2: {
+                "title": "B",
+                "body": "y",
+                "labels": [],
+                "comments": [{"author": {"login": "me"}}],
+                "comments_complete": True,
+            },
+        }
+
+        with patch.object(personal_scan, "USE_LLM_SCAN", False):
+            result = personal_scan.scan_issues_for_personal_agent(
+                "me", {"interests": []}, [1, 2, 3], "owner/repo", username="me"
+            )
+
+        mock_batch.assert_called_once_with([1, 2, 3], format_comments=False, repo="owner/repo")
+        mock_check.assert_not_called()
+        assert result["total_scanned"] == 1
+
+    @patch("issuelab.personal_scan.get_issue_info")
+    @patch("issuelab.personal_scan.get_issues_batch")
+    def test_batch_failure_falls_back_to_serial(self, mock_batch, mock_get):
+        from issuelab.personal_scan import get_issues_content
+
+        mock_batch.side_effect = RuntimeError("graphql unavailable")
+        mock_get.return_value = {"title": "T", "body": "", "labels": [], "comments": []}
+
+        issues = get_issues_content([5, 6], "owner/repo")
+
+        assert set(issues) == {5, 6}
+        assert mock_get.call_count == 2
+
+
 class TestLlmSelectIssues:
     """测试 LLM 选择流程复用执行器封装"""
 
@@ -0,0 +1,157 @@
+"""测试 prompt 组装的片段缓存与模板失效"""
+
+import os
+import time
+
+import pytest
+
+from issuelab.agents import executor as ex
+
+TEMPLATES = """default_template: review_v1
+templates:
+  review_v1:
+    section_order: [summary, findings]
+    sections:
+      summary:
+        title: "## Summary"
+        guidance: "{guidance}"
+      findings:
+        title: "## Key Findings"
+"""
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ISSUELAB_REGISTRY_SNAPSHOT", "0")
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "output_templates.yml").write_text(TEMPLATES.format(guidance="一句话"), encoding="utf-8")
+    ex.clear_prompt_caches()
+    yield tmp_path
+    ex.clear_prompt_caches()
+
+
+def _bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_output_templates_invalidate_when_file_changes(project):
+    first = ex._append_output_schema("p", "alice")
+    assert "一句话" in first
+    assert ex._append_output_schema("p", "alice") == first
+
+    path = project / "config" / "output_templates.yml"
+    path.write_text(TEMPLATES.format(guidance="两句话"), encoding="utf-8")
+    _bump_mtime(path)
+
+    assert "两句话" in ex._append_output_schema("p", "alice")
+
+
+def test_agent_output_config_invalidates_when_file_changes(project):
+    agent_dir = project / "agents" / "alice"
+    agent_dir.mkdir(parents=True)
+    config = agent_dir / "output_config.yml"
+    config.write_text("templates:\n  mine:\n    section_order: [a]\n    sections:\n      a: {title: '## A'}\n")
+
+    assert "## A" in ex._append_output_schema("p", "alice", output_template="local:mine")
+
+    config.write_text("templates:\n  mine:\n    section_order: [b]\n    sections:\n      b: {title: '## B'}\n")
+    _bump_mtime(config)
+
+    rendered = ex._append_output_schema("p", "alice", output_template="local:mine")
+    assert "## B" in rendered and "## A" not in rendered
+
+
+def test_output_preferences_follow_registry_config_content(monkeypatch):
+    ex.clear_prompt_caches()
+    config = {"output_format": "hybrid", "mentions_mode": "off"}
+    parses = {"n": 0}
+
+    def fake_parse(c):
+        parses["n"] += 1
+        return (c["output_format"], c["mentions_mode"], None, None)
+
+    # get_agent_config 每次返回副本
+    monkeypatch.setattr(ex, "get_agent_config", lambda name: dict(config))
+    monkeypatch.setattr(ex, "_parse_output_preferences", fake_parse)
+    assert ex._get_output_preferences("alice") == ("hybrid", "off", None, None)
+    assert ex._get_output_preferences("alice") == ("hybrid", "off", None, None)
+    assert parses["n"] == 1
+
+    # 配置内容变化后偏好随之刷新
+    config = {"output_format": "yaml", "mentions_mode": "off"}
+    assert ex._get_output_preferences("alice")[0] == "yaml"
+    assert parses["n"] == 2
+
+
+def _prompt_builder_100_agents(project, monkeypatch):
+    configs = {}
+    for i in range(100):
+        name = f"agent{i:03d}"
+        agent_dir = project / "agents" / name
+        agent_dir.mkdir(parents=True)
+        (agent_dir / "output_config.yml").write_text("default_template: review_v1\n", encoding="utf-8")
+        configs[name] = {"output_format": "markdown", "mentions_mode": "controlled", "section_order": ["summary"]}
+    monkeypatch.setattr(ex, "get_agent_config", configs.get)
+
+    def build_all() -> list[str]:
+        prompts = []
+        for name in configs:
+            output_format, mentions_mode, template, section_order = ex._get_output_preferences(name)
+            prompts.append(
+                ex._append_output_schema(
+                    "p",
+                    name,
+                    output_format=output_format,
+                    mentions_mode=mentions_mode,
+                    output_template=template,
+                    section_order=section_order,
+                )
+            )
+        return prompts
+
+    return build_all
+
+
+def test_prompt_construction_memoized_for_100_agents(project, monkeypatch):
+    build_all = _prompt_builder_100_agents(project, monkeypatch)
+    renders = {"n": 0}
+    render = ex._render_output_schema_block
+
+    def counting_render(*args, **kwargs):
+        renders["n"] += 1
+        return render(*args, **kwargs)
+
+    monkeypatch.setattr(ex, "_render_output_schema_block", counting_render)
+    ex.clear_prompt_caches()
+    cold = build_all()
+    assert renders["n"] == 100
+
+    warm = build_all()
+    assert warm == cold
+    assert renders["n"] == 100
+
+
+@pytest.mark.perf
+def test_prompt_construction_benchmark_100_agents(project, monkeypatch):
+    build_all = _prompt_builder_100_agents(project, monkeypatch)
+    rounds = 5
+    start = time.perf_counter()
+    for _ in range(rounds):
+        ex.clear_prompt_caches()
+        cold = build_all()
+    cold_seconds = time.perf_counter() - start
+
+    build_all()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        warm = build_all()
+    warm_seconds = time.perf_counter() - start
+
+    print(
+        f"\n[bench] prompt assembly 100 agents x {rounds}: "
+        f"cold {cold_seconds * 1000:.1f} ms, memoized {warm_seconds * 1000:.1f} ms"
+    )
+    assert warm == cold
+    assert warm_seconds < cold_seconds
@@ -0,0 +1,73 @@
+"""测试并行分发的共享 prompt 前缀布局"""
+
+import os
+
+from issuelab.agents import executor as ex
+
+AGENTS = ["moderator", "reviewer_a", "reviewer_b", "summarizer"]
+
+
+def test_shared_prefix_is_byte_identical_across_agents():
+    prompts = [ex._build_agent_task_prompt(a, f"你是 {a}", 9, "## Issue ctx", shared_prefix=True) for a in AGENTS]
+
+    prefix = ex.shared_task_prefix(9, "## Issue ctx")
+    assert all(p.startswith(prefix + "## 你的角色") for p in prompts)
+    assert os.path.commonprefix(prompts) == prefix + "## 你的角色\n\n你是 "
+
+    # 默认布局以角色定义开头，不共享前缀
+    default = [ex._build_agent_task_prompt(a, f"{a} 角色", 9, "## Issue ctx", shared_prefix=False) for a in AGENTS]
+    assert os.path.commonprefix(default) == ""
+
+
+async def test_parallel_fanout_uses_shared_prefix_and_sums_cache_tokens(monkeypatch, caplog):
+    monkeypatch.setenv("ISSUELAB_SHARED_PROMPT_PREFIX", "1")
+    prompts: dict[str, str] = {}
+
+    async def fake_run_single_agent(prompt: str, agent_name: str, *, stage_name: str | None = None):
+        prompts[agent_name] = prompt
+        return {"ok": True, "response": "ok", "input_tokens": 50, "cache_read_input_tokens": 3000}
+
+    monkeypatch.setattr(ex, "run_single_agent", fake_run_single_agent)
+    monkeypatch.setattr(ex, "_load_agent_prompt", lambda name: f"你是 {name}")
+
+    results = await ex.run_agents_parallel(3, AGENTS, "## Issue ctx", comment_count=2)
+
+    task_context = ex._build_task_context("## Issue ctx", 2)
+    prefix = ex.shared_task_prefix(3, task_context)
+    assert "## 协作指南" in prefix
+    assert all(prompts[a].startswith(prefix) for a in AGENTS)
+    assert ex._log_prompt_cache_usage(3, results) == {
+        "input_tokens": 200,
+        "cache_read_input_tokens": 12000,
+        "cache_creation_input_tokens": 0,
+    }
+
+
+async def test_identical_output_schema_moves_into_shared_prefix(monkeypatch):
+    monkeypatch.setenv("ISSUELAB_SHARED_PROMPT_PREFIX", "1")
+    prompts: dict[str, str] = {}
+
+    async def fake_run_single_agent(prompt: str, agent_name: str, *, stage_name: str | None = None):
+        prompts[agent_name] = prompt
+        return {"ok": True, "response": "ok"}
+
+    monkeypatch.setattr(ex, "run_single_agent", fake_run_single_agent)
+    monkeypatch.setattr(ex, "_load_agent_prompt", lambda name: f"你是 {name}")
+
+    # moderator / reviewer_a / reviewer_b 使用同一输出模板
+    same_schema = ["moderator", "reviewer_a", "reviewer_b"]
+    schema = ex._common_output_schema(same_schema)
+    assert "## Output Format (required)" in schema
+    await ex.run_agents_parallel(3, same_schema, "## Issue ctx")
+
+    prefix = ex.shared_task_prefix(3, ex._build_task_context("## Issue ctx"), output_schema=schema)
+    for name in same_schema:
+        assert prompts[name].startswith(prefix + "## 你的角色")
+        # 已在前缀中注入，run_single_agent 不再在末尾重复追加
+        assert ex._append_output_schema(prompts[name], name) == prompts[name]
+
+    # 输出格式不一致时仍由 run_single_agent 逐个追加在角色之后
+    assert ex._common_output_schema(AGENTS) == ""
+    prompts.clear()
+    await ex.run_agents_parallel(3, AGENTS, "## Issue ctx")
+    assert all("## Output Format (required)" not in p for p in prompts.values())
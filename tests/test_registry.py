@@ -0,0 +1,220 @@
+"""测试 agent registry 进程级缓存"""
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from issuelab.agents import registry as registry_mod
+
+
+@pytest.fixture(autouse=True)
+def _clear_registry_cache():
+    registry_mod.clear_registry_cache()
+    yield
+    registry_mod.clear_registry_cache()
+
+
+def _write_agent(agents_dir: Path, name: str, **extra: str) -> Path:
+    agent_dir = agents_dir / name
+    agent_dir.mkdir(parents=True, exist_ok=True)
+    lines = [f"owner: {name}", f"description: {name} agent", "repository: gqy20/IssueLab"]
+    lines.extend(f"{key}: {value}" for key, value in extra.items())
+    path = agent_dir / "agent.yml"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def _bump_mtime(path: Path) -> None:
+    new_mtime = path.stat().st_mtime + 2
+    os.utime(path, (new_mtime, new_mtime))
+
+
+def test_get_agent_config_case_insensitive(tmp_path):
+    agents_dir = tmp_path / "agents"
+    _write_agent(agents_dir, "Alice")
+
+    config = registry_mod.get_agent_config("alice", agents_dir=agents_dir)
+    assert config is not None
+    assert config["owner"] == "Alice"
+    assert registry_mod.get_agent_config("ALICE", agents_dir=agents_dir) == config
+
+
+def test_disabled_agent_only_visible_with_include_disabled(tmp_path):
+    agents_dir = tmp_path / "agents"
+    _write_agent(agents_dir, "bob", enabled="false")
+
+    assert registry_mod.get_agent_config("bob", agents_dir=agents_dir) is None
+    assert registry_mod.get_agent_config("bob", agents_dir=agents_dir, include_disabled=True) is not None
+    assert "bob" not in registry_mod.load_registry(agents_dir)
+    assert "bob" in registry_mod.load_registry(agents_dir, include_disabled=True)
+
+
+def test_lookups_reuse_parsed_registry(tmp_path, monkeypatch):
+    agents_dir = tmp_path / "agents"
+    for name in ("alice", "bob", "carol"):
+        _write_agent(agents_dir, name)
+
+    calls = {"count": 0}
+    real_parse = registry_mod._parse_agent_yml
+
+    def counting_parse(path):
+        calls["count"] += 1
+        return real_parse(path)
+
+    monkeypatch.setattr(registry_mod, "_parse_agent_yml", counting_parse)
+
+    registry_mod.get_agent_config("alice", agents_dir=agents_dir)
+    assert calls["count"] == 3
+
+    for _ in range(10):
+        registry_mod.get_agent_config("bob", agents_dir=agents_dir)
+        registry_mod.is_system_agent("carol", agents_dir=agents_dir)
+        registry_mod.load_registry(agents_dir)
+    assert calls["count"] == 3
+
+
+def test_cache_invalidated_when_agent_yml_changes(tmp_path):
+    agents_dir = tmp_path / "agents"
+    path = _write_agent(agents_dir, "alice", agent_type="user")
+    assert registry_mod.is_system_agent("alice", agents_dir=agents_dir)[0] is False
+
+    path.write_text("owner: alice\nagent_type: system\n", encoding="utf-8")
+    _bump_mtime(path)
+    assert registry_mod.is_system_agent("alice", agents_dir=agents_dir)[0] is True
+
+
+def test_cache_invalidated_when_agent_added_or_removed(tmp_path):
+    agents_dir = tmp_path / "agents"
+    _write_agent(agents_dir, "alice")
+    assert registry_mod.get_agent_config("bob", agents_dir=agents_dir) is None
+
+    bob_yml = _write_agent(agents_dir, "bob")
+    assert registry_mod.get_agent_config("bob", agents_dir=agents_dir) is not None
+
+    bob_yml.unlink()
+    assert registry_mod.get_agent_config("bob", agents_dir=agents_dir) is None
+
+
+def test_recheck_interval_is_opt_in(tmp_path, monkeypatch):
+    agents_dir = tmp_path / "agents"
+    for name in ("alice", "bob", "carol"):
+        _write_agent(agents_dir, name)
+
+    clock = {"now": 1000.0}
+    scans = {"n": 0}
+    real_signature = registry_mod._get_registry_signature
+
+    def counting_signature(path):
+        scans["n"] += 1
+        return real_signature(path)
+
+    monkeypatch.setattr(registry_mod.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(registry_mod, "_get_registry_signature", counting_signature)
+
+    # 默认每次查找都比较签名（只 stat，不解析 YAML）
+    for _ in range(5):
+        registry_mod.get_agent_config("alice", agents_dir=agents_dir)
+    assert scans["n"] == 5
+
+    monkeypatch.setenv("ISSUELAB_REGISTRY_RECHECK_SECONDS", "2")
+    clock["now"] += 10
+    scans["n"] = 0
+    for _ in range(50):
+        registry_mod.get_agent_config("bob", agents_dir=agents_dir)
+        registry_mod.is_system_agent("carol", agents_dir=agents_dir)
+    assert scans["n"] == 1
+
+    _write_agent(agents_dir, "dave")
+    clock["now"] += 2
+    assert registry_mod.get_agent_config("dave", agents_dir=agents_dir) is not None
+    assert scans["n"] == 2
+
+
+def test_lookups_return_copies(tmp_path):
+    """调用方修改返回的配置不影响后续查找"""
+    agents_dir = tmp_path / "agents"
+    _write_agent(agents_dir, "alice", triggers="[a]")
+
+    config = registry_mod.get_agent_config("alice", agents_dir=agents_dir)
+    config["description"] = "mutated"
+    config["triggers"].append("b")
+    registry_mod.load_registry(agents_dir)["alice"]["owner"] = "mallory"
+
+    fresh = registry_mod.get_agent_config("alice", agents_dir=agents_dir)
+    assert fresh["description"] == "alice agent"
+    assert fresh["triggers"] == ["a"]
+    assert fresh["owner"] == "alice"
+
+
+def test_clear_registry_cache_forces_recheck(tmp_path):
+    agents_dir = tmp_path / "agents"
+    _write_agent(agents_dir, "alice")
+    assert registry_mod.get_agent_config("bob", agents_dir=agents_dir) is None
+
+    _write_agent(agents_dir, "bob")
+    registry_mod.clear_registry_cache()
+    assert registry_mod.get_agent_config("bob", agents_dir=agents_dir) is not None
+
+
+def test_load_registry_returns_independent_mapping(tmp_path):
+    agents_dir = tmp_path / "agents"
+    _write_agent(agents_dir, "alice")
+
+    first = registry_mod.load_registry(agents_dir)
+    first.pop("alice")
+    assert "alice" in registry_mod.load_registry(agents_dir)
+
+
+def _write_500_agents(tmp_path: Path) -> tuple[Path, list[str]]:
+    agents_dir = tmp_path / "agents"
+    names = [f"agent_{i:03d}" for i in range(500)]
+    for name in names:
+        _write_agent(agents_dir, name, agent_type="user", max_turns="30")
+    return agents_dir, names
+
+
+def test_registry_warm_lookups_skip_yaml_parsing_500_agents(tmp_path, monkeypatch):
+    agents_dir, names = _write_500_agents(tmp_path)
+    parsed = {"n": 0}
+    parse = registry_mod._parse_agent_yml
+
+    def counting_parse(path):
+        parsed["n"] += 1
+        return parse(path)
+
+    monkeypatch.setattr(registry_mod, "_parse_agent_yml", counting_parse)
+    assert registry_mod.get_agent_config(names[0], agents_dir=agents_dir) is not None
+    assert parsed["n"] == 500
+
+    for i in range(200):
+        assert registry_mod.get_agent_config(names[i % len(names)], agents_dir=agents_dir) is not None
+    assert parsed["n"] == 500
+
+
+@pytest.mark.perf
+def test_registry_lookup_benchmark_500_agents(tmp_path, monkeypatch):
+    """基准：500 个 agent 下冷启动解析 vs 热缓存查找（热路径不做 YAML 解析）"""
+    agents_dir, names = _write_500_agents(tmp_path)
+
+    start = time.perf_counter()
+    assert registry_mod.get_agent_config(names[0], agents_dir=agents_dir) is not None
+    cold_seconds = time.perf_counter() - start
+
+    def fail_parse(_path):
+        raise AssertionError("warm lookups must not parse YAML")
+
+    monkeypatch.setattr(registry_mod, "_parse_agent_yml", fail_parse)
+
+    lookups = 200
+    start = time.perf_counter()
+    for i in range(lookups):
+        assert registry_mod.get_agent_config(names[i % len(names)], agents_dir=agents_dir) is not None
+    warm_per_lookup = (time.perf_counter() - start) / lookups
+
+    print(
+        f"\n[bench] registry 500 agents: cold load {cold_seconds * 1000:.1f} ms, "
+        f"warm lookup {warm_per_lookup * 1000:.3f} ms/op"
+    )
+    assert warm_per_lookup < cold_seconds
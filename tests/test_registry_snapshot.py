@@ -0,0 +1,217 @@
+"""测试 registry 快照编译与加载"""
+
+import json
+import os
+import shutil
+import subprocess
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+from issuelab.agents import discovery as discovery_mod
+from issuelab.agents import registry as registry_mod
+from issuelab.agents import snapshot as snapshot_mod
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    registry_mod.clear_registry_cache()
+    snapshot_mod.clear_snapshot_cache()
+    yield
+    registry_mod.clear_registry_cache()
+    snapshot_mod.clear_snapshot_cache()
+
+
+def _make_tree(root: Path) -> None:
+    (root / "config").mkdir(parents=True)
+    (root / "config" / "output_templates.yml").write_text(
+        "default_template: review_v1\ntemplates:\n  review_v1:\n    sections: {}\n    section_order: []\n",
+        encoding="utf-8",
+    )
+    for name in ("alice", "bob"):
+        agent_dir = root / "agents" / name
+        agent_dir.mkdir(parents=True)
+        (agent_dir / "agent.yml").write_text(
+            f"owner: {name}\ndescription: {name} desc\noutput_template: review_v1\n", encoding="utf-8"
+        )
+        (agent_dir / "prompt.md").write_text(f"# {name} prompt\n", encoding="utf-8")
+    (root / "agents" / "bob" / "output_config.yml").write_text("templates:\n  mine: {}\n", encoding="utf-8")
+
+
+def test_build_snapshot_contains_configs_prompts_and_templates(tmp_path):
+    _make_tree(tmp_path)
+
+    snapshot_mod.build_registry_snapshot(tmp_path)
+    path = tmp_path / ".issuelab" / "registry_snapshot.json"
+    data = json.loads(path.read_text(encoding="utf-8"))
+
+    assert data["version"] == snapshot_mod.SNAPSHOT_VERSION
+    assert data["agents"]["alice"]["config"]["owner"] == "alice"
+    assert data["agents"]["alice"]["prompt"] == "# alice prompt\n"
+    assert data["agents"]["bob"]["output_config"] == {"templates": {"mine": {}}}
+    assert data["agents"]["alice"]["resolved_template"] == "review_v1"
+    assert "review_v1" in data["output_templates"]["templates"]
+    assert "config/output_templates.yml" in data["files"]
+
+
+def test_registry_uses_snapshot_without_parsing_yaml(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    snapshot_mod.build_registry_snapshot(tmp_path)
+    snapshot_mod.clear_snapshot_cache()
+
+    def fail_parse(_path):
+        raise AssertionError("agent.yml should come from snapshot")
+
+    monkeypatch.setattr(registry_mod, "_parse_agent_yml", fail_parse)
+    config = registry_mod.get_agent_config("BOB", agents_dir=tmp_path / "agents")
+    assert config is not None
+    assert config["description"] == "bob desc"
+
+
+def test_discovery_reads_prompts_from_snapshot(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    snapshot_mod.build_registry_snapshot(tmp_path)
+
+    monkeypatch.setattr(discovery_mod, "AGENTS_DIR", tmp_path / "agents")
+    monkeypatch.setattr(discovery_mod, "_CACHED_AGENTS", None)
+    monkeypatch.setattr(discovery_mod, "_CACHED_SIGNATURE", None)
+    monkeypatch.setattr(Path, "read_text", _fail_for_prompt(Path.read_text))
+
+    agents = discovery_mod.discover_agents()
+    assert agents["alice"]["prompt"] == "# alice prompt"
+
+
+def _fail_for_prompt(original):
+    def wrapper(self, *args, **kwargs):
+        if self.name == "prompt.md":
+            raise AssertionError("prompt.md should come from snapshot")
+        return original(self, *args, **kwargs)
+
+    return wrapper
+
+
+def test_snapshot_rejected_when_content_changes(tmp_path):
+    _make_tree(tmp_path)
+    snapshot_mod.build_registry_snapshot(tmp_path)
+    assert snapshot_mod.load_registry_snapshot(tmp_path) is not None
+
+    agent_yml = tmp_path / "agents" / "alice" / "agent.yml"
+    agent_yml.write_text("owner: alice\ndescription: changed\n", encoding="utf-8")
+    new_mtime = agent_yml.stat().st_mtime + 2
+    os.utime(agent_yml, (new_mtime, new_mtime))
+
+    assert snapshot_mod.load_registry_snapshot(tmp_path) is None
+    assert registry_mod.get_agent_config("alice", agents_dir=tmp_path / "agents")["description"] == "changed"
+
+
+def test_snapshot_rejected_when_agent_added(tmp_path):
+    _make_tree(tmp_path)
+    snapshot_mod.build_registry_snapshot(tmp_path)
+
+    (tmp_path / "agents" / "carol").mkdir()
+    (tmp_path / "agents" / "carol" / "agent.yml").write_text("owner: carol\n", encoding="utf-8")
+
+    assert snapshot_mod.load_registry_snapshot(tmp_path) is None
+
+
+def test_snapshot_survives_mtime_only_change(tmp_path):
+    """重新 checkout 只改变 mtime 时，通过内容哈希继续复用快照并刷新指纹"""
+    _make_tree(tmp_path)
+    snapshot_mod.build_registry_snapshot(tmp_path)
+    path = tmp_path / ".issuelab" / "registry_snapshot.json"
+    old_fingerprint = json.loads(path.read_text(encoding="utf-8"))["fingerprint"]
+
+    prompt = tmp_path / "agents" / "alice" / "prompt.md"
+    new_mtime = prompt.stat().st_mtime + 5
+    os.utime(prompt, (new_mtime, new_mtime))
+
+    assert snapshot_mod.load_registry_snapshot(tmp_path) is not None
+    assert json.loads(path.read_text(encoding="utf-8"))["fingerprint"] != old_fingerprint
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="需要 git")
+def test_snapshot_validated_from_git_index_after_fresh_checkout(tmp_path, monkeypatch):
+    """CI 重新 checkout 后 mtime 全变：从 git 索引取 blob 哈希验证，不逐个读取源文件"""
+    _make_tree(tmp_path)
+    git = ["git", "-c", "user.name=t", "-c", "user.email=t@example.com"]
+    subprocess.run([*git, "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run([*git, "add", "agents", "config"], cwd=tmp_path, check=True)
+    subprocess.run([*git, "commit", "-qm", "init"], cwd=tmp_path, check=True)
+    snapshot_mod.build_registry_snapshot(tmp_path)
+    snapshot_mod.clear_snapshot_cache()
+
+    for path in list((tmp_path / "agents").rglob("*")) + [tmp_path / "config" / "output_templates.yml"]:
+        if path.is_file():
+            new_mtime = path.stat().st_mtime + 10
+            os.utime(path, (new_mtime, new_mtime))
+    # 模拟 checkout 写入的新鲜索引
+    subprocess.run(["git", "update-index", "-q", "--refresh"], cwd=tmp_path, check=True)
+
+    def fail_read(*_args):
+        raise AssertionError("source files should not be reread when the git index is clean")
+
+    monkeypatch.setattr(snapshot_mod, "_read_blob_hashes", fail_read)
+    assert snapshot_mod.load_registry_snapshot(tmp_path) is not None
+
+    (tmp_path / "agents" / "alice" / "prompt.md").write_text("# edited\n", encoding="utf-8")
+    monkeypatch.undo()
+    snapshot_mod.clear_snapshot_cache()
+    assert snapshot_mod.load_registry_snapshot(tmp_path) is None
+
+
+def test_snapshot_path_from_env_used_for_build_and_load(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    monkeypatch.setenv("ISSUELAB_REGISTRY_SNAPSHOT_PATH", "build/snap.json")
+
+    snapshot_mod.build_registry_snapshot(tmp_path)
+
+    assert (tmp_path / "build" / "snap.json").exists()
+    assert not (tmp_path / ".issuelab" / "registry_snapshot.json").exists()
+    assert snapshot_mod.load_registry_snapshot(tmp_path) is not None
+
+
+def test_snapshot_disabled_by_env(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    snapshot_mod.build_registry_snapshot(tmp_path)
+    monkeypatch.setenv("ISSUELAB_REGISTRY_SNAPSHOT", "0")
+    assert snapshot_mod.load_registry_snapshot(tmp_path) is None
+
+
+def test_handle_registry_build(tmp_path, capsys):
+    from issuelab.commands.registry import handle_registry_build
+
+    _make_tree(tmp_path)
+    output = tmp_path / "out" / "snap.json"
+    ret = handle_registry_build(Namespace(root=str(tmp_path), output=str(output)))
+
+    assert ret is None
+    assert output.exists()
+    out = capsys.readouterr().out
+    assert "agents=2" in out
+    assert "ISSUELAB_REGISTRY_SNAPSHOT_PATH=out/snap.json" in out
+
+
+def test_handle_registry_build_hint_resolves_from_other_cwd(tmp_path, monkeypatch, capsys):
+    """--root 不是当前目录时，按提示设置环境变量后加载的正是刚生成的快照"""
+    from issuelab.commands.registry import handle_registry_build
+
+    root = tmp_path / "project"
+    _make_tree(root)
+    cwd = tmp_path / "elsewhere"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+
+    for output in ("snap.json", str(root / "build" / "snap.json")):
+        handle_registry_build(Namespace(root=str(root), output=output))
+        hint = capsys.readouterr().out.split("ISSUELAB_REGISTRY_SNAPSHOT_PATH=", 1)[1].split()[0]
+        monkeypatch.setenv("ISSUELAB_REGISTRY_SNAPSHOT_PATH", hint)
+        assert snapshot_mod.get_snapshot_path(root).resolve() == Path(output).resolve()
+        assert snapshot_mod.load_registry_snapshot(root) is not None
+        monkeypatch.delenv("ISSUELAB_REGISTRY_SNAPSHOT_PATH")
+
+
+def test_handle_registry_build_missing_agents_dir(tmp_path):
+    from issuelab.commands.registry import handle_registry_build
+
+    assert handle_registry_build(Namespace(root=str(tmp_path), output="")) == 1
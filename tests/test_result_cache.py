@@ -0,0 +1,163 @@
+"""测试 agent 结果缓存"""
+
+import os
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from issuelab.agents import executor
+from issuelab.agents.result_cache import (
+    ResultCache,
+    build_result_cache_key,
+    context_file_digest,
+    get_result_cache,
+    reset_result_cache,
+)
+
+
+@pytest.fixture
+def enabled_cache(monkeypatch, tmp_path):
+    reset_result_cache()
+    monkeypatch.setenv("ISSUELAB_RESULT_CACHE", "1")
+    monkeypatch.setenv("ISSUELAB_RESULT_CACHE_DIR", str(tmp_path / "cache"))
+    yield get_result_cache()
+    reset_result_cache()
+
+
+def test_cache_key_depends_on_every_component():
+    base = build_result_cache_key("prompt", "moderator", "model-a", "opts")
+    assert base == build_result_cache_key("prompt", "moderator", "model-a", "opts")
+    assert base != build_result_cache_key("prompt!", "moderator", "model-a", "opts")
+    assert base != build_result_cache_key("prompt", "reviewer_a", "model-a", "opts")
+    assert base != build_result_cache_key("prompt", "moderator", "model-b", "opts")
+    assert base != build_result_cache_key("prompt", "moderator", "model-a", "opts2")
+    assert base != build_result_cache_key("prompt", "moderator", "model-a", "opts", "ctx")
+
+
+def test_context_file_digest_tracks_file_content(tmp_path):
+    issue_file = tmp_path / "issue_1.md"
+    issue_file.write_text("# 标题\n正文", encoding="utf-8")
+    prompt = f"**Issue 内容文件**: {issue_file}\n请使用 Read 工具读取该文件后再进行分析。"
+
+    before = context_file_digest(prompt)
+    issue_file.write_text("# 标题\n正文\n\n新评论", encoding="utf-8")
+
+    assert before and context_file_digest(prompt) != before
+    assert context_file_digest("没有引用文件") == ""
+    assert context_file_digest(f"**Issue 内容文件**: {tmp_path / 'missing.md'}") == ""
+
+
+def test_disabled_by_default(monkeypatch):
+    reset_result_cache()
+    monkeypatch.delenv("ISSUELAB_RESULT_CACHE", raising=False)
+    assert get_result_cache() is None
+
+
+def test_disk_entry_survives_new_process_and_expires(tmp_path):
+    ResultCache(tmp_path).put("ab" * 32, {"response": "hi"})
+
+    fresh = ResultCache(tmp_path, ttl_seconds=60)
+    assert fresh.get("ab" * 32) == {"response": "hi"}
+    assert fresh.stats() == {"hits": 1, "misses": 0}
+
+    expired = ResultCache(tmp_path, ttl_seconds=60)
+    path = expired._path("ab" * 32)
+    path.write_text('{"created_at": 0, "value": {"response": "hi"}}', "utf-8")
+    assert expired.get("ab" * 32) is None
+    assert not path.exists()
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    cache.put(keys[0], {"response": "x" * 60})
+    # 上限恰好容纳 3 个条目
+    cache.max_bytes = cache._path(keys[0]).stat().st_size * 3 + 10
+    for i, key in enumerate(keys):
+        cache.put(key, {"response": "x" * 60})
+        os.utime(cache._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+    # 访问第一个条目刷新 mtime，使其变为最近使用
+    cache._memory.clear()
+    assert cache.get(keys[0]) is not None
+
+    cache.put("ff" * 32, {"response": "x" * 60})
+
+    assert cache._path(keys[0]).exists()
+    assert not cache._path(keys[1]).exists()
+    assert cache._path("ff" * 32).exists()
+
+
+def _counting_query(calls: list):
+    from claude_agent_sdk import AssistantMessage, ResultMessage
+    from claude_agent_sdk.types import TextBlock
+
+    async def fake_query(*args, **kwargs):
+        calls.append(kwargs["prompt"])
+        msg = MagicMock(spec=AssistantMessage)
+        msg.content = [TextBlock(text="评审结论")]
+        yield msg
+        result = MagicMock(spec=ResultMessage)
+        result.total_cost_usd = 0.25
+        result.num_turns = 2
+        result.session_id = "sess-1"
+        result.usage = {"input_tokens": 10, "output_tokens": 5}
+        yield result
+
+    return fake_query
+
+
+async def test_rerun_served_from_cache(monkeypatch, enabled_cache):
+    calls: list[str] = []
+    monkeypatch.setattr(executor, "query", _counting_query(calls))
+    monkeypatch.setattr(executor, "print", lambda *a, **k: None, raising=False)
+
+    first = await executor.run_single_agent("审阅 #1", "moderator")
+    second = await executor.run_single_agent("审阅 #1", "moderator")
+
+    assert len(calls) == 1
+    assert first["cache"] == {"hit": False, "hits": 0, "misses": 1, "saved_cost_usd": 0.0}
+    assert second["response"] == first["response"] == "评审结论"
+    assert second["session_id"] == "sess-1"
+    assert second["total_tokens"] == 15
+    assert second["cost_usd"] == 0.0
+    assert second["cache"] == {"hit": True, "hits": 1, "misses": 1, "saved_cost_usd": 0.25}
+
+    await executor.run_single_agent("审阅 #2", "moderator")
+    assert len(calls) == 2
+
+
+async def test_issue_update_invalidates_cached_result(monkeypatch, enabled_cache, tmp_path):
+    """prompt 只含上下文文件路径；文件内容变化（新评论）后不应命中旧结果"""
+    calls: list[str] = []
+    monkeypatch.setattr(executor, "query", _counting_query(calls))
+    monkeypatch.setattr(executor, "print", lambda *a, **k: None, raising=False)
+    issue_file = tmp_path / "issue_7.md"
+    issue_file.write_text("# 标题\n正文", encoding="utf-8")
+    prompt = f"**Issue 内容文件**: {issue_file}\n请使用 Read 工具读取该文件后再进行分析。"
+
+    await executor.run_single_agent(prompt, "moderator")
+    await executor.run_single_agent(prompt, "moderator")
+    assert len(calls) == 1
+
+    issue_file.write_text("# 标题\n正文\n\n### 评论\n新的反驳意见", encoding="utf-8")
+    await executor.run_single_agent(prompt, "moderator")
+    assert len(calls) == 2
+
+
+async def test_failed_run_not_cached(monkeypatch, enabled_cache):
+    calls: list[str] = []
+
+    async def failing_query(*args, **kwargs):
+        calls.append(kwargs["prompt"])
+        raise ValueError("boom")
+        yield
+
+    monkeypatch.setattr(executor, "query", failing_query)
+    monkeypatch.setattr(executor, "_agent_retry_policy", lambda: executor.RetryPolicy(max_retries=0))
+
+    first = await executor.run_single_agent("审阅 #3", "moderator")
+    second = await executor.run_single_agent("审阅 #3", "moderator")
+
+    assert first["ok"] is False and second["ok"] is False
+    assert len(calls) == 2
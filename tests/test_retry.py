@@ -1,5 +1,7 @@
 """测试重试机制"""
 
+from unittest.mock import MagicMock
+
 import pytest
 
 from issuelab.retry import RetryError, retry_async, retry_sync
@@ -157,3 +159,192 @@ class TestRetrySync:
             timeout_fail()
 
         assert call_count == 1
+
+
+class TestErrorClassification:
+    """测试错误分类与 retry-after 提取"""
+
+    def test_classify_by_status_and_text(self):
+        from claude_agent_sdk import ProcessError
+
+        from issuelab.retry import classify_error
+
+        class StatusError(Exception):
+            def __init__(self, status):
+                super().__init__("boom")
+                self.api_error_status = status
+
+        assert classify_error(StatusError(429)) == "rate_limit"
+        assert classify_error(StatusError(529)) == "overloaded"
+        assert classify_error(StatusError(401)) == "auth"
+        assert classify_error(StatusError(400)) == "fatal"
+        assert classify_error(ProcessError("failed", exit_code=1, stderr="API Error: 429 Too Many Requests")) == (
+            "rate_limit"
+        )
+        assert classify_error(RuntimeError("Overloaded")) == "overloaded"
+        assert classify_error(RuntimeError("invalid x-api-key")) == "auth"
+        assert classify_error(ConnectionResetError("reset by peer")) == "transient"
+
+    def test_cli_not_found_is_fatal(self):
+        from claude_agent_sdk import CLINotFoundError
+
+        from issuelab.retry import classify_error
+
+        assert classify_error(CLINotFoundError()) == "fatal"
+
+    def test_get_retry_after(self):
+        from issuelab.retry import get_retry_after
+
+        class HintedError(Exception):
+            retry_after = 3
+
+        assert get_retry_after(HintedError()) == 3.0
+        assert get_retry_after(RuntimeError("429: please retry after 12 seconds")) == 12.0
+        assert get_retry_after(RuntimeError("nothing")) is None
+
+
+class TestRetryPolicy:
+    """测试自适应重试策略"""
+
+    def test_decorrelated_jitter_bounds(self):
+        import random
+
+        from issuelab.retry import RetryPolicy
+
+        policy = RetryPolicy(base_delay=1.0, throttle_base_delay=4.0, max_delay=30.0, rng=random.Random(7))
+        delays = [policy.compute_delay("transient", 2.0, None) for _ in range(50)]
+        assert all(1.0 <= d <= 6.0 for d in delays)
+        assert len({round(d, 6) for d in delays}) > 1
+        assert 4.0 <= policy.compute_delay("rate_limit", 0.0, None) <= 4.0
+        assert policy.compute_delay("transient", 0.0, 45.0) == 45.0
+
+    @pytest.mark.asyncio
+    async def test_auth_errors_fail_fast(self):
+        from issuelab.retry import RetryPolicy
+
+        calls = 0
+
+        async def unauthorized():
+            nonlocal calls
+            calls += 1
+            raise RuntimeError("authentication_failed")
+
+        with pytest.raises(RuntimeError):
+            await RetryPolicy(base_delay=0.01).run_async(unauthorized)
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_pauses_shared_bucket(self):
+        from issuelab.retry import RetryPolicy, TokenBucket
+
+        bucket = TokenBucket(rate=100.0, capacity=10)
+        calls = 0
+
+        async def throttled_once():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("rate_limit")
+            return "ok"
+
+        policy = RetryPolicy(throttle_base_delay=0.05, max_delay=0.05, bucket=bucket)
+        assert await policy.run_async(throttled_once) == "ok"
+        assert bucket.reserve(consume=False) == 0.0
+
+        bucket.pause(0.2)
+        assert bucket.reserve(consume=False) > 0.1
+
+    def test_token_bucket_refill(self):
+        from issuelab.retry import TokenBucket
+
+        now = [0.0]
+        bucket = TokenBucket(rate=2.0, capacity=1, clock=lambda: now[0])
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == pytest.approx(0.5)
+        now[0] = 0.5
+        assert bucket.reserve() == 0.0
+
+
+class TestRateLimitBurst:
+    """模拟 429 突发：对比固定退避（同步重试）与共享令牌桶策略的完成时间"""
+
+    @staticmethod
+    def _make_fake_query(api: dict):
+        """滑动窗口限流的假 query：0.2 秒内最多 2 个请求，超出即 429"""
+        import asyncio
+        import time as time_mod
+
+        from claude_agent_sdk import AssistantMessage, ProcessError, ResultMessage
+        from claude_agent_sdk.types import TextBlock
+
+        async def fake_query(*args, **kwargs):
+            now = time_mod.monotonic()
+            api["starts"] = [t for t in api["starts"] if now - t < 0.2]
+            if len(api["starts"]) >= 2:
+                api["rate_limited"] += 1
+                # 被拒绝的请求同样消耗一次往返（含 CLI 启动）
+                await asyncio.sleep(0.05)
+                raise ProcessError("Command failed", exit_code=1, stderr="API Error: 429 rate_limit_error")
+            api["starts"].append(now)
+            await asyncio.sleep(0.05)
+            msg = MagicMock(spec=AssistantMessage)
+            msg.content = [TextBlock(text="ok")]
+            yield msg
+            result = MagicMock(spec=ResultMessage)
+            result.total_cost_usd = 0.0
+            result.num_turns = 1
+            result.session_id = "s"
+            result.usage = {}
+            yield result
+
+        return fake_query
+
+    async def _run_burst(self, monkeypatch, policy_factory) -> tuple[int, list[dict]]:
+        import asyncio
+
+        from issuelab.agents import executor
+
+        api = {"starts": [], "rate_limited": 0}
+        monkeypatch.setattr(executor, "query", self._make_fake_query(api))
+        monkeypatch.setattr(executor, "create_agent_options", lambda **kwargs: None)
+        monkeypatch.setattr(executor, "_agent_retry_policy", policy_factory)
+        monkeypatch.setattr(executor, "print", lambda *a, **k: None, raising=False)
+
+        results = await asyncio.gather(*(executor.run_single_agent("p", f"burst_{i}") for i in range(6)))
+        return api["rate_limited"], results
+
+    @pytest.mark.asyncio
+    async def test_shared_bucket_reduces_429_storm(self, monkeypatch):
+        import random
+
+        from issuelab.retry import RetryPolicy, TokenBucket
+
+        def lockstep_policy():
+            # 对照组：固定间隔、无抖动、互不协调（各 agent 同步重试）
+            return RetryPolicy(
+                max_retries=8,
+                base_delay=0.1,
+                throttle_base_delay=0.1,
+                max_delay=0.1,
+                max_retries_by_class={},
+                rng=random.Random(0),
+            )
+
+        shared_bucket = TokenBucket(rate=10.0, capacity=1)
+
+        def adaptive_policy():
+            return RetryPolicy(
+                max_retries=8,
+                base_delay=0.05,
+                throttle_base_delay=0.1,
+                max_delay=0.4,
+                max_retries_by_class={},
+                bucket=shared_bucket,
+                rng=random.Random(0),
+            )
+
+        lockstep_429, lockstep_results = await self._run_burst(monkeypatch, lockstep_policy)
+        adaptive_429, adaptive_results = await self._run_burst(monkeypatch, adaptive_policy)
+
+        assert all(r["ok"] for r in lockstep_results + adaptive_results)
+        assert adaptive_429 < lockstep_429
@@ -0,0 +1,86 @@
+"""测试 review 流水线：moderator → reviewer_a/reviewer_b 并行 → summarizer"""
+
+import asyncio
+import os
+from argparse import Namespace
+
+from issuelab.agents import executor as ex
+
+
+def _patch_agents(monkeypatch, fail: set[str] | None = None):
+    prompts: dict[str, str] = {}
+    running: set[str] = set()
+    overlaps: list[set[str]] = []
+
+    async def fake_run_single_agent(prompt: str, agent_name: str, *, stage_name: str | None = None):
+        prompts[agent_name] = prompt
+        running.add(agent_name)
+        overlaps.append(set(running))
+        await asyncio.sleep(0.03)
+        running.discard(agent_name)
+        if fail and agent_name in fail:
+            return {"ok": False, "response": "[错误] boom", "error_type": "api_error", "cost_usd": 0.0}
+        return {"ok": True, "response": f"[Agent: {agent_name}] {agent_name}-output", "cost_usd": 0.01}
+
+    monkeypatch.setattr(ex, "run_single_agent", fake_run_single_agent)
+    monkeypatch.setattr(ex, "_load_agent_prompt", lambda name: f"你是 {name}")
+    return prompts, overlaps
+
+
+async def test_review_pipeline_reviewers_share_prefix_with_output_schema(monkeypatch):
+    monkeypatch.setenv("ISSUELAB_SHARED_PROMPT_PREFIX", "1")
+    prompts, _ = _patch_agents(monkeypatch)
+
+    await ex.run_review_pipeline(1, "## Issue ctx", 0)
+
+    reviewers = (prompts["reviewer_a"], prompts["reviewer_b"])
+    shared = os.path.commonprefix(reviewers)
+    assert shared.endswith("## 你的角色\n\n你是 reviewer_")
+    assert "moderator-output" in shared and "## Output Format (required)" in shared
+    # moderator / summarizer 没有同组阶段，输出格式仍由 run_single_agent 追加
+    assert "## Output Format (required)" not in prompts["moderator"]
+    assert "## Output Format (required)" not in prompts["summarizer"]
+
+
+async def test_review_pipeline_passes_outputs_downstream(monkeypatch):
+    prompts, overlaps = _patch_agents(monkeypatch)
+
+    results = await ex.run_review_pipeline(1, "## Issue ctx", 0)
+
+    assert list(results) == ["moderator", "reviewer_a", "reviewer_b", "summarizer"]
+    assert "moderator-output" not in prompts["moderator"]
+    for reviewer in ("reviewer_a", "reviewer_b"):
+        assert "moderator-output" in prompts[reviewer]
+    for upstream in ("moderator-output", "reviewer_a-output", "reviewer_b-output"):
+        assert upstream in prompts["summarizer"]
+    # 两位 reviewer 并行
+    assert {"reviewer_a", "reviewer_b"} in overlaps
+    assert all(len(group) == 1 for group in overlaps if "summarizer" in group or "moderator" in group)
+    for result in results.values():
+        assert result["pipeline"]["stage_seconds"] > 0
+
+
+async def test_review_pipeline_continues_after_reviewer_failure(monkeypatch):
+    prompts, _ = _patch_agents(monkeypatch, fail={"reviewer_a"})
+
+    results = await ex.run_review_pipeline(1, "ctx", 0)
+
+    assert results["reviewer_a"]["ok"] is False
+    assert "reviewer_a 未能完成" in prompts["summarizer"]
+    assert "reviewer_b-output" in prompts["summarizer"]
+    assert results["summarizer"]["ok"] is True
+
+
+def test_handle_review_uses_pipeline_and_auto_closes(monkeypatch):
+    from issuelab.commands import core
+
+    async def fake_pipeline(issue, context, comment_count, available_agents=None, trigger_comment=None):
+        return {"summarizer": {"ok": True, "response": "[Agent: summarizer] done [CLOSE]"}}
+
+    closed = []
+    monkeypatch.setattr("issuelab.commands.common.run_review_pipeline", fake_pipeline)
+    monkeypatch.setattr("issuelab.response_processor.close_issue", lambda issue: closed.append(issue) or True)
+
+    core.handle_review(Namespace(issue=5, post=False), "ctx", 0)
+
+    assert closed == [5]
@@ -666,6 +666,8 @@ class TestStreamingOutput:
                 "input_tokens": 123,
                 "output_tokens": 45,
                 "total_tokens": 168,
+                "cache_read_input_tokens": 4000,
+                "cache_creation_input_tokens": 600,
             }
             yield result
 
@@ -674,6 +676,8 @@ class TestStreamingOutput:
             assert info["input_tokens"] == 123
             assert info["output_tokens"] == 45
             assert info["total_tokens"] == 168
+            assert info["cache_read_input_tokens"] == 4000
+            assert info["cache_creation_input_tokens"] == 600
 
     @pytest.mark.asyncio
     async def test_output_schema_is_injected(self):
@@ -0,0 +1,107 @@
+"""测试多阶段流程的阶段检查点与断点续跑"""
+
+import pytest
+
+from issuelab.agents import executor as ex
+from issuelab.agents.stage_checkpoint import StageCheckpointStore, get_stage_checkpoint_store, inputs_digest
+
+VALID_RESEARCHER = """```yaml
+summary: "r"
+evidence:
+  - claim: "c"
+    source: "s"
+    url: "https://example.com/r"
+    confidence: "high"
+open_questions: []
+confidence: "high"
+```"""
+
+
+def _stage_of(prompt: str) -> str:
+    return next(name for name in ex._GQY20_STAGE_NAMES if f"当前阶段：{name}" in prompt)
+
+
+def _response(stage: str) -> str:
+    if stage == "Researcher":
+        return VALID_RESEARCHER
+    if stage == "Judge":
+        return "[Agent: gqy20]\n\n## Summary\nok\n\n## Sources\n- https://example.com/final\n"
+    return f'summary: "{stage}"'
+
+
+@pytest.fixture
+def gqy20(monkeypatch, tmp_path):
+    monkeypatch.setenv("ISSUELAB_STAGE_CHECKPOINTS", "1")
+    monkeypatch.setenv("ISSUELAB_STAGE_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(ex, "get_agent_config", lambda name: {})
+    calls: list[str] = []
+    failing: set[str] = set()
+
+    async def fake_run_single_agent(
+        prompt: str, agent_name: str, *, stage_name: str | None = None, trace_label: str | None = None
+    ):
+        stage = _stage_of(prompt)
+        calls.append(stage)
+        if stage in failing:
+            return {"ok": False, "error_type": "timeout", "error_message": "timeout", "cost_usd": 0.1}
+        return {"ok": True, "response": _response(stage), "cost_usd": 0.1, "num_turns": 1, "tool_calls": []}
+
+    monkeypatch.setattr(ex, "run_single_agent", fake_run_single_agent)
+    return calls, failing, tmp_path
+
+
+async def test_rerun_resumes_from_failed_stage(gqy20):
+    calls, failing, root = gqy20
+    failing.add("Verifier")
+    first = await ex._run_gqy20_multistage("agent prompt", 5, "ctx")
+    assert first["ok"] is False
+    assert calls == ["Researcher", "Analyst", "Critic", "Verifier"]
+
+    calls.clear()
+    failing.clear()
+    second = await ex._run_gqy20_multistage("agent prompt", 5, "ctx")
+
+    assert second["ok"] is True
+    assert calls == ["Verifier", "Judge"]
+    assert second["dag"]["resumed_stages"] == ["Researcher", "Analyst", "Critic"]
+    assert second["cost_usd"] == pytest.approx(0.2)
+    # 成功后清除本次运行的检查点
+    assert not any((root / "issue-5").rglob("*.json"))
+
+
+async def test_context_change_does_not_resume(gqy20):
+    calls, failing, _ = gqy20
+    failing.add("Judge")
+    await ex._run_gqy20_multistage("agent prompt", 5, "ctx")
+
+    calls.clear()
+    failing.clear()
+    await ex._run_gqy20_multistage("agent prompt", 5, "ctx v2")
+
+    assert calls == ["Researcher", "Analyst", "Critic", "Verifier", "Judge"]
+
+
+async def test_invalid_researcher_checkpoint_is_rerun(gqy20):
+    calls, _, root = gqy20
+    store = StageCheckpointStore(root, 5, "agent prompt\nctx")
+    store.save("Researcher", inputs_digest({}), "not yaml evidence")
+
+    result = await ex._run_gqy20_multistage("agent prompt", 5, "ctx")
+
+    assert result["ok"] is True
+    assert calls[0] == "Researcher"
+    assert result["dag"]["resumed_stages"] == []
+
+
+def test_upstream_change_invalidates_downstream(tmp_path):
+    store = StageCheckpointStore(tmp_path, 1, "ctx")
+    store.save("Analyst", inputs_digest({"Researcher": "a"}), "analysis")
+
+    assert store.load("Analyst", inputs_digest({"Researcher": "a"})) == "analysis"
+    assert store.load("Analyst", inputs_digest({"Researcher": "b"})) is None
+    assert store.load("Critic", inputs_digest({"Researcher": "a"})) is None
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("ISSUELAB_STAGE_CHECKPOINTS", raising=False)
+    assert get_stage_checkpoint_store(1, "ctx") is None
@@ -0,0 +1,168 @@
+"""测试多阶段流程的阶段 DAG 调度"""
+
+import asyncio
+import time
+
+import pytest
+
+from issuelab.agents import executor as ex
+from issuelab.agents.stage_dag import (
+    StageSpec,
+    critical_path,
+    parse_stage_specs,
+    run_stage_dag,
+)
+
+PARALLEL_STAGES = [
+    {"name": "Researcher"},
+    {"name": "Analyst", "depends_on": ["Researcher"]},
+    {"name": "Critic", "depends_on": ["Researcher"]},
+    {"name": "Verifier", "depends_on": ["Researcher", "Analyst", "Critic"]},
+    {"name": "Judge", "depends_on": ["Researcher", "Analyst", "Critic", "Verifier"]},
+]
+
+
+def test_parse_rejects_cycles_and_unknown_deps():
+    with pytest.raises(ValueError, match="环"):
+        parse_stage_specs([{"name": "A", "depends_on": ["B"]}, {"name": "B", "depends_on": "A"}])
+    with pytest.raises(ValueError, match="未定义"):
+        parse_stage_specs([{"name": "A", "depends_on": ["Z"]}])
+    assert parse_stage_specs(["A", {"name": "B", "depends_on": "A"}]) == [StageSpec("A"), StageSpec("B", ("A",))]
+
+
+async def test_independent_stages_run_concurrently():
+    specs = parse_stage_specs(PARALLEL_STAGES)
+    running: set[str] = set()
+    overlaps: list[set[str]] = []
+
+    async def run_stage(spec, done):
+        assert all(dep in done for dep in spec.depends_on)
+        running.add(spec.name)
+        overlaps.append(set(running))
+        await asyncio.sleep(0.02)
+        running.discard(spec.name)
+        return {"ok": True, "response": spec.name}
+
+    run = await run_stage_dag(specs, run_stage)
+
+    assert run.ok
+    assert {"Analyst", "Critic"} in overlaps
+    assert set(run.results) == {s["name"] for s in PARALLEL_STAGES}
+
+
+async def test_failure_stops_new_stages_and_reports_declared_order():
+    specs = parse_stage_specs(PARALLEL_STAGES)
+    started: list[str] = []
+
+    async def run_stage(spec, done):
+        started.append(spec.name)
+        if spec.name == "Critic":
+            await asyncio.sleep(0.01)
+            return {"ok": False, "error_type": "timeout"}
+        if spec.name == "Analyst":
+            await asyncio.sleep(0.03)
+            return {"ok": False, "error_type": "api_error"}
+        return {"ok": True}
+
+    run = await run_stage_dag(specs, run_stage)
+
+    assert "Verifier" not in started and "Judge" not in started
+    # 并行阶段跑完后按声明顺序报告
+    assert run.failed_stage == "Analyst"
+
+
+def test_critical_path_follows_longest_chain():
+    specs = parse_stage_specs(PARALLEL_STAGES)
+    spans = {
+        "Researcher": (0.0, 1.0),
+        "Analyst": (1.0, 4.0),
+        "Critic": (1.0, 2.0),
+        "Verifier": (4.0, 5.0),
+        "Judge": (5.0, 7.0),
+    }
+    path, seconds = critical_path(specs, spans)
+    assert path == ["Researcher", "Analyst", "Verifier", "Judge"]
+    assert seconds == 7.0
+
+
+def _stage_response(prompt: str) -> str:
+    if "当前阶段：Researcher" in prompt:
+        return """```yaml
+summary: "r"
+evidence:
+  - claim: "c"
+    source: "s"
+    url: "https://example.com/r"
+    confidence: "high"
+open_questions: []
+confidence: "high"
+```"""
+    if "当前阶段：Judge" in prompt:
+        return "[Agent: gqy20]\n\n## Summary\nok\n\n## Sources\n- https://example.com/final\n"
+    return 'summary: "ok"'
+
+
+async def _run_gqy20(monkeypatch, stages_config) -> tuple[dict, float, list[str], int]:
+    prompts: list[str] = []
+    active = {"now": 0, "peak": 0}
+
+    async def fake_run_single_agent(
+        prompt: str, agent_name: str, *, stage_name: str | None = None, trace_label: str | None = None
+    ):
+        prompts.append(prompt)
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.05)
+        active["now"] -= 1
+        return {"ok": True, "response": _stage_response(prompt), "cost_usd": 0.01, "num_turns": 1, "tool_calls": []}
+
+    config = {"multistage_stages": stages_config} if stages_config is not None else {}
+    monkeypatch.setattr(ex, "get_agent_config", lambda name: config)
+    monkeypatch.setattr(ex, "run_single_agent", fake_run_single_agent)
+    start = time.perf_counter()
+    result = await ex._run_gqy20_multistage("agent prompt", 1, "ctx")
+    return result, time.perf_counter() - start, prompts, active["peak"]
+
+
+async def test_gqy20_parallel_dag_overlaps_independent_stages(monkeypatch):
+    serial, _, serial_prompts, serial_peak = await _run_gqy20(monkeypatch, None)
+    parallel, _, parallel_prompts, parallel_peak = await _run_gqy20(monkeypatch, PARALLEL_STAGES)
+
+    assert serial["ok"] and parallel["ok"]
+    assert set(serial["stages"]) == set(parallel["stages"])
+    assert parallel["response"] == serial["response"]
+    path = parallel["dag"]["critical_path"]
+    assert path[0] == "Researcher" and path[1] in {"Analyst", "Critic"} and path[2:] == ["Verifier", "Judge"]
+    assert len(serial["dag"]["critical_path"]) == 5
+    assert serial_peak == 1
+    assert parallel_peak == 2
+
+    # 并行时 Critic 只看 Researcher 证据；串行默认仍批判 Analyst 候选结论
+    critic_parallel = next(p for p in parallel_prompts if "当前阶段：Critic" in p)
+    critic_serial = next(p for p in serial_prompts if "当前阶段：Critic" in p)
+    assert "Analyst 输出" not in critic_parallel
+    assert "Analyst 输出" in critic_serial
+    assert "candidate_id" not in critic_parallel and "- claim:" in critic_parallel
+    assert "Analyst 候选结论" not in critic_parallel
+    assert "candidate_id" in critic_serial
+
+
+@pytest.mark.perf
+async def test_gqy20_parallel_dag_shortens_wall_time(monkeypatch):
+    _, serial_seconds, _, _ = await _run_gqy20(monkeypatch, None)
+    parallel, parallel_seconds, _, _ = await _run_gqy20(monkeypatch, PARALLEL_STAGES)
+
+    print(
+        f"\n[bench] gqy20 5 stages x 50 ms: serial {serial_seconds * 1000:.0f} ms, "
+        f"DAG {parallel_seconds * 1000:.0f} ms (critical path {parallel['dag']['critical_path']})"
+    )
+    assert parallel["dag"]["wall_seconds"] < parallel["dag"]["serial_seconds"]
+    assert parallel_seconds < serial_seconds
+
+
+async def test_gqy20_invalid_dag_config_falls_back_to_serial(monkeypatch):
+    result, _, prompts, _ = await _run_gqy20(monkeypatch, [{"name": "Judge", "depends_on": ["Ghost"]}])
+
+    assert result["ok"] is True
+    assert len(result["dag"]["critical_path"]) == 5
+    assert len(prompts) == 5
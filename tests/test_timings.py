@@ -0,0 +1,102 @@
+"""测试 agent 运行耗时采集"""
+
+import asyncio
+import json
+
+from claude_agent_sdk import AssistantMessage, ResultMessage, UserMessage
+from claude_agent_sdk.types import TextBlock, ToolResultBlock, ToolUseBlock
+
+from issuelab.agents import executor
+from issuelab.agents.timings import TimingCollector
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_collector_splits_model_and_tool_time():
+    clock = _Clock()
+    timings = TimingCollector(clock)
+
+    clock.now = 102.0
+    timings.on_turn()
+    timings.on_tool_use("t1", "mcp__search")
+    clock.now = 110.0
+    timings.on_tool_result("t1")
+    clock.now = 111.5
+    timings.on_turn()
+    timings.on_text()
+    clock.now = 112.0
+    timings.on_tool_use("t2", "Read")
+    timings.finish()
+
+    summary = timings.summary()
+    assert summary["total_seconds"] == 12.0
+    assert summary["time_to_first_text_seconds"] == 11.5
+    assert [t["seconds"] for t in summary["turns"]] == [2.0, 1.5]
+    assert summary["model_seconds"] == 3.5
+    assert summary["tools"][0] == {
+        "id": "t1",
+        "name": "mcp__search",
+        "start": 2.0,
+        "seconds": 8.0,
+        "is_error": False,
+        "pending": False,
+    }
+    # 未返回结果的工具按已耗时计入并标记 pending
+    assert summary["tools"][1]["pending"] is True
+    assert summary["tools"][1]["seconds"] == 0.0
+
+
+async def test_run_single_agent_records_timings(monkeypatch, tmp_path):
+    trace_file = tmp_path / "timings.jsonl"
+    monkeypatch.setenv("ISSUELAB_TIMINGS_FILE", str(trace_file))
+    monkeypatch.setattr(executor, "create_agent_options", lambda **kwargs: None)
+    monkeypatch.setattr(executor, "print", lambda *a, **k: None, raising=False)
+
+    async def fake_query(*args, **kwargs):
+        yield AssistantMessage(content=[ToolUseBlock(id="tu_1", name="mcp__slow", input={})], model="m")
+        await asyncio.sleep(0.05)
+        yield UserMessage(content=[ToolResultBlock(tool_use_id="tu_1", content="ok")])
+        yield AssistantMessage(content=[TextBlock(text="结论")], model="m")
+        yield ResultMessage(
+            subtype="success", duration_ms=1, duration_api_ms=1, is_error=False, num_turns=2, session_id="s"
+        )
+
+    monkeypatch.setattr(executor, "query", fake_query)
+
+    result = await executor.run_single_agent("p", "timing_agent")
+
+    timings = result["timings"]
+    assert [t["turn"] for t in timings["turns"]] == [1, 2]
+    assert timings["tools"][0]["name"] == "mcp__slow"
+    assert timings["tools"][0]["seconds"] >= 0.04
+    assert timings["tools"][0]["pending"] is False
+    assert timings["time_to_first_text_seconds"] >= timings["tools"][0]["seconds"]
+
+    record = json.loads(trace_file.read_text(encoding="utf-8").strip())
+    assert record["agent"] == "timing_agent"
+    assert record["tools"][0]["id"] == "tu_1"
+
+
+async def test_failed_run_keeps_partial_timings(monkeypatch):
+    monkeypatch.delenv("ISSUELAB_TIMINGS_FILE", raising=False)
+    monkeypatch.setattr(executor, "create_agent_options", lambda **kwargs: None)
+    monkeypatch.setattr(executor, "print", lambda *a, **k: None, raising=False)
+    monkeypatch.setattr(executor, "_agent_retry_policy", lambda: executor.RetryPolicy(max_retries=0))
+
+    async def hanging_query(*args, **kwargs):
+        yield AssistantMessage(content=[ToolUseBlock(id="tu_9", name="mcp__hang", input={})], model="m")
+        raise ValueError("tool crashed")
+
+    monkeypatch.setattr(executor, "query", hanging_query)
+
+    result = await executor.run_single_agent("p", "timing_agent")
+
+    assert result["ok"] is False
+    assert result["timings"]["tools"][0]["name"] == "mcp__hang"
+    assert result["timings"]["tools"][0]["pending"] is True
@@ -0,0 +1,203 @@
+"""Tests for GitHub App installation token cache."""
+
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from issuelab.cli import dispatch as dispatch_mod
+from issuelab.cli.token_cache import InstallationTokenCache, parse_expires_at, reset_token_cache
+
+
+@pytest.fixture(autouse=True)
+def _reset_default_cache(monkeypatch):
+    monkeypatch.delenv("ISSUELAB_TOKEN_CACHE_FILE", raising=False)
+    reset_token_cache()
+    dispatch_mod._APP_JWT_CACHE.clear()
+    yield
+    reset_token_cache()
+    dispatch_mod._APP_JWT_CACHE.clear()
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = datetime(2024, 1, 1, tzinfo=UTC)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def test_parse_expires_at():
+    assert parse_expires_at("2024-01-01T01:00:00Z") == datetime(2024, 1, 1, 1, tzinfo=UTC)
+    assert parse_expires_at("") is None
+    assert parse_expires_at("not-a-date") is None
+
+
+def test_token_reused_until_refresh_margin():
+    clock = _Clock()
+    cache = InstallationTokenCache(refresh_margin_seconds=300, clock=clock)
+    calls = []
+
+    def loader():
+        calls.append(clock.now)
+        return f"tok{len(calls)}", clock.now + timedelta(hours=1)
+
+    assert cache.get_token(1, loader) == "tok1"
+    clock.now += timedelta(minutes=50)
+    assert cache.get_token(1, loader) == "tok1"
+    # 进入提前刷新窗口（过期前 5 分钟）
+    clock.now += timedelta(minutes=6)
+    assert cache.get_token(1, loader) == "tok2"
+    assert len(calls) == 2
+
+
+def test_failed_loads_are_not_cached():
+    cache = InstallationTokenCache()
+    assert cache.get_installation_id("a/b", lambda: None) is None
+    assert cache.get_installation_id("a/b", lambda: 42) == 42
+    assert cache.get_token(42, lambda: None) is None
+    assert cache.get_token(42, lambda: ("tok", datetime.now(UTC) + timedelta(hours=1))) == "tok"
+
+
+def test_concurrent_refresh_is_deduplicated():
+    cache = InstallationTokenCache()
+    calls = {"count": 0}
+
+    def loader():
+        calls["count"] += 1
+        time.sleep(0.05)
+        return "tok", datetime.now(UTC) + timedelta(hours=1)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_token(7, loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["tok"] * 8
+    assert calls["count"] == 1
+
+
+def test_disk_store_shared_between_instances(tmp_path):
+    store = tmp_path / "tokens.json"
+    first = InstallationTokenCache(store_path=store)
+    first.get_installation_id("alice/IssueLab", lambda: 11)
+    first.get_token(11, lambda: ("tok", datetime.now(UTC) + timedelta(hours=1)))
+    assert oct(store.stat().st_mode & 0o777) == "0o600"
+
+    second = InstallationTokenCache(store_path=store)
+
+    def fail():
+        raise AssertionError("should be served from disk store")
+
+    assert second.get_installation_id("alice/IssueLab", fail) == 11
+    assert second.get_token(11, fail) == "tok"
+
+
+def test_disk_store_drops_expired_tokens(tmp_path):
+    store = tmp_path / "tokens.json"
+    first = InstallationTokenCache(store_path=store)
+    first.get_token(11, lambda: ("old", datetime.now(UTC) + timedelta(minutes=1)))
+
+    second = InstallationTokenCache(store_path=store)
+    assert second.get_token(11, lambda: ("new", datetime.now(UTC) + timedelta(hours=1))) == "new"
+
+
+def test_get_token_for_repository_skips_api_calls_on_repeat(monkeypatch):
+    calls = {"jwt": 0, "installation": 0, "token": 0}
+
+    def fake_jwt(app_id, private_key):
+        calls["jwt"] += 1
+        return "jwt"
+
+    def fake_installation(owner, repo, app_jwt):
+        calls["installation"] += 1
+        return 99
+
+    def fake_token(installation_id, app_jwt):
+        calls["token"] += 1
+        return "tok", datetime.now(UTC) + timedelta(hours=1)
+
+    monkeypatch.setattr(dispatch_mod, "generate_github_app_jwt", fake_jwt)
+    monkeypatch.setattr(dispatch_mod, "get_installation_id", fake_installation)
+    monkeypatch.setattr(dispatch_mod, "_request_installation_token", fake_token)
+
+    for _ in range(3):
+        assert dispatch_mod.get_token_for_repository("alice/IssueLab", "1", "key") == "tok"
+
+    assert calls == {"jwt": 1, "installation": 1, "token": 1}
+
+
+def test_invalidate_repository_drops_its_token():
+    cache = InstallationTokenCache()
+    cache.get_installation_id("alice/IssueLab", lambda: 7)
+    cache.get_token(7, lambda: ("old", datetime.now(UTC) + timedelta(hours=1)))
+
+    cache.invalidate(repository="alice/IssueLab")
+
+    assert cache.get_installation_id("alice/IssueLab", lambda: 8) == 8
+    assert cache.get_token(7, lambda: ("new", datetime.now(UTC) + timedelta(hours=1))) == "new"
+
+
+class _FakeDispatchClient:
+    def __init__(self, valid_token: str) -> None:
+        self.valid_token = valid_token
+        self.tokens: list[str] = []
+
+    def request(self, method, path, *, token, json, timeout):
+        import requests
+
+        self.tokens.append(token)
+        response = requests.Response()
+        response.status_code = 204 if token == self.valid_token else 401
+        response._content = b"" if response.status_code == 204 else b'{"message": "Bad credentials"}'
+        return response
+
+
+@pytest.mark.parametrize("mode", ["repository_dispatch", "workflow_dispatch"])
+def test_dispatch_refreshes_revoked_token_once(monkeypatch, mode):
+    """缓存的 token 被撤销时：401 → 失效缓存 → 重新生成 token → 重试一次"""
+    minted = iter(["revoked", "fresh"])
+    calls = {"installation": 0, "token": 0}
+
+    def fake_installation(owner, repo, app_jwt):
+        calls["installation"] += 1
+        return 99
+
+    def fake_token(installation_id, app_jwt):
+        calls["token"] += 1
+        return next(minted), datetime.now(UTC) + timedelta(hours=1)
+
+    client = _FakeDispatchClient(valid_token="fresh")
+    monkeypatch.setattr(dispatch_mod, "generate_github_app_jwt", lambda app_id, private_key: "jwt")
+    monkeypatch.setattr(dispatch_mod, "get_installation_id", fake_installation)
+    monkeypatch.setattr(dispatch_mod, "_request_installation_token", fake_token)
+    monkeypatch.setattr(dispatch_mod, "get_github_client", lambda: client)
+
+    repository = "alice/IssueLab"
+    token = dispatch_mod.get_token_for_repository(repository, "1", "key")
+
+    def refresh():
+        return dispatch_mod.refresh_token_for_repository(repository, "1", "key")
+
+    if mode == "workflow_dispatch":
+        result = dispatch_mod.dispatch_workflow(repository, "user_agent.yml", "main", {}, token, refresh_token=refresh)
+    else:
+        result = dispatch_mod.dispatch_event(repository, "agent_trigger", {}, token, refresh_token=refresh)
+
+    assert result == (True, "")
+    assert client.tokens == ["revoked", "fresh"]
+    assert calls == {"installation": 2, "token": 2}
+    assert dispatch_mod.get_token_for_repository(repository, "1", "key") == "fresh"
+
+
+def test_dispatch_401_without_new_token_fails_without_looping(monkeypatch):
+    client = _FakeDispatchClient(valid_token="never")
+    monkeypatch.setattr(dispatch_mod, "get_github_client", lambda: client)
+
+    result = dispatch_mod.dispatch_event("alice/IssueLab", "agent_trigger", {}, "tok", refresh_token=lambda: "tok")
+
+    assert result == (False, "UNAUTHORIZED")
+    assert client.tokens == ["tok"]
@@ -0,0 +1,182 @@
+"""测试跨 agent 工具结果缓存"""
+
+import time
+
+import anyio
+import pytest
+from claude_agent_sdk import AssistantMessage, ResultMessage, UserMessage
+from claude_agent_sdk.types import ToolResultBlock, ToolUseBlock
+
+from issuelab.agents import executor, options, tool_cache
+from issuelab.agents.result_cache import ResultCache
+from issuelab.agents.tool_cache import (
+    TOOL_CACHE_SERVER,
+    ToolCache,
+    build_tool_cache_hint,
+    build_tool_cache_tools,
+    html_to_text,
+    normalize_url,
+    parse_cache_status,
+    reset_tool_cache,
+)
+
+
+@pytest.mark.parametrize(
+    ("raw", "expected"),
+    [
+        ("http://www.arxiv.org/abs/2401.00001#sec1", "https://arxiv.org/abs/2401.00001"),
+        ("doi:10.1038/NATURE12373", "https://doi.org/10.1038/nature12373"),
+        ("https://dx.doi.org/10.1038/nature12373", "https://doi.org/10.1038/nature12373"),
+        ("https://github.com/gqy20/IssueLab.git/", "https://github.com/gqy20/IssueLab"),
+        ("HTTPS://Example.com:443/p?b=2&utm_source=x&a=1", "https://example.com/p?a=1&b=2"),
+    ],
+)
+def test_normalize_url(raw, expected):
+    assert normalize_url(raw) == expected
+
+
+def test_html_to_text_drops_scripts():
+    assert html_to_text("<html><script>x()</script><p>Hello <b>world</b></p><p>!</p></html>") == "Hello world\n!"
+
+
+class _FakeWeb:
+    def __init__(self) -> None:
+        self.fetches: list[str] = []
+
+    def fetch(self, url: str) -> dict:
+        self.fetches.append(url)
+        time.sleep(0.02)
+        return {"url": url, "content_type": "text/html", "text": f"page {url} " + "x" * 5000}
+
+    def search(self, query: str, source: str, max_results: int) -> dict:
+        return {"source": source, "query": query, "items": [{"title": "T", "url": "https://arxiv.org/abs/1"}]}
+
+
+def _tools(cache: ToolCache) -> dict:
+    return {t.name: t.handler for t in build_tool_cache_tools(cache)}
+
+
+async def test_agents_share_fetches_and_mark_hits(tmp_path):
+    web = _FakeWeb()
+    cache = ToolCache(ResultCache(None, namespace="tools"), fetcher=web.fetch, searcher=web.search)
+    fetch = _tools(cache)["cached_fetch"]
+    results: list[str] = []
+
+    async def _agent(url: str) -> None:
+        result = await fetch({"url": url})
+        results.append(result["content"][0]["text"])
+
+    # 三个 agent 并发抓取同一页面的不同写法：只请求一次
+    async with anyio.create_task_group() as tg:
+        for url in (
+            "arxiv.org/abs/2401.00001",
+            "http://www.arxiv.org/abs/2401.00001",
+            "https://arxiv.org/abs/2401.00001#x",
+        ):
+            tg.start_soon(_agent, url)
+
+    assert web.fetches == ["https://arxiv.org/abs/2401.00001"]
+    assert sorted(parse_cache_status(text) for text in results) == ["hit", "hit", "miss"]
+
+    paged = await fetch({"url": "arxiv.org/abs/2401.00001", "offset": 1000, "max_chars": 1000})
+    assert "[truncated: chars 1000-2000" in paged["content"][0]["text"]
+
+    search = await _tools(cache)["cached_search"]({"query": "Graph  Neural", "source": "arxiv"})
+    again = await _tools(cache)["cached_search"]({"query": "graph neural"})
+    assert parse_cache_status(search["content"]) == "miss"
+    assert parse_cache_status(again["content"]) == "hit"
+
+
+async def test_disk_layer_survives_jobs_and_expires(tmp_path):
+    web = _FakeWeb()
+    first = ToolCache(ResultCache(tmp_path, namespace="tools"), fetcher=web.fetch)
+    await first.fetch("https://github.com/gqy20/IssueLab")
+
+    second = ToolCache(ResultCache(tmp_path, namespace="tools"), fetcher=web.fetch)
+    hit, _ = await second.fetch("https://github.com/gqy20/IssueLab/")
+    assert hit and len(web.fetches) == 1
+
+    expiring = ToolCache(ResultCache(tmp_path, ttl_seconds=0.01, namespace="tools"), fetcher=web.fetch)
+    time.sleep(0.02)
+    hit, _ = await expiring.fetch("https://github.com/gqy20/IssueLab")
+    assert not hit and len(web.fetches) == 2
+
+
+async def test_fetch_errors_are_not_cached():
+    calls = []
+
+    def broken(url: str) -> dict:
+        calls.append(url)
+        raise OSError("boom")
+
+    fetch = _tools(ToolCache(ResultCache(None), fetcher=broken))["cached_fetch"]
+    for _ in range(2):
+        result = await fetch({"url": "https://example.com"})
+        assert result["is_error"] is True
+    assert len(calls) == 2
+
+
+def test_options_wire_cache_server_for_system_agents(monkeypatch):
+    monkeypatch.setenv("ISSUELAB_TOOL_CACHE", "1")
+    reset_tool_cache()
+    options.clear_agent_options_cache()
+    try:
+        opts = options.create_agent_options(agent_name="reviewer_a")
+        assert opts.mcp_servers[TOOL_CACHE_SERVER]["type"] == "sdk"
+        assert f"mcp__{TOOL_CACHE_SERVER}__*" in opts.allowed_tools
+        assert build_tool_cache_hint() in opts.system_prompt["append"]
+        assert f"mcp__{TOOL_CACHE_SERVER}__cached_fetch" in build_tool_cache_hint()
+
+        monkeypatch.delenv("ISSUELAB_TOOL_CACHE")
+        reset_tool_cache()
+        options.clear_agent_options_cache()
+        opts = options.create_agent_options(agent_name="reviewer_a")
+        assert TOOL_CACHE_SERVER not in opts.mcp_servers
+        assert build_tool_cache_hint() not in opts.system_prompt["append"]
+    finally:
+        reset_tool_cache()
+        options.clear_agent_options_cache()
+
+
+@pytest.mark.parametrize(
+    ("raw", "content_type", "expected"),
+    [
+        ("Café crème".encode("latin-1"), "text/html; charset=ISO-8859-1", "Café crème"),
+        ("论文摘要".encode("gbk"), "text/html; charset=gbk", "论文摘要"),
+        ('<meta charset="gbk"><p>论文摘要</p>'.encode("gbk"), "text/html", "论文摘要"),
+        ("Résumé ünïcode — ok".encode(), "text/html", "Résumé ünïcode — ok"),
+        (
+            "这是一段没有声明编码的中文网页内容，用于检测字符集探测是否生效。".encode("gb18030"),
+            "text/html",
+            "没有声明编码",
+        ),
+    ],
+)
+def test_decode_body_does_not_default_to_latin1(raw, content_type, expected):
+    assert expected in tool_cache._decode_body(raw, content_type)
+
+
+def test_decode_body_unknown_charset_falls_back_to_utf8():
+    assert tool_cache._decode_body("ok ✓".encode(), "text/plain; charset=x-unknown") == "ok ✓"
+
+
+async def test_hit_rate_in_execution_info(monkeypatch):
+    async def fake_query(*args, **kwargs):
+        for i, marker in enumerate(["[cache miss]", "[cache hit]", "[cache hit]"]):
+            yield AssistantMessage(
+                content=[ToolUseBlock(id=f"t{i}", name=f"mcp__{TOOL_CACHE_SERVER}__cached_fetch", input={})], model="m"
+            )
+            yield UserMessage(
+                content=[ToolResultBlock(tool_use_id=f"t{i}", content=[{"type": "text", "text": marker}])]
+            )
+        yield ResultMessage(
+            subtype="success", duration_ms=1, duration_api_ms=1, is_error=False, num_turns=3, session_id="s"
+        )
+
+    monkeypatch.setattr(executor, "query", fake_query)
+    monkeypatch.setattr(executor, "create_agent_options", lambda **kwargs: None)
+    monkeypatch.setattr(executor, "print", lambda *a, **k: None, raising=False)
+
+    result = await executor.run_single_agent("p", "reviewer_a")
+
+    assert result["tool_cache"] == {"hits": 2, "misses": 1, "hit_rate": 0.667}
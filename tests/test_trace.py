@@ -0,0 +1,123 @@
+"""测试执行轨迹录制与回放"""
+
+import asyncio
+
+import pytest
+from claude_agent_sdk import AssistantMessage, ResultMessage, UserMessage
+from claude_agent_sdk.types import TextBlock, ToolResultBlock, ToolUseBlock
+
+from issuelab.agents import executor
+from issuelab.agents.trace import (
+    TraceRecorder,
+    TraceReplayError,
+    decode_message,
+    encode_message,
+    load_trace,
+    replay_trace,
+    trace_issue,
+    trace_path,
+)
+
+
+def _messages() -> list:
+    return [
+        AssistantMessage(content=[ToolUseBlock(id="tu_1", name="mcp__search", input={"q": "x"})], model="m"),
+        UserMessage(content=[ToolResultBlock(tool_use_id="tu_1", content="命中 3 条")]),
+        AssistantMessage(content=[TextBlock(text="[Agent: moderator]\n结论")], model="m"),
+        ResultMessage(
+            subtype="success",
+            duration_ms=10,
+            duration_api_ms=8,
+            is_error=False,
+            num_turns=2,
+            session_id="sess",
+            total_cost_usd=0.12,
+            usage={"input_tokens": 100, "output_tokens": 20},
+        ),
+    ]
+
+
+def test_encode_decode_roundtrip():
+    for message in _messages():
+        assert decode_message(encode_message(message)) == message
+
+
+def test_trace_path_uses_issue_scope(tmp_path):
+    with trace_issue(42):
+        assert trace_path(tmp_path, "gqy20", "judge") == tmp_path / "issue-42" / "gqy20.judge.jsonl.gz"
+    assert trace_path(tmp_path, "a/b") == tmp_path / "issue-none" / "a_b.jsonl.gz"
+
+
+@pytest.fixture
+def quiet_executor(monkeypatch):
+    monkeypatch.setattr(executor, "create_agent_options", lambda **kwargs: None)
+    monkeypatch.setattr(executor, "print", lambda *a, **k: None, raising=False)
+
+
+async def test_record_then_replay_without_model(monkeypatch, tmp_path, quiet_executor):
+    async def live_query(*args, **kwargs):
+        for message in _messages():
+            await asyncio.sleep(0.02)
+            yield message
+
+    monkeypatch.setenv("ISSUELAB_TRACE_DIR", str(tmp_path))
+    monkeypatch.setattr(executor, "query", live_query)
+    with trace_issue(7):
+        recorded = await executor.run_single_agent("p", "moderator")
+
+    entries, end = load_trace(tmp_path / "issue-7" / "moderator.jsonl.gz")
+    assert [m for _, m in entries] == _messages()
+    assert end["status"] == "ok" and end["issue"] == 7
+
+    async def no_model(*args, **kwargs):
+        raise AssertionError("回放模式不应调用模型")
+        yield
+
+    monkeypatch.delenv("ISSUELAB_TRACE_DIR")
+    monkeypatch.setenv("ISSUELAB_TRACE_REPLAY_DIR", str(tmp_path))
+    monkeypatch.setattr(executor, "query", no_model)
+    sleeps: list[float] = []
+    real_sleep = asyncio.sleep
+
+    async def record_sleep(delay, *args, **kwargs):
+        sleeps.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", record_sleep)
+    with trace_issue(7):
+        fast = await executor.run_single_agent("p", "moderator")
+        fast_sleeps, sleeps[:] = list(sleeps), []
+
+        monkeypatch.setenv("ISSUELAB_TRACE_REPLAY_SPEED", "1")
+        paced = await executor.run_single_agent("p", "moderator")
+
+    for replayed in (fast, paced):
+        for key in ("response", "cost_usd", "num_turns", "tool_calls", "session_id", "total_tokens"):
+            assert replayed[key] == recorded[key]
+    # 最快速度不等待；按原速回放时等待录制时的消息间隔（4 条消息各间隔 ≥20 ms）
+    assert fast_sleeps == []
+    assert len(sleeps) == 4
+    assert sum(sleeps) >= 0.07
+
+
+async def test_errored_trace_replays_error(tmp_path):
+    path = tmp_path / "t.jsonl.gz"
+    recorder = TraceRecorder(path)
+    recorder.record(_messages()[0])
+    recorder.close("error", "ProcessError: exit 1")
+
+    received = []
+    with pytest.raises(TraceReplayError, match="exit 1"):
+        async for message in replay_trace(path):
+            received.append(message)
+    assert received == _messages()[:1]
+
+
+async def test_missing_trace_fails_run(monkeypatch, tmp_path, quiet_executor):
+    monkeypatch.setenv("ISSUELAB_TRACE_REPLAY_DIR", str(tmp_path))
+    monkeypatch.setattr(executor, "_agent_retry_policy", lambda: executor.RetryPolicy(max_retries=0))
+
+    result = await executor.run_single_agent("p", "unknown_agent")
+
+    assert result["ok"] is False
+    assert "回放轨迹不存在" in result["error_message"]